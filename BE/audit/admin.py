@@ -0,0 +1,25 @@
+from django.contrib import admin
+from .models import AuditChainHead, AuditEvent
+
+
+class ReadOnlyAdmin(admin.ModelAdmin):
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(AuditEvent)
+class AuditEventAdmin(ReadOnlyAdmin):
+    list_display = ['occurred_at', 'actor_username', 'action', 'resource_type', 'resource_id', 'patient_id']
+    list_filter = ['action', 'resource_type', 'partition']
+    search_fields = ['actor_username', 'resource_id']
+
+
+@admin.register(AuditChainHead)
+class AuditChainHeadAdmin(ReadOnlyAdmin):
+    list_display = ['partition', 'sequence', 'hash', 'updated_at']
@@ -0,0 +1,38 @@
+# BE/audit/management/commands/verify_audit_chain.py
+from django.core.management.base import BaseCommand, CommandError
+
+from audit.services.chain import AuditChain, get_audit_config
+
+
+class Command(BaseCommand):
+    help = 'Recompute audit log hash chains and report the first broken link in each partition'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--partition',
+            type=int,
+            action='append',
+            help='Month to verify as YYYYMM (repeatable; default every partition)',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=get_audit_config().get('VERIFY_BATCH_SIZE', 5000),
+            help='Events read per query',
+        )
+
+    def handle(self, *args, **options):
+        chain = AuditChain()
+        broken = 0
+        for partition in options['partition'] or chain.partitions():
+            check = chain.verify(partition, batch_size=options['batch_size'])
+            if check.ok:
+                self.stdout.write(f'{partition}: {check.checked} events verified')
+            else:
+                broken += 1
+                self.stdout.write(self.style.ERROR(
+                    f'{partition}: broken at sequence {check.broken_at} ({check.reason}) after {check.checked} events'
+                ))
+        if broken:
+            raise CommandError(f'{broken} audit partitions failed verification')
+        self.stdout.write(self.style.SUCCESS('Audit log intact'))
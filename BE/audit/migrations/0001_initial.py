@@ -0,0 +1,105 @@
+# Generated by Django 4.2.30 on 2026-10-19 10:00
+
+from django.db import migrations, models
+
+
+def partition_audit_events(apps, schema_editor):
+    """
+    On PostgreSQL, rebuild the empty audit_events table range-partitioned by
+    month (audit.services.chain.ensure_partition adds each month's table), and
+    reject UPDATE and DELETE statements on it. A partitioned table's primary
+    key has to include the partition column, and identity columns need
+    PostgreSQL 17, so ids come from a plain sequence.
+    """
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for statement in [
+        "ALTER TABLE audit_events RENAME TO audit_events_unpartitioned",
+        "CREATE TABLE audit_events (LIKE audit_events_unpartitioned INCLUDING DEFAULTS INCLUDING CONSTRAINTS) "
+        "PARTITION BY RANGE (partition)",
+        "DROP TABLE audit_events_unpartitioned",
+        "CREATE SEQUENCE audit_events_id_seq OWNED BY audit_events.id",
+        "ALTER TABLE audit_events ALTER COLUMN id SET DEFAULT nextval('audit_events_id_seq')",
+        "ALTER TABLE audit_events ADD PRIMARY KEY (id, partition)",
+        "CREATE TABLE audit_events_default PARTITION OF audit_events DEFAULT",
+        """
+        CREATE FUNCTION audit_events_append_only() RETURNS trigger LANGUAGE plpgsql AS $$
+        BEGIN
+            RAISE EXCEPTION 'audit_events is append-only';
+        END
+        $$
+        """,
+        "CREATE TRIGGER audit_events_append_only BEFORE UPDATE OR DELETE ON audit_events "
+        "FOR EACH STATEMENT EXECUTE FUNCTION audit_events_append_only()",
+    ]:
+        schema_editor.execute(statement)
+
+
+def drop_append_only_trigger(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute("DROP FUNCTION IF EXISTS audit_events_append_only() CASCADE")
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AuditChainHead',
+            fields=[
+                ('partition', models.PositiveIntegerField(primary_key=True, serialize=False)),
+                ('sequence', models.PositiveBigIntegerField(default=0)),
+                ('hash', models.CharField(max_length=64)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'db_table': 'audit_chain_heads',
+            },
+        ),
+        migrations.CreateModel(
+            name='AuditEvent',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('partition', models.PositiveIntegerField(help_text='Month of occurred_at as YYYYMM')),
+                ('sequence', models.PositiveBigIntegerField(help_text="Position in the partition's hash chain")),
+                ('occurred_at', models.DateTimeField()),
+                ('recorded_at', models.DateTimeField()),
+                ('actor_id', models.IntegerField(blank=True, null=True)),
+                ('actor_username', models.CharField(blank=True, max_length=150)),
+                ('ip_address', models.GenericIPAddressField(blank=True, null=True)),
+                ('action', models.CharField(choices=[('READ', 'Read'), ('CREATE', 'Create'), ('UPDATE', 'Update'), ('DELETE', 'Delete')], max_length=10)),
+                ('resource_type', models.CharField(choices=[('HEALTH_RECORD', 'Health record'), ('VITALS', 'Vital signs'), ('ALLERGY', 'Allergy'), ('PRESCRIPTION', 'Prescription'), ('CHART', 'Chart summary')], max_length=20)),
+                ('resource_id', models.CharField(blank=True, max_length=64)),
+                ('patient_id', models.IntegerField(blank=True, null=True)),
+                ('details', models.JSONField(blank=True, default=dict)),
+                ('previous_hash', models.CharField(max_length=64)),
+                ('hash', models.CharField(max_length=64)),
+            ],
+            options={
+                'db_table': 'audit_events',
+            },
+        ),
+        migrations.RunPython(partition_audit_events, drop_append_only_trigger),
+        # Created after partitioning, so PostgreSQL builds them on every month's table
+        migrations.AddIndex(
+            model_name='auditevent',
+            index=models.Index(fields=['partition', 'patient_id', 'occurred_at'], name='audit_event_patient_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='auditevent',
+            index=models.Index(fields=['partition', 'actor_id', 'occurred_at'], name='audit_event_actor_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='auditevent',
+            index=models.Index(fields=['partition', 'resource_type', 'resource_id'], name='audit_event_resource_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='auditevent',
+            constraint=models.UniqueConstraint(fields=('partition', 'sequence'), name='audit_event_chain_position'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.30 on 2026-10-19 10:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('audit', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='auditevent',
+            name='resource_type',
+            field=models.CharField(choices=[('HEALTH_RECORD', 'Health record'), ('VITALS', 'Vital signs'), ('ALLERGY', 'Allergy'), ('PRESCRIPTION', 'Prescription'), ('CHART', 'Chart summary'), ('TIMELINE', 'Patient timeline')], max_length=20),
+        ),
+    ]
@@ -0,0 +1,79 @@
+# Generated by Django 4.2.30 on 2026-10-19 11:19
+
+from django.db import migrations, models
+
+
+def no_truncate(table):
+    return (
+        f"DO $$ BEGIN "
+        f"CREATE TRIGGER audit_events_no_truncate BEFORE TRUNCATE ON {table} "
+        f"FOR EACH STATEMENT EXECUTE FUNCTION audit_events_append_only(); "
+        f"EXCEPTION WHEN duplicate_object THEN NULL; "
+        f"END $$"
+    )
+
+
+def partitions(schema_editor):
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute("SELECT inhrelid::regclass::text FROM pg_inherits WHERE inhparent = 'audit_events'::regclass")
+        return [row[0] for row in cursor.fetchall()]
+
+
+def guard_rows_and_truncate(apps, schema_editor):
+    """
+    0001's statement-level trigger sat on the partitioned parent only, so an
+    UPDATE or DELETE aimed at a month's table went through. A row-level
+    trigger on the parent is cloned to every partition, present and future.
+    TRUNCATE only fires statement triggers, and those aren't inherited, so the
+    parent and each partition get one (ensure_partition adds it to new months).
+    """
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute("DROP TRIGGER IF EXISTS audit_events_append_only ON audit_events")
+    schema_editor.execute(
+        "CREATE TRIGGER audit_events_append_only BEFORE UPDATE OR DELETE ON audit_events "
+        "FOR EACH ROW EXECUTE FUNCTION audit_events_append_only()"
+    )
+    for table in ['audit_events', *partitions(schema_editor)]:
+        schema_editor.execute(no_truncate(table))
+
+
+def restore_statement_trigger(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for table in ['audit_events', *partitions(schema_editor)]:
+        schema_editor.execute(f"DROP TRIGGER IF EXISTS audit_events_no_truncate ON {table}")
+    schema_editor.execute("DROP TRIGGER IF EXISTS audit_events_append_only ON audit_events")
+    schema_editor.execute(
+        "CREATE TRIGGER audit_events_append_only BEFORE UPDATE OR DELETE ON audit_events "
+        "FOR EACH STATEMENT EXECUTE FUNCTION audit_events_append_only()"
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('audit', '0002_timeline_resource'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PendingAuditEvent',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('occurred_at', models.DateTimeField()),
+                ('actor_id', models.IntegerField(blank=True, null=True)),
+                ('actor_username', models.CharField(blank=True, max_length=150)),
+                ('ip_address', models.GenericIPAddressField(blank=True, null=True)),
+                ('action', models.CharField(choices=[('READ', 'Read'), ('CREATE', 'Create'), ('UPDATE', 'Update'), ('DELETE', 'Delete')], max_length=10)),
+                ('resource_type', models.CharField(choices=[('HEALTH_RECORD', 'Health record'), ('VITALS', 'Vital signs'), ('ALLERGY', 'Allergy'), ('PRESCRIPTION', 'Prescription'), ('CHART', 'Chart summary'), ('TIMELINE', 'Patient timeline')], max_length=20)),
+                ('resource_id', models.CharField(blank=True, max_length=64)),
+                ('patient_id', models.IntegerField(blank=True, null=True)),
+                ('details', models.JSONField(blank=True, default=dict)),
+            ],
+            options={
+                'db_table': 'audit_pending_events',
+            },
+        ),
+        migrations.RunPython(guard_rows_and_truncate, restore_statement_trigger),
+    ]
@@ -0,0 +1,123 @@
+# BE/audit/models.py
+from django.db import models
+
+
+class AuditLogImmutable(Exception):
+    """Raised on any attempt to change or remove an audit event"""
+
+
+class AppendOnlyQuerySet(models.QuerySet):
+    def update(self, **kwargs):
+        raise AuditLogImmutable("Audit events can't be updated")
+
+    def delete(self):
+        raise AuditLogImmutable("Audit events can't be deleted")
+
+
+class AuditEvent(models.Model):
+    """
+    One read or write of patient data, append-only. Events are chained per
+    monthly partition: each stores the hash of the one before it, so editing,
+    removing or reordering a row breaks every hash after it. Actor and patient
+    are plain ids rather than foreign keys, so no cascade ever rewrites the log.
+    See audit.services.chain.
+    """
+    ACTION_CHOICES = [
+        ('READ', 'Read'),
+        ('CREATE', 'Create'),
+        ('UPDATE', 'Update'),
+        ('DELETE', 'Delete'),
+    ]
+    RESOURCE_CHOICES = [
+        ('HEALTH_RECORD', 'Health record'),
+        ('VITALS', 'Vital signs'),
+        ('ALLERGY', 'Allergy'),
+        ('PRESCRIPTION', 'Prescription'),
+        ('CHART', 'Chart summary'),
+        ('TIMELINE', 'Patient timeline'),
+    ]
+
+    id = models.BigAutoField(primary_key=True)
+    partition = models.PositiveIntegerField(help_text="Month of occurred_at as YYYYMM")
+    sequence = models.PositiveBigIntegerField(help_text="Position in the partition's hash chain")
+    occurred_at = models.DateTimeField()
+    recorded_at = models.DateTimeField()
+    actor_id = models.IntegerField(null=True, blank=True)
+    actor_username = models.CharField(max_length=150, blank=True)
+    ip_address = models.GenericIPAddressField(null=True, blank=True)
+    action = models.CharField(max_length=10, choices=ACTION_CHOICES)
+    resource_type = models.CharField(max_length=20, choices=RESOURCE_CHOICES)
+    resource_id = models.CharField(max_length=64, blank=True)
+    patient_id = models.IntegerField(null=True, blank=True)
+    details = models.JSONField(default=dict, blank=True)
+    previous_hash = models.CharField(max_length=64)
+    hash = models.CharField(max_length=64)
+
+    objects = AppendOnlyQuerySet.as_manager()
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding:
+            raise AuditLogImmutable("Audit events can't be updated")
+        super().save(*args, **kwargs)
+
+    def delete(self, *args, **kwargs):
+        raise AuditLogImmutable("Audit events can't be deleted")
+
+    def __str__(self):
+        return f"{self.actor_username or 'system'} {self.action} {self.resource_type} {self.resource_id} at {self.occurred_at}"
+
+    class Meta:
+        db_table = 'audit_events'
+        constraints = [
+            models.UniqueConstraint(fields=['partition', 'sequence'], name='audit_event_chain_position'),
+        ]
+        indexes = [
+            # Compliance queries name a partition range first, so each index is searched per month
+            models.Index(fields=['partition', 'patient_id', 'occurred_at'], name='audit_event_patient_idx'),
+            models.Index(fields=['partition', 'actor_id', 'occurred_at'], name='audit_event_actor_idx'),
+            models.Index(fields=['partition', 'resource_type', 'resource_id'], name='audit_event_resource_idx'),
+        ]
+
+
+class AuditChainHead(models.Model):
+    """Last link of each partition's chain; appends lock this row to extend it in order"""
+    partition = models.PositiveIntegerField(primary_key=True)
+    sequence = models.PositiveBigIntegerField(default=0)
+    hash = models.CharField(max_length=64)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Audit partition {self.partition}: {self.sequence} events"
+
+    class Meta:
+        db_table = 'audit_chain_heads'
+
+
+class PendingAuditEvent(models.Model):
+    """
+    An event recorded but not yet chained. Writers insert here, which is one
+    uncontended INSERT, and a drainer in any process moves rows onto the chain
+    and deletes them in the same transaction, so events survive a killed worker.
+    """
+    id = models.BigAutoField(primary_key=True)
+    occurred_at = models.DateTimeField()
+    actor_id = models.IntegerField(null=True, blank=True)
+    actor_username = models.CharField(max_length=150, blank=True)
+    ip_address = models.GenericIPAddressField(null=True, blank=True)
+    action = models.CharField(max_length=10, choices=AuditEvent.ACTION_CHOICES)
+    resource_type = models.CharField(max_length=20, choices=AuditEvent.RESOURCE_CHOICES)
+    resource_id = models.CharField(max_length=64, blank=True)
+    patient_id = models.IntegerField(null=True, blank=True)
+    details = models.JSONField(default=dict, blank=True)
+
+    # Copied to and from AuditEvent
+    EVENT_FIELDS = (
+        'occurred_at', 'actor_id', 'actor_username', 'ip_address', 'action', 'resource_type', 'resource_id',
+        'patient_id', 'details',
+    )
+
+    def __str__(self):
+        return f"Pending {self.action} {self.resource_type} {self.resource_id} at {self.occurred_at}"
+
+    class Meta:
+        db_table = 'audit_pending_events'
@@ -0,0 +1,11 @@
+# BE/audit/serializers.py
+from rest_framework import serializers
+from .models import AuditEvent
+
+
+class AuditEventSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = AuditEvent
+        fields = ['id', 'occurred_at', 'actor_id', 'actor_username', 'ip_address', 'action', 'resource_type',
+                  'resource_id', 'patient_id', 'details', 'partition', 'sequence', 'hash']
+        read_only_fields = fields
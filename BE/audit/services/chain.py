@@ -0,0 +1,175 @@
+# BE/audit/services/chain.py
+import hashlib
+import json
+import logging
+from collections import defaultdict
+from dataclasses import dataclass
+from datetime import datetime, timezone as dt_timezone
+from typing import Iterable, List, Optional
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+
+from ..models import AuditChainHead, AuditEvent
+
+logger = logging.getLogger(__name__)
+
+# previous_hash of the first event in every partition
+GENESIS_HASH = '0' * 64
+
+# Hashed in this order; changing it invalidates every existing chain
+HASHED_FIELDS = (
+    'partition', 'sequence', 'occurred_at', 'actor_id', 'actor_username', 'ip_address',
+    'action', 'resource_type', 'resource_id', 'patient_id', 'details',
+)
+
+
+def get_audit_config():
+    return getattr(settings, 'AUDIT_CONFIG', {})
+
+
+def partition_key(moment: datetime) -> int:
+    moment = moment.astimezone(dt_timezone.utc)
+    return moment.year * 100 + moment.month
+
+
+def next_partition_key(partition: int) -> int:
+    year, month = divmod(partition, 100)
+    return (year + 1) * 100 + 1 if month == 12 else partition + 1
+
+
+def event_hash(event: AuditEvent, previous_hash: str) -> str:
+    payload = {field: getattr(event, field) for field in HASHED_FIELDS}
+    payload['occurred_at'] = event.occurred_at.astimezone(dt_timezone.utc).isoformat()
+    canonical = json.dumps(payload, sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.sha256(f'{previous_hash}{canonical}'.encode('utf-8')).hexdigest()
+
+
+def block_truncate(table: str) -> str:
+    """
+    SQL adding the append-only TRUNCATE guard to one table. Statement triggers
+    aren't inherited by partitions (the row-level UPDATE/DELETE guard is), so
+    every month's table gets its own; see audit migration 0003.
+    """
+    return (
+        f"DO $$ BEGIN "
+        f"CREATE TRIGGER audit_events_no_truncate BEFORE TRUNCATE ON {table} "
+        f"FOR EACH STATEMENT EXECUTE FUNCTION audit_events_append_only(); "
+        f"EXCEPTION WHEN duplicate_object THEN NULL; "
+        f"END $$"
+    )
+
+
+def ensure_partition(partition: int):
+    """
+    On PostgreSQL audit_events is range-partitioned by month (audit migration
+    0001); a month's table is created with its chain head, before any of its
+    events exist, so the DEFAULT partition never holds rows that would block it.
+    """
+    if connection.vendor != 'postgresql':
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"CREATE TABLE IF NOT EXISTS audit_events_{partition} PARTITION OF audit_events "
+            f"FOR VALUES FROM ({partition}) TO ({next_partition_key(partition)})"
+        )
+        cursor.execute(block_truncate(f'audit_events_{partition}'))
+
+
+@dataclass
+class ChainCheck:
+    partition: int
+    checked: int
+    broken_at: Optional[int] = None
+    reason: str = ''
+
+    @property
+    def ok(self):
+        return self.broken_at is None
+
+
+class AuditChain:
+    """
+    Appends events to their partition's hash chain and verifies chains.
+
+    An append locks the partition's head row, numbers and hashes the batch
+    from it, bulk inserts the rows and moves the head, all in one transaction,
+    so concurrent writers extend a chain one after another and a unique
+    (partition, sequence) constraint catches any that don't.
+    """
+
+    def append(self, events: Iterable[AuditEvent]) -> int:
+        by_partition = defaultdict(list)
+        for event in events:
+            by_partition[partition_key(event.occurred_at)].append(event)
+
+        appended = 0
+        for partition, batch in sorted(by_partition.items()):
+            batch.sort(key=lambda event: event.occurred_at)
+            with transaction.atomic():
+                head = self.lock_head(partition)
+                recorded_at = timezone.now()
+                sequence, previous_hash = head.sequence, head.hash
+                for event in batch:
+                    sequence += 1
+                    event.partition = partition
+                    event.sequence = sequence
+                    event.recorded_at = recorded_at
+                    event.previous_hash = previous_hash
+                    event.hash = previous_hash = event_hash(event, previous_hash)
+                AuditEvent.objects.bulk_create(batch)
+                head.sequence, head.hash = sequence, previous_hash
+                head.save(update_fields=['sequence', 'hash', 'updated_at'])
+            appended += len(batch)
+        return appended
+
+    @staticmethod
+    def lock_head(partition: int) -> AuditChainHead:
+        head = AuditChainHead.objects.select_for_update().filter(partition=partition).first()
+        if head is None:
+            ensure_partition(partition)
+            AuditChainHead.objects.bulk_create(
+                [AuditChainHead(partition=partition, hash=GENESIS_HASH)], ignore_conflicts=True
+            )
+            head = AuditChainHead.objects.select_for_update().get(partition=partition)
+        return head
+
+    def verify(self, partition: int, batch_size=None) -> ChainCheck:
+        """Recompute one partition's chain in sequence order and compare it with the stored hashes and head"""
+        batch_size = batch_size or get_audit_config().get('VERIFY_BATCH_SIZE', 5000)
+        head = AuditChainHead.objects.filter(partition=partition).first()
+        check = ChainCheck(partition=partition, checked=0)
+        expected_sequence, previous_hash = 1, GENESIS_HASH
+
+        while True:
+            batch = list(AuditEvent.objects.filter(
+                partition=partition, sequence__gte=expected_sequence
+            ).order_by('sequence')[:batch_size])
+            for event in batch:
+                if event.sequence != expected_sequence:
+                    return self._broken(check, expected_sequence, 'missing event')
+                if event.previous_hash != previous_hash:
+                    return self._broken(check, event.sequence, 'previous hash does not match')
+                if event.hash != event_hash(event, previous_hash):
+                    return self._broken(check, event.sequence, 'event contents changed')
+                previous_hash = event.hash
+                expected_sequence += 1
+                check.checked += 1
+            if len(batch) < batch_size:
+                break
+
+        if head is None:
+            return self._broken(check, 1, 'no chain head') if check.checked else check
+        if head.sequence != check.checked or head.hash != previous_hash:
+            return self._broken(check, check.checked + 1, f'chain ends before head at {head.sequence}')
+        return check
+
+    def partitions(self) -> List[int]:
+        return list(AuditChainHead.objects.order_by('partition').values_list('partition', flat=True))
+
+    @staticmethod
+    def _broken(check, sequence, reason):
+        check.broken_at, check.reason = sequence, reason
+        logger.error(f"Audit chain {check.partition} broken at {sequence}: {reason}")
+        return check
@@ -0,0 +1,83 @@
+# BE/audit/services/trail.py
+import json
+from collections import defaultdict
+from contextvars import ContextVar
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from django.db import transaction
+from django.utils import timezone
+
+from ..models import AuditEvent
+from .chain import get_audit_config, partition_key
+from .writer import get_writer
+
+# Request being served, set by AuditContextMiddleware so signal handlers can
+# attribute writes; None in management commands and other background work
+current_request: ContextVar = ContextVar('audit_request', default=None)
+
+
+def client_ip(request) -> Optional[str]:
+    forwarded = request.META.get('HTTP_X_FORWARDED_FOR')
+    return forwarded.split(',')[0].strip() if forwarded else request.META.get('REMOTE_ADDR')
+
+
+def build_event(action, resource_type, patient_id=None, resource_id='', details=None, request=None) -> AuditEvent:
+    request = request if request is not None else current_request.get()
+    user = getattr(request, 'user', None)
+    authenticated = bool(user and user.is_authenticated)
+    occurred_at = timezone.now()
+    return AuditEvent(
+        partition=partition_key(occurred_at),
+        occurred_at=occurred_at,
+        actor_id=user.id if authenticated else None,
+        actor_username=user.get_username() if authenticated else '',
+        ip_address=client_ip(request) if request is not None else None,
+        action=action,
+        resource_type=resource_type,
+        resource_id=str(resource_id or ''),
+        patient_id=patient_id,
+        # Stored exactly as hashed: JSON round trips must not change it
+        details=json.loads(json.dumps(details or {}, default=str)),
+    )
+
+
+def audit_enabled() -> bool:
+    return get_audit_config().get('ENABLED', True)
+
+
+def audit_read(request, resource_type, patient_id, resource_id='', **details):
+    if audit_enabled():
+        get_writer().write([build_event('READ', resource_type, patient_id, resource_id, details, request)])
+
+
+def per_patient_events(request, action, resource_type, rows: Iterable[Tuple[int, str]], details) -> List[AuditEvent]:
+    """One event per patient for (patient id, resource id) rows, the distinct ids listed in details"""
+    by_patient: Dict[int, Dict[str, None]] = defaultdict(dict)
+    for patient_id, resource_id in rows:
+        by_patient[patient_id][str(resource_id)] = None
+    return [
+        build_event(action, resource_type, patient_id, details={**details, 'resource_ids': list(resource_ids)},
+                    request=request)
+        for patient_id, resource_ids in by_patient.items()
+    ]
+
+
+def audit_reads(request, resource_type, rows: Iterable[Tuple[int, str]], **details):
+    if audit_enabled():
+        get_writer().write(per_patient_events(request, 'READ', resource_type, rows, details))
+
+
+def audit_writes(request, action, resource_type, rows: Iterable[Tuple[int, str]], **details):
+    """Bulk writes send no signals; their callers log them here, once per patient"""
+    if not audit_enabled():
+        return
+    events = per_patient_events(request, action, resource_type, rows, details)
+    transaction.on_commit(lambda: get_writer().write(events))
+
+
+def audit_write(action, resource_type, patient_id, resource_id='', **details):
+    """Logged once the write commits; a rolled-back change never happened"""
+    if not audit_enabled():
+        return
+    event = build_event(action, resource_type, patient_id, resource_id, details)
+    transaction.on_commit(lambda: get_writer().write([event]))
@@ -0,0 +1,128 @@
+# BE/audit/services/writer.py
+import logging
+import threading
+from typing import List, Optional
+
+from django.db import connection, transaction
+
+from ..models import AuditEvent, PendingAuditEvent
+from .chain import AuditChain, get_audit_config, partition_key
+
+logger = logging.getLogger(__name__)
+
+
+class AuditWriter:
+    """
+    Hands audit events to the chain without making requests wait on it.
+
+    In the background mode events are staged in PendingAuditEvent with one
+    plain INSERT, which takes no chain lock, and a background thread chains
+    them every ``FLUSH_INTERVAL_SECONDS`` or as soon as ``BATCH_SIZE`` are
+    waiting. Staged rows are durable, so a worker killed before its thread
+    flushes loses nothing: any process's drainer picks them up. Each batch is
+    chained and removed from the staging table in one transaction, so an
+    event is chained exactly once.
+
+    With ``BACKGROUND`` off (as under the test runner) ``write`` chains the
+    events itself, in the caller's thread and transaction.
+    """
+
+    def __init__(self, chain=None, background=None, batch_size=None, flush_interval=None):
+        config = get_audit_config()
+        self.chain = chain or AuditChain()
+        self.background = config.get('BACKGROUND', True) if background is None else background
+        self.batch_size = batch_size or config.get('BATCH_SIZE', 500)
+        self.flush_interval = flush_interval or config.get('FLUSH_INTERVAL_SECONDS', 2)
+        self._staged = 0
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread = None
+
+    def write(self, events: List[AuditEvent]):
+        if not events:
+            return
+        if not self.background:
+            self.chain.append(events)
+            return
+
+        self.stage(events)
+        with self._lock:
+            self._staged += len(events)
+            waiting = self._staged
+        self._start()
+        if waiting >= self.batch_size:
+            self._wakeup.set()
+
+    @staticmethod
+    def stage(events: List[AuditEvent]):
+        PendingAuditEvent.objects.bulk_create([
+            PendingAuditEvent(**{name: getattr(event, name) for name in PendingAuditEvent.EVENT_FIELDS})
+            for event in events
+        ])
+
+    def flush(self) -> int:
+        """Chain everything staged, from any process, one batch per transaction"""
+        flushed = 0
+        with self._flush_lock:
+            with self._lock:
+                self._staged = 0
+            while True:
+                with transaction.atomic():
+                    # Another process's drainer takes the rows this one skips
+                    pending = list(PendingAuditEvent.objects.select_for_update(skip_locked=True).order_by(
+                        'id'
+                    )[:self.batch_size])
+                    if not pending:
+                        return flushed
+                    self.chain.append([self.event(row) for row in pending])
+                    PendingAuditEvent.objects.filter(id__in=[row.id for row in pending]).delete()
+                flushed += len(pending)
+
+    @staticmethod
+    def event(row: PendingAuditEvent) -> AuditEvent:
+        values = {name: getattr(row, name) for name in PendingAuditEvent.EVENT_FIELDS}
+        return AuditEvent(partition=partition_key(row.occurred_at), **values)
+
+    def pending(self) -> int:
+        return PendingAuditEvent.objects.count()
+
+    def _start(self):
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='audit-writer', daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                # The events stay staged for the next attempt
+                logger.error(f"Audit flush failed: {e}")
+            finally:
+                connection.close()
+
+
+_writer: Optional[AuditWriter] = None
+_writer_lock = threading.Lock()
+
+
+def get_writer() -> AuditWriter:
+    global _writer
+    if _writer is None:
+        with _writer_lock:
+            if _writer is None:
+                _writer = AuditWriter()
+    return _writer
+
+
+def set_writer(writer: Optional[AuditWriter]):
+    """Replace the process's writer, e.g. with a synchronous one; None builds a fresh one from settings"""
+    global _writer
+    with _writer_lock:
+        _writer = writer
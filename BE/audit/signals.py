@@ -0,0 +1,34 @@
+# BE/audit/signals.py
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from pharmacy.models import Prescription
+from records.models import Allergy, HealthRecord, VitalSigns
+from .services.trail import audit_write
+
+RESOURCE_TYPES = {
+    HealthRecord: ('HEALTH_RECORD', 'record_id'),
+    VitalSigns: ('VITALS', 'pk'),
+    Allergy: ('ALLERGY', 'pk'),
+    Prescription: ('PRESCRIPTION', 'prescription_number'),
+}
+
+
+@receiver(post_save, sender=HealthRecord)
+@receiver(post_save, sender=VitalSigns)
+@receiver(post_save, sender=Allergy)
+@receiver(post_save, sender=Prescription)
+def audit_saved(sender, instance, created, update_fields=None, **kwargs):
+    resource_type, id_field = RESOURCE_TYPES[sender]
+    details = {'fields': sorted(update_fields)} if update_fields else {}
+    audit_write('CREATE' if created else 'UPDATE', resource_type, instance.patient_id,
+                getattr(instance, id_field), **details)
+
+
+@receiver(post_delete, sender=HealthRecord)
+@receiver(post_delete, sender=VitalSigns)
+@receiver(post_delete, sender=Allergy)
+@receiver(post_delete, sender=Prescription)
+def audit_deleted(sender, instance, **kwargs):
+    resource_type, id_field = RESOURCE_TYPES[sender]
+    audit_write('DELETE', resource_type, instance.patient_id, getattr(instance, id_field))
@@ -0,0 +1,155 @@
+from datetime import datetime, timedelta, timezone as dt_timezone
+from io import StringIO
+from unittest import mock, skipUnless
+
+from django.core.management import CommandError, call_command
+from django.db import DatabaseError, connection, transaction
+from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from shared.models import User
+from .models import AuditChainHead, AuditEvent, AuditLogImmutable, PendingAuditEvent
+from .services.chain import AuditChain, partition_key
+from .services.trail import audit_read
+from .services.writer import AuditWriter, get_writer, set_writer
+
+MARCH = datetime(2024, 3, 10, 12, tzinfo=dt_timezone.utc)
+
+
+def make_event(occurred_at, patient_id=1, action='READ', resource_type='CHART', **details):
+    return AuditEvent(
+        partition=partition_key(occurred_at), occurred_at=occurred_at, actor_id=1, actor_username='doc',
+        action=action, resource_type=resource_type, resource_id=str(patient_id), patient_id=patient_id,
+        details=details,
+    )
+
+
+class AuditChainTests(TestCase):
+    def setUp(self):
+        self.chain = AuditChain()
+        self.chain.append([make_event(MARCH + timedelta(minutes=minute), view=minute) for minute in range(5)])
+
+    def tamper(self, sql, *params):
+        # Only the database itself can still change a row
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+
+    def test_events_are_chained_per_month(self):
+        self.chain.append([make_event(MARCH + timedelta(days=30)), make_event(MARCH + timedelta(minutes=9))])
+        self.assertEqual(self.chain.partitions(), [202403, 202404])
+        march = list(AuditEvent.objects.filter(partition=202403).order_by('sequence'))
+        self.assertEqual([event.sequence for event in march], [1, 2, 3, 4, 5, 6])
+        self.assertEqual(march[1].previous_hash, march[0].hash)
+        self.assertEqual(AuditChainHead.objects.get(partition=202403).hash, march[-1].hash)
+        self.assertTrue(self.chain.verify(202403, batch_size=2).ok)
+        self.assertEqual(self.chain.verify(202404).checked, 1)
+
+    def test_events_cannot_be_changed_through_the_orm(self):
+        event = AuditEvent.objects.first()
+        with self.assertRaises(AuditLogImmutable):
+            event.save()
+        with self.assertRaises(AuditLogImmutable):
+            AuditEvent.objects.filter(id=event.id).delete()
+
+    def test_edited_event_breaks_the_chain(self):
+        self.tamper("UPDATE audit_events SET details = %s WHERE sequence = 3", '{"view": 99}')
+        check = self.chain.verify(202403)
+        self.assertEqual((check.ok, check.broken_at, check.reason, check.checked),
+                         (False, 3, 'event contents changed', 2))
+
+    def test_removed_event_breaks_the_chain(self):
+        self.tamper("DELETE FROM audit_events WHERE sequence = 2")
+        check = self.chain.verify(202403)
+        self.assertEqual((check.broken_at, check.reason), (2, 'missing event'))
+
+    def test_truncated_chain_is_caught_by_the_head(self):
+        self.tamper("DELETE FROM audit_events WHERE sequence = 5")
+        check = self.chain.verify(202403)
+        self.assertEqual((check.broken_at, check.reason), (5, 'chain ends before head at 5'))
+
+    def test_command_reports_broken_partitions(self):
+        out = StringIO()
+        call_command('verify_audit_chain', stdout=out)
+        self.assertIn('202403: 5 events verified', out.getvalue())
+        self.tamper("UPDATE audit_events SET actor_username = 'someone' WHERE sequence = 1")
+        with self.assertRaises(CommandError):
+            call_command('verify_audit_chain', stdout=StringIO())
+
+
+class AuditWriterTests(TestCase):
+    def test_events_are_chained_inline_under_the_test_runner(self):
+        audit_read(None, 'CHART', 7, view='summary')
+        self.assertEqual(list(AuditEvent.objects.values_list('patient_id', 'sequence')), [(7, 1)])
+        self.assertFalse(PendingAuditEvent.objects.exists())
+
+    def test_staged_events_outlive_the_writer_that_staged_them(self):
+        events = [make_event(MARCH + timedelta(minutes=minute), patient_id=minute) for minute in range(3)]
+        # Staged, then the worker dies before its thread flushes
+        AuditWriter(background=True).stage(events)
+        self.assertEqual(PendingAuditEvent.objects.count(), 3)
+
+        self.assertEqual(AuditWriter(background=True, batch_size=2).flush(), 3)
+        self.assertFalse(PendingAuditEvent.objects.exists())
+        self.assertEqual(list(AuditEvent.objects.order_by('sequence').values_list('patient_id', flat=True)),
+                         [0, 1, 2])
+        self.assertTrue(AuditChain().verify(202403).ok)
+
+    def test_a_failed_flush_keeps_the_batch_staged(self):
+        writer = AuditWriter(background=True)
+        writer.stage([make_event(MARCH)])
+        with mock.patch.object(writer.chain, 'append', side_effect=DatabaseError('locked')):
+            with self.assertRaises(DatabaseError):
+                writer.flush()
+        self.assertEqual(writer.pending(), 1)
+        self.assertEqual(writer.flush(), 1)
+
+    def test_writer_can_be_replaced(self):
+        writer = AuditWriter(background=False)
+        set_writer(writer)
+        self.addCleanup(set_writer, None)
+        self.assertIs(get_writer(), writer)
+
+
+@skipUnless(connection.vendor == 'postgresql', 'append-only triggers are PostgreSQL only')
+class AuditPartitionGuardTests(TestCase):
+    def setUp(self):
+        AuditChain().append([make_event(MARCH)])
+
+    def test_month_tables_reject_updates_deletes_and_truncate(self):
+        for sql in ("UPDATE audit_events_202403 SET actor_username = 'someone'",
+                    "DELETE FROM audit_events_202403",
+                    "TRUNCATE audit_events_202403",
+                    "TRUNCATE audit_events"):
+            with self.subTest(sql=sql), self.assertRaises(DatabaseError), transaction.atomic():
+                with connection.cursor() as cursor:
+                    cursor.execute(sql)
+
+
+class AuditTrailViewTests(TestCase):
+    def setUp(self):
+        self.now = timezone.now()
+        AuditChain().append([
+            make_event(self.now - timedelta(hours=1), patient_id=1),
+            make_event(self.now - timedelta(hours=2), patient_id=2),
+            make_event(self.now - timedelta(days=40), patient_id=1),
+        ])
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user('staff', 'staff@example.com', 'pw', is_staff=True))
+
+    def test_recent_events_newest_first_and_filtered(self):
+        response = self.client.get('/api/audit/')
+        self.assertEqual([event['patient_id'] for event in response.data['results']], [1, 2])
+        response = self.client.get('/api/audit/', {'patient_id': 1, 'start': (self.now - timedelta(days=60)).isoformat()})
+        self.assertEqual(len(response.data['results']), 2)
+
+    def test_invalid_windows_are_rejected(self):
+        self.assertEqual(self.client.get('/api/audit/', {'start': 'last week'}).status_code, 400)
+        self.assertEqual(self.client.get('/api/audit/', {'start': '2024-13-45T00:00'}).status_code, 400)
+        self.assertEqual(self.client.get('/api/audit/', {'end': '2024-02-30T00:00'}).status_code, 400)
+        self.assertEqual(self.client.get('/api/audit/', {'patient_id': 'x'}).status_code, 400)
+
+    def test_only_staff_read_the_trail(self):
+        client = APIClient()
+        client.force_authenticate(User.objects.create_user('doc', 'doc@example.com', 'pw', is_doctor=True))
+        self.assertEqual(client.get('/api/audit/').status_code, 403)
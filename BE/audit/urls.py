@@ -0,0 +1,6 @@
+from django.urls import path
+from . import views
+
+urlpatterns = [
+    path('', views.AuditTrailView.as_view(), name='audit-trail'),
+]
@@ -0,0 +1,54 @@
+# BE/audit/views.py
+from datetime import timedelta
+
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from rest_framework import generics
+from rest_framework.exceptions import ValidationError
+from rest_framework.permissions import IsAdminUser
+
+from shared.utils.pagination import AuditEventPagination
+from .models import AuditEvent
+from .serializers import AuditEventSerializer
+from .services.chain import partition_key
+
+
+class AuditTrailView(generics.ListAPIView):
+    """
+    Compliance view of the audit log, newest first.
+    Query params: start, end (ISO 8601, default the last 30 days), patient_id,
+    actor_id, action, resource_type, resource_id.
+    """
+    serializer_class = AuditEventSerializer
+    pagination_class = AuditEventPagination
+    permission_classes = [IsAdminUser]
+
+    def get_queryset(self):
+        params = self.request.query_params
+        try:
+            end = parse_datetime(params['end']) if params.get('end') else timezone.now()
+            start = parse_datetime(params['start']) if params.get('start') else end and end - timedelta(days=30)
+        except ValueError:
+            # Well-formed but impossible, e.g. 2024-13-45T00:00
+            start = end = None
+        if start is None or end is None or start >= end:
+            raise ValidationError({"detail": "Use ISO 8601 start < end"})
+        start = timezone.make_aware(start) if timezone.is_naive(start) else start
+        end = timezone.make_aware(end) if timezone.is_naive(end) else end
+
+        # The partition bounds let PostgreSQL skip other months entirely
+        queryset = AuditEvent.objects.filter(
+            partition__gte=partition_key(start), partition__lte=partition_key(end),
+            occurred_at__gte=start, occurred_at__lt=end,
+        )
+        for param in ('patient_id', 'actor_id'):
+            if params.get(param):
+                if not params[param].isdigit():
+                    raise ValidationError({param: "Must be an integer"})
+                queryset = queryset.filter(**{param: int(params[param])})
+        for param in ('action', 'resource_type'):
+            if params.get(param):
+                queryset = queryset.filter(**{param: params[param].upper()})
+        if params.get('resource_id'):
+            queryset = queryset.filter(resource_id=params['resource_id'])
+        return queryset
@@ -0,0 +1,9 @@
+from django.apps import AppConfig
+
+class DoctorConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'doctor'
+    verbose_name = 'Doctor Scheduling'
+
+    def ready(self):
+        from . import signals  # noqa: F401
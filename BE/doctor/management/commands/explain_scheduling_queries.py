@@ -0,0 +1,172 @@
+# BE/doctor/management/commands/explain_scheduling_queries.py
+import re
+from datetime import date, time, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from shared.models import User, Doctor, Patient
+from doctor.models.schedule import Schedule, Appointment
+
+
+class Command(BaseCommand):
+    help = 'Run EXPLAIN on the hot scheduling queries and report sequential scans'
+
+    # Plan lines that mean a full table read, per backend
+    SEQ_SCAN_PATTERNS = {
+        'postgresql': re.compile(r'Seq Scan on (\w+)'),
+        # The \b stops (\w+) backtracking into a shorter name that isn't followed by USING
+        'sqlite': re.compile(r'\bSCAN (\w+)\b(?! USING)'),
+    }
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--doctors',
+            type=int,
+            default=50,
+            help='Number of doctors to generate',
+        )
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=60,
+            help='Days of schedules to generate per doctor',
+        )
+        parser.add_argument(
+            '--no-generate',
+            action='store_true',
+            help='Explain against existing data instead of generated data',
+        )
+        parser.add_argument(
+            '--keep',
+            action='store_true',
+            help='Keep the generated data instead of rolling it back',
+        )
+        parser.add_argument(
+            '--fail-on-seq-scan',
+            action='store_true',
+            help='Exit with an error if any hot query uses a sequential scan',
+        )
+
+    def handle(self, *args, **options):
+        if connection.vendor not in self.SEQ_SCAN_PATTERNS:
+            raise CommandError(f'EXPLAIN parsing is not supported for {connection.vendor}')
+
+        with transaction.atomic():
+            if not options['no_generate']:
+                self.generate_data(options['doctors'], options['days'])
+                self.analyze_tables()
+
+            findings = self.explain_hot_queries(options['verbosity'])
+
+            if not options['keep']:
+                transaction.set_rollback(True)
+
+        seq_scans = {name: tables for name, tables in findings.items() if tables}
+        if seq_scans:
+            for name, tables in seq_scans.items():
+                self.stdout.write(self.style.WARNING(f'{name}: sequential scan on {", ".join(tables)}'))
+            if options['fail_on_seq_scan']:
+                raise CommandError(f'{len(seq_scans)} hot queries use sequential scans')
+        else:
+            self.stdout.write(self.style.SUCCESS(f'All {len(findings)} hot queries are index-driven'))
+
+    def hot_queries(self):
+        """Querysets mirroring what the scheduling views execute"""
+        doctor_id = Doctor.objects.values_list('id', flat=True).order_by('id').first()
+        patient_id = Patient.objects.values_list('id', flat=True).order_by('id').first()
+        schedule_id = Schedule.objects.values_list('id', flat=True).order_by('id').first()
+        today = date.today()
+
+        return {
+            'open schedules for doctor': Schedule.objects.filter(
+                doctor_id=doctor_id, date__gte=today, is_available=True
+            ),
+            'confirmed slots in schedule': Appointment.objects.filter(
+                schedule_id=schedule_id, status='CONFIRMED'
+            ),
+            'patient appointment page': Appointment.objects.filter(
+                patient_id=patient_id
+            ).order_by('date', 'time', 'id')[:20],
+            'doctor appointment page': Appointment.objects.filter(
+                doctor_id=doctor_id
+            ).order_by('date', 'time', 'id')[:20],
+            'doctor appointments by date': Appointment.objects.filter(
+                doctor_id=doctor_id, date__range=(today, today + timedelta(days=7))
+            ),
+            'doctor schedule page': Schedule.objects.filter(
+                doctor_id=doctor_id
+            ).order_by('date', 'start_time', 'id')[:20],
+            'upcoming confirmed appointments': Appointment.objects.filter(
+                status='CONFIRMED', date__range=(today, today + timedelta(days=1))
+            ).order_by('date', 'time'),
+        }
+
+    def explain_hot_queries(self, verbosity):
+        pattern = self.SEQ_SCAN_PATTERNS[connection.vendor]
+        findings = {}
+
+        for name, queryset in self.hot_queries().items():
+            plan = queryset.explain()
+            findings[name] = sorted(set(pattern.findall(plan)))
+
+            if verbosity > 1:
+                self.stdout.write(f'\n-- {name}\n{plan}')
+
+        return findings
+
+    def analyze_tables(self):
+        """Refresh planner statistics so the plans reflect the generated volume"""
+        tables = [Schedule._meta.db_table, Appointment._meta.db_table]
+        with connection.cursor() as cursor:
+            for table in tables:
+                cursor.execute(f'ANALYZE {connection.ops.quote_name(table)}')
+
+    def generate_data(self, doctor_count, days):
+        self.stdout.write(f'Generating {doctor_count} doctors x {days} days of schedules...')
+
+        users = User.objects.bulk_create([
+            User(username=f'explain_doctor_{i}', is_doctor=True) for i in range(doctor_count)
+        ] + [
+            User(username=f'explain_patient_{i}', is_patient=True) for i in range(doctor_count * 4)
+        ])
+        doctor_users = [u for u in users if u.is_doctor]
+        patient_users = [u for u in users if u.is_patient]
+
+        doctors = Doctor.objects.bulk_create([
+            Doctor(user=user, specialization='General Practice') for user in doctor_users
+        ])
+        patients = Patient.objects.bulk_create([Patient(user=user) for user in patient_users])
+
+        start = date.today() - timedelta(days=days // 2)
+        schedules = Schedule.objects.bulk_create([
+            Schedule(
+                doctor=doctor,
+                date=start + timedelta(days=day),
+                start_time=time(hour),
+                end_time=time(hour + 1),
+                slot_duration=30,
+                is_available=day % 3 != 0,
+            )
+            for doctor in doctors
+            for day in range(days)
+            for hour in (9, 11, 14, 16)
+        ], batch_size=2000)
+
+        appointments = []
+        for index, schedule in enumerate(schedules):
+            if index % 2:
+                continue
+            appointments.append(Appointment(
+                patient=patients[index % len(patients)],
+                doctor=schedule.doctor,
+                schedule=schedule,
+                date=schedule.date,
+                time=schedule.start_time,
+                end_time=time(schedule.start_time.hour, 30),
+                status='CONFIRMED' if index % 5 else 'CANCELLED',
+                reason='Generated for EXPLAIN',
+            ))
+        Appointment.objects.bulk_create(appointments, batch_size=2000)
+
+        self.stdout.write(f'Generated {len(schedules)} schedules and {len(appointments)} appointments')
@@ -0,0 +1,45 @@
+# BE/doctor/management/commands/run_waitlist_matcher.py
+import logging
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from ...services.waitlist import WaitlistService
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = 'Expire stale waitlist offers and offer open slots to waiting patients'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Run a single matching pass and exit',
+        )
+        parser.add_argument(
+            '--interval',
+            type=int,
+            default=getattr(settings, 'SCHEDULING_CONFIG', {}).get('WAITLIST_MATCH_INTERVAL_SECONDS', 30),
+            help='Seconds between matching passes',
+        )
+
+    def handle(self, *args, **options):
+        service = WaitlistService()
+
+        while True:
+            try:
+                expired = service.expire_offers()
+                offered = service.match_open_slots()
+                if expired or offered or options['verbosity'] > 1:
+                    self.stdout.write(f'Expired {expired} offers, made {offered} new offers')
+            except Exception as e:
+                logger.error(f"Waitlist matching pass failed: {e}")
+                if options['once']:
+                    raise
+
+            if options['once']:
+                break
+            time.sleep(options['interval'])
@@ -0,0 +1,25 @@
+# Generated by Django 4.2.30 on 2026-10-19 08:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('doctor', '0002_keyset_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='appointment',
+            index=models.Index(fields=['schedule', 'status'], name='appt_schedule_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='appointment',
+            index=models.Index(condition=models.Q(('status', 'CONFIRMED')), fields=['date', 'time'], name='appt_confirmed_date_time_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='schedule',
+            index=models.Index(condition=models.Q(('is_available', True)), fields=['doctor', 'date'], name='schedule_open_doctor_date_idx'),
+        ),
+    ]
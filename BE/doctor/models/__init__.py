@@ -0,0 +1,7 @@
+# Remove duplicate model definitions, just import
+from shared.models.base import User, Doctor, Patient
+from .schedule import Schedule, Appointment
+from .waitlist import WaitlistEntry
+
+# Re-export for convenience
+__all__ = ['User', 'Doctor', 'Patient', 'Schedule', 'Appointment', 'WaitlistEntry']
@@ -20,6 +20,15 @@ class Schedule(models.Model):
     def __str__(self):
         return f"Schedule for Dr. {self.doctor.user.last_name} on {self.date}"
 
+    class Meta:
+        indexes = [
+            # Keyset pagination for a doctor's schedule list
+            models.Index(fields=['doctor', 'date', 'start_time', 'id'], name='schedule_doctor_keyset_idx'),
+            # Bookable schedules for a doctor from a given date (DoctorScheduleView)
+            models.Index(fields=['doctor', 'date'], condition=models.Q(is_available=True),
+                         name='schedule_open_doctor_date_idx'),
+        ]
+
 class Appointment(models.Model):
     STATUS_CHOICES = (
         ('CONFIRMED', 'Confirmed'),
@@ -37,4 +46,16 @@ class Appointment(models.Model):
     reason = models.TextField()
 
     def __str__(self):
-        return f"Appointment: {self.patient.user.first_name} with Dr. {self.doctor.user.last_name} on {self.date}"
\ No newline at end of file
+        return f"Appointment: {self.patient.user.first_name} with Dr. {self.doctor.user.last_name} on {self.date}"
+
+    class Meta:
+        indexes = [
+            # Keyset pagination for patient and doctor appointment lists
+            models.Index(fields=['patient', 'date', 'time', 'id'], name='appt_patient_keyset_idx'),
+            models.Index(fields=['doctor', 'date', 'time', 'id'], name='appt_doctor_keyset_idx'),
+            # Slot accounting per schedule (booking and cancellation)
+            models.Index(fields=['schedule', 'status'], name='appt_schedule_status_idx'),
+            # Upcoming confirmed appointments (reminders, calendars)
+            models.Index(fields=['date', 'time'], condition=models.Q(status='CONFIRMED'),
+                         name='appt_confirmed_date_time_idx'),
+        ]
@@ -0,0 +1,53 @@
+# BE/doctor/models/waitlist.py
+
+from django.db import models
+
+class WaitlistEntry(models.Model):
+    STATUS_CHOICES = (
+        ('WAITING', 'Waiting'),
+        ('OFFERED', 'Offered'),
+        ('BOOKED', 'Booked'),
+        ('EXPIRED', 'Expired'),
+        ('CANCELLED', 'Cancelled'),
+    )
+    ACTIVE_STATUSES = ('WAITING', 'OFFERED')
+
+    patient = models.ForeignKey('shared.Patient', on_delete=models.CASCADE, related_name='waitlist_entries')
+    doctor = models.ForeignKey('shared.Doctor', on_delete=models.CASCADE, related_name='waitlist_entries')
+    date = models.DateField()
+    reason = models.TextField(blank=True)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='WAITING')
+
+    # Slot currently held for this patient
+    offered_schedule = models.ForeignKey('doctor.Schedule', on_delete=models.SET_NULL, null=True, blank=True,
+                                         related_name='waitlist_offers')
+    offered_time = models.TimeField(null=True, blank=True)
+    offer_expires_at = models.DateTimeField(null=True, blank=True)
+    appointment = models.ForeignKey('doctor.Appointment', on_delete=models.SET_NULL, null=True, blank=True,
+                                    related_name='waitlist_entries')
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Waitlist: patient {self.patient_id} for Dr. {self.doctor_id} on {self.date} ({self.status})"
+
+    @property
+    def offer_is_live(self):
+        from django.utils import timezone
+        return self.status == 'OFFERED' and self.offer_expires_at is not None and self.offer_expires_at > timezone.now()
+
+    class Meta:
+        ordering = ['created_at', 'id']
+        indexes = [
+            # Next waiting patient for a doctor-day, first come first served
+            models.Index(fields=['doctor', 'date', 'status', 'created_at'], name='waitlist_queue_idx'),
+            # Outstanding offers by expiry (matcher)
+            models.Index(fields=['offer_expires_at'], condition=models.Q(status='OFFERED'),
+                         name='waitlist_offer_expiry_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=['patient', 'doctor', 'date'],
+                                    condition=models.Q(status__in=['WAITING', 'OFFERED']),
+                                    name='waitlist_one_active_entry'),
+        ]
@@ -0,0 +1,119 @@
+# BE/doctor/services/calendar.py
+import logging
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+from typing import Dict, List
+
+from django.core.cache import cache
+from django.db.models import Count
+
+from shared.utils.transactions import OnCommitBatch
+from ..models.schedule import Schedule, Appointment
+
+logger = logging.getLogger(__name__)
+
+CALENDAR_CACHE_TIMEOUT = 60 * 15  # 15 minutes
+
+
+def calendar_cache_key(doctor_id: int, day: date) -> str:
+    return f'doctor-calendar:{doctor_id}:{day.isoformat()}'
+
+
+def invalidate_calendar_day(doctor_id: int, day: date):
+    """Drop the cached occupancy grid for one doctor-day once the change commits"""
+    pending_calendar_invalidations.add((doctor_id, day))
+
+
+def _invalidate_pending(days):
+    cache.delete_many([calendar_cache_key(doctor_id, day) for doctor_id, day in days])
+
+
+# Dropped after commit, so a concurrent read can't cache the pre-commit grid
+# over the invalidation and a rollback leaves the cache alone
+pending_calendar_invalidations = OnCommitBatch(_invalidate_pending)
+
+
+class CalendarService:
+    """
+    Builds a compact per-day occupancy grid for a doctor.
+
+    Each day lists its schedules with a slot bitmap ("1" = confirmed booking)
+    plus booking counts by status. Days are cached individually so booking or
+    cancelling only invalidates the day it touches.
+    """
+
+    def get_calendar(self, doctor_id: int, start: date, days: int) -> List[Dict]:
+        day_list = [start + timedelta(days=offset) for offset in range(days)]
+        keys = {calendar_cache_key(doctor_id, day): day for day in day_list}
+
+        cached = cache.get_many(list(keys))
+        missing = [day for key, day in keys.items() if key not in cached]
+
+        if missing:
+            built = self.build_days(doctor_id, min(missing), max(missing))
+            fresh = {calendar_cache_key(doctor_id, day): built[day] for day in missing}
+            cache.set_many(fresh, CALENDAR_CACHE_TIMEOUT)
+            cached.update(fresh)
+
+        return [cached[calendar_cache_key(doctor_id, day)] for day in day_list]
+
+    def build_days(self, doctor_id: int, first_day: date, last_day: date) -> Dict[date, Dict]:
+        """Build every day in the range with one schedule query and one aggregate query"""
+        schedules = Schedule.objects.filter(
+            doctor_id=doctor_id,
+            date__range=(first_day, last_day)
+        ).order_by('date', 'start_time').values(
+            'id', 'date', 'start_time', 'end_time', 'slot_duration', 'is_available'
+        )
+
+        bookings = Appointment.objects.filter(
+            doctor_id=doctor_id,
+            date__range=(first_day, last_day)
+        ).values('schedule_id', 'date', 'time', 'status').annotate(count=Count('id'))
+
+        booked_times = defaultdict(set)
+        status_counts = defaultdict(lambda: defaultdict(int))
+        for row in bookings:
+            status_counts[row['date']][row['status']] += row['count']
+            if row['status'] == 'CONFIRMED':
+                booked_times[row['schedule_id']].add(row['time'])
+
+        days = {}
+        for offset in range((last_day - first_day).days + 1):
+            day = first_day + timedelta(days=offset)
+            days[day] = {
+                'date': day.isoformat(),
+                'schedules': [],
+                'booked': dict(status_counts.get(day, {})),
+                'total_slots': 0,
+                'free_slots': 0,
+            }
+
+        for schedule in schedules:
+            bitmap = self.slot_bitmap(schedule, booked_times.get(schedule['id'], set()))
+            entry = days[schedule['date']]
+            entry['schedules'].append({
+                'id': schedule['id'],
+                'start_time': schedule['start_time'].strftime('%H:%M'),
+                'end_time': schedule['end_time'].strftime('%H:%M'),
+                'slot_duration': schedule['slot_duration'],
+                'is_available': schedule['is_available'],
+                'slots': bitmap,
+            })
+            entry['total_slots'] += len(bitmap)
+            entry['free_slots'] += bitmap.count('0')
+
+        return days
+
+    @staticmethod
+    def slot_bitmap(schedule: Dict, booked_times: set) -> str:
+        start = datetime.combine(date.min, schedule['start_time'])
+        end = datetime.combine(date.min, schedule['end_time'])
+        duration = timedelta(minutes=schedule['slot_duration'])
+
+        slots = []
+        current = start
+        while current + duration <= end:
+            slots.append('1' if current.time() in booked_times else '0')
+            current += duration
+        return ''.join(slots)
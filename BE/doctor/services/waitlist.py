@@ -0,0 +1,199 @@
+# BE/doctor/services/waitlist.py
+import logging
+from collections import defaultdict
+from datetime import timedelta
+from typing import List, Optional
+
+from django.conf import settings
+from django.contrib.contenttypes.models import ContentType
+from django.db import transaction
+from django.utils import timezone
+
+from notifications.models import Notification
+from patient.services.booking import BookingService
+from ..models.schedule import Schedule, Appointment
+from ..models.waitlist import WaitlistEntry
+
+logger = logging.getLogger(__name__)
+
+
+def get_offer_ttl():
+    config = getattr(settings, 'SCHEDULING_CONFIG', {})
+    return timedelta(minutes=config.get('WAITLIST_OFFER_TTL_MINUTES', 30))
+
+
+class WaitlistService:
+    """
+    Per-doctor/per-day waitlist with push-based backfill.
+
+    A freed slot is offered to the longest-waiting patient and held for them
+    until the offer expires; expired offers roll over to the next patient.
+    """
+
+    def __init__(self):
+        self.booking = BookingService()
+
+    def join(self, patient, doctor, day, reason=''):
+        entry = WaitlistEntry.objects.filter(
+            patient=patient, doctor=doctor, date=day, status__in=WaitlistEntry.ACTIVE_STATUSES
+        ).first()
+        if entry:
+            return entry, False
+
+        entry = WaitlistEntry.objects.create(patient=patient, doctor=doctor, date=day, reason=reason)
+        # The day may already have an open slot nobody was offered yet
+        transaction.on_commit(lambda: self.match_doctor_day(doctor.id, day))
+        return entry, True
+
+    def cancel(self, entry):
+        was_offered = entry.status == 'OFFERED'
+        schedule, slot_time = entry.offered_schedule, entry.offered_time
+
+        entry.status = 'CANCELLED'
+        entry.save(update_fields=['status', 'updated_at'])
+
+        if was_offered and schedule is not None:
+            self.offer_freed_slot(schedule, slot_time)
+
+    # Holds
+
+    def live_offers(self, schedule):
+        return WaitlistEntry.objects.filter(
+            offered_schedule=schedule,
+            status='OFFERED',
+            offer_expires_at__gt=timezone.now()
+        )
+
+    def is_held_for_other(self, schedule, slot_time, patient):
+        return self.live_offers(schedule).filter(offered_time=slot_time).exclude(patient=patient).exists()
+
+    def mark_booked(self, schedule, slot_time, patient, appointment):
+        """Close the patient's offer (or waiting entry) for the day once they book it"""
+        WaitlistEntry.objects.filter(
+            patient=patient,
+            doctor_id=schedule.doctor_id,
+            date=schedule.date,
+            status__in=WaitlistEntry.ACTIVE_STATUSES
+        ).update(status='BOOKED', appointment=appointment, updated_at=timezone.now())
+
+    def free_slot_times(self, schedule):
+        booked = set(Appointment.objects.filter(
+            schedule=schedule, status='CONFIRMED'
+        ).values_list('time', flat=True))
+        held = set(self.live_offers(schedule).values_list('offered_time', flat=True))
+        return [slot for slot in self.booking.slot_times(schedule) if slot not in booked and slot not in held]
+
+    def slot_is_open(self, schedule, slot_time):
+        """Still upcoming, still offered by the doctor, and neither booked nor held"""
+        now = timezone.localtime()
+        if (schedule.date, slot_time) <= (now.date(), now.time()):
+            return False
+        if not Schedule.objects.filter(id=schedule.id, is_available=True).exists():
+            return False
+        if self.booking.is_booked(schedule, slot_time):
+            return False
+        return not self.live_offers(schedule).filter(offered_time=slot_time).exists()
+
+    # Offers
+
+    def offer_freed_slot(self, schedule, slot_time) -> Optional[WaitlistEntry]:
+        """Offer one freed slot to the next waiting patient for that doctor-day"""
+        with transaction.atomic():
+            # Checked under the schedule lock, so concurrent cancellations, expiries
+            # and bookings of the same slot can't each see it as free
+            schedule = self.booking.lock_schedule(schedule)
+            if not self.slot_is_open(schedule, slot_time):
+                # Passed, booked or already re-offered since it was freed
+                return None
+
+            entry = WaitlistEntry.objects.select_for_update(skip_locked=True).filter(
+                doctor_id=schedule.doctor_id,
+                date=schedule.date,
+                status='WAITING'
+            ).order_by('created_at', 'id').first()
+
+            if entry is None:
+                return None
+
+            entry.status = 'OFFERED'
+            entry.offered_schedule = schedule
+            entry.offered_time = slot_time
+            entry.offer_expires_at = timezone.now() + get_offer_ttl()
+            entry.save(update_fields=['status', 'offered_schedule', 'offered_time', 'offer_expires_at', 'updated_at'])
+
+            self.notify_offer(entry, schedule)
+
+        logger.info(f"Offered {schedule.date} {slot_time} with doctor {schedule.doctor_id} to waitlist entry {entry.id}")
+        return entry
+
+    def expire_offers(self) -> int:
+        """Expire stale offers and roll their slots over to the next patient"""
+        with transaction.atomic():
+            expired = list(WaitlistEntry.objects.select_for_update(skip_locked=True).filter(
+                status='OFFERED',
+                offer_expires_at__lte=timezone.now()
+            ).select_related('offered_schedule'))
+
+            if not expired:
+                return 0
+
+            WaitlistEntry.objects.filter(id__in=[entry.id for entry in expired]).update(
+                status='EXPIRED', updated_at=timezone.now()
+            )
+
+        for entry in expired:
+            if entry.offered_schedule is not None:
+                self.offer_freed_slot(entry.offered_schedule, entry.offered_time)
+
+        return len(expired)
+
+    def match_doctor_day(self, doctor_id, day) -> List[WaitlistEntry]:
+        offers = []
+        now = timezone.localtime()
+        schedules = Schedule.objects.filter(doctor_id=doctor_id, date=day, is_available=True)
+        for schedule in schedules:
+            for slot_time in self.free_slot_times(schedule):
+                if day == now.date() and slot_time <= now.time():
+                    continue
+                entry = self.offer_freed_slot(schedule, slot_time)
+                if entry is None:
+                    return offers
+                offers.append(entry)
+        return offers
+
+    def match_open_slots(self) -> int:
+        """Offer any free slot on a day that still has waiting patients"""
+        waiting_days = defaultdict(set)
+        for doctor_id, day in WaitlistEntry.objects.filter(
+            status='WAITING',
+            date__gte=timezone.localdate()
+        ).values_list('doctor_id', 'date').distinct():
+            waiting_days[doctor_id].add(day)
+
+        offered = 0
+        for doctor_id, days in waiting_days.items():
+            for day in sorted(days):
+                offered += len(self.match_doctor_day(doctor_id, day))
+        return offered
+
+    def notify_offer(self, entry, schedule):
+        Notification.objects.create(
+            recipient=entry.patient.user,
+            notification_type='APPOINTMENT',
+            priority='HIGH',
+            title='An appointment slot opened up',
+            message=(
+                f"A slot on {schedule.date} at {entry.offered_time.strftime('%H:%M')} is being held for you "
+                f"until {timezone.localtime(entry.offer_expires_at).strftime('%H:%M')}. Accept it to book."
+            ),
+            action_text='Accept slot',
+            content_type=ContentType.objects.get_for_model(WaitlistEntry),
+            object_id=entry.id,
+            expires_at=entry.offer_expires_at,
+            metadata={
+                'waitlist_entry': entry.id,
+                'schedule_id': schedule.id,
+                'date': schedule.date.isoformat(),
+                'time': entry.offered_time.strftime('%H:%M'),
+            },
+        )
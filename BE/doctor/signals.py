@@ -0,0 +1,27 @@
+# BE/doctor/signals.py
+from django.db.models.signals import post_delete, post_init, post_save
+from django.dispatch import receiver
+
+from .models.schedule import Schedule, Appointment
+from .services.calendar import invalidate_calendar_day
+
+
+@receiver(post_init, sender=Schedule)
+@receiver(post_init, sender=Appointment)
+def remember_calendar_day(sender, instance, **kwargs):
+    # Keep the loaded date so a moved schedule/appointment clears its old day too.
+    # Read from __dict__ so deferred fields are not fetched on load.
+    instance._calendar_day = (instance.__dict__.get('doctor_id'), instance.__dict__.get('date'))
+
+
+@receiver(post_save, sender=Schedule)
+@receiver(post_save, sender=Appointment)
+@receiver(post_delete, sender=Schedule)
+@receiver(post_delete, sender=Appointment)
+def invalidate_calendar(sender, instance, **kwargs):
+    invalidate_calendar_day(instance.doctor_id, instance.date)
+
+    previous = getattr(instance, '_calendar_day', None)
+    if previous and previous[1] and previous != (instance.doctor_id, instance.date):
+        invalidate_calendar_day(*previous)
+    instance._calendar_day = (instance.doctor_id, instance.date)
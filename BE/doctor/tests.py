@@ -0,0 +1,269 @@
+from contextlib import suppress
+from datetime import date, time, timedelta
+from io import StringIO
+from unittest import skipUnless
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from notifications.models import Notification
+from patient.services.booking import BookingService, SlotTaken
+from shared.factories import make_doctor, make_patient
+from shared.utils.pagination import AppointmentCursorPagination, seek_filter
+from .management.commands.explain_scheduling_queries import Command as ExplainCommand
+from .models.schedule import Appointment, Schedule
+from .models.waitlist import WaitlistEntry
+from .services.calendar import CalendarService, calendar_cache_key
+from .services.waitlist import WaitlistService
+
+
+def make_schedule(doctor, day, start=time(9), end=time(17), **kwargs):
+    return Schedule.objects.create(doctor=doctor, date=day, start_time=start, end_time=end, **kwargs)
+
+
+def make_appointment(schedule, patient, at, status='CONFIRMED'):
+    end = (timedelta(hours=at.hour, minutes=at.minute) + timedelta(minutes=schedule.slot_duration))
+    return Appointment.objects.create(
+        patient=patient, doctor=schedule.doctor, schedule=schedule, date=schedule.date, time=at,
+        end_time=time(end.seconds // 3600, end.seconds % 3600 // 60), status=status, reason='Checkup',
+    )
+
+
+class KeysetPaginationTests(TestCase):
+    def setUp(self):
+        self.doctor = make_doctor()
+        self.patient = make_patient()
+        start = date.today() + timedelta(days=1)
+        # Several appointments share a date and time, so only the id breaks ties
+        for offset in range(5):
+            schedule = make_schedule(self.doctor, start + timedelta(days=offset))
+            for hour in (9, 10, 10, 11, 12):
+                make_appointment(schedule, self.patient, time(hour))
+        self.client = APIClient()
+        self.client.force_authenticate(self.doctor.user)
+
+    def walk(self, url):
+        pages = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            pages.append(response.data)
+            url = response.data['next']
+        return pages
+
+    def test_pages_cover_every_appointment_once_in_order(self):
+        pages = self.walk('/api/doctor/appointments/?page_size=7')
+        ids = [row['id'] for page in pages for row in page['results']]
+        expected = list(Appointment.objects.order_by('date', 'time', 'id').values_list('id', flat=True))
+        self.assertEqual(ids, expected)
+        self.assertEqual([len(page['results']) for page in pages], [7, 7, 7, 4])
+        self.assertIsNone(pages[0]['previous'])
+
+    def test_previous_link_returns_the_page_before(self):
+        first = self.client.get('/api/doctor/appointments/?page_size=7').data
+        second = self.client.get(first['next']).data
+        back = self.client.get(second['previous']).data
+        self.assertEqual([row['id'] for row in back['results']], [row['id'] for row in first['results']])
+
+    def test_invalid_cursor_is_not_found(self):
+        response = self.client.get('/api/doctor/appointments/?cursor=not-a-cursor')
+        self.assertEqual(response.status_code, 404)
+
+    def test_page_size_is_capped(self):
+        cap = AppointmentCursorPagination.max_page_size
+        schedule = Schedule.objects.first()
+        Appointment.objects.bulk_create([
+            Appointment(patient=self.patient, doctor=self.doctor, schedule=schedule, date=schedule.date,
+                        time=time(13), end_time=time(13, 30), status='CONFIRMED', reason='Checkup')
+            for _ in range(cap)
+        ])
+        response = self.client.get(f'/api/doctor/appointments/?page_size={cap * 10}')
+        self.assertEqual(len(response.data['results']), cap)
+        self.assertIsNotNone(response.data['next'])
+
+    @skipUnless(connection.vendor == 'sqlite', 'Plan text is SQLite specific')
+    def test_deep_page_seeks_into_the_index(self):
+        ordering = AppointmentCursorPagination.ordering
+        pivot = Appointment.objects.order_by(*ordering)[20]
+        plan = Appointment.objects.filter(doctor=self.doctor).filter(
+            seek_filter(ordering, [pivot.date, pivot.time, pivot.id])
+        ).order_by(*ordering).explain()
+        # The range starts at the cursor rather than at the doctor's first row
+        self.assertRegex(plan, r'appt_doctor_keyset_idx \(doctor_id=\? AND date>\?\)')
+
+    def test_patient_sees_only_their_own_appointments(self):
+        other = make_patient('other')
+        make_appointment(Schedule.objects.first(), other, time(15))
+        client = APIClient()
+        client.force_authenticate(other.user)
+        response = client.get('/api/patient/appointments/')
+        self.assertEqual(len(response.data['results']), 1)
+
+    def test_seek_filter_honours_field_direction(self):
+        appointments = list(Appointment.objects.order_by('-date', '-time', '-id'))
+        pivot = appointments[10]
+        after = Appointment.objects.filter(
+            seek_filter(('-date', '-time', '-id'), [pivot.date, pivot.time, pivot.id])
+        ).order_by('-date', '-time', '-id')
+        self.assertEqual(list(after), appointments[11:])
+
+
+class ExplainSchedulingQueriesTests(TestCase):
+    pattern = ExplainCommand.SEQ_SCAN_PATTERNS['sqlite']
+
+    def test_index_scans_are_not_reported_as_sequential(self):
+        plan = 'SCAN doctor_appointment USING INDEX appt_doctor_keyset_idx\nSCAN doctor_schedule USING COVERING INDEX x'
+        self.assertEqual(self.pattern.findall(plan), [])
+
+    def test_full_scans_are_reported(self):
+        plan = 'SCAN doctor_appointment\nSEARCH doctor_schedule USING INDEX schedule_doctor_keyset_idx (doctor_id=?)'
+        self.assertEqual(self.pattern.findall(plan), ['doctor_appointment'])
+
+    def test_generated_hot_queries_are_explained_and_rolled_back(self):
+        out = StringIO()
+        call_command('explain_scheduling_queries', doctors=2, days=4, stdout=out)
+        self.assertIn('Generated 32 schedules', out.getvalue())
+        self.assertFalse(Schedule.objects.exists())
+
+
+class DoctorCalendarTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.doctor = make_doctor()
+        self.patient = make_patient()
+        self.day = date.today() + timedelta(days=2)
+        self.schedule = make_schedule(self.doctor, self.day, time(9), time(11), slot_duration=30)
+        self.client = APIClient()
+        self.client.force_authenticate(self.doctor.user)
+
+    def calendar(self, **params):
+        return self.client.get('/api/doctor/calendar/', {'start': self.day.isoformat(), **params})
+
+    def test_day_shows_slot_bitmap_and_counts(self):
+        make_appointment(self.schedule, self.patient, time(9, 30))
+        make_appointment(self.schedule, self.patient, time(10), status='CANCELLED')
+        day = self.calendar(days=1).data['days'][0]
+        self.assertEqual(day['schedules'][0]['slots'], '0100')
+        self.assertEqual((day['total_slots'], day['free_slots']), (4, 3))
+        self.assertEqual(day['booked'], {'CONFIRMED': 1, 'CANCELLED': 1})
+
+    def test_booking_and_cancelling_invalidate_the_cached_day(self):
+        self.assertEqual(self.calendar(days=1).data['days'][0]['free_slots'], 4)
+        with self.captureOnCommitCallbacks(execute=True):
+            appointment = make_appointment(self.schedule, self.patient, time(9))
+        self.assertEqual(self.calendar(days=1).data['days'][0]['free_slots'], 3)
+        with self.captureOnCommitCallbacks(execute=True):
+            appointment.status = 'CANCELLED'
+            appointment.save()
+        self.assertEqual(self.calendar(days=1).data['days'][0]['free_slots'], 4)
+
+    def test_day_is_only_dropped_once_the_change_commits(self):
+        key = calendar_cache_key(self.doctor.id, self.day)
+        self.calendar(days=1)
+        with self.captureOnCommitCallbacks(execute=True):
+            make_appointment(self.schedule, self.patient, time(9))
+            self.assertIsNotNone(cache.get(key))
+        self.assertIsNone(cache.get(key))
+
+        self.calendar(days=1)
+        with suppress(RuntimeError), transaction.atomic():
+            make_appointment(self.schedule, self.patient, time(10))
+            raise RuntimeError('rolled back')
+        self.assertIsNotNone(cache.get(key))
+
+    def test_moving_a_schedule_clears_both_days(self):
+        next_day = self.day + timedelta(days=1)
+        service = CalendarService()
+        service.get_calendar(self.doctor.id, self.day, 2)
+        schedule = Schedule.objects.get(id=self.schedule.id)
+        schedule.date = next_day
+        with self.captureOnCommitCallbacks(execute=True):
+            schedule.save()
+        first, second = service.get_calendar(self.doctor.id, self.day, 2)
+        self.assertEqual((len(first['schedules']), len(second['schedules'])), (0, 1))
+
+    def test_warm_calendar_needs_no_queries(self):
+        self.calendar(days=7)
+        with self.assertNumQueries(0):
+            CalendarService().get_calendar(self.doctor.id, self.day, 7)
+
+    def test_invalid_parameters_are_rejected(self):
+        self.assertEqual(self.calendar(days=0).status_code, 400)
+        self.assertEqual(self.calendar(days=32).status_code, 400)
+        self.assertEqual(self.client.get('/api/doctor/calendar/', {'start': '2024-13-01'}).status_code, 400)
+        self.assertEqual(self.calendar(start='9999-12-30', days=7).status_code, 400)
+        self.assertEqual(self.calendar(start='9999-12-25', days=7).status_code, 200)
+        client = APIClient()
+        client.force_authenticate(self.patient.user)
+        self.assertEqual(client.get('/api/doctor/calendar/').status_code, 403)
+
+
+class WaitlistOfferTests(TestCase):
+    def setUp(self):
+        self.doctor = make_doctor()
+        self.day = date.today() + timedelta(days=3)
+        self.schedule = make_schedule(self.doctor, self.day, time(9), time(10), slot_duration=30)
+        self.first = WaitlistEntry.objects.create(patient=make_patient('first'), doctor=self.doctor, date=self.day)
+        self.second = WaitlistEntry.objects.create(patient=make_patient('second'), doctor=self.doctor, date=self.day)
+        self.service = WaitlistService()
+
+    def test_freed_slot_goes_to_the_longest_waiting_patient(self):
+        entry = self.service.offer_freed_slot(self.schedule, time(9))
+        self.assertEqual(entry.id, self.first.id)
+        self.assertEqual((entry.status, entry.offered_time), ('OFFERED', time(9)))
+        self.assertTrue(Notification.objects.filter(recipient=self.first.patient.user).exists())
+
+    def test_booked_slot_is_not_offered(self):
+        make_appointment(self.schedule, make_patient('booked'), time(9))
+        self.assertIsNone(self.service.offer_freed_slot(self.schedule, time(9)))
+        self.assertEqual(WaitlistEntry.objects.filter(status='OFFERED').count(), 0)
+
+    def test_past_slot_is_not_offered(self):
+        yesterday = make_schedule(self.doctor, date.today() - timedelta(days=1))
+        WaitlistEntry.objects.filter(id=self.first.id).update(date=yesterday.date)
+        self.assertIsNone(self.service.offer_freed_slot(yesterday, time(9)))
+
+    def test_slot_held_for_someone_else_is_not_offered_twice(self):
+        self.service.offer_freed_slot(self.schedule, time(9))
+        self.assertIsNone(self.service.offer_freed_slot(self.schedule, time(9)))
+        self.assertEqual(WaitlistEntry.objects.get(id=self.second.id).status, 'WAITING')
+
+    def test_expired_offer_rolls_over_to_the_next_patient(self):
+        self.service.offer_freed_slot(self.schedule, time(9))
+        WaitlistEntry.objects.filter(id=self.first.id).update(offer_expires_at=timezone.now() - timedelta(minutes=1))
+        self.assertEqual(self.service.expire_offers(), 1)
+        self.assertEqual(WaitlistEntry.objects.get(id=self.first.id).status, 'EXPIRED')
+        second = WaitlistEntry.objects.get(id=self.second.id)
+        self.assertEqual((second.status, second.offered_time), ('OFFERED', time(9)))
+
+    def test_expired_offer_for_a_since_booked_slot_is_not_rolled_over(self):
+        self.service.offer_freed_slot(self.schedule, time(9))
+        WaitlistEntry.objects.filter(id=self.first.id).update(offer_expires_at=timezone.now() - timedelta(minutes=1))
+        make_appointment(self.schedule, make_patient('walkin'), time(9))
+        self.service.expire_offers()
+        self.assertEqual(WaitlistEntry.objects.get(id=self.second.id).status, 'WAITING')
+
+    def test_accepting_an_offer_for_a_since_booked_slot_conflicts(self):
+        self.service.offer_freed_slot(self.schedule, time(9))
+        client = APIClient()
+        client.force_authenticate(self.first.patient.user)
+        walkin = make_patient('walkin')
+        BookingService().book(walkin, self.schedule, time(9))
+        response = client.post(f'/api/patient/waitlist/{self.first.id}/accept/')
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(Appointment.objects.filter(schedule=self.schedule, time=time(9)).count(), 1)
+
+    def test_a_booked_slot_cannot_be_booked_again(self):
+        BookingService().book(make_patient('walkin'), self.schedule, time(9))
+        with self.assertRaises(SlotTaken):
+            BookingService().book(self.first.patient, self.schedule, time(9))
+        client = APIClient()
+        client.force_authenticate(self.second.patient.user)
+        response = client.post('/api/patient/book/', {'schedule_id': self.schedule.id, 'time': '09:00'})
+        self.assertEqual(response.status_code, 409)
+        response = client.post('/api/patient/book/', {'schedule_id': self.schedule.id, 'time': '09:30'})
+        self.assertEqual(response.status_code, 201)
@@ -1,5 +1,5 @@
 from django.urls import path
-from .views import schedule, appointments
+from .views import schedule, appointments, calendar
 
 urlpatterns = [
     # Schedule management
@@ -8,4 +8,7 @@ urlpatterns = [
 
     # Appointments
     path('appointments/', appointments.DoctorAppointmentListView.as_view(), name='doctor-appointments'),
+
+    # Calendar
+    path('calendar/', calendar.DoctorCalendarView.as_view(), name='doctor-calendar'),
 ]
\ No newline at end of file
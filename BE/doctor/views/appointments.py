@@ -9,6 +9,7 @@ from ..models.schedule import Schedule, Appointment
 # Change this line:
 from ..serializers.schedule import ScheduleSerializer, AppointmentSerializer
 from rest_framework import serializers
+from shared.utils.pagination import AppointmentCursorPagination
 
 # Get models.py dynamically to avoid import issues
 def get_user_models():
@@ -142,12 +143,13 @@ class PatientAppointmentListView(generics.ListAPIView):
 # Doctor Appointment Management
 class DoctorAppointmentListView(generics.ListAPIView):
     serializer_class = AppointmentSerializer
+    pagination_class = AppointmentCursorPagination
 
     def get_queryset(self):
         if self.request.user.is_doctor:
             User, Doctor, Patient = get_user_models()
             doctor = Doctor.objects.get(user=self.request.user)
-            return Appointment.objects.filter(doctor=doctor)
+            return Appointment.objects.filter(doctor=doctor).select_related('patient__user', 'doctor__user')
         return Appointment.objects.none()
 
 # Appointment Cancellation (for both doctor and patient)
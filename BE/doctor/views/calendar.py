@@ -0,0 +1,44 @@
+# BE/doctor/views/calendar.py
+from datetime import date, datetime
+
+from rest_framework import status
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from shared.models import Doctor
+from ..services.calendar import CalendarService
+
+
+class DoctorCalendarView(APIView):
+    """Per-day occupancy grid for the logged-in doctor"""
+    MAX_DAYS = 31
+
+    def get(self, request):
+        if not request.user.is_doctor:
+            return Response({"detail": "Only doctors can view the calendar"},
+                            status=status.HTTP_403_FORBIDDEN)
+
+        try:
+            start = request.query_params.get('start')
+            start = datetime.strptime(start, '%Y-%m-%d').date() if start else date.today()
+            days = int(request.query_params.get('days', 7))
+        except ValueError:
+            return Response({"detail": "Use start=YYYY-MM-DD and an integer days value"},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        if not 1 <= days <= self.MAX_DAYS:
+            return Response({"detail": f"days must be between 1 and {self.MAX_DAYS}"},
+                            status=status.HTTP_400_BAD_REQUEST)
+        if (date.max - start).days < days - 1:
+            return Response({"detail": "The requested days run past the last representable date"},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        doctor_id = Doctor.objects.filter(user=request.user).values_list('id', flat=True).first()
+        if doctor_id is None:
+            return Response({"detail": "Doctor profile not found"}, status=status.HTTP_404_NOT_FOUND)
+
+        return Response({
+            'doctor': doctor_id,
+            'start': start.isoformat(),
+            'days': CalendarService().get_calendar(doctor_id, start, days),
+        })
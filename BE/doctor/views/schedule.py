@@ -11,6 +11,7 @@ from ..serializers.schedule import ScheduleSerializer, AppointmentSerializer
 from rest_framework import serializers
 from rest_framework.permissions import AllowAny
 from rest_framework.permissions import IsAuthenticated
+from shared.utils.pagination import ScheduleCursorPagination
 
 # Get models.py dynamically to avoid import issues
 def get_user_models():
@@ -40,10 +41,11 @@ class DoctorWithUserSerializer(serializers.ModelSerializer):
 class DoctorScheduleListCreateView(generics.ListCreateAPIView):
     permission_classes = [IsAuthenticated]  # Add this line
     serializer_class = ScheduleSerializer
+    pagination_class = ScheduleCursorPagination
 
     def get_queryset(self):
         if self.request.user.is_authenticated and self.request.user.is_doctor:
-            return Schedule.objects.filter(doctor__user=self.request.user)
+            return Schedule.objects.filter(doctor__user=self.request.user).select_related('doctor__user')
         return Schedule.objects.none()
 
     def perform_create(self, serializer):
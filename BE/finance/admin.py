@@ -1,5 +1,6 @@
 from django.contrib import admin
 from .models import Insurance, Invoice, InvoiceItem, Payment, Refund
+from .services.coverage import CoverageEngine
 
 @admin.register(Insurance)
 class InsuranceAdmin(admin.ModelAdmin):
@@ -9,9 +10,15 @@ class InsuranceAdmin(admin.ModelAdmin):
 
 @admin.register(Invoice)
 class InvoiceAdmin(admin.ModelAdmin):
-    list_display = ['invoice_number', 'patient', 'invoice_type', 'total_amount', 'status', 'invoice_date']
+    list_display = ['invoice_number', 'patient', 'invoice_type', 'total_amount', 'balance_due', 'status', 'invoice_date']
     list_filter = ['status', 'invoice_type', 'invoice_date']
     search_fields = ['invoice_number', 'patient__user__first_name', 'patient__user__last_name']
+    actions = ['adjudicate_coverage']
+
+    @admin.action(description='Adjudicate insurance coverage')
+    def adjudicate_coverage(self, request, queryset):
+        adjudicated = CoverageEngine().adjudicate(queryset.values_list('id', flat=True))
+        self.message_user(request, f'Adjudicated {adjudicated} invoices')
 
 @admin.register(Payment)
 class PaymentAdmin(admin.ModelAdmin):
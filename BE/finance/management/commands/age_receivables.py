@@ -0,0 +1,40 @@
+# BE/finance/management/commands/age_receivables.py
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+
+from finance.services.aging import ReceivablesService
+
+
+class Command(BaseCommand):
+    help = 'Nightly receivables job: mark past-due invoices OVERDUE and optionally rebuild aging rollups'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--as-of',
+            default=None,
+            help='Date to age against (YYYY-MM-DD), defaults to today',
+        )
+        parser.add_argument(
+            '--rebuild',
+            action='store_true',
+            help='Recompute every aging rollup from the invoices',
+        )
+
+    def handle(self, *args, **options):
+        as_of = None
+        if options['as_of']:
+            try:
+                as_of = datetime.strptime(options['as_of'], '%Y-%m-%d').date()
+            except ValueError:
+                raise CommandError('--as-of must be YYYY-MM-DD')
+
+        service = ReceivablesService()
+        overdue = service.mark_overdue(as_of)
+        self.stdout.write(f'Marked {overdue} invoices overdue')
+
+        if options['rebuild']:
+            rows = service.rebuild()
+            self.stdout.write(f'Rebuilt {rows} aging rollup rows')
+
+        self.stdout.write(self.style.SUCCESS('Receivables aged'))
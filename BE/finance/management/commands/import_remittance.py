@@ -0,0 +1,60 @@
+# BE/finance/management/commands/import_remittance.py
+import os
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from finance.services.remittance import RemittanceImporter
+
+
+class Command(BaseCommand):
+    help = 'Post an insurer remittance CSV as payments against matching invoices'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Remittance CSV file')
+        parser.add_argument(
+            '--batch-ref',
+            default=None,
+            help='Remittance batch reference, such as the payer\'s check or EFT number (defaults to a hash of the '
+                 'file contents); re-importing a batch skips posted lines',
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=None,
+            help='Lines posted per transaction',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Match and validate without posting anything',
+        )
+
+    def handle(self, *args, **options):
+        path = options['path']
+        if not os.path.exists(path):
+            raise CommandError(f'{path} does not exist')
+
+        batch_ref = options['batch_ref']
+        if not batch_ref:
+            with open(path, 'rb') as stream:
+                batch_ref = RemittanceImporter.content_reference(stream)
+        importer = RemittanceImporter(batch_ref, chunk_size=options['chunk_size'])
+
+        started = time.monotonic()
+        with open(path, newline='', encoding='utf-8') as stream:
+            try:
+                result = importer.import_file(stream, dry_run=options['dry_run'])
+            except ValueError as e:
+                raise CommandError(str(e))
+        elapsed = time.monotonic() - started
+
+        for line_number, reason in result.rejected:
+            self.stdout.write(self.style.WARNING(f'Line {line_number}: {reason}'))
+
+        prefix = 'Dry run: would post' if options['dry_run'] else 'Posted'
+        self.stdout.write(self.style.SUCCESS(
+            f'{prefix} {result.posted} of {result.lines} lines (${result.amount_posted}), '
+            f'{result.duplicates} already posted, {result.rejected_count} rejected '
+            f'in {elapsed:.1f}s ({result.lines / elapsed if elapsed else 0:.0f} lines/s)'
+        ))
@@ -0,0 +1,37 @@
+# BE/finance/management/commands/recalculate_invoices.py
+from django.core.management.base import BaseCommand
+
+from finance.models import Invoice
+from finance.services.invoicing import InvoiceCalculator
+
+
+class Command(BaseCommand):
+    help = 'Recalculate invoice totals, insurance split and balance from line items'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--status',
+            action='append',
+            choices=[choice for choice, _ in Invoice.STATUS_CHOICES],
+            help='Only invoices in this status (repeatable)',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=None,
+            help='Invoices per set-based update',
+        )
+        parser.add_argument(
+            '--tax-rate',
+            default=None,
+            help='Override FINANCE_CONFIG TAX_RATE, e.g. 0.0825',
+        )
+
+    def handle(self, *args, **options):
+        queryset = Invoice.objects.all()
+        if options['status']:
+            queryset = queryset.filter(status__in=options['status'])
+
+        calculator = InvoiceCalculator(tax_rate=options['tax_rate'], batch_size=options['batch_size'])
+        updated = calculator.recalculate_all(queryset)
+        self.stdout.write(self.style.SUCCESS(f'Recalculated {updated} invoices'))
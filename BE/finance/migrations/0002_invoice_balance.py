@@ -0,0 +1,25 @@
+# Generated by Django 4.2.30 on 2026-10-19 09:07
+
+from django.db import migrations, models
+from django.db.models import F
+
+
+def backfill_balance_due(apps, schema_editor):
+    Invoice = apps.get_model('finance', 'Invoice')
+    Invoice.objects.update(balance_due=F('total_amount') - F('paid_amount') - F('insurance_paid_amount'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('finance', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='invoice',
+            name='balance_due',
+            field=models.DecimalField(decimal_places=2, default=0, help_text='Total less patient and insurance payments', max_digits=12),
+        ),
+        migrations.RunPython(backfill_balance_due, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 4.2.30 on 2026-10-19 09:08
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('finance', '0002_invoice_balance'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReceivableRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('dimension', models.CharField(choices=[('PATIENT', 'Patient'), ('DOCTOR', 'Doctor'), ('INSURER', 'Insurer')], max_length=10)),
+                ('key', models.CharField(help_text='Patient/doctor id or insurer name; blank for self-pay', max_length=200)),
+                ('due_date', models.DateField()),
+                ('invoice_count', models.PositiveIntegerField(default=0)),
+                ('balance', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('refreshed_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'db_table': 'receivable_rollups',
+            },
+        ),
+        migrations.AddField(
+            model_name='invoice',
+            name='insurance',
+            field=models.ForeignKey(blank=True, help_text='Policy the claim is billed to', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='invoices', to='finance.insurance'),
+        ),
+        migrations.AddIndex(
+            model_name='invoice',
+            index=models.Index(condition=models.Q(('balance_due__gt', 0)), fields=['due_date'], name='invoice_open_due_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='receivablerollup',
+            constraint=models.UniqueConstraint(fields=('dimension', 'key', 'due_date'), name='receivable_rollup_unique'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.30 on 2026-10-19 09:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('finance', '0003_receivables_aging'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='invoice',
+            name='claim_number',
+            field=models.CharField(blank=True, db_index=True, help_text="Insurer's claim reference", max_length=100),
+        ),
+    ]
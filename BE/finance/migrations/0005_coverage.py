@@ -0,0 +1,42 @@
+# Generated by Django 4.2.30 on 2026-10-19 09:19
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('finance', '0004_invoice_claim_number'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='invoice',
+            name='deductible_applied',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=12),
+        ),
+        migrations.AddField(
+            model_name='invoice',
+            name='out_of_pocket_applied',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=12),
+        ),
+        migrations.CreateModel(
+            name='CoverageAccumulator',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('plan_year', models.PositiveSmallIntegerField()),
+                ('deductible_met', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('out_of_pocket_met', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('insurance', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='accumulators', to='finance.insurance')),
+            ],
+            options={
+                'db_table': 'coverage_accumulators',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='coverageaccumulator',
+            constraint=models.UniqueConstraint(fields=('insurance', 'plan_year'), name='coverage_accumulator_unique'),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 4.2.30 on 2026-10-19 09:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('finance', '0005_coverage'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='invoice',
+            name='invoice_number',
+            field=models.CharField(blank=True, help_text='Assigned on save if left blank', max_length=50, unique=True),
+        ),
+        migrations.AlterField(
+            model_name='payment',
+            name='payment_id',
+            field=models.CharField(blank=True, help_text='Assigned on save if left blank', max_length=50, unique=True),
+        ),
+        migrations.AlterField(
+            model_name='refund',
+            name='refund_id',
+            field=models.CharField(blank=True, help_text='Assigned on save if left blank', max_length=50, unique=True),
+        ),
+    ]
@@ -0,0 +1,65 @@
+# Generated by Django 4.2.30 on 2026-10-19 11:14
+
+from collections import defaultdict
+
+from django.db import migrations, models
+
+CLOSED_STATUSES = ['DRAFT', 'PAID', 'CANCELLED', 'REFUNDED']
+
+
+def backfill_entries(apps, schema_editor):
+    """Record every outstanding invoice and rebuild the rollups from the same rows, so they agree"""
+    Invoice = apps.get_model('finance', 'Invoice')
+    ReceivableEntry = apps.get_model('finance', 'ReceivableEntry')
+    ReceivableRollup = apps.get_model('finance', 'ReceivableRollup')
+
+    entries = []
+    rollups = defaultdict(lambda: [0, 0])
+    rows = Invoice.objects.filter(balance_due__gt=0).exclude(status__in=CLOSED_STATUSES).values_list(
+        'id', 'patient_id', 'doctor_id', 'insurance__company_name', 'due_date', 'balance_due'
+    )
+    for invoice_id, patient_id, doctor_id, insurer, due_date, balance in rows.iterator(chunk_size=2000):
+        entry = ReceivableEntry(
+            invoice_id=invoice_id, patient_key=str(patient_id),
+            doctor_key=None if doctor_id is None else str(doctor_id), insurer_key=insurer or '',
+            due_date=due_date, balance=balance,
+        )
+        entries.append(entry)
+        keys = [('PATIENT', entry.patient_key), ('INSURER', entry.insurer_key)]
+        if entry.doctor_key is not None:
+            keys.append(('DOCTOR', entry.doctor_key))
+        for dimension, key in keys:
+            rollups[dimension, key, due_date][0] += 1
+            rollups[dimension, key, due_date][1] += balance
+
+    ReceivableEntry.objects.bulk_create(entries, batch_size=2000)
+    ReceivableRollup.objects.all().delete()
+    ReceivableRollup.objects.bulk_create([
+        ReceivableRollup(dimension=dimension, key=key, due_date=due_date, invoice_count=count, balance=balance)
+        for (dimension, key, due_date), (count, balance) in rollups.items()
+    ], batch_size=2000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('finance', '0006_business_ids'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReceivableEntry',
+            fields=[
+                ('invoice_id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('patient_key', models.CharField(max_length=200)),
+                ('doctor_key', models.CharField(max_length=200, null=True)),
+                ('insurer_key', models.CharField(max_length=200)),
+                ('due_date', models.DateField()),
+                ('balance', models.DecimalField(decimal_places=2, max_digits=12)),
+            ],
+            options={
+                'db_table': 'receivable_entries',
+            },
+        ),
+        migrations.RunPython(backfill_entries, migrations.RunPython.noop),
+    ]
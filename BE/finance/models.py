@@ -1,7 +1,10 @@
 # BE/finance/models.py
 from django.db import models
+from django.db.models import F
 from decimal import Decimal
 
+from shared.utils.ids import next_id
+
 class Insurance(models.Model):
     INSURANCE_TYPE_CHOICES = [
         ('HEALTH', 'Health Insurance'),
@@ -47,6 +50,20 @@ class Insurance(models.Model):
     class Meta:
         db_table = 'insurances'
 
+class InvoiceQuerySet(models.QuerySet):
+    def outstanding(self):
+        """Invoices that still expect money"""
+        return self.filter(balance_due__gt=0).exclude(status__in=Invoice.CLOSED_STATUSES)
+
+    def overdue(self, as_of=None):
+        from django.utils import timezone
+        return self.outstanding().filter(due_date__lt=as_of or timezone.localdate())
+
+    def refresh_balances(self):
+        """Recompute the stored balance in SQL, e.g. after a queryset update of paid amounts"""
+        return self.update(balance_due=Invoice.balance_expression())
+
+
 class Invoice(models.Model):
     STATUS_CHOICES = [
         ('DRAFT', 'Draft'),
@@ -57,6 +74,7 @@ class Invoice(models.Model):
         ('CANCELLED', 'Cancelled'),
         ('REFUNDED', 'Refunded'),
     ]
+    CLOSED_STATUSES = ['DRAFT', 'PAID', 'CANCELLED', 'REFUNDED']
 
     INVOICE_TYPE_CHOICES = [
         ('CONSULTATION', 'Consultation'),
@@ -69,9 +87,11 @@ class Invoice(models.Model):
         ('OTHER', 'Other'),
     ]
 
-    invoice_number = models.CharField(max_length=50, unique=True)
+    invoice_number = models.CharField(max_length=50, unique=True, blank=True, help_text="Assigned on save if left blank")
     patient = models.ForeignKey('shared.Patient', on_delete=models.CASCADE, related_name='invoices')
     doctor = models.ForeignKey('shared.Doctor', on_delete=models.CASCADE, related_name='invoices', null=True, blank=True)
+    insurance = models.ForeignKey(Insurance, on_delete=models.SET_NULL, related_name='invoices', null=True, blank=True,
+                                  help_text="Policy the claim is billed to")
     invoice_type = models.CharField(max_length=20, choices=INVOICE_TYPE_CHOICES)
 
     # Financial Details
@@ -82,9 +102,17 @@ class Invoice(models.Model):
     paid_amount = models.DecimalField(max_digits=12, decimal_places=2, default=0)
 
     # Insurance
+    claim_number = models.CharField(max_length=100, blank=True, db_index=True, help_text="Insurer's claim reference")
     insurance_claim_amount = models.DecimalField(max_digits=12, decimal_places=2, default=0)
     insurance_paid_amount = models.DecimalField(max_digits=12, decimal_places=2, default=0)
     patient_responsibility = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    # What adjudication charged against the policy's accumulators, reversed on re-adjudication
+    deductible_applied = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    out_of_pocket_applied = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+
+    # Stored so it can be filtered, sorted and aggregated in SQL
+    balance_due = models.DecimalField(max_digits=12, decimal_places=2, default=0,
+                                      help_text="Total less patient and insurance payments")
 
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='DRAFT')
     description = models.TextField()
@@ -99,12 +127,25 @@ class Invoice(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = InvoiceQuerySet.as_manager()
+
+    BALANCE_FIELDS = {'total_amount', 'paid_amount', 'insurance_paid_amount'}
+
     def __str__(self):
         return f"Invoice {self.invoice_number} - ${self.total_amount}"
 
-    @property
-    def balance_due(self):
-        return self.total_amount - self.paid_amount
+    @staticmethod
+    def balance_expression():
+        return F('total_amount') - F('paid_amount') - F('insurance_paid_amount')
+
+    def save(self, *args, **kwargs):
+        if not self.invoice_number:
+            self.invoice_number = next_id('invoice', 'INV')
+        self.balance_due = (self.total_amount or 0) - (self.paid_amount or 0) - (self.insurance_paid_amount or 0)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and self.BALANCE_FIELDS.intersection(update_fields):
+            kwargs['update_fields'] = set(update_fields) | {'balance_due'}
+        super().save(*args, **kwargs)
 
     @property
     def is_overdue(self):
@@ -113,6 +154,77 @@ class Invoice(models.Model):
 
     class Meta:
         db_table = 'invoices'
+        indexes = [
+            # Receivables: open balances by due date
+            models.Index(fields=['due_date'], condition=models.Q(balance_due__gt=0), name='invoice_open_due_idx'),
+        ]
+
+class ReceivableRollup(models.Model):
+    """
+    Open balance per (dimension, key, due date), kept up to date incrementally.
+    Aging buckets are derived at read time from due_date, so rows only change
+    when invoices or payments do, not as days pass.
+    """
+    DIMENSION_CHOICES = [
+        ('PATIENT', 'Patient'),
+        ('DOCTOR', 'Doctor'),
+        ('INSURER', 'Insurer'),
+    ]
+
+    dimension = models.CharField(max_length=10, choices=DIMENSION_CHOICES)
+    key = models.CharField(max_length=200, help_text="Patient/doctor id or insurer name; blank for self-pay")
+    due_date = models.DateField()
+    invoice_count = models.PositiveIntegerField(default=0)
+    balance = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    refreshed_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.dimension} {self.key} due {self.due_date}: ${self.balance}"
+
+    class Meta:
+        db_table = 'receivable_rollups'
+        constraints = [
+            models.UniqueConstraint(fields=['dimension', 'key', 'due_date'], name='receivable_rollup_unique'),
+        ]
+
+class ReceivableEntry(models.Model):
+    """
+    What one outstanding invoice currently contributes to the rollups, so a
+    change to the invoice moves them by the difference instead of re-summing.
+    """
+    # No foreign key: a deleted invoice's entry stays until its contribution is taken back out
+    invoice_id = models.BigIntegerField(primary_key=True)
+    patient_key = models.CharField(max_length=200)
+    doctor_key = models.CharField(max_length=200, null=True)
+    insurer_key = models.CharField(max_length=200)
+    due_date = models.DateField()
+    balance = models.DecimalField(max_digits=12, decimal_places=2)
+
+    def __str__(self):
+        return f"Invoice {self.invoice_id} due {self.due_date}: ${self.balance}"
+
+    class Meta:
+        db_table = 'receivable_entries'
+
+class CoverageAccumulator(models.Model):
+    """
+    Deductible and out-of-pocket spend per policy and plan year, moved by the
+    amounts adjudicated invoices apply, so estimates never sum payment history.
+    """
+    insurance = models.ForeignKey(Insurance, on_delete=models.CASCADE, related_name='accumulators')
+    plan_year = models.PositiveSmallIntegerField()
+    deductible_met = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    out_of_pocket_met = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.insurance} {self.plan_year}: deductible ${self.deductible_met}, OOP ${self.out_of_pocket_met}"
+
+    class Meta:
+        db_table = 'coverage_accumulators'
+        constraints = [
+            models.UniqueConstraint(fields=['insurance', 'plan_year'], name='coverage_accumulator_unique'),
+        ]
 
 class InvoiceItem(models.Model):
     invoice = models.ForeignKey(Invoice, on_delete=models.CASCADE, related_name='items')
@@ -154,7 +266,7 @@ class Payment(models.Model):
         ('REFUNDED', 'Refunded'),
     ]
 
-    payment_id = models.CharField(max_length=50, unique=True)
+    payment_id = models.CharField(max_length=50, unique=True, blank=True, help_text="Assigned on save if left blank")
     invoice = models.ForeignKey(Invoice, on_delete=models.CASCADE, related_name='payments')
     patient = models.ForeignKey('shared.Patient', on_delete=models.CASCADE, related_name='payments')
     amount = models.DecimalField(max_digits=12, decimal_places=2)
@@ -178,6 +290,11 @@ class Payment(models.Model):
     processed_date = models.DateTimeField(null=True, blank=True)
     notes = models.TextField(blank=True)
 
+    def save(self, *args, **kwargs):
+        if not self.payment_id:
+            self.payment_id = next_id('payment', 'PAY')
+        super().save(*args, **kwargs)
+
     def __str__(self):
         return f"Payment {self.payment_id} - ${self.amount}"
 
@@ -193,7 +310,7 @@ class Refund(models.Model):
         ('REJECTED', 'Rejected'),
     ]
 
-    refund_id = models.CharField(max_length=50, unique=True)
+    refund_id = models.CharField(max_length=50, unique=True, blank=True, help_text="Assigned on save if left blank")
     original_payment = models.ForeignKey(Payment, on_delete=models.CASCADE, related_name='refunds')
     amount = models.DecimalField(max_digits=12, decimal_places=2)
     reason = models.TextField()
@@ -207,6 +324,11 @@ class Refund(models.Model):
     processed_date = models.DateTimeField(null=True, blank=True)
     notes = models.TextField(blank=True)
 
+    def save(self, *args, **kwargs):
+        if not self.refund_id:
+            self.refund_id = next_id('refund', 'RFD')
+        super().save(*args, **kwargs)
+
     def __str__(self):
         return f"Refund {self.refund_id} - ${self.amount}"
 
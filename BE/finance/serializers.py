@@ -0,0 +1,10 @@
+# BE/finance/serializers.py
+from rest_framework import serializers
+
+
+class CoverageEstimateSerializer(serializers.Serializer):
+    amounts = serializers.ListField(
+        child=serializers.DecimalField(max_digits=10, decimal_places=2), min_length=1, max_length=100
+    )
+    service_date = serializers.DateField(required=False)
+    patient_id = serializers.IntegerField(required=False, help_text="Staff and doctors only; patients get their own")
@@ -0,0 +1,243 @@
+# BE/finance/services/aging.py
+import logging
+import operator
+from collections import defaultdict
+from datetime import date, timedelta
+from decimal import Decimal
+from functools import reduce
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from django.db import transaction
+from django.db.models import Case, Count, DecimalField, F, IntegerField, Q, Sum, Value, When
+from django.utils import timezone
+
+from shared.utils.transactions import OnCommitBatch
+from ..models import Invoice, ReceivableEntry, ReceivableRollup
+
+logger = logging.getLogger(__name__)
+
+# Invoice field each rollup dimension groups by
+DIMENSION_FIELDS = {
+    'PATIENT': 'patient_id',
+    'DOCTOR': 'doctor_id',
+    'INSURER': 'insurance__company_name',
+}
+SELF_PAY = ''
+ZERO = Decimal('0')
+
+# (label, min days past due, max days past due); None is open-ended
+AGING_BUCKETS = [
+    ('current', None, -1),
+    ('days_0_30', 0, 30),
+    ('days_31_60', 31, 60),
+    ('days_61_90', 61, 90),
+    ('days_90_plus', 91, None),
+]
+
+
+class ReceivablesService:
+    """
+    Accounts-receivable aging over the ReceivableRollup table.
+
+    Rollups hold open balances per patient, doctor and insurer per due date.
+    Each outstanding invoice's contribution is recorded in a ReceivableEntry;
+    after commit, a changed invoice's entry is locked and the rollups it
+    touches are moved by the difference with F() updates, so refreshing costs
+    the same however many invoices a key has. ``rebuild`` recomputes
+    everything for the nightly job. Reports aggregate the (small) rollup
+    table, never the invoices.
+    """
+
+    # Refreshing
+
+    def refresh_invoices(self, invoice_ids: Iterable[int]) -> int:
+        """Move the rollups by what changed on these invoices since they were last applied"""
+        invoice_ids = set(invoice_ids)
+        if not invoice_ids:
+            return 0
+
+        with transaction.atomic():
+            # Concurrent refreshes of the same invoice queue on its row (or, once
+            # it is deleted, on its entry) and each sees what the other applied
+            list(Invoice.objects.select_for_update().filter(id__in=invoice_ids).order_by('id').values_list('id'))
+            entries = {
+                entry.invoice_id: entry
+                for entry in ReceivableEntry.objects.select_for_update().filter(invoice_id__in=invoice_ids)
+            }
+            current = {
+                entry.invoice_id: entry
+                for entry in self.entries(Invoice.objects.outstanding().filter(id__in=invoice_ids))
+            }
+
+            deltas = defaultdict(lambda: [0, ZERO])
+
+            def shift(entry, sign):
+                for rollup_key in self.rollup_keys(entry):
+                    deltas[rollup_key][0] += sign
+                    deltas[rollup_key][1] += sign * entry.balance
+
+            for entry in entries.values():
+                shift(entry, -1)
+            for entry in current.values():
+                shift(entry, 1)
+            self.apply_deltas(deltas)
+
+            gone = entries.keys() - current.keys()
+            ReceivableEntry.objects.filter(invoice_id__in=gone).delete()
+            changed = [entry for invoice_id, entry in current.items() if invoice_id in entries]
+            ReceivableEntry.objects.bulk_update(
+                changed, ['patient_key', 'doctor_key', 'insurer_key', 'due_date', 'balance'], batch_size=2000
+            )
+            ReceivableEntry.objects.bulk_create(
+                [entry for invoice_id, entry in current.items() if invoice_id not in entries], batch_size=2000
+            )
+        return len(invoice_ids)
+
+    @staticmethod
+    def entries(invoices) -> List[ReceivableEntry]:
+        rows = invoices.values_list('id', 'patient_id', 'doctor_id', 'insurance__company_name', 'due_date',
+                                    'balance_due')
+        return [
+            ReceivableEntry(
+                invoice_id=invoice_id,
+                patient_key=str(patient_id),
+                doctor_key=None if doctor_id is None else str(doctor_id),
+                insurer_key=SELF_PAY if insurer is None else insurer,
+                due_date=due_date,
+                balance=balance,
+            )
+            for invoice_id, patient_id, doctor_id, insurer, due_date, balance in rows
+        ]
+
+    @staticmethod
+    def rollup_keys(entry: ReceivableEntry) -> List[Tuple[str, str, date]]:
+        keys = [('PATIENT', entry.patient_key, entry.due_date), ('INSURER', entry.insurer_key, entry.due_date)]
+        if entry.doctor_key is not None:
+            keys.append(('DOCTOR', entry.doctor_key, entry.due_date))
+        return keys
+
+    @staticmethod
+    def apply_deltas(deltas: Dict[Tuple[str, str, date], List]):
+        """Create missing rollups, then move every changed one by its delta in one UPDATE"""
+        changed = {key: delta for key, delta in deltas.items() if any(delta)}
+        if not changed:
+            return
+
+        ReceivableRollup.objects.bulk_create(
+            [ReceivableRollup(dimension=dimension, key=key, due_date=due_date)
+             for dimension, key, due_date in changed],
+            batch_size=2000, ignore_conflicts=True,
+        )
+        condition = reduce(operator.or_, (
+            Q(dimension=dimension, key=key, due_date=due_date) for dimension, key, due_date in changed
+        ))
+
+        def moved(field_name, index, output_field):
+            delta = Case(
+                *[When(dimension=dimension, key=key, due_date=due_date, then=Value(delta[index]))
+                  for (dimension, key, due_date), delta in changed.items()],
+                default=Value(0), output_field=output_field,
+            )
+            return F(field_name) + delta
+
+        # Emptied rows stay at zero; dropping them could race a concurrent increment.
+        # Reports skip them and the nightly rebuild clears them out.
+        ReceivableRollup.objects.filter(condition).update(
+            invoice_count=moved('invoice_count', 0, IntegerField()),
+            balance=moved('balance', 1, DecimalField(max_digits=14, decimal_places=2)),
+            refreshed_at=timezone.now(),
+        )
+
+    @staticmethod
+    def rollup_rows(dimension, invoices) -> List[ReceivableRollup]:
+        field = DIMENSION_FIELDS[dimension]
+        grouped = invoices.order_by().values(field, 'due_date').annotate(
+            invoice_count=Count('id'), balance=Sum('balance_due')
+        )
+        rows = []
+        for row in grouped:
+            key = row[field]
+            if key is None and dimension != 'INSURER':
+                continue
+            rows.append(ReceivableRollup(
+                dimension=dimension,
+                key=SELF_PAY if key is None else str(key),
+                due_date=row['due_date'],
+                invoice_count=row['invoice_count'],
+                balance=row['balance'],
+            ))
+        return rows
+
+    def rebuild(self) -> int:
+        with transaction.atomic():
+            ReceivableEntry.objects.all().delete()
+            ReceivableRollup.objects.all().delete()
+            ReceivableEntry.objects.bulk_create(self.entries(Invoice.objects.outstanding()), batch_size=2000)
+            rows = []
+            for dimension in DIMENSION_FIELDS:
+                rows.extend(self.rollup_rows(dimension, Invoice.objects.outstanding()))
+            ReceivableRollup.objects.bulk_create(rows, batch_size=2000)
+        return len(rows)
+
+    # Reporting
+
+    @staticmethod
+    def today() -> date:
+        return timezone.localdate()
+
+    @staticmethod
+    def bucket_filter(as_of: date, low: Optional[int], high: Optional[int]) -> Q:
+        condition = Q()
+        if low is not None:
+            condition &= Q(due_date__lte=as_of - timedelta(days=low))
+        if high is not None:
+            condition &= Q(due_date__gte=as_of - timedelta(days=high))
+        return condition
+
+    def aging(self, dimension, as_of: Optional[date] = None, keys: Optional[Iterable[str]] = None,
+              limit: Optional[int] = None) -> List[Dict]:
+        """Aged open balances per key, largest total first"""
+        as_of = as_of or self.today()
+        rollups = ReceivableRollup.objects.filter(dimension=dimension, invoice_count__gt=0)
+        if keys is not None:
+            rollups = rollups.filter(key__in=[str(key) for key in keys])
+
+        buckets = {
+            label: Sum('balance', filter=self.bucket_filter(as_of, low, high), default=0)
+            for label, low, high in AGING_BUCKETS
+        }
+        rows = rollups.values('key').annotate(
+            **buckets, total=Sum('balance'), invoice_count=Sum('invoice_count')
+        ).order_by('-total', 'key')
+        return list(rows[:limit] if limit else rows)
+
+    def totals(self, dimension='PATIENT', as_of: Optional[date] = None) -> Dict:
+        """Aging across all receivables; every invoice sits in exactly one key per dimension"""
+        as_of = as_of or self.today()
+        return ReceivableRollup.objects.filter(dimension=dimension, invoice_count__gt=0).aggregate(
+            **{
+                label: Sum('balance', filter=self.bucket_filter(as_of, low, high), default=0)
+                for label, low, high in AGING_BUCKETS
+            },
+            total=Sum('balance', default=0),
+            invoice_count=Sum('invoice_count', default=0),
+        )
+
+    # Nightly aging
+
+    def mark_overdue(self, as_of: Optional[date] = None) -> int:
+        """Flip sent and partially paid invoices past their due date to OVERDUE in one UPDATE"""
+        as_of = as_of or self.today()
+        updated = Invoice.objects.filter(
+            status__in=['SENT', 'PARTIAL'], balance_due__gt=0, due_date__lt=as_of
+        ).update(status='OVERDUE', updated_at=timezone.now())
+        logger.info(f"Marked {updated} invoices overdue as of {as_of}")
+        return updated
+
+
+def _refresh_pending(invoice_ids):
+    ReceivablesService().refresh_invoices(invoice_ids)
+
+
+# Invoices changed in a transaction, applied to the rollups together after commit
+pending_rollups = OnCommitBatch(_refresh_pending)
@@ -0,0 +1,491 @@
+# BE/finance/services/coverage.py
+import logging
+import operator
+from collections import defaultdict
+from dataclasses import dataclass, field
+from datetime import date
+from decimal import Decimal, ROUND_HALF_UP
+from functools import reduce
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Case, F, Q, Sum, Value, When
+from django.db.models.functions import ExtractYear, Greatest
+from django.utils import timezone
+
+from records.services.chart import invalidate_charts
+from shared.utils.transactions import OnCommitBatch
+from ..models import CoverageAccumulator, Insurance, Invoice, InvoiceItem
+from .aging import pending_rollups
+from .invoicing import MONEY
+
+logger = logging.getLogger(__name__)
+
+ZERO = Decimal('0')
+CENT = Decimal('0.01')
+HUNDRED = Decimal('100')
+
+COVERAGE_CACHE_TIMEOUT = 60 * 60
+POLICY_FIELDS = (
+    'id', 'patient_id', 'copay_amount', 'deductible_amount', 'out_of_pocket_max',
+    'coverage_percentage', 'effective_date', 'expiration_date',
+)
+# What adjudication writes on an invoice
+SPLIT_FIELDS = (
+    'insurance_id', 'insurance_claim_amount', 'patient_responsibility',
+    'deductible_applied', 'out_of_pocket_applied',
+)
+# Adjudicating these would move accumulators for care that was never billed
+UNADJUDICATED_STATUSES = ['CANCELLED', 'REFUNDED']
+
+
+def cents(value) -> Decimal:
+    return Decimal(value).quantize(CENT, rounding=ROUND_HALF_UP)
+
+
+def plan_year(on_date: date) -> int:
+    """Deductibles and out-of-pocket maximums reset every calendar year"""
+    return on_date.year
+
+
+def policies_cache_key(patient_id):
+    return f'coverage-policies:{patient_id}'
+
+
+def accumulator_cache_key(insurance_id, year):
+    return f'coverage-accumulator:{insurance_id}:{year}'
+
+
+def invalidate_policies(patient_id):
+    cache.delete(policies_cache_key(patient_id))
+
+
+@dataclass
+class ItemSplit:
+    """One charge divided between the patient (by reason) and the insurer"""
+    amount: Decimal
+    copay: Decimal = ZERO
+    deductible: Decimal = ZERO
+    coinsurance: Decimal = ZERO
+    uncovered: Decimal = ZERO
+    insurer: Decimal = ZERO
+
+    @property
+    def patient(self) -> Decimal:
+        return self.copay + self.deductible + self.coinsurance + self.uncovered
+
+
+@dataclass
+class CoverageResult:
+    policy_id: Optional[int]
+    plan_year: Optional[int] = None
+    items: List[ItemSplit] = field(default_factory=list)
+    deductible_remaining: Optional[Decimal] = None
+    out_of_pocket_remaining: Optional[Decimal] = None
+
+    @property
+    def patient_total(self) -> Decimal:
+        return sum((item.patient for item in self.items), ZERO)
+
+    @property
+    def insurer_total(self) -> Decimal:
+        return sum((item.insurer for item in self.items), ZERO)
+
+    @property
+    def deductible_applied(self) -> Decimal:
+        return sum((item.deductible for item in self.items), ZERO)
+
+    @property
+    def out_of_pocket_applied(self) -> Decimal:
+        # Self-pay charges don't count toward any policy's maximum
+        return self.patient_total if self.policy_id else ZERO
+
+    def as_dict(self) -> Dict:
+        return {
+            'insurance_id': self.policy_id,
+            'plan_year': self.plan_year,
+            'patient_total': self.patient_total,
+            'insurer_total': self.insurer_total,
+            'deductible_applied': self.deductible_applied,
+            'deductible_remaining': self.deductible_remaining,
+            'out_of_pocket_remaining': self.out_of_pocket_remaining,
+            'items': [
+                {
+                    'amount': item.amount,
+                    'copay': item.copay,
+                    'deductible': item.deductible,
+                    'coinsurance': item.coinsurance,
+                    'uncovered': item.uncovered,
+                    'patient': item.patient,
+                    'insurer': item.insurer,
+                }
+                for item in self.items
+            ],
+        }
+
+
+def allocate(total: Decimal, weights: Sequence[Decimal]) -> List[Decimal]:
+    """Spread ``total`` over ``weights`` in proportion, in cents, the rounding remainder on the last"""
+    weight_sum = sum(weights, ZERO)
+    if not weights or weight_sum == 0:
+        return [cents(total)]
+    shares = [cents(total * weight / weight_sum) for weight in weights[:-1]]
+    shares.append(cents(total) - sum(shares, ZERO))
+    return shares
+
+
+def split_charges(amounts: Iterable[Decimal], policy: Optional[Dict], deductible_met=ZERO,
+                  out_of_pocket_met=ZERO) -> CoverageResult:
+    """
+    Apply a policy to one visit's charges, in order: the copay (once per visit),
+    then whatever deductible is left, then coinsurance on the rest; the patient's
+    share is capped at what is left of the out-of-pocket maximum. A zero maximum
+    means no cap. Without a policy the patient owes everything.
+    """
+    items = [ItemSplit(amount=cents(amount)) for amount in amounts]
+    if policy is None:
+        for item in items:
+            item.uncovered = item.amount
+        return CoverageResult(policy_id=None, items=items)
+
+    copay_left = policy['copay_amount']
+    deductible_left = max(policy['deductible_amount'] - deductible_met, ZERO)
+    out_of_pocket_left = None
+    if policy['out_of_pocket_max'] > 0:
+        out_of_pocket_left = max(policy['out_of_pocket_max'] - out_of_pocket_met, ZERO)
+    patient_rate = (HUNDRED - policy['coverage_percentage']) / HUNDRED
+
+    for item in items:
+        if item.amount <= 0:
+            # Credits go back to the patient
+            item.uncovered = item.amount
+            continue
+
+        remaining = item.amount
+        item.copay = min(copay_left, remaining)
+        copay_left -= item.copay
+        remaining -= item.copay
+
+        item.deductible = min(deductible_left, remaining)
+        deductible_left -= item.deductible
+        remaining -= item.deductible
+
+        item.coinsurance = cents(remaining * patient_rate)
+
+        if out_of_pocket_left is not None:
+            excess = item.patient - out_of_pocket_left
+            for part in ('coinsurance', 'deductible', 'copay'):
+                if excess <= 0:
+                    break
+                cut = min(excess, getattr(item, part))
+                setattr(item, part, getattr(item, part) - cut)
+                excess -= cut
+            out_of_pocket_left -= item.patient
+
+        item.insurer = item.amount - item.patient
+
+    return CoverageResult(
+        policy_id=policy['id'],
+        items=items,
+        deductible_remaining=deductible_left,
+        out_of_pocket_remaining=out_of_pocket_left,
+    )
+
+
+class CoverageEngine:
+    """
+    Patient vs insurer responsibility for invoice items.
+
+    The policy is the patient's active one on the service date, primary first.
+    Year-to-date deductible and out-of-pocket spend come from CoverageAccumulator
+    rows, which adjudication moves by exactly what each invoice applies (and
+    backs out again when an invoice is re-adjudicated, cancelled or refunded).
+    New invoices are queued when created and again whenever their totals are
+    recalculated. Policies and accumulators
+    are read through the cache, so a booking-time estimate costs no queries once
+    warm.
+    """
+
+    # Policies
+
+    def policies(self, patient_ids: Iterable[int]) -> Dict[int, List[Dict]]:
+        """Active policies per patient, primary first, then most recent"""
+        patient_ids = set(patient_ids)
+        keys = {policies_cache_key(patient_id): patient_id for patient_id in patient_ids}
+        policies = {keys[key]: value for key, value in cache.get_many(keys.keys()).items()}
+
+        missing = patient_ids - set(policies)
+        if missing:
+            fresh = {patient_id: [] for patient_id in missing}
+            rows = Insurance.objects.filter(patient_id__in=missing, is_active=True).order_by(
+                '-is_primary', '-effective_date', '-id'
+            ).values(*POLICY_FIELDS)
+            for row in rows:
+                fresh[row['patient_id']].append(row)
+            cache.set_many(
+                {policies_cache_key(patient_id): value for patient_id, value in fresh.items()},
+                COVERAGE_CACHE_TIMEOUT,
+            )
+            policies.update(fresh)
+        return policies
+
+    @staticmethod
+    def select_policy(policies: List[Dict], on_date: date) -> Optional[Dict]:
+        for policy in policies:
+            if policy['effective_date'] <= on_date and (
+                policy['expiration_date'] is None or policy['expiration_date'] >= on_date
+            ):
+                return policy
+        return None
+
+    # Accumulators
+
+    def accumulators(self, keys: Iterable[Tuple[int, int]]) -> Dict[Tuple[int, int], Tuple[Decimal, Decimal]]:
+        """(deductible met, out-of-pocket met) per (insurance id, plan year), zero when nothing was applied yet"""
+        keys = set(keys)
+        cache_keys = {accumulator_cache_key(*key): key for key in keys}
+        values = {cache_keys[key]: value for key, value in cache.get_many(cache_keys.keys()).items()}
+
+        missing = keys - set(values)
+        if missing:
+            fresh = {key: (ZERO, ZERO) for key in missing}
+            rows = CoverageAccumulator.objects.filter(
+                insurance_id__in={insurance_id for insurance_id, _ in missing},
+                plan_year__in={year for _, year in missing},
+            ).values_list('insurance_id', 'plan_year', 'deductible_met', 'out_of_pocket_met')
+            for insurance_id, year, deductible_met, out_of_pocket_met in rows:
+                if (insurance_id, year) in fresh:
+                    fresh[(insurance_id, year)] = (deductible_met, out_of_pocket_met)
+            cache.set_many(
+                {accumulator_cache_key(*key): value for key, value in fresh.items()},
+                COVERAGE_CACHE_TIMEOUT,
+            )
+            values.update(fresh)
+        return values
+
+    @staticmethod
+    def lock_accumulators(keys: Iterable[Tuple[int, int]]) -> Dict[Tuple[int, int], Dict]:
+        """Create missing rows, then lock and read all of them from the table"""
+        keys = set(keys)
+        if not keys:
+            return {}
+        CoverageAccumulator.objects.bulk_create(
+            [CoverageAccumulator(insurance_id=insurance_id, plan_year=year) for insurance_id, year in keys],
+            ignore_conflicts=True,
+        )
+        rows = CoverageAccumulator.objects.select_for_update().filter(
+            insurance_id__in={insurance_id for insurance_id, _ in keys},
+            plan_year__in={year for _, year in keys},
+        ).values('id', 'insurance_id', 'plan_year', 'deductible_met', 'out_of_pocket_met')
+        return {(row['insurance_id'], row['plan_year']): row for row in rows}
+
+    @staticmethod
+    def apply_deltas(deltas: Dict[Tuple[int, int], List[Decimal]], rows: Dict[Tuple[int, int], Dict]):
+        """Move every changed accumulator by its delta in one UPDATE"""
+        changed = {rows[key]['id']: delta for key, delta in deltas.items() if any(delta)}
+        if not changed:
+            return
+
+        def moved(field_name, index):
+            delta = Case(
+                *[When(id=row_id, then=Value(delta[index])) for row_id, delta in changed.items()],
+                default=Value(ZERO), output_field=MONEY,
+            )
+            return Greatest(F(field_name) + delta, Value(ZERO), output_field=MONEY)
+
+        CoverageAccumulator.objects.filter(id__in=changed).update(
+            deductible_met=moved('deductible_met', 0),
+            out_of_pocket_met=moved('out_of_pocket_met', 1),
+            updated_at=timezone.now(),
+        )
+
+    # Estimating
+
+    def estimate(self, patient_id, amounts: Iterable[Decimal], on_date: Optional[date] = None) -> CoverageResult:
+        """What the patient would owe for ``amounts`` on ``on_date``, without recording anything"""
+        on_date = on_date or timezone.localdate()
+        policy = self.select_policy(self.policies([patient_id])[patient_id], on_date)
+        if policy is None:
+            return split_charges(amounts, None)
+
+        key = (policy['id'], plan_year(on_date))
+        deductible_met, out_of_pocket_met = self.accumulators([key])[key]
+        result = split_charges(amounts, policy, deductible_met, out_of_pocket_met)
+        result.plan_year = key[1]
+        return result
+
+    # Adjudicating
+
+    def adjudicate(self, invoice_ids: Iterable[int]) -> int:
+        """
+        Split the invoices between patient and insurer and record what they apply
+        to the accumulators. Invoices are applied in service-date order; ones that
+        were adjudicated before have their earlier amounts backed out first, and
+        adjudicated invoices later in the same plan year are redone after them.
+        Cancelled and refunded invoices only have what they applied backed out.
+        Returns how many invoices' splits changed.
+        """
+        invoice_ids = list(invoice_ids)
+        now = timezone.now()
+        with transaction.atomic():
+            released = self.released_rows(invoice_ids)
+            invoices = self.invoice_rows([Q(id__in=invoice_ids)])
+            if not invoices and not released:
+                return 0
+
+            policies = self.policies({invoice['patient_id'] for invoice in invoices + released})
+
+            def choose(rows):
+                return {
+                    invoice['id']: self.select_policy(policies[invoice['patient_id']], invoice['service_date'])
+                    for invoice in rows
+                }
+
+            chosen = choose(invoices)
+            # Later invoices on the same policy and plan year were split against
+            # accumulator values this batch changes, so they are redone as well
+            later = self.later_invoices(invoices + released,
+                                        {**chosen, **{invoice['id']: None for invoice in released}})
+            if later:
+                chosen.update(choose(later))
+                invoices = sorted(invoices + later, key=lambda invoice: (invoice['service_date'], invoice['id']))
+
+            charges = defaultdict(list)
+            items = InvoiceItem.objects.filter(invoice_id__in=[invoice['id'] for invoice in invoices]).order_by('id')
+            for invoice_id, total_price in items.values_list('invoice_id', 'total_price'):
+                charges[invoice_id].append(total_price)
+
+            deltas = defaultdict(lambda: [ZERO, ZERO])
+            for invoice in invoices + released:
+                if invoice['insurance_id']:
+                    key = (invoice['insurance_id'], plan_year(invoice['service_date']))
+                    deltas[key][0] -= invoice['deductible_applied']
+                    deltas[key][1] -= invoice['out_of_pocket_applied']
+            keys = set(deltas) | {
+                (policy['id'], plan_year(invoice['service_date']))
+                for invoice in invoices if (policy := chosen[invoice['id']])
+            }
+            rows = self.lock_accumulators(keys)
+            met = {
+                key: [
+                    max(rows[key]['deductible_met'] + deltas[key][0], ZERO),
+                    max(rows[key]['out_of_pocket_met'] + deltas[key][1], ZERO),
+                ]
+                for key in keys
+            }
+
+            changed = defaultdict(list)
+            for invoice in invoices:
+                # Line items carry the charges; tax and discounts are spread over them
+                amounts = allocate(invoice['total_amount'], charges.get(invoice['id']) or [invoice['total_amount']])
+                policy = chosen[invoice['id']]
+                if policy is None:
+                    result = split_charges(amounts, None)
+                else:
+                    key = (policy['id'], plan_year(invoice['service_date']))
+                    result = split_charges(amounts, policy, *met[key])
+                    for index, applied in enumerate((result.deductible_applied, result.out_of_pocket_applied)):
+                        met[key][index] += applied
+                        deltas[key][index] += applied
+
+                split = (result.policy_id, result.insurer_total, result.patient_total,
+                         result.deductible_applied, result.out_of_pocket_applied)
+                if split == tuple(invoice[name] for name in SPLIT_FIELDS):
+                    continue
+                changed[split].append(invoice['id'])
+
+            # Splits repeat a lot (same fees, same plan), so one UPDATE per distinct split
+            for split, ids in changed.items():
+                Invoice.objects.filter(id__in=ids).update(**dict(zip(SPLIT_FIELDS, split)), updated_at=now)
+            if released:
+                Invoice.objects.filter(id__in=[invoice['id'] for invoice in released]).update(
+                    deductible_applied=ZERO, out_of_pocket_applied=ZERO, updated_at=now,
+                )
+            self.apply_deltas(deltas, rows)
+
+            # Bulk writes send no signals
+            pending_rollups.add(*(invoice_id for ids in changed.values() for invoice_id in ids))
+            invalidate_charts(*{invoice['patient_id'] for invoice in invoices + released})
+            stale = [accumulator_cache_key(*key) for key in keys]
+            transaction.on_commit(lambda: cache.delete_many(stale))
+
+        updated = sum(len(ids) for ids in changed.values()) + len(released)
+        logger.info(f"Adjudicated {len(invoices)} invoices, {updated} changed, against {len(keys)} accumulators")
+        return updated
+
+    @staticmethod
+    def invoice_rows(conditions: List[Q]) -> List[Dict]:
+        """Lock and read the invoices matching any of ``conditions``, in service order"""
+        rows = {}
+        for condition in conditions:
+            invoices = Invoice.objects.select_for_update().filter(condition).exclude(
+                status__in=UNADJUDICATED_STATUSES
+            ).values('id', 'patient_id', 'service_date', 'total_amount', *SPLIT_FIELDS)
+            rows.update((invoice['id'], invoice) for invoice in invoices)
+        return sorted(rows.values(), key=lambda invoice: (invoice['service_date'], invoice['id']))
+
+    @staticmethod
+    def released_rows(invoice_ids: List[int]) -> List[Dict]:
+        """Lock and read cancelled or refunded invoices that still count toward an accumulator"""
+        return list(Invoice.objects.select_for_update().filter(
+            Q(deductible_applied__gt=0) | Q(out_of_pocket_applied__gt=0),
+            id__in=invoice_ids,
+            status__in=UNADJUDICATED_STATUSES,
+            insurance__isnull=False,
+        ).order_by('service_date', 'id').values('id', 'patient_id', 'service_date', 'total_amount', *SPLIT_FIELDS))
+
+    def later_invoices(self, invoices: List[Dict], chosen: Dict[int, Optional[Dict]]) -> List[Dict]:
+        """Adjudicated invoices that follow the batch on any policy and plan year it touches"""
+        earliest = {}
+        for invoice in invoices:
+            policy = chosen[invoice['id']]
+            for insurance_id in {invoice['insurance_id'], policy and policy['id']} - {None}:
+                key = (insurance_id, plan_year(invoice['service_date']))
+                earliest[key] = min(earliest.get(key, invoice['service_date']), invoice['service_date'])
+
+        # Kept to a few hundred terms per query, well inside SQL expression limits
+        terms = [
+            Q(insurance_id=insurance_id, service_date__year=year, service_date__gte=first)
+            for (insurance_id, year), first in earliest.items()
+        ]
+        conditions = [reduce(operator.or_, terms[start:start + 200]) for start in range(0, len(terms), 200)]
+        batch = {invoice['id'] for invoice in invoices}
+        return [invoice for invoice in self.invoice_rows(conditions) if invoice['id'] not in batch]
+
+    def rebuild_accumulators(self, year: Optional[int] = None) -> int:
+        """Recompute accumulators from what adjudicated invoices applied, e.g. after a manual correction"""
+        invoices = Invoice.objects.filter(insurance__isnull=False).exclude(status__in=UNADJUDICATED_STATUSES)
+        accumulators = CoverageAccumulator.objects.all()
+        if year is not None:
+            invoices = invoices.filter(service_date__year=year)
+            accumulators = accumulators.filter(plan_year=year)
+
+        totals = invoices.annotate(year=ExtractYear('service_date')).order_by().values(
+            'insurance_id', 'year'
+        ).annotate(deductible_met=Sum('deductible_applied'), out_of_pocket_met=Sum('out_of_pocket_applied'))
+
+        rows = [
+            CoverageAccumulator(
+                insurance_id=row['insurance_id'],
+                plan_year=row['year'],
+                deductible_met=row['deductible_met'],
+                out_of_pocket_met=row['out_of_pocket_met'],
+            )
+            for row in totals
+        ]
+        with transaction.atomic():
+            stale = {accumulator_cache_key(*key) for key in accumulators.values_list('insurance_id', 'plan_year')}
+            stale.update(accumulator_cache_key(row.insurance_id, row.plan_year) for row in rows)
+            accumulators.delete()
+            CoverageAccumulator.objects.bulk_create(rows, batch_size=2000)
+            transaction.on_commit(lambda: cache.delete_many(list(stale)))
+        return len(rows)
+
+
+def _adjudicate_pending(invoice_ids):
+    CoverageEngine().adjudicate(sorted(invoice_ids))
+
+
+# New, recalculated, cancelled and refunded invoices, adjudicated together after commit
+pending_adjudications = OnCommitBatch(_adjudicate_pending)
@@ -0,0 +1,142 @@
+# BE/finance/services/invoicing.py
+import logging
+from decimal import Decimal
+from typing import Iterable, List
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import (
+    DecimalField, Exists, ExpressionWrapper, F, OuterRef, Q, Subquery, Sum, Value
+)
+from django.db.models.functions import Coalesce, Greatest, Round
+
+from records.services.chart import pending_chart_invalidations
+from shared.utils.transactions import OnCommitBatch
+from ..models import Insurance, Invoice, InvoiceItem
+from .aging import pending_rollups
+
+logger = logging.getLogger(__name__)
+
+MONEY = DecimalField(max_digits=12, decimal_places=2)
+
+
+def get_finance_config():
+    return getattr(settings, 'FINANCE_CONFIG', {})
+
+
+def money(expression):
+    return ExpressionWrapper(expression, output_field=MONEY)
+
+
+class InvoiceCalculator:
+    """
+    Derives invoice totals from line items with set-based UPDATEs.
+
+    Per chunk of invoices: subtotal from an aggregate subquery over items; tax
+    and total; then the insurance split (the patient's primary policy active on
+    the service date) and the stored balance. A handful of statements per chunk,
+    however many invoices it holds. An invoice whose last item was removed drops
+    to zero; the full walk only visits invoices with items, so manually entered
+    amounts are left alone. Invoices of patients with an active policy are then
+    queued for the coverage engine, which also applies copays and deductibles.
+    """
+
+    def __init__(self, tax_rate=None, batch_size=None):
+        config = get_finance_config()
+        self.tax_rate = Decimal(str(tax_rate if tax_rate is not None else config.get('TAX_RATE', '0')))
+        self.batch_size = batch_size or config.get('RECALC_BATCH_SIZE', 5000)
+
+    # Expressions
+
+    @staticmethod
+    def items_subtotal():
+        return Coalesce(
+            Subquery(
+                InvoiceItem.objects.filter(invoice=OuterRef('pk')).order_by()
+                .values('invoice').annotate(total=Sum('total_price')).values('total')
+            ),
+            Value(Decimal('0')),
+            output_field=MONEY,
+        )
+
+    @staticmethod
+    def coverage_percentage():
+        policy = Insurance.objects.filter(
+            Q(expiration_date__isnull=True) | Q(expiration_date__gte=OuterRef('service_date')),
+            patient=OuterRef('patient'),
+            is_primary=True,
+            is_active=True,
+            effective_date__lte=OuterRef('service_date'),
+        ).order_by('-effective_date').values('coverage_percentage')[:1]
+        return Coalesce(Subquery(policy), Value(Decimal('0')), output_field=MONEY)
+
+    def totals(self):
+        taxable = money(Greatest(F('subtotal') - F('discount_amount'), Value(Decimal('0'))))
+        tax = money(Round(taxable * Value(self.tax_rate), 2))
+        return {'tax_amount': tax, 'total_amount': money(taxable + tax)}
+
+    def insurance_split(self):
+        claim = money(Round(F('total_amount') * self.coverage_percentage() / Value(Decimal('100')), 2))
+        return {
+            'insurance_claim_amount': claim,
+            'patient_responsibility': money(F('total_amount') - claim),
+            'balance_due': money(Invoice.balance_expression()),
+        }
+
+    # Recalculation
+
+    def recalculate(self, invoice_ids: Iterable[int]) -> int:
+        """Recalculate the given invoices from their line items, if any, in chunks"""
+        invoice_ids = list(invoice_ids)
+        updated = 0
+        for start in range(0, len(invoice_ids), self.batch_size):
+            updated += self.recalculate_chunk(invoice_ids[start:start + self.batch_size])
+        return updated
+
+    def recalculate_chunk(self, invoice_ids: List[int]) -> int:
+        invoices = Invoice.objects.filter(id__in=invoice_ids)
+        with transaction.atomic():
+            updated = invoices.update(subtotal=self.items_subtotal())
+            if updated:
+                invoices.update(**self.totals())
+                # Adjudicated invoices get their split from the coverage engine instead
+                invoices.filter(insurance__isnull=True).update(**self.insurance_split())
+                insured = list(invoices.filter(
+                    Q(insurance__isnull=False)
+                    | Exists(Insurance.objects.filter(patient=OuterRef('patient'), is_active=True))
+                ).values_list('id', flat=True))
+                if insured:
+                    from .coverage import pending_adjudications
+
+                    Invoice.objects.filter(id__in=insured, insurance__isnull=False).refresh_balances()
+                    pending_adjudications.add(*insured)
+                # Queryset updates send no signals, so queue the rollup refresh here
+                pending_rollups.add(*invoice_ids)
+                pending_chart_invalidations.add(*(('INVOICE', invoice_id) for invoice_id in invoice_ids))
+        return updated
+
+    def recalculate_all(self, queryset=None) -> int:
+        """Walk every invoice with items (or those in ``queryset``) by id, one chunk at a time"""
+        queryset = (queryset if queryset is not None else Invoice.objects.all()).filter(
+            Exists(InvoiceItem.objects.filter(invoice=OuterRef('pk')))
+        ).order_by('id')
+        last_id = 0
+        updated = 0
+        while True:
+            ids = list(queryset.filter(id__gt=last_id).values_list('id', flat=True)[:self.batch_size])
+            if not ids:
+                return updated
+            updated += self.recalculate_chunk(ids)
+            last_id = ids[-1]
+
+
+def _recalculate_pending(invoice_ids):
+    InvoiceCalculator().recalculate(sorted(invoice_ids))
+
+
+# Several item changes in one transaction share a single recalculation on commit
+pending_recalculations = OnCommitBatch(_recalculate_pending)
+
+
+def schedule_recalculation(invoice_id):
+    pending_recalculations.add(invoice_id)
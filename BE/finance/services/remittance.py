@@ -0,0 +1,248 @@
+# BE/finance/services/remittance.py
+import csv
+import hashlib
+import logging
+from dataclasses import dataclass, field
+from decimal import Decimal, InvalidOperation
+from itertools import islice
+from typing import BinaryIO, Dict, Iterable, Iterator, List, TextIO, Tuple
+
+from django.db import transaction
+from django.db.models import Case, F, OuterRef, Q, Subquery, Sum, Value, When
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from records.services.chart import invalidate_charts
+from ..models import Invoice, Payment
+from .aging import pending_rollups
+from .invoicing import MONEY, get_finance_config, money
+
+logger = logging.getLogger(__name__)
+
+PAYMENT_METHODS = {choice for choice, _ in Payment.PAYMENT_METHOD_CHOICES}
+PAYMENT_ID_LENGTH = Payment._meta.get_field('payment_id').max_length
+# Room left in a payment id for the line number
+LINE_NUMBER_DIGITS = 10
+# Invoices a remittance can still be posted against
+POSTABLE_STATUSES = ['SENT', 'PARTIAL', 'OVERDUE', 'PAID']
+
+
+@dataclass
+class RemittanceLine:
+    line_number: int
+    invoice_number: str
+    claim_number: str
+    amount: Decimal
+    payment_method: str
+    reference_number: str
+    transaction_id: str
+
+
+@dataclass
+class ImportResult:
+    lines: int = 0
+    posted: int = 0
+    duplicates: int = 0
+    amount_posted: Decimal = Decimal('0')
+    rejected: List[Tuple[int, str]] = field(default_factory=list)
+
+    MAX_REJECTIONS_KEPT = 1000
+
+    def reject(self, line_number, reason):
+        if len(self.rejected) < self.MAX_REJECTIONS_KEPT:
+            self.rejected.append((line_number, reason))
+
+    @property
+    def rejected_count(self):
+        return self.lines - self.posted - self.duplicates
+
+
+class RemittanceImporter:
+    """
+    Streams a remittance CSV and posts it as Payment rows in chunks.
+
+    Each chunk runs in one transaction: one locking query builds the invoice
+    lookup by invoice and claim number, one query finds lines already posted
+    (payment ids derive from the batch reference and line number, so a re-run
+    skips them), then a bulk_create of payments and three set-based UPDATEs
+    that add the chunk's payments to their invoices and settle status.
+
+    Expected columns: invoice_number and/or claim_number, amount, and optionally
+    payment_method (default INSURANCE), reference_number, transaction_id.
+    """
+
+    def __init__(self, batch_reference, chunk_size=None, processed_by=None):
+        self.batch_reference = batch_reference
+        self.chunk_size = chunk_size or get_finance_config().get('REMITTANCE_CHUNK_SIZE', 5000)
+        self.processed_by = processed_by
+        self.payment_id_prefix = f'RMT-{self.payment_reference(batch_reference)}-'
+
+    def import_file(self, stream: TextIO, dry_run=False) -> ImportResult:
+        result = ImportResult()
+        lines = self.parse(stream, result)
+        while True:
+            chunk = list(islice(lines, self.chunk_size))
+            if not chunk:
+                break
+            self.post_chunk(chunk, result, dry_run=dry_run)
+        return result
+
+    # Parsing
+
+    def parse(self, stream: TextIO, result: ImportResult) -> Iterator[RemittanceLine]:
+        reader = csv.DictReader(stream)
+        missing = {'amount'} - set(reader.fieldnames or [])
+        if missing or not {'invoice_number', 'claim_number'} & set(reader.fieldnames or []):
+            raise ValueError('Remittance file needs an amount column and invoice_number or claim_number')
+
+        # Line 1 is the header
+        for line_number, row in enumerate(reader, start=2):
+            result.lines += 1
+            try:
+                amount = Decimal((row.get('amount') or '').strip())
+            except InvalidOperation:
+                result.reject(line_number, f"Invalid amount {row.get('amount')!r}")
+                continue
+            if amount <= 0:
+                result.reject(line_number, 'Amount must be positive')
+                continue
+
+            method = (row.get('payment_method') or 'INSURANCE').strip().upper()
+            if method not in PAYMENT_METHODS:
+                result.reject(line_number, f'Unknown payment method {method}')
+                continue
+
+            invoice_number = (row.get('invoice_number') or '').strip()
+            claim_number = (row.get('claim_number') or '').strip()
+            if not invoice_number and not claim_number:
+                result.reject(line_number, 'No invoice or claim number')
+                continue
+
+            yield RemittanceLine(
+                line_number=line_number,
+                invoice_number=invoice_number,
+                claim_number=claim_number,
+                amount=amount.quantize(Decimal('0.01')),
+                payment_method=method,
+                reference_number=(row.get('reference_number') or '').strip()[:100],
+                transaction_id=(row.get('transaction_id') or '').strip()[:200],
+            )
+
+    @staticmethod
+    def content_reference(stream: BinaryIO) -> str:
+        """
+        A batch reference derived from the file's bytes. Payers reuse file names
+        (era.csv), so the name can't tell two batches apart; the same file
+        re-imported keeps its reference and skips what was already posted.
+        """
+        digest = hashlib.sha1()
+        for block in iter(lambda: stream.read(1 << 16), b''):
+            digest.update(block)
+        return f'sha1-{digest.hexdigest()[:16]}'
+
+    # Posting
+
+    @staticmethod
+    def payment_reference(batch_reference) -> str:
+        """The batch reference, shortened with a hash of it if payment ids would be too long"""
+        room = PAYMENT_ID_LENGTH - len('RMT--') - LINE_NUMBER_DIGITS
+        if len(batch_reference) <= room:
+            return batch_reference
+        digest = hashlib.sha1(batch_reference.encode('utf-8')).hexdigest()[:8]
+        return f'{batch_reference[:room - len(digest) - 1]}~{digest}'
+
+    def payment_id(self, line: RemittanceLine) -> str:
+        return f'{self.payment_id_prefix}{line.line_number}'
+
+    def post_chunk(self, chunk: List[RemittanceLine], result: ImportResult, dry_run=False):
+        now = timezone.now()
+        with transaction.atomic():
+            by_number, by_claim = self.lookup(chunk)
+            posted_ids = set(Payment.objects.filter(
+                payment_id__in=[self.payment_id(line) for line in chunk]
+            ).values_list('payment_id', flat=True))
+
+            payments = []
+            for line in chunk:
+                payment_id = self.payment_id(line)
+                if payment_id in posted_ids:
+                    result.duplicates += 1
+                    continue
+
+                invoice = by_number.get(line.invoice_number) or by_claim.get(line.claim_number)
+                if invoice is None:
+                    result.reject(line.line_number, 'No matching invoice')
+                    continue
+
+                payments.append(Payment(
+                    payment_id=payment_id,
+                    invoice_id=invoice['id'],
+                    patient_id=invoice['patient_id'],
+                    amount=line.amount,
+                    payment_method=line.payment_method,
+                    payment_status='COMPLETED',
+                    transaction_id=line.transaction_id,
+                    reference_number=line.reference_number,
+                    insurance_id=invoice['insurance_id'] if line.payment_method == 'INSURANCE' else None,
+                    claim_number=line.claim_number or invoice['claim_number'],
+                    processed_by=self.processed_by,
+                    processed_date=now,
+                    notes=f'Remittance {self.batch_reference}',
+                ))
+                result.posted += 1
+                result.amount_posted += line.amount
+
+            if dry_run or not payments:
+                transaction.set_rollback(dry_run)
+                return
+
+            Payment.objects.bulk_create(payments, batch_size=2000)
+            invoice_ids = {payment.invoice_id for payment in payments}
+            self.apply_payments(invoice_ids, [payment.payment_id for payment in payments], now)
+            # Bulk writes send no signals
+            pending_rollups.add(*invoice_ids)
+            invalidate_charts(*{payment.patient_id for payment in payments})
+
+        logger.info(f"Remittance {self.batch_reference}: posted {len(payments)} payments to {len(invoice_ids)} invoices")
+
+    def lookup(self, chunk: Iterable[RemittanceLine]) -> Tuple[Dict[str, Dict], Dict[str, Dict]]:
+        """Lock and index the chunk's invoices by invoice number and claim number in one query"""
+        numbers = {line.invoice_number for line in chunk if line.invoice_number}
+        claims = {line.claim_number for line in chunk if line.claim_number}
+        invoices = Invoice.objects.select_for_update().filter(
+            Q(invoice_number__in=numbers) | Q(claim_number__in=claims),
+            status__in=POSTABLE_STATUSES,
+        ).values('id', 'invoice_number', 'claim_number', 'patient_id', 'insurance_id')
+
+        by_number, by_claim = {}, {}
+        for invoice in invoices:
+            by_number[invoice['invoice_number']] = invoice
+            if invoice['claim_number']:
+                by_claim[invoice['claim_number']] = invoice
+        return by_number, by_claim
+
+    def apply_payments(self, invoice_ids, payment_ids, now):
+        """Add the payments just inserted for this chunk to their invoices and settle status"""
+        def chunk_total(insurance):
+            payments = Payment.objects.filter(invoice=OuterRef('pk'), payment_id__in=payment_ids)
+            payments = payments.filter(payment_method='INSURANCE') if insurance else payments.exclude(
+                payment_method='INSURANCE'
+            )
+            total = payments.order_by().values('invoice').annotate(total=Sum('amount')).values('total')
+            return Coalesce(Subquery(total), Value(Decimal('0')), output_field=MONEY)
+
+        invoices = Invoice.objects.filter(id__in=invoice_ids)
+        invoices.update(
+            paid_amount=money(F('paid_amount') + chunk_total(insurance=False)),
+            insurance_paid_amount=money(F('insurance_paid_amount') + chunk_total(insurance=True)),
+            updated_at=now,
+        )
+        invoices.refresh_balances()
+        settled = Q(balance_due__lte=0)
+        invoices.update(
+            status=Case(When(settled, then=Value('PAID')), default=Value('PARTIAL')),
+            paid_date=Case(
+                When(settled & Q(paid_date__isnull=True), then=Value(timezone.localdate(now))),
+                default=F('paid_date'),
+            ),
+        )
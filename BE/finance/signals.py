@@ -0,0 +1,42 @@
+# BE/finance/signals.py
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from .models import Insurance, Invoice, InvoiceItem, Payment
+from .services.aging import pending_rollups
+from .services.coverage import UNADJUDICATED_STATUSES, invalidate_policies, pending_adjudications
+from .services.invoicing import schedule_recalculation
+
+
+@receiver(post_save, sender=InvoiceItem)
+@receiver(post_delete, sender=InvoiceItem)
+def recalculate_invoice_totals(sender, instance, **kwargs):
+    schedule_recalculation(instance.invoice_id)
+
+
+@receiver(post_save, sender=Invoice)
+@receiver(post_delete, sender=Invoice)
+def refresh_invoice_rollups(sender, instance, **kwargs):
+    pending_rollups.add(instance.id)
+
+
+@receiver(post_save, sender=Invoice)
+def adjudicate_invoice(sender, instance, created, **kwargs):
+    # New invoices get their split; cancelled or refunded ones give back what they applied
+    released = instance.status in UNADJUDICATED_STATUSES and (
+        instance.deductible_applied or instance.out_of_pocket_applied
+    )
+    if created or released:
+        pending_adjudications.add(instance.id)
+
+
+@receiver(post_save, sender=Payment)
+@receiver(post_delete, sender=Payment)
+def refresh_payment_rollups(sender, instance, **kwargs):
+    pending_rollups.add(instance.invoice_id)
+
+
+@receiver(post_save, sender=Insurance)
+@receiver(post_delete, sender=Insurance)
+def invalidate_cached_policies(sender, instance, **kwargs):
+    invalidate_policies(instance.patient_id)
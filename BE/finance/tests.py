@@ -0,0 +1,318 @@
+import os
+from datetime import date, timedelta
+from decimal import Decimal
+from io import StringIO
+from tempfile import TemporaryDirectory
+from unittest import mock
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from shared.factories import make_patient
+from shared.models import User
+from .models import CoverageAccumulator, Insurance, Invoice, InvoiceItem, Payment, ReceivableRollup
+from .services.aging import ReceivablesService
+from .services.coverage import CoverageEngine, split_charges
+from .services.invoicing import InvoiceCalculator
+from .services.remittance import RemittanceImporter
+
+
+def make_invoice(patient, amount='0.00', **kwargs):
+    kwargs.setdefault('service_date', date(2030, 3, 1))
+    kwargs.setdefault('due_date', kwargs['service_date'] + timedelta(days=30))
+    return Invoice.objects.create(
+        patient=patient, invoice_type='CONSULTATION', description='Visit', subtotal=Decimal(amount),
+        total_amount=Decimal(amount), **kwargs,
+    )
+
+
+def make_policy(patient, number='POL-1', **kwargs):
+    kwargs.setdefault('effective_date', date(2030, 1, 1))
+    return Insurance.objects.create(
+        company_name='Acme Health', policy_number=number, patient=patient, insurance_type='HEALTH',
+        coverage_type='INDIVIDUAL', subscriber_name='Pat', subscriber_id='S1', relationship_to_patient='Self',
+        contact_phone='555-0100', **kwargs,
+    )
+
+
+class InvoiceCalculatorTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.patient = make_patient()
+        self.invoice = make_invoice(self.patient, discount_amount=Decimal('50.00'))
+
+    def add_items(self, invoice, *prices):
+        with self.captureOnCommitCallbacks(execute=True):
+            return [
+                InvoiceItem.objects.create(invoice=invoice, description=f'Item {n}', quantity=2, unit_price=price)
+                for n, price in enumerate(prices)
+            ]
+
+    def test_item_changes_recalculate_totals_and_balance(self):
+        self.add_items(self.invoice, Decimal('100.00'), Decimal('225.00'))
+        self.invoice.refresh_from_db()
+        self.assertEqual(self.invoice.subtotal, Decimal('650.00'))
+        self.assertEqual(self.invoice.total_amount, Decimal('600.00'))
+        self.assertEqual(self.invoice.balance_due, Decimal('600.00'))
+        self.assertEqual(self.invoice.patient_responsibility, Decimal('600.00'))
+
+    def test_deleting_the_last_item_zeroes_the_invoice(self):
+        items = self.add_items(self.invoice, Decimal('100.00'), Decimal('225.00'))
+        with self.captureOnCommitCallbacks(execute=True):
+            for item in items:
+                item.delete()
+        self.invoice.refresh_from_db()
+        self.assertEqual((self.invoice.subtotal, self.invoice.total_amount, self.invoice.balance_due),
+                         (Decimal('0.00'), Decimal('0.00'), Decimal('0.00')))
+
+    def test_tax_and_primary_policy_split(self):
+        make_policy(self.patient, coverage_percentage=Decimal('80.00'))
+        make_policy(self.patient, number='POL-OLD', coverage_percentage=Decimal('50.00'),
+                    expiration_date=date(2030, 2, 1))
+        self.add_items(self.invoice, Decimal('100.00'))
+        with self.captureOnCommitCallbacks(execute=True):
+            InvoiceCalculator(tax_rate='0.10').recalculate([self.invoice.id])
+        self.invoice.refresh_from_db()
+        self.assertEqual((self.invoice.tax_amount, self.invoice.total_amount), (Decimal('15.00'), Decimal('165.00')))
+        self.assertEqual(self.invoice.insurance_claim_amount, Decimal('132.00'))
+        self.assertEqual(self.invoice.patient_responsibility, Decimal('33.00'))
+
+    def test_full_walk_leaves_invoices_without_items_alone(self):
+        manual = make_invoice(self.patient, amount='75.00')
+        self.add_items(self.invoice, Decimal('10.00'))
+        self.assertEqual(InvoiceCalculator(batch_size=1).recalculate_all(), 1)
+        manual.refresh_from_db()
+        self.assertEqual(manual.total_amount, Decimal('75.00'))
+
+
+class ReceivablesAgingTests(TestCase):
+    as_of = date(2030, 6, 1)
+
+    def setUp(self):
+        cache.clear()
+        self.patient, self.other = make_patient(), make_patient('other')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.current = make_invoice(self.patient, '100.00', status='SENT', due_date=date(2030, 6, 10))
+            make_invoice(self.patient, '40.00', status='SENT', due_date=date(2030, 5, 20))
+            make_invoice(self.other, '300.00', status='OVERDUE', due_date=date(2030, 1, 1))
+            make_invoice(self.other, '999.00', status='DRAFT', due_date=date(2030, 1, 1))
+        self.admin = User.objects.create_user('admin', 'admin@example.com', 'pw', is_staff=True)
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def aging(self, **params):
+        return self.client.get('/api/finance/receivables/aging/', {'as_of': self.as_of.isoformat(), **params})
+
+    def test_open_balances_are_bucketed_by_days_past_due(self):
+        rows = {row['key']: row for row in ReceivablesService().aging('PATIENT', self.as_of)}
+        mine, theirs = rows[str(self.patient.id)], rows[str(self.other.id)]
+        self.assertEqual((mine['current'], mine['days_0_30'], mine['total']),
+                         (Decimal('100.00'), Decimal('40.00'), Decimal('140.00')))
+        self.assertEqual((theirs['days_90_plus'], theirs['invoice_count']), (Decimal('300.00'), 1))
+
+    def test_rollups_follow_invoice_changes_and_match_a_rebuild(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.current.paid_amount = Decimal('100.00')
+            self.current.status = 'PAID'
+            self.current.save()
+        self.assertEqual(ReceivablesService().totals('PATIENT', self.as_of)['total'], Decimal('340.00'))
+        before = set(self.rollups())
+        ReceivablesService().rebuild()
+        self.assertEqual(set(self.rollups()), before)
+
+    def rollups(self):
+        return ReceivableRollup.objects.filter(invoice_count__gt=0).values_list(
+            'dimension', 'key', 'due_date', 'invoice_count', 'balance'
+        )
+
+    def test_changes_move_the_rollups_by_the_invoice_delta(self):
+        mine = ReceivableRollup.objects.filter(dimension='PATIENT', key=str(self.patient.id))
+        # Drift on a row the change doesn't touch survives, so nothing was re-summed
+        mine.filter(due_date=date(2030, 5, 20)).update(balance=Decimal('41.00'))
+        with self.captureOnCommitCallbacks(execute=True):
+            self.current.patient = self.other
+            self.current.due_date = date(2030, 6, 1)
+            self.current.save()
+        self.assertEqual(dict(mine.filter(invoice_count__gt=0).values_list('due_date', 'balance')),
+                         {date(2030, 5, 20): Decimal('41.00')})
+        theirs = ReceivableRollup.objects.get(dimension='PATIENT', key=str(self.other.id), due_date=date(2030, 6, 1))
+        self.assertEqual((theirs.invoice_count, theirs.balance), (1, Decimal('100.00')))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.current.delete()
+        self.assertEqual(ReceivablesService().totals('PATIENT', self.as_of)['total'], Decimal('341.00'))
+        ReceivablesService().rebuild()
+        self.assertEqual(ReceivablesService().totals('PATIENT', self.as_of)['total'], Decimal('340.00'))
+
+    def test_view_limits_rows_largest_first(self):
+        response = self.aging(limit=1)
+        self.assertEqual([row['key'] for row in response.data['results']], [str(self.other.id)])
+        self.assertEqual(response.data['totals']['total'], Decimal('440.00'))
+
+    def test_invalid_parameters_are_rejected(self):
+        for params in ({'limit': 0}, {'limit': -5}, {'limit': 'ten'}, {'as_of': '2030-13-01'},
+                       {'dimension': 'ward'}):
+            self.assertEqual(self.aging(**params).status_code, 400, params)
+
+    def test_admin_only(self):
+        client = APIClient()
+        client.force_authenticate(self.patient.user)
+        self.assertEqual(client.get('/api/finance/receivables/aging/').status_code, 403)
+
+
+class RemittanceImportTests(TestCase):
+    CSV = (
+        'invoice_number,claim_number,amount,payment_method,reference_number\n'
+        'INV-A,,60.00,,EOB-1\n'
+        ',CLM-B,200.00,INSURANCE,EOB-2\n'
+        'INV-A,,40.00,CASH,\n'
+        'INV-MISSING,,10.00,,\n'
+        'INV-A,,ten,,\n'
+        'INV-A,,-5,,\n'
+    )
+
+    def setUp(self):
+        cache.clear()
+        patient = make_patient()
+        self.a = make_invoice(patient, '100.00', invoice_number='INV-A', status='SENT')
+        self.b = make_invoice(patient, '500.00', invoice_number='INV-B', claim_number='CLM-B', status='SENT')
+
+    def run_import(self, reference='ERA-2030-03', csv=None, **kwargs):
+        with self.captureOnCommitCallbacks(execute=True):
+            return RemittanceImporter(reference, chunk_size=2).import_file(StringIO(csv or self.CSV), **kwargs)
+
+    def test_lines_are_posted_and_invoices_settled(self):
+        result = self.run_import()
+        self.assertEqual((result.lines, result.posted, result.rejected_count), (6, 3, 3))
+        self.assertEqual(result.amount_posted, Decimal('300.00'))
+        self.assertEqual([line for line, _ in result.rejected], [5, 6, 7])
+
+        self.a.refresh_from_db()
+        self.assertEqual((self.a.insurance_paid_amount, self.a.paid_amount), (Decimal('60.00'), Decimal('40.00')))
+        self.assertEqual((self.a.balance_due, self.a.status), (Decimal('0.00'), 'PAID'))
+        self.assertIsNotNone(self.a.paid_date)
+        self.b.refresh_from_db()
+        self.assertEqual((self.b.balance_due, self.b.status), (Decimal('300.00'), 'PARTIAL'))
+
+    def test_reimporting_a_batch_skips_posted_lines(self):
+        self.run_import()
+        result = self.run_import()
+        self.assertEqual((result.posted, result.duplicates), (0, 3))
+        self.a.refresh_from_db()
+        self.assertEqual(self.a.balance_due, Decimal('0.00'))
+
+    def test_dry_run_posts_nothing(self):
+        result = self.run_import(dry_run=True)
+        self.assertEqual(result.posted, 3)
+        self.assertFalse(Payment.objects.exists())
+
+    def test_only_the_inserted_payments_are_applied(self):
+        # Same batch note and timestamp as the import, but not one of its lines
+        now = timezone.now()
+        Payment.objects.create(invoice=self.b, patient=self.b.patient, amount=Decimal('25.00'),
+                               payment_method='INSURANCE', processed_date=now, notes='Remittance ERA-2030-03')
+        with mock.patch('django.utils.timezone.now', return_value=now):
+            self.run_import(csv='claim_number,amount\nCLM-B,100.00\n')
+        self.b.refresh_from_db()
+        self.assertEqual(self.b.insurance_paid_amount, Decimal('100.00'))
+
+    def test_long_batch_references_still_fit_the_payment_id(self):
+        reference = 'remittance-advice-acme-health-insurance-2030-03-weekly'
+        self.run_import(reference)
+        self.run_import(reference + '-resend')
+        payment_ids = list(Payment.objects.values_list('payment_id', flat=True))
+        self.assertEqual(len(payment_ids), 6)
+        self.assertTrue(all(len(payment_id) <= 50 for payment_id in payment_ids))
+        self.assertEqual(RemittanceImporter(reference).payment_id_prefix,
+                         RemittanceImporter(reference).payment_id_prefix)
+
+    def test_command_tells_same_named_files_apart_by_content(self):
+        def import_file(directory, csv):
+            path = os.path.join(directory, 'era.csv')
+            with open(path, 'w', encoding='utf-8') as stream:
+                stream.write(csv)
+            with self.captureOnCommitCallbacks(execute=True):
+                call_command('import_remittance', path, stdout=StringIO())
+
+        with TemporaryDirectory() as first, TemporaryDirectory() as second:
+            import_file(first, 'invoice_number,amount\nINV-A,60.00\n')
+            import_file(second, 'invoice_number,amount\nINV-A,40.00\n')
+            import_file(first, 'invoice_number,amount\nINV-A,60.00\n')
+        self.assertEqual(sorted(Payment.objects.values_list('amount', flat=True)),
+                         [Decimal('40.00'), Decimal('60.00')])
+
+
+class CoverageAdjudicationTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.patient = make_patient()
+        self.policy = make_policy(self.patient, copay_amount=Decimal('20.00'), deductible_amount=Decimal('500.00'),
+                                  out_of_pocket_max=Decimal('1000.00'), coverage_percentage=Decimal('80.00'))
+
+    def bill(self, service_date, *prices):
+        with self.captureOnCommitCallbacks(execute=True):
+            invoice = make_invoice(self.patient, service_date=service_date, status='SENT')
+            for price in prices:
+                InvoiceItem.objects.create(invoice=invoice, description='Service', unit_price=Decimal(price))
+        invoice.refresh_from_db()
+        return invoice
+
+    def split(self, invoice):
+        invoice.refresh_from_db()
+        return (invoice.insurance_id, invoice.insurance_claim_amount, invoice.patient_responsibility,
+                invoice.deductible_applied, invoice.out_of_pocket_applied)
+
+    def accumulator(self):
+        row = CoverageAccumulator.objects.get(insurance=self.policy, plan_year=2030)
+        return row.deductible_met, row.out_of_pocket_met
+
+    def test_new_invoices_are_adjudicated_copay_deductible_then_coinsurance(self):
+        invoice = self.bill(date(2030, 3, 1), '300.00', '400.00')
+        # 20 copay + 480 deductible, then 20% of the remaining 200
+        self.assertEqual(self.split(invoice), (self.policy.id, Decimal('144.00'), Decimal('556.00'),
+                                               Decimal('500.00'), Decimal('556.00')))
+        later = self.bill(date(2030, 4, 1), '1000.00')
+        self.assertEqual(self.split(later)[1:3], (Decimal('784.00'), Decimal('216.00')))
+        self.assertEqual(self.accumulator(), (Decimal('500.00'), Decimal('772.00')))
+
+    def test_cancelling_gives_back_what_the_invoice_applied(self):
+        first = self.bill(date(2030, 3, 1), '300.00', '400.00')
+        later = self.bill(date(2030, 4, 1), '1000.00')
+        with self.captureOnCommitCallbacks(execute=True):
+            first.status = 'CANCELLED'
+            first.save()
+        self.assertEqual(self.split(first)[3:], (Decimal('0.00'), Decimal('0.00')))
+        # The later visit now meets the deductible itself
+        self.assertEqual(self.split(later)[1:], (Decimal('384.00'), Decimal('616.00'), Decimal('500.00'),
+                                                 Decimal('616.00')))
+        self.assertEqual(self.accumulator(), (Decimal('500.00'), Decimal('616.00')))
+
+    def test_accumulators_match_a_rebuild_after_item_changes(self):
+        first = self.bill(date(2030, 3, 1), '300.00')
+        self.bill(date(2030, 2, 1), '150.00')
+        with self.captureOnCommitCallbacks(execute=True):
+            InvoiceItem.objects.create(invoice=first, description='Extra', unit_price=Decimal('900.00'))
+        incremental = self.accumulator()
+        CoverageEngine().rebuild_accumulators()
+        self.assertEqual(self.accumulator(), incremental)
+        self.assertEqual(incremental[0], Decimal('500.00'))
+
+    def test_out_of_pocket_maximum_caps_the_patient_share(self):
+        policy = {'id': 1, 'copay_amount': Decimal('20'), 'deductible_amount': Decimal('0'),
+                  'out_of_pocket_max': Decimal('1000'), 'coverage_percentage': Decimal('50')}
+        result = split_charges([Decimal('1000')], policy, out_of_pocket_met=Decimal('900'))
+        self.assertEqual((result.patient_total, result.insurer_total), (Decimal('100'), Decimal('900')))
+        self.assertEqual(split_charges([Decimal('80')], None).patient_total, Decimal('80'))
+
+    def test_patients_can_estimate_their_own_share(self):
+        client = APIClient()
+        client.force_authenticate(self.patient.user)
+        response = client.post('/api/finance/coverage/estimate/',
+                               {'amounts': ['100.00'], 'service_date': '2030-05-01'}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((response.data['patient_total'], response.data['insurer_total']),
+                         (Decimal('100.00'), Decimal('0.00')))
+        self.assertFalse(CoverageAccumulator.objects.filter(deductible_met__gt=0).exists())
@@ -0,0 +1,10 @@
+from django.urls import path
+from . import views
+
+urlpatterns = [
+    # Accounts receivable
+    path('receivables/aging/', views.ReceivablesAgingView.as_view(), name='receivables-aging'),
+
+    # Insurance coverage
+    path('coverage/estimate/', views.CoverageEstimateView.as_view(), name='coverage-estimate'),
+]
@@ -0,0 +1,73 @@
+# BE/finance/views.py
+from datetime import datetime
+
+from rest_framework import permissions, status
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from .serializers import CoverageEstimateSerializer
+from .services.aging import AGING_BUCKETS, DIMENSION_FIELDS, ReceivablesService
+from .services.coverage import CoverageEngine
+
+
+class ReceivablesAgingView(APIView):
+    """
+    Aged open balances per patient, doctor or insurer, served from the rollup table.
+    Query params: dimension (patient/doctor/insurer), as_of=YYYY-MM-DD, limit, key (repeatable).
+    """
+    permission_classes = [permissions.IsAdminUser]
+    MAX_LIMIT = 500
+
+    def get(self, request):
+        dimension = request.query_params.get('dimension', 'patient').upper()
+        if dimension not in DIMENSION_FIELDS:
+            choices = ', '.join(choice.lower() for choice in DIMENSION_FIELDS)
+            return Response({"detail": f"dimension must be one of {choices}"},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            as_of = request.query_params.get('as_of')
+            as_of = datetime.strptime(as_of, '%Y-%m-%d').date() if as_of else None
+            limit = int(request.query_params.get('limit', 50))
+        except ValueError:
+            return Response({"detail": "Use as_of=YYYY-MM-DD and an integer limit"},
+                            status=status.HTTP_400_BAD_REQUEST)
+        if limit < 1:
+            return Response({"detail": "limit must be at least 1"}, status=status.HTTP_400_BAD_REQUEST)
+        limit = min(limit, self.MAX_LIMIT)
+
+        service = ReceivablesService()
+        keys = request.query_params.getlist('key') or None
+        return Response({
+            'dimension': dimension.lower(),
+            'as_of': (as_of or service.today()).isoformat(),
+            'buckets': [label for label, _, _ in AGING_BUCKETS],
+            'totals': service.totals(dimension, as_of),
+            'results': service.aging(dimension, as_of, keys=keys, limit=limit),
+        })
+
+
+class CoverageEstimateView(APIView):
+    """
+    Patient vs insurer share for a list of charges, e.g. while booking. Uses the
+    cached policy and year-to-date accumulators; nothing is recorded.
+    """
+
+    def post(self, request):
+        serializer = CoverageEstimateSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+
+        user = request.user
+        if user.is_staff or user.is_doctor:
+            patient_id = data.get('patient_id')
+            if patient_id is None:
+                return Response({"detail": "patient_id is required"}, status=status.HTTP_400_BAD_REQUEST)
+        elif hasattr(user, 'patient_profile'):
+            patient_id = user.patient_profile.id
+        else:
+            return Response({"detail": "Only patients, doctors and staff can request estimates"},
+                            status=status.HTTP_403_FORBIDDEN)
+
+        estimate = CoverageEngine().estimate(patient_id, data['amounts'], data.get('service_date'))
+        return Response(estimate.as_dict())
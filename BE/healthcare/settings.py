@@ -1,6 +1,7 @@
 # BE/healthcare/settings.py
 
 import os
+import sys
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -12,6 +13,8 @@ SECRET_KEY = 'django-insecure-your-secret-key-here'
 # SECURITY WARNING: don't run with debug turned on in production!
 DEBUG = True
 
+TESTING = len(sys.argv) > 1 and sys.argv[1] == 'test'
+
 ALLOWED_HOSTS = ['localhost', '127.0.0.1', '0.0.0.0', '*']
 
 # Application definition
@@ -39,6 +42,7 @@ INSTALLED_APPS = [
     'finance',
     'records',
     'notifications',
+    'audit',
 ]
 
 MIDDLEWARE = [
@@ -48,6 +52,7 @@ MIDDLEWARE = [
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'audit.middleware.AuditContextMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -95,6 +100,28 @@ except ImportError:
         }
     }
 
+# Cache (calendar days, coverage, notification templates and preferences)
+# Invalidation deletes cache keys, so the web process and the workers
+# (schedule_reminders, dispatch_notifications, ...) must share one cache: set
+# REDIS_URL. The per-process LocMem fallback is for single-process development.
+REDIS_URL = os.environ.get('REDIS_URL')
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'OPTIONS': {
+                'MAX_ENTRIES': 200000,
+            },
+        }
+    }
+
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -196,6 +223,139 @@ LOGGING = {
     },
 }
 
+# Scheduling Configuration
+SCHEDULING_CONFIG = {
+    'WAITLIST_OFFER_TTL_MINUTES': 30,  # How long a freed slot is held for a waitlisted patient
+    'WAITLIST_MATCH_INTERVAL_SECONDS': 30,
+}
+
+# Notification Configuration
+NOTIFICATION_CONFIG = {
+    # Appointment reminders
+    'REMINDER_LEAD_MINUTES': 60 * 24,  # Send reminders a day ahead unless the template says otherwise
+    'REMINDER_LOOKAHEAD_HOURS': 48,
+    'REMINDER_BUCKET_MINUTES': 60,
+    'REMINDER_BATCH_SIZE': 1000,
+    'REMINDER_SCAN_INTERVAL_SECONDS': 60,
+
+    # Delivery pipeline
+    'DELIVERY_BATCH_SIZE': 500,
+    'DELIVERY_MAX_ATTEMPTS': 5,
+    'DELIVERY_BACKOFF_SECONDS': 30,  # Doubles with each failed attempt
+    'DELIVERY_MAX_BACKOFF_SECONDS': 60 * 60,
+    'DELIVERY_LEASE_SECONDS': 60 * 5,  # Claimed rows are retried if a worker dies mid-batch
+    'DISPATCH_INTERVAL_SECONDS': 5,
+    'CHANNEL_BACKENDS': {
+        'IN_APP': 'notifications.backends.in_app.InAppBackend',
+        'EMAIL': 'notifications.backends.email.DjangoEmailBackend',
+        'SMS': 'notifications.backends.stub.StubSMSBackend',
+        'PUSH': 'notifications.backends.stub.StubPushBackend',
+    },
+    'CHANNEL_CONCURRENCY': {
+        'IN_APP': 1,
+        'EMAIL': 8,
+        'SMS': 4,
+        'PUSH': 8,
+    },
+
+    # Recipient resolution
+    'PREFERENCE_CHUNK_SIZE': 2000,
+    # Without a shared cache other processes only see changes once their copy expires
+    'PREFERENCE_CACHE_SECONDS': 60 * 60 if REDIS_URL else 60,
+    'TEMPLATE_CACHE_SECONDS': 60 * 60 if REDIS_URL else 60,
+
+    # Inbox
+    'INBOX_ARCHIVE_BATCH_SIZE': 1000,
+    'INBOX_ARCHIVE_INTERVAL_SECONDS': 60 * 15,
+
+    # Real-time push
+    'REALTIME_BROKER': (
+        'notifications.services.realtime.RedisBroker' if REDIS_URL
+        else 'notifications.services.realtime.InProcessBroker'
+    ),
+    'REALTIME_HEARTBEAT_SECONDS': 15,
+    # Single-node fallback for the in-process broker: streams poll the inbox for
+    # notifications committed by other processes. None with a shared broker.
+    'REALTIME_POLL_SECONDS': None if REDIS_URL else 2,
+    'REALTIME_STREAM_MAX_SECONDS': 60 * 5,  # Clients reconnect and replay with Last-Event-ID
+    'REALTIME_QUEUE_SIZE': 100,
+    'REALTIME_REPLAY_LIMIT': 50,
+    'URGENT_DISPATCH': True,  # Send EMERGENCY/CRITICAL notifications without waiting for the dispatcher
+}
+
+# Finance Configuration
+FINANCE_CONFIG = {
+    'TAX_RATE': '0.00',  # Applied to subtotal less discount
+    'RECALC_BATCH_SIZE': 5000,
+    'REMITTANCE_CHUNK_SIZE': 5000,  # Remittance lines posted per transaction
+}
+
+# Vital-sign time series
+VITALS_CONFIG = {
+    'INGEST_BATCH_SIZE': 5000,  # Readings written (and rolled up) per transaction
+    'INGEST_MAX_READINGS': 10000,  # Per API request
+    'MAX_CLOCK_SKEW_SECONDS': 300,  # Readings further in the future are rejected
+    'RAW_RETENTION_DAYS': 30,
+    'MINUTE_ROLLUP_RETENTION_DAYS': 90,  # Hour and day rollups are kept
+    'PRUNE_INTERVAL_SECONDS': 60 * 60,
+}
+
+# Patient chart summary (records.services.chart)
+CHART_CONFIG = {
+    'RECENT_RECORDS': 10,
+    'RECENT_LAB_RESULTS': 20,
+    'CACHE_SECONDS': 60 * 10,  # Writes invalidate sooner; this bounds bulk changes that send no signals
+}
+
+# Health record full-text search (records.services.search)
+RECORD_SEARCH_CONFIG = {
+    'MAX_QUERY_TERMS': 8,
+    'MAX_PAGE_SIZE': 100,
+    'SNIPPET_WORDS': 30,  # Per highlighted field
+}
+
+# Early-warning scoring (records.services.early_warning)
+EARLY_WARNING_CONFIG = {
+    'STALE_MINUTES': 240,  # Older values count as missing; patients without newer readings aren't monitored
+    'BASELINE_HOURS': 24,  # Hourly rollups a patient's own baseline is built from
+    'MIN_BASELINE_READINGS': 30,
+    'Z_LIMIT': 3.0,  # Deviations from baseline flagged as anomalous
+    'REPEAT_MINUTES': 60,  # Re-alert while risk stays raised
+    'CARE_TEAM_DAYS': 30,  # Doctors with records or appointments this recent are alerted
+    'SCORE_INTERVAL_SECONDS': 60,
+}
+
+# Access audit log (audit.services)
+AUDIT_CONFIG = {
+    'ENABLED': True,
+    # Stage events and chain them from a background thread. Off under the test
+    # runner, so each test's events are chained inline and roll back with it.
+    'BACKGROUND': not TESTING,
+    'BATCH_SIZE': 500,  # Staged events that wake the writer before its interval; also events chained per transaction
+    'FLUSH_INTERVAL_SECONDS': 2,
+    'VERIFY_BATCH_SIZE': 5000,
+}
+
+# Bulk clinical data import (records.services.clinical_import)
+IMPORT_CONFIG = {
+    'CHUNK_SIZE': 5000,  # Source rows per transaction and checkpoint
+    'MAX_LOGGED_ERRORS': 1000,  # Rejected rows kept on the job; all are counted
+}
+
+# Prescribing safety checks (pharmacy.services.safety)
+PRESCRIBING_SAFETY_CONFIG = {
+    'RULES_CACHE_SECONDS': 60 * 60,  # Rule and medication saves invalidate sooner
+    'RECHECK_BATCH_SIZE': 1000,  # Patients rechecked per transaction after a rule change
+    'CHECK_INTERVAL_SECONDS': 60,
+}
+
+# Business id generation (shared.utils.ids)
+ID_CONFIG = {
+    'BLOCK_SIZE': 100,  # Numbers each process reserves per database round trip
+    'WIDTH': 10,  # Zero-padded so ids sort numerically
+    'BLOCK_MAX_AGE_SECONDS': 1,  # Older blocks are dropped, so ids from different processes stay time-ordered
+}
+
 # Chatbot Configuration (Import only if file exists)
 try:
     from .settings.chatbot import CHATBOT_CONFIG
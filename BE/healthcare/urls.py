@@ -7,4 +7,9 @@ urlpatterns = [
     path('api/doctor/', include('doctor.urls')),
     path('api/patient/', include('patient.urls')),
     path('api/medical/', include('medical.urls')),
+    path('api/notifications/', include('notifications.urls')),
+    path('api/finance/', include('finance.urls')),
+    path('api/records/', include('records.urls')),
+    path('api/pharmacy/', include('pharmacy.urls')),
+    path('api/audit/', include('audit.urls')),
 ]
\ No newline at end of file
@@ -0,0 +1,29 @@
+# Generated by Django 4.2.30 on 2026-10-19 09:30
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def deduplicate_order_numbers(apps, schema_editor):
+    """Suffix repeated (or blank) order numbers with the row id so the unique index can be built"""
+    LabOrder = apps.get_model('laboratory', 'LabOrder')
+    repeated = LabOrder.objects.values('order_number').annotate(n=Count('id')).filter(n__gt=1).values('order_number')
+    for order in LabOrder.objects.filter(order_number__in=repeated).order_by('id').only('id', 'order_number'):
+        order.order_number = f'{order.order_number or "LAB"}-{order.id}'[:50]
+        order.save(update_fields=['order_number'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('laboratory', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(deduplicate_order_numbers, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='laborder',
+            name='order_number',
+            field=models.CharField(blank=True, help_text='Assigned on save if left blank', max_length=50, unique=True),
+        ),
+    ]
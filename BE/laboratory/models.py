@@ -1,5 +1,7 @@
 from django.db import models
 
+from shared.utils.ids import next_id
+
 class Laboratory(models.Model):
     name = models.CharField(max_length=200)
     lab_type = models.CharField(max_length=50)
@@ -21,7 +23,7 @@ class LabTest(models.Model):
         return self.name
 
 class LabOrder(models.Model):
-    order_number = models.CharField(max_length=50)
+    order_number = models.CharField(max_length=50, unique=True, blank=True, help_text="Assigned on save if left blank")
     patient = models.ForeignKey('shared.Patient', on_delete=models.CASCADE)
     doctor = models.ForeignKey('shared.Doctor', on_delete=models.CASCADE)
     laboratory = models.ForeignKey(Laboratory, on_delete=models.CASCADE)
@@ -29,6 +31,11 @@ class LabOrder(models.Model):
     priority = models.CharField(max_length=50, default='NORMAL')
     created_at = models.DateTimeField(auto_now_add=True)
 
+    def save(self, *args, **kwargs):
+        if not self.order_number:
+            self.order_number = next_id('lab_order', 'LAB')
+        super().save(*args, **kwargs)
+
     def __str__(self):
         return self.order_number
 
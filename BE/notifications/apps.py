@@ -3,4 +3,7 @@ from django.apps import AppConfig
 class NotificationsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'notifications'
-    verbose_name = 'Notifications System'
\ No newline at end of file
+    verbose_name = 'Notifications System'
+
+    def ready(self):
+        from . import signals  # noqa: F401
@@ -0,0 +1,20 @@
+# BE/notifications/backends/__init__.py
+from django.utils.module_loading import import_string
+
+from .base import BaseChannelBackend, DeliveryResult
+
+DEFAULT_CHANNEL_BACKENDS = {
+    'IN_APP': 'notifications.backends.in_app.InAppBackend',
+    'EMAIL': 'notifications.backends.email.DjangoEmailBackend',
+    'SMS': 'notifications.backends.stub.StubSMSBackend',
+    'PUSH': 'notifications.backends.stub.StubPushBackend',
+}
+
+
+def load_channel_backends(paths=None):
+    """Instantiate one backend per channel from dotted paths"""
+    paths = paths if paths is not None else DEFAULT_CHANNEL_BACKENDS
+    return {channel: import_string(path)() for channel, path in paths.items()}
+
+
+__all__ = ['BaseChannelBackend', 'DeliveryResult', 'DEFAULT_CHANNEL_BACKENDS', 'load_channel_backends']
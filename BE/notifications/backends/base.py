@@ -0,0 +1,57 @@
+# BE/notifications/backends/base.py
+from dataclasses import dataclass
+from decimal import Decimal
+from typing import List, Optional
+
+
+@dataclass
+class DeliveryResult:
+    """Outcome of one delivery attempt, mirrored into a NotificationLog row"""
+    notification_id: int
+    status: str  # NotificationLog status: SENT, DELIVERED, FAILED, BOUNCED
+    recipient_address: str = ''
+    external_id: str = ''
+    response_code: str = ''
+    response_message: str = ''
+    error_details: str = ''
+    retryable: bool = True
+    cost: Optional[Decimal] = None
+
+    @property
+    def succeeded(self):
+        return self.status in ('SENT', 'DELIVERED')
+
+
+class BaseChannelBackend:
+    """
+    A delivery channel (email provider, SMS gateway, ...).
+
+    Backends run on worker threads, so they must only use the notification and
+    its preloaded recipient and never touch the database themselves.
+    """
+    channel = None
+    provider = ''
+
+    def send(self, notification) -> DeliveryResult:
+        raise NotImplementedError
+
+    def send_batch(self, notifications) -> List[DeliveryResult]:
+        return [self.send_safely(notification) for notification in notifications]
+
+    def send_safely(self, notification) -> DeliveryResult:
+        try:
+            return self.send(notification)
+        except Exception as e:
+            return self.failure(notification, str(e))
+
+    def recipient_address(self, notification) -> str:
+        return str(notification.recipient_id)
+
+    def failure(self, notification, error, retryable=True, status='FAILED') -> DeliveryResult:
+        return DeliveryResult(
+            notification_id=notification.id,
+            status=status,
+            recipient_address=self.recipient_address(notification),
+            error_details=error,
+            retryable=retryable,
+        )
@@ -0,0 +1,36 @@
+# BE/notifications/backends/email.py
+from django.conf import settings
+from django.core.mail import EmailMessage
+
+from .base import BaseChannelBackend, DeliveryResult
+
+
+class DjangoEmailBackend(BaseChannelBackend):
+    """Sends through Django's configured EMAIL_BACKEND (locmem/console in development)"""
+    channel = 'EMAIL'
+    provider = 'django-mail'
+
+    def recipient_address(self, notification):
+        return notification.recipient.email or ''
+
+    def send(self, notification):
+        address = self.recipient_address(notification)
+        if not address:
+            return self.failure(notification, 'Recipient has no email address', retryable=False, status='BOUNCED')
+
+        message = EmailMessage(
+            subject=notification.title,
+            body=notification.message,
+            from_email=getattr(settings, 'DEFAULT_FROM_EMAIL', None),
+            to=[address],
+        )
+        sent = message.send(fail_silently=False)
+        if not sent:
+            return self.failure(notification, 'Mail backend accepted no messages')
+
+        return DeliveryResult(
+            notification_id=notification.id,
+            status='SENT',
+            recipient_address=address,
+            response_code='250',
+        )
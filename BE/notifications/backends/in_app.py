@@ -0,0 +1,15 @@
+# BE/notifications/backends/in_app.py
+from .base import BaseChannelBackend, DeliveryResult
+
+
+class InAppBackend(BaseChannelBackend):
+    """In-app notifications are delivered once they are visible in the inbox"""
+    channel = 'IN_APP'
+    provider = 'in-app'
+
+    def send(self, notification):
+        return DeliveryResult(
+            notification_id=notification.id,
+            status='DELIVERED',
+            recipient_address=self.recipient_address(notification),
+        )
@@ -0,0 +1,51 @@
+# BE/notifications/backends/stub.py
+import logging
+import uuid
+
+from .base import BaseChannelBackend, DeliveryResult
+
+logger = logging.getLogger(__name__)
+
+
+class StubBackend(BaseChannelBackend):
+    """
+    Local stand-in for an external provider: records what would have been sent.
+
+    ``outbox`` is shared per class so tests can assert on delivered messages.
+    """
+    outbox = None
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls.outbox = []
+
+    def send(self, notification):
+        address = self.recipient_address(notification)
+        if not address:
+            return self.failure(notification, f'Recipient has no {self.channel} address', retryable=False,
+                                status='BOUNCED')
+
+        external_id = uuid.uuid4().hex
+        self.outbox.append({'to': address, 'title': notification.title, 'message': notification.message,
+                            'external_id': external_id})
+        logger.debug(f"[{self.provider}] {self.channel} to {address}: {notification.title}")
+
+        return DeliveryResult(
+            notification_id=notification.id,
+            status='SENT',
+            recipient_address=address,
+            external_id=external_id,
+        )
+
+
+class StubSMSBackend(StubBackend):
+    channel = 'SMS'
+    provider = 'stub-sms'
+
+    def recipient_address(self, notification):
+        return notification.recipient.phone_number or ''
+
+
+class StubPushBackend(StubBackend):
+    channel = 'PUSH'
+    provider = 'stub-push'
@@ -0,0 +1,50 @@
+# BE/notifications/management/commands/archive_notifications.py
+import logging
+import time
+
+from django.core.management.base import BaseCommand
+
+from ...services.inbox import InboxService
+from ...services.reminders import get_notification_config
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = 'Archive expired notifications and keep unread counters in step'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Run a single pass and exit',
+        )
+        parser.add_argument(
+            '--interval',
+            type=int,
+            default=get_notification_config().get('INBOX_ARCHIVE_INTERVAL_SECONDS', 60 * 15),
+            help='Seconds between passes',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=None,
+            help='Notifications archived per transaction',
+        )
+
+    def handle(self, *args, **options):
+        service = InboxService()
+
+        while True:
+            try:
+                archived = service.archive_expired(batch_size=options['batch_size'])
+                if archived or options['verbosity'] > 1:
+                    self.stdout.write(f'Archived {archived} notifications')
+            except Exception as e:
+                logger.error(f"Notification archival failed: {e}")
+                if options['once']:
+                    raise
+
+            if options['once']:
+                break
+            time.sleep(options['interval'])
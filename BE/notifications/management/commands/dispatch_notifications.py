@@ -0,0 +1,63 @@
+# BE/notifications/management/commands/dispatch_notifications.py
+import logging
+import time
+
+from django.core.management.base import BaseCommand
+
+from ...services.delivery import NotificationDispatcher
+from ...services.reminders import get_notification_config
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = 'Deliver pending notifications through their channel backends'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Drain the pending queue once and exit',
+        )
+        parser.add_argument(
+            '--interval',
+            type=int,
+            default=get_notification_config().get('DISPATCH_INTERVAL_SECONDS', 5),
+            help='Seconds to wait when the queue is empty',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=None,
+            help='Notifications claimed per batch',
+        )
+
+    def handle(self, *args, **options):
+        dispatcher = NotificationDispatcher(batch_size=options['batch_size'])
+
+        try:
+            while True:
+                try:
+                    dispatched = self.drain(dispatcher)
+                    if dispatched or options['verbosity'] > 1:
+                        self.stdout.write(f'Dispatched {dispatched} notifications')
+                except Exception as e:
+                    logger.error(f"Notification dispatch failed: {e}")
+                    if options['once']:
+                        raise
+
+                if options['once']:
+                    break
+                time.sleep(options['interval'])
+        finally:
+            dispatcher.shutdown()
+
+    @staticmethod
+    def drain(dispatcher):
+        """Keep claiming while batches come back full"""
+        total = 0
+        while True:
+            claimed = dispatcher.dispatch_once()
+            total += claimed
+            if claimed < dispatcher.batch_size:
+                return total
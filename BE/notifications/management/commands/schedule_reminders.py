@@ -0,0 +1,58 @@
+# BE/notifications/management/commands/schedule_reminders.py
+import logging
+import time
+
+from django.core.management.base import BaseCommand
+
+from ...services.reminders import ReminderScheduler, get_notification_config
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = 'Materialize appointment reminder notifications for upcoming appointments'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Run a single scan and exit',
+        )
+        parser.add_argument(
+            '--interval',
+            type=int,
+            default=get_notification_config().get('REMINDER_SCAN_INTERVAL_SECONDS', 60),
+            help='Seconds between scans',
+        )
+        parser.add_argument(
+            '--lookahead-hours',
+            type=int,
+            default=None,
+            help='How far ahead to scan for appointments',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=None,
+            help='Appointments per batch',
+        )
+
+    def handle(self, *args, **options):
+        scheduler = ReminderScheduler(
+            lookahead_hours=options['lookahead_hours'],
+            batch_size=options['batch_size'],
+        )
+
+        while True:
+            try:
+                scheduled = scheduler.run()
+                if scheduled or options['verbosity'] > 1:
+                    self.stdout.write(f'Scheduled {scheduled} reminders')
+            except Exception as e:
+                logger.error(f"Reminder scan failed: {e}")
+                if options['once']:
+                    raise
+
+            if options['once']:
+                break
+            time.sleep(options['interval'])
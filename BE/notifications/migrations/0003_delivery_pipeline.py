@@ -0,0 +1,22 @@
+# Generated by Django 4.2.30 on 2026-10-19 08:58
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notifications', '0002_reminder_scheduling'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='notification',
+            name='next_attempt_at',
+            field=models.DateTimeField(blank=True, help_text='When the next delivery retry is due', null=True),
+        ),
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(condition=models.Q(('is_delivered', False)), fields=['next_attempt_at', 'scheduled_for'], name='notification_pending_idx'),
+        ),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 4.2.30 on 2026-10-19 09:02
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shared', '0002_nurse'),
+        ('notifications', '0003_delivery_pipeline'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NotificationCounter',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='notification_counter', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('unread_count', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'db_table': 'notification_counters',
+            },
+        ),
+        migrations.AddField(
+            model_name='notification',
+            name='archived_at',
+            field=models.DateTimeField(blank=True, help_text='Set once the notification leaves the inbox', null=True),
+        ),
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(condition=models.Q(('archived_at__isnull', True), ('delivery_method', 'IN_APP')), fields=['recipient', '-created_at', '-id'], name='notification_inbox_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(condition=models.Q(('archived_at__isnull', True)), fields=['expires_at'], name='notification_expiry_idx'),
+        ),
+    ]
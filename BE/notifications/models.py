@@ -79,12 +79,16 @@ class Notification(models.Model):
     delivery_method = models.CharField(max_length=10, choices=DELIVERY_METHOD_CHOICES, default='IN_APP')
     delivery_attempts = models.PositiveIntegerField(default=0)
     last_delivery_attempt = models.DateTimeField(null=True, blank=True)
+    next_attempt_at = models.DateTimeField(null=True, blank=True, help_text="When the next delivery retry is due")
     delivered_at = models.DateTimeField(null=True, blank=True)
     read_at = models.DateTimeField(null=True, blank=True)
+    archived_at = models.DateTimeField(null=True, blank=True, help_text="Set once the notification leaves the inbox")
 
     # Scheduling
     scheduled_for = models.DateTimeField(null=True, blank=True, help_text="When to send this notification")
     expires_at = models.DateTimeField(null=True, blank=True, help_text="When this notification expires")
+    dedupe_key = models.CharField(max_length=150, unique=True, null=True, blank=True,
+                                  help_text="Idempotency key for generated notifications")
 
     # Metadata
     created_at = models.DateTimeField(auto_now_add=True)
@@ -108,8 +112,31 @@ class Notification(models.Model):
             models.Index(fields=['recipient', 'is_read']),
             models.Index(fields=['notification_type', 'priority']),
             models.Index(fields=['scheduled_for']),
+            models.Index(fields=['content_type', 'object_id']),
+            # Undelivered notifications waiting for the dispatcher
+            models.Index(fields=['next_attempt_at', 'scheduled_for'], condition=models.Q(is_delivered=False),
+                         name='notification_pending_idx'),
+            # In-app inbox pages, newest first
+            models.Index(fields=['recipient', '-created_at', '-id'],
+                         condition=models.Q(delivery_method='IN_APP', archived_at__isnull=True),
+                         name='notification_inbox_idx'),
+            models.Index(fields=['expires_at'], condition=models.Q(archived_at__isnull=True),
+                         name='notification_expiry_idx'),
         ]
 
+class NotificationCounter(models.Model):
+    """Per-user unread inbox count, kept in step with the inbox instead of counted per request"""
+    user = models.OneToOneField('shared.User', on_delete=models.CASCADE, primary_key=True,
+                                related_name='notification_counter')
+    unread_count = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.user_id}: {self.unread_count} unread"
+
+    class Meta:
+        db_table = 'notification_counters'
+
 class NotificationTemplate(models.Model):
     """Templates for common notifications"""
     TEMPLATE_TYPE_CHOICES = [
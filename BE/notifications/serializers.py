@@ -0,0 +1,21 @@
+# BE/notifications/serializers.py
+from rest_framework import serializers
+from .models import Notification
+
+
+class NotificationSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Notification
+        fields = ['id', 'notification_type', 'priority', 'title', 'message', 'action_url', 'action_text',
+                  'content_type', 'object_id', 'is_read', 'read_at', 'expires_at', 'created_at', 'metadata']
+        read_only_fields = fields
+
+
+class MarkReadSerializer(serializers.Serializer):
+    ids = serializers.ListField(child=serializers.IntegerField(min_value=1), required=False, max_length=500)
+    all = serializers.BooleanField(required=False, default=False)
+
+    def validate(self, attrs):
+        if not attrs.get('all') and not attrs.get('ids'):
+            raise serializers.ValidationError("Pass a list of ids or all=true")
+        return attrs
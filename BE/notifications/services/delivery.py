@@ -0,0 +1,209 @@
+# BE/notifications/services/delivery.py
+import logging
+import threading
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from typing import Dict, List
+
+from django.db import connection, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from ..backends import DeliveryResult, load_channel_backends
+from ..models import Notification, NotificationLog
+from .inbox import InboxService
+from .reminders import get_notification_config
+
+logger = logging.getLogger(__name__)
+
+
+class NotificationDispatcher:
+    """
+    Claims due notifications in batches and fans them out to per-channel pools.
+
+    Claiming uses ``select_for_update(skip_locked=True)`` so several dispatchers
+    can run side by side; each claim bumps ``delivery_attempts`` and leases the
+    row, so a crashed worker's batch is retried once the lease lapses. Failed
+    sends back off exponentially on ``delivery_attempts``. Outcomes are written
+    with one bulk_update and one bulk_create of NotificationLog rows per batch.
+    """
+
+    def __init__(self, backends=None, concurrency=None, batch_size=None):
+        config = get_notification_config()
+        self.backends = backends if backends is not None else load_channel_backends(config.get('CHANNEL_BACKENDS'))
+        self.concurrency = concurrency or config.get('CHANNEL_CONCURRENCY', {})
+        self.batch_size = batch_size or config.get('DELIVERY_BATCH_SIZE', 500)
+        self.max_attempts = config.get('DELIVERY_MAX_ATTEMPTS', 5)
+        self.backoff = config.get('DELIVERY_BACKOFF_SECONDS', 30)
+        self.max_backoff = config.get('DELIVERY_MAX_BACKOFF_SECONDS', 60 * 60)
+        self.lease = timedelta(seconds=config.get('DELIVERY_LEASE_SECONDS', 60 * 5))
+        self._pools = {}
+
+    # Claiming
+
+    @staticmethod
+    def due_filter(now):
+        """Undelivered, due, unexpired, and either never attempted or with a retry that has come up"""
+        return (
+            Q(is_delivered=False)
+            & (Q(scheduled_for__isnull=True) | Q(scheduled_for__lte=now))
+            & (Q(expires_at__isnull=True) | Q(expires_at__gt=now))
+            & (Q(next_attempt_at__isnull=True, delivery_attempts=0) | Q(next_attempt_at__lte=now))
+        )
+
+    def claim_batch(self, now=None, ids=None) -> List[Notification]:
+        now = now or timezone.now()
+        queryset = Notification.objects.select_for_update(skip_locked=True).filter(self.due_filter(now))
+        if ids is not None:
+            queryset = queryset.filter(id__in=ids)
+
+        with transaction.atomic():
+            ids = list(queryset.order_by('id').values_list('id', flat=True)[:self.batch_size])
+            if not ids:
+                return []
+
+            Notification.objects.filter(id__in=ids).update(
+                delivery_attempts=F('delivery_attempts') + 1,
+                last_delivery_attempt=now,
+                next_attempt_at=now + self.lease,
+            )
+
+        return list(Notification.objects.filter(id__in=ids).select_related('recipient'))
+
+    # Dispatching
+
+    def dispatch_once(self) -> int:
+        notifications = self.claim_batch()
+        if notifications:
+            self.deliver(notifications)
+        return len(notifications)
+
+    def deliver_now(self, ids) -> int:
+        """Claim and send specific notifications without waiting for the next poll"""
+        notifications = self.claim_batch(ids=ids)
+        if notifications:
+            self.deliver(notifications)
+        return len(notifications)
+
+    def deliver(self, notifications: List[Notification]) -> List[DeliveryResult]:
+        """Send already-claimed notifications and record the outcome"""
+        by_channel = defaultdict(list)
+        for notification in notifications:
+            by_channel[notification.delivery_method].append(notification)
+
+        futures = []
+        results = []
+        for channel, batch in by_channel.items():
+            backend = self.backends.get(channel)
+            if backend is None:
+                results.extend(
+                    DeliveryResult(notification_id=n.id, status='FAILED', retryable=False,
+                                   error_details=f'No backend configured for {channel}')
+                    for n in batch
+                )
+                continue
+
+            pool = self.get_pool(channel)
+            futures.extend(pool.submit(backend.send_safely, notification) for notification in batch)
+
+        results.extend(future.result() for future in futures)
+        self.record(notifications, results)
+        return results
+
+    def get_pool(self, channel) -> ThreadPoolExecutor:
+        pool = self._pools.get(channel)
+        if pool is None:
+            pool = ThreadPoolExecutor(
+                max_workers=max(1, self.concurrency.get(channel, 1)),
+                thread_name_prefix=f'notify-{channel.lower()}',
+            )
+            self._pools[channel] = pool
+        return pool
+
+    def shutdown(self):
+        for pool in self._pools.values():
+            pool.shutdown(wait=True)
+        self._pools = {}
+
+    # Recording
+
+    def retry_delay(self, attempts) -> timedelta:
+        return timedelta(seconds=min(self.backoff * 2 ** max(attempts - 1, 0), self.max_backoff))
+
+    def record(self, notifications: List[Notification], results: List[DeliveryResult]):
+        now = timezone.now()
+        by_id: Dict[int, Notification] = {n.id: n for n in notifications}
+        logs = []
+
+        for result in results:
+            notification = by_id[result.notification_id]
+            backend = self.backends.get(notification.delivery_method)
+
+            if result.succeeded:
+                notification.is_delivered = True
+                notification.delivered_at = now
+                notification.next_attempt_at = None
+            elif result.retryable and notification.delivery_attempts < self.max_attempts:
+                notification.next_attempt_at = now + self.retry_delay(notification.delivery_attempts)
+            else:
+                # Dead letter: attempted, no retry scheduled, never claimed again
+                notification.next_attempt_at = None
+                logger.warning(f"Giving up on notification {notification.id}: {result.error_details}")
+
+            logs.append(NotificationLog(
+                notification_id=notification.id,
+                delivery_method=notification.delivery_method,
+                status=result.status,
+                recipient_address=result.recipient_address,
+                provider=backend.provider if backend else '',
+                external_id=result.external_id,
+                response_code=result.response_code,
+                response_message=result.response_message,
+                error_details=result.error_details,
+                delivered_at=now if result.status == 'DELIVERED' else None,
+                cost=result.cost,
+            ))
+
+        with transaction.atomic():
+            Notification.objects.bulk_update(notifications, ['is_delivered', 'delivered_at', 'next_attempt_at'])
+            NotificationLog.objects.bulk_create(logs)
+            # Scheduled in-app notifications only show up in the inbox once delivered
+            InboxService().entered(n for n in notifications if n.is_delivered and n.scheduled_for is not None)
+
+
+_urgent_executor = None
+_urgent_dispatcher = None
+_urgent_lock = threading.Lock()
+
+
+def _get_urgent_dispatcher():
+    global _urgent_executor, _urgent_dispatcher
+    if _urgent_dispatcher is None:
+        with _urgent_lock:
+            if _urgent_dispatcher is None:
+                _urgent_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix='notify-urgent')
+                _urgent_dispatcher = NotificationDispatcher()
+    return _urgent_executor, _urgent_dispatcher
+
+
+def _deliver_urgent(dispatcher, ids):
+    try:
+        dispatcher.deliver_now(ids)
+    except Exception as e:
+        logger.error(f"Urgent delivery of {ids} failed, leaving it to the dispatcher: {e}")
+    finally:
+        connection.close()
+
+
+def dispatch_urgent(notifications):
+    """
+    Send urgent notifications off the request thread as soon as they commit.
+    Anything this misses is still picked up by the regular dispatcher.
+    """
+    ids = [n.id for n in notifications]
+    if not ids or not get_notification_config().get('URGENT_DISPATCH', True):
+        return
+
+    executor, dispatcher = _get_urgent_dispatcher()
+    transaction.on_commit(lambda: executor.submit(_deliver_urgent, dispatcher, ids))
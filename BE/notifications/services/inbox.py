@@ -0,0 +1,132 @@
+# BE/notifications/services/inbox.py
+import logging
+from collections import Counter, defaultdict
+from typing import Dict, Iterable, Optional
+
+from django.db import transaction
+from django.db.models import Count, F, Q
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+from ..models import Notification, NotificationCounter
+from .realtime import publish_notifications
+from .reminders import get_notification_config
+
+logger = logging.getLogger(__name__)
+
+
+def inbox_filter():
+    """
+    In-app notifications that are not archived and have reached the user:
+    immediate ones from creation, scheduled ones once the dispatcher delivers them.
+    """
+    return (
+        Q(delivery_method='IN_APP', archived_at__isnull=True)
+        & (Q(scheduled_for__isnull=True) | Q(is_delivered=True))
+    )
+
+
+def in_inbox(notification) -> bool:
+    return (
+        notification.delivery_method == 'IN_APP'
+        and notification.archived_at is None
+        and (notification.scheduled_for is None or notification.is_delivered)
+    )
+
+
+class InboxService:
+    """
+    In-app inbox backed by a per-user unread counter.
+
+    The counter is adjusted whenever an unread notification enters or leaves the
+    inbox, so badge counts are a primary-key read. Users without a counter row
+    are counted once and the row is created; ``recount`` repairs drift.
+    """
+
+    def inbox(self, user):
+        return Notification.objects.filter(inbox_filter(), recipient=user)
+
+    # Counter
+
+    def unread_count(self, user) -> int:
+        count = NotificationCounter.objects.filter(user=user).values_list('unread_count', flat=True).first()
+        if count is None:
+            count = self.recount(user)
+        return count
+
+    def recount(self, user) -> int:
+        count = self.inbox(user).filter(is_read=False).count()
+        NotificationCounter.objects.update_or_create(user=user, defaults={'unread_count': count})
+        return count
+
+    @staticmethod
+    def adjust(deltas: Dict[int, int]):
+        """Apply per-user unread deltas, one UPDATE per distinct delta"""
+        by_delta = defaultdict(list)
+        for user_id, delta in deltas.items():
+            if delta:
+                by_delta[delta].append(user_id)
+
+        now = timezone.now()
+        for delta, user_ids in by_delta.items():
+            # Rows that don't exist yet are created by a full count on first read
+            NotificationCounter.objects.filter(user_id__in=user_ids).update(
+                unread_count=Greatest(F('unread_count') + delta, 0),
+                updated_at=now,
+            )
+
+    def entered(self, notifications: Iterable[Notification]):
+        """Count and push unread notifications that just became visible in their recipient's inbox"""
+        entered = [n for n in notifications if not n.is_read and in_inbox(n)]
+        self.adjust(Counter(n.recipient_id for n in entered))
+        publish_notifications(entered)
+
+    # Reading
+
+    def mark_read(self, user, ids: Optional[Iterable[int]] = None) -> int:
+        """Mark the given (or all) unread inbox notifications read in a single UPDATE"""
+        queryset = self.inbox(user).filter(is_read=False)
+        if ids is not None:
+            queryset = queryset.filter(id__in=list(ids))
+
+        with transaction.atomic():
+            updated = queryset.update(is_read=True, read_at=timezone.now())
+            if updated:
+                self.adjust({user.id: -updated})
+        return updated
+
+    # Archival
+
+    def archive_expired(self, now=None, batch_size=None) -> int:
+        """Move expired notifications out of the inbox in batches"""
+        now = now or timezone.now()
+        batch_size = batch_size or get_notification_config().get('INBOX_ARCHIVE_BATCH_SIZE', 1000)
+        archived = 0
+
+        while True:
+            with transaction.atomic():
+                ids = list(
+                    Notification.objects.select_for_update(skip_locked=True)
+                    .filter(archived_at__isnull=True, expires_at__lte=now)
+                    .order_by('expires_at')
+                    .values_list('id', flat=True)[:batch_size]
+                )
+                if not ids:
+                    break
+
+                batch = Notification.objects.filter(id__in=ids)
+                unread = dict(
+                    batch.filter(inbox_filter(), is_read=False)
+                    .order_by().values('recipient_id').annotate(count=Count('id'))
+                    .values_list('recipient_id', 'count')
+                )
+                batch.update(archived_at=now)
+                self.adjust({user_id: -count for user_id, count in unread.items()})
+
+            archived += len(ids)
+            if len(ids) < batch_size:
+                break
+
+        if archived:
+            logger.info(f"Archived {archived} expired notifications")
+        return archived
@@ -0,0 +1,207 @@
+# BE/notifications/services/preferences.py
+import logging
+from dataclasses import dataclass
+from datetime import datetime, timedelta, time
+from typing import Dict, Iterable, List, Optional, Tuple
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+
+from ..models import NotificationPreference
+
+logger = logging.getLogger(__name__)
+
+
+def get_zone(tz_name: str) -> ZoneInfo:
+    try:
+        return ZoneInfo(tz_name or 'UTC')
+    except (ZoneInfoNotFoundError, ValueError):
+        logger.warning(f"Unknown notification timezone {tz_name!r}, using UTC")
+        return ZoneInfo('UTC')
+
+
+def in_quiet_hours(local_time: time, start: time, end: time) -> bool:
+    if start <= end:
+        return start <= local_time < end
+    # Window wraps midnight, e.g. 22:00-07:00
+    return local_time >= start or local_time < end
+
+
+def defer_for_quiet_hours(send_at: datetime, start: Optional[time], end: Optional[time],
+                          tz_name: str, deadline: Optional[datetime] = None) -> datetime:
+    """
+    Move ``send_at`` out of the recipient's do-not-disturb window.
+
+    The send is deferred to the end of quiet hours; if that would be at or past
+    ``deadline`` (e.g. the appointment itself) it is pulled forward to just
+    before quiet hours began instead.
+    """
+    if start is None or end is None or start == end:
+        return send_at
+
+    zone = get_zone(tz_name)
+    local = send_at.astimezone(zone)
+    if not in_quiet_hours(local.time(), start, end):
+        return send_at
+
+    quiet_end = datetime.combine(local.date(), end, tzinfo=zone)
+    if quiet_end <= local:
+        quiet_end += timedelta(days=1)
+
+    if deadline is None or quiet_end < deadline:
+        return quiet_end
+
+    quiet_start = datetime.combine(local.date(), start, tzinfo=zone)
+    if quiet_start > local:
+        quiet_start -= timedelta(days=1)
+    return quiet_start - timedelta(minutes=1)
+
+
+# Preference flag and delivery-method field per notification type. A None flag
+# means the type cannot be switched off on its own.
+NOTIFICATION_CATEGORIES = {
+    'APPOINTMENT': (None, 'appointment_delivery_methods'),
+    'REMINDER': ('appointment_reminders', 'appointment_delivery_methods'),
+    'PRESCRIPTION': ('prescription_ready', 'medical_delivery_methods'),
+    'LAB_RESULT': ('lab_results', 'medical_delivery_methods'),
+    'BILLING': ('billing_notifications', 'billing_delivery_methods'),
+    'SYSTEM': ('system_updates', 'system_delivery_methods'),
+    'ALERT': ('security_alerts', 'system_delivery_methods'),
+    'MESSAGE': (None, 'system_delivery_methods'),
+    'EMERGENCY': (None, 'emergency_delivery_methods'),
+}
+
+# Never opted out of and never held back by quiet hours
+BYPASS_TYPES = ('EMERGENCY',)
+BYPASS_PRIORITIES = ('CRITICAL',)
+
+PREFERENCE_CACHE_TIMEOUT = 60 * 60
+# Cached for users without a preference row, so they don't miss the cache every time
+NO_PREFERENCES = 'defaults'
+
+
+def preference_cache_key(user_id):
+    return f'notification-preferences:{user_id}'
+
+
+def invalidate_preferences(user_id):
+    cache.delete(preference_cache_key(user_id))
+
+
+@dataclass(frozen=True)
+class RecipientPlan:
+    """How (and when) one recipient should get a notification"""
+    user_id: int
+    channels: Tuple[str, ...]
+    send_at: datetime
+    deferred: bool = False
+
+
+class PreferenceResolver:
+    """
+    Bulk resolution of NotificationPreference into per-recipient plans.
+
+    Preferences are read through the cache in chunks: one get_many per chunk and
+    one query for the users that missed, with rows dropped from the cache when
+    they are saved. Users without a row resolve to the model defaults.
+    """
+
+    def __init__(self, chunk_size=None):
+        config = getattr(settings, 'NOTIFICATION_CONFIG', {})
+        self.chunk_size = chunk_size or config.get('PREFERENCE_CHUNK_SIZE', 2000)
+        self.cache_timeout = config.get('PREFERENCE_CACHE_SECONDS', PREFERENCE_CACHE_TIMEOUT)
+        self.fields = self.preference_fields()
+        self.defaults = {
+            name: NotificationPreference._meta.get_field(name).get_default() for name in self.fields
+        }
+
+    @staticmethod
+    def preference_fields():
+        fields = {'do_not_disturb_start', 'do_not_disturb_end', 'timezone'}
+        for flag, methods in NOTIFICATION_CATEGORIES.values():
+            fields.add(methods)
+            if flag:
+                fields.add(flag)
+        return sorted(fields)
+
+    # Loading
+
+    def load(self, user_ids: Iterable[int]) -> Dict[int, Dict]:
+        """Preference values per user, defaults filled in for users without a row"""
+        user_ids = list(dict.fromkeys(user_ids))
+        loaded = {}
+        for start in range(0, len(user_ids), self.chunk_size):
+            loaded.update(self.load_chunk(user_ids[start:start + self.chunk_size]))
+        return loaded
+
+    def load_chunk(self, user_ids: List[int]) -> Dict[int, Dict]:
+        keys = {preference_cache_key(user_id): user_id for user_id in user_ids}
+        cached = cache.get_many(keys.keys())
+        values = {keys[key]: value for key, value in cached.items()}
+
+        missing = [user_id for user_id in user_ids if user_id not in values]
+        if missing:
+            queryset = NotificationPreference.objects.filter(user_id__in=missing).values('user_id', *self.fields)
+            rows = {row.pop('user_id'): row for row in queryset}
+            fresh = {user_id: rows.get(user_id, NO_PREFERENCES) for user_id in missing}
+            cache.set_many(
+                {preference_cache_key(user_id): value for user_id, value in fresh.items()},
+                self.cache_timeout,
+            )
+            values.update(fresh)
+
+        return {
+            user_id: self.defaults if value == NO_PREFERENCES else value
+            for user_id, value in values.items()
+        }
+
+    # Planning
+
+    def plan(self, user_id, preferences: Dict, notification_type, send_at: datetime, priority='NORMAL',
+             flag=None, channels: Optional[Iterable[str]] = None,
+             deadline: Optional[datetime] = None) -> Optional[RecipientPlan]:
+        """
+        Channels and send time for one recipient, or None if they opted out.
+        ``flag`` overrides the type's preference flag (e.g. appointment_cancellations)
+        and ``channels`` limits the result to what the sender supports.
+        """
+        category_flag, methods_field = NOTIFICATION_CATEGORIES.get(
+            notification_type, (None, 'system_delivery_methods')
+        )
+        bypass = notification_type in BYPASS_TYPES or priority in BYPASS_PRIORITIES
+
+        flag = flag or category_flag
+        if flag and not bypass and not preferences.get(flag, True):
+            return None
+
+        methods = preferences.get(methods_field) or []
+        if channels is not None:
+            allowed = set(channels)
+            methods = [method for method in methods if method in allowed]
+        if not methods:
+            return None
+
+        planned_at = send_at
+        if not bypass:
+            planned_at = defer_for_quiet_hours(
+                send_at,
+                preferences.get('do_not_disturb_start'),
+                preferences.get('do_not_disturb_end'),
+                preferences.get('timezone'),
+                deadline=deadline,
+            )
+        return RecipientPlan(user_id, tuple(methods), planned_at, deferred=planned_at != send_at)
+
+    def resolve(self, user_ids: Iterable[int], notification_type, send_at: Optional[datetime] = None,
+                priority='NORMAL', flag=None, channels=None, deadline=None) -> Dict[int, RecipientPlan]:
+        """Plans for every recipient that should be notified; opted-out users are left out"""
+        send_at = send_at or timezone.now()
+        plans = {}
+        for user_id, preferences in self.load(user_ids).items():
+            plan = self.plan(user_id, preferences, notification_type, send_at, priority=priority,
+                             flag=flag, channels=channels, deadline=deadline)
+            if plan is not None:
+                plans[user_id] = plan
+        return plans
@@ -0,0 +1,214 @@
+# BE/notifications/services/realtime.py
+import asyncio
+import json
+import logging
+import threading
+from collections import defaultdict
+from typing import Dict, Iterable
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.utils.module_loading import import_string
+
+from .reminders import get_notification_config
+
+logger = logging.getLogger(__name__)
+
+URGENT_PRIORITIES = ('CRITICAL',)
+URGENT_TYPES = ('EMERGENCY',)
+
+
+def is_urgent(notification) -> bool:
+    return notification.priority in URGENT_PRIORITIES or notification.notification_type in URGENT_TYPES
+
+
+def notification_event(notification) -> Dict:
+    """The payload pushed to clients, shaped like the inbox API"""
+    from ..serializers import NotificationSerializer
+
+    return {
+        'id': notification.id,
+        'event': 'urgent' if is_urgent(notification) else 'notification',
+        'data': json.dumps(NotificationSerializer(notification).data, cls=DjangoJSONEncoder),
+    }
+
+
+class Subscription:
+    """
+    One connected client: a bounded queue drained by the stream's event loop.
+
+    ``put`` may be called from any thread (events are published from
+    ``on_commit`` in sync code); it hands the event to the loop that opened
+    the subscription.
+    """
+
+    def __init__(self, broker, user_id, maxsize):
+        self.broker = broker
+        self.user_id = user_id
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(maxsize=maxsize)
+        self.dropped = 0
+
+    def put(self, event):
+        try:
+            self.loop.call_soon_threadsafe(self._put, event)
+        except RuntimeError:
+            # The stream's loop has already shut down
+            pass
+
+    def _put(self, event):
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            # Slow client; it replays what was dropped from the inbox when it reconnects
+            self.dropped += 1
+
+    async def get(self, timeout=None):
+        """The next pushed event, or None if nothing arrives within ``timeout`` seconds"""
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    async def close(self):
+        self.broker.unsubscribe(self)
+
+
+class BaseBroker:
+    """
+    Fan-out of notification events to connected clients.
+
+    ``publish`` is called after commit from sync code; ``subscribe`` is awaited
+    by the stream. Configured through ``REALTIME_BROKER``.
+    """
+
+    def publish(self, user_id, event):
+        raise NotImplementedError
+
+    async def subscribe(self, user_id):
+        raise NotImplementedError
+
+
+class InProcessBroker(BaseBroker):
+    """
+    Single-process broker: only clients connected to this process receive
+    events. Notifications committed by other processes (e.g. the dispatcher)
+    reach streams through the ``REALTIME_POLL_SECONDS`` inbox poll instead.
+    """
+
+    def __init__(self):
+        config = get_notification_config()
+        self.queue_size = config.get('REALTIME_QUEUE_SIZE', 100)
+        self._subscribers = defaultdict(set)
+        self._lock = threading.Lock()
+
+    def publish(self, user_id, event):
+        with self._lock:
+            subscribers = list(self._subscribers.get(user_id, ()))
+        for subscription in subscribers:
+            subscription.put(event)
+
+    async def subscribe(self, user_id) -> Subscription:
+        subscription = Subscription(self, user_id, self.queue_size)
+        with self._lock:
+            self._subscribers[user_id].add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            subscribers = self._subscribers.get(subscription.user_id)
+            if subscribers is not None:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._subscribers[subscription.user_id]
+
+    def subscriber_count(self, user_id=None):
+        with self._lock:
+            if user_id is not None:
+                return len(self._subscribers.get(user_id, ()))
+            return sum(len(subscribers) for subscribers in self._subscribers.values())
+
+
+class RedisSubscription:
+    """One client's Redis channel, read with the asyncio client"""
+
+    def __init__(self, client, pubsub):
+        self.client = client
+        self.pubsub = pubsub
+
+    async def get(self, timeout=None):
+        message = await self.pubsub.get_message(ignore_subscribe_messages=True, timeout=timeout)
+        if message is None:
+            return None
+        return json.loads(message['data'])
+
+    async def close(self):
+        try:
+            await self.pubsub.unsubscribe()
+            await self.pubsub.close()
+        finally:
+            await self.client.close()
+
+
+class RedisBroker(BaseBroker):
+    """
+    Redis pub/sub broker: one channel per user, so events published by any
+    process reach streams open on every node.
+    """
+
+    def __init__(self):
+        import redis
+
+        config = get_notification_config()
+        self.url = config.get('REALTIME_REDIS_URL') or settings.REDIS_URL
+        self.prefix = config.get('REALTIME_CHANNEL_PREFIX', 'notifications:user:')
+        self.publisher = redis.Redis.from_url(self.url)
+
+    def channel(self, user_id):
+        return f'{self.prefix}{user_id}'
+
+    def publish(self, user_id, event):
+        self.publisher.publish(self.channel(user_id), json.dumps(event))
+
+    async def subscribe(self, user_id) -> RedisSubscription:
+        from redis import asyncio as aioredis
+
+        # A client per stream: asyncio connections belong to the loop that opened them
+        client = aioredis.Redis.from_url(self.url)
+        pubsub = client.pubsub()
+        await pubsub.subscribe(self.channel(user_id))
+        return RedisSubscription(client, pubsub)
+
+
+_broker = None
+_broker_lock = threading.Lock()
+
+
+def get_broker() -> BaseBroker:
+    global _broker
+    if _broker is None:
+        with _broker_lock:
+            if _broker is None:
+                path = get_notification_config().get(
+                    'REALTIME_BROKER', 'notifications.services.realtime.InProcessBroker'
+                )
+                _broker = import_string(path)()
+    return _broker
+
+
+def publish_notifications(notifications: Iterable):
+    """Push notifications to their recipients' open streams once the transaction commits"""
+    notifications = list(notifications)
+    if not notifications:
+        return
+
+    def publish():
+        broker = get_broker()
+        for notification in notifications:
+            try:
+                broker.publish(notification.recipient_id, notification_event(notification))
+            except Exception as e:
+                logger.error(f"Failed to publish notification {notification.id}: {e}")
+
+    transaction.on_commit(publish)
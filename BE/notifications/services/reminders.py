@@ -0,0 +1,189 @@
+# BE/notifications/services/reminders.py
+import logging
+from datetime import datetime, timedelta
+from typing import Dict, List
+
+from django.conf import settings
+from django.contrib.contenttypes.models import ContentType
+from django.db.models import Exists, OuterRef, Q
+from django.utils import timezone
+
+from doctor.models.schedule import Appointment
+from shared.utils.pagination import seek_filter
+from ..models import Notification
+from .preferences import PreferenceResolver
+from .templates import CompiledTemplate, template_registry
+
+logger = logging.getLogger(__name__)
+
+
+def get_notification_config():
+    return getattr(settings, 'NOTIFICATION_CONFIG', {})
+
+
+class ReminderScheduler:
+    """
+    Materializes appointment reminders ahead of time.
+
+    Upcoming confirmed appointments are scanned in time buckets and keyset
+    batches; each batch costs one appointment query, one bulk insert and, for
+    preferences not yet cached, one preference query. Reminders carry a dedupe
+    key, and appointments that already have one are skipped in SQL, so reruns
+    and restarts never duplicate them.
+    """
+    TEMPLATE_TYPE = 'APPOINTMENT_REMINDER'
+    DEDUPE_PREFIX = 'appointment-reminder'
+    BATCH_ORDERING = ('date', 'time', 'id')
+
+    DEFAULT_TEMPLATE = {
+        'notification_type': 'REMINDER',
+        'priority': 'NORMAL',
+        'title_template': 'Appointment Reminder - {doctor_name}',
+        'message_template': 'You have an appointment with {doctor_name} on {date} at {time}.',
+        'action_text': 'View Appointment',
+        'action_url_template': '',
+        'delivery_methods': [],
+        'delay_minutes': 0,
+        'available_variables': [],
+    }
+
+    def __init__(self, lookahead_hours=None, batch_size=None, bucket_minutes=None):
+        config = get_notification_config()
+        self.lookahead = timedelta(hours=lookahead_hours or config.get('REMINDER_LOOKAHEAD_HOURS', 48))
+        self.batch_size = batch_size or config.get('REMINDER_BATCH_SIZE', 1000)
+        self.bucket = timedelta(minutes=bucket_minutes or config.get('REMINDER_BUCKET_MINUTES', 60))
+        self.default_lead_minutes = config.get('REMINDER_LEAD_MINUTES', 60 * 24)
+        self.appointment_type = ContentType.objects.get_for_model(Appointment)
+        self.resolver = PreferenceResolver()
+
+    def run(self, now=None) -> int:
+        """Schedule reminders for every appointment in the lookahead window"""
+        now = now or timezone.now()
+        template = template_registry.get(self.TEMPLATE_TYPE, fallback=self.DEFAULT_TEMPLATE)
+        if template is None:
+            logger.info("Appointment reminder template is inactive, nothing scheduled")
+            return 0
+
+        scheduled = 0
+        window_end = now + self.lookahead
+        bucket_start = now
+        while bucket_start < window_end:
+            bucket_end = min(bucket_start + self.bucket, window_end)
+            for batch in self.iter_batches(bucket_start, bucket_end):
+                scheduled += self.schedule_batch(batch, template, now)
+            bucket_start = bucket_end
+
+        return scheduled
+
+    # Scanning
+
+    def iter_batches(self, start, end):
+        """Yield keyset batches of not-yet-reminded appointments starting in [start, end)"""
+        already_reminded = Notification.objects.filter(
+            content_type=self.appointment_type,
+            object_id=OuterRef('id'),
+            dedupe_key__startswith=self.DEDUPE_PREFIX,
+        )
+        queryset = Appointment.objects.filter(
+            self.time_range(start, end),
+            status='CONFIRMED',
+        ).filter(~Exists(already_reminded)).order_by(*self.BATCH_ORDERING).values(
+            'id', 'date', 'time',
+            'patient__user_id', 'patient__user__first_name', 'patient__user__last_name',
+            'doctor__user__first_name', 'doctor__user__last_name', 'doctor__specialization',
+        )
+
+        position = None
+        while True:
+            page = queryset if position is None else queryset.filter(seek_filter(self.BATCH_ORDERING, position))
+            batch = list(page[:self.batch_size])
+            if not batch:
+                return
+            yield batch
+            if len(batch) < self.batch_size:
+                return
+            last = batch[-1]
+            position = [last['date'], last['time'], last['id']]
+
+    @staticmethod
+    def time_range(start, end):
+        """Filter appointments whose (date, time) falls in [start, end) in local time"""
+        start, end = timezone.localtime(start), timezone.localtime(end)
+        if start.date() == end.date():
+            return Q(date=start.date(), time__gte=start.time(), time__lt=end.time())
+        return (
+            Q(date=start.date(), time__gte=start.time())
+            | Q(date__gt=start.date(), date__lt=end.date())
+            | Q(date=end.date(), time__lt=end.time())
+        )
+
+    # Materializing
+
+    def schedule_batch(self, batch: List[Dict], template: CompiledTemplate, now) -> int:
+        preferences = self.resolver.load(row['patient__user_id'] for row in batch)
+        lead = timedelta(minutes=template.delay_minutes or self.default_lead_minutes)
+        notifications = []
+
+        for row in batch:
+            appointment_at = timezone.make_aware(datetime.combine(row['date'], row['time']))
+            plan = self.resolver.plan(
+                row['patient__user_id'],
+                preferences[row['patient__user_id']],
+                template.notification_type,
+                max(appointment_at - lead, now),
+                priority=template.priority,
+                flag='appointment_reminders',
+                channels=template.delivery_methods or None,
+                deadline=appointment_at,
+            )
+            if plan is None:
+                continue
+
+            send_at = max(plan.send_at, now)
+            content = template.render(self.build_context(row))
+            for method in plan.channels:
+                notifications.append(self.build_notification(row, template, content, method, send_at, appointment_at))
+
+        Notification.objects.bulk_create(notifications, ignore_conflicts=True)
+        logger.info(f"Scheduled {len(notifications)} reminders for {len(batch)} appointments")
+        return len(notifications)
+
+    @staticmethod
+    def build_context(row: Dict) -> Dict:
+        return {
+            'appointment_id': row['id'],
+            'patient_name': f"{row['patient__user__first_name']} {row['patient__user__last_name']}".strip(),
+            'doctor_name': f"Dr. {row['doctor__user__first_name']} {row['doctor__user__last_name']}".strip(),
+            'specialization': row['doctor__specialization'],
+            'date': row['date'].strftime('%Y-%m-%d'),
+            'time': row['time'].strftime('%H:%M'),
+            'location': '',
+        }
+
+    def build_notification(self, row, template, content, method, send_at, appointment_at):
+        return Notification(
+            recipient_id=row['patient__user_id'],
+            notification_type=template.notification_type,
+            priority=template.priority,
+            title=content['title'],
+            message=content['message'],
+            action_text=template.action_text,
+            action_url=content['action_url'],
+            content_type=self.appointment_type,
+            object_id=row['id'],
+            delivery_method=method,
+            scheduled_for=send_at,
+            expires_at=appointment_at,
+            dedupe_key=f"{self.DEDUPE_PREFIX}:{row['id']}:{method}",
+            metadata={'appointment_id': row['id'], 'template_type': self.TEMPLATE_TYPE},
+        )
+
+    def discard_for_appointment(self, appointment_id) -> int:
+        """Drop reminders that have not gone out yet, e.g. after a cancellation"""
+        deleted, _ = Notification.objects.filter(
+            content_type=self.appointment_type,
+            object_id=appointment_id,
+            dedupe_key__startswith=self.DEDUPE_PREFIX,
+            is_delivered=False,
+        ).delete()
+        return deleted
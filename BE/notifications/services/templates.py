@@ -0,0 +1,171 @@
+# BE/notifications/services/templates.py
+import logging
+from dataclasses import dataclass, field
+from string import Formatter
+from typing import Callable, Dict, List, Optional, Tuple
+
+from django.conf import settings
+from django.core.cache import cache
+
+from ..models import NotificationTemplate
+
+logger = logging.getLogger(__name__)
+
+TEMPLATE_CACHE_TIMEOUT = 60 * 60
+TEMPLATE_FIELDS = (
+    'template_type', 'notification_type', 'priority', 'title_template', 'message_template', 'action_text',
+    'action_url_template', 'delivery_methods', 'delay_minutes', 'available_variables', 'is_active', 'updated_at',
+)
+
+# Cached in place of a row so missing templates don't hit the database either
+MISSING = 'missing'
+
+
+class TemplateError(ValueError):
+    """A template uses a placeholder it does not declare, or one that is not a plain name"""
+
+
+def template_cache_key(template_type):
+    return f'notification-template:{template_type}'
+
+
+def invalidate_template(template_type):
+    cache.delete(template_cache_key(template_type))
+
+
+def compile_format(source: str, allowed=None) -> Callable[[Dict], str]:
+    """
+    Parse a ``{variable}`` format string once and return a render function.
+
+    Placeholders must be plain names (no attribute or index access) and, when
+    ``allowed`` is given, declared in it. Missing context values render empty.
+    """
+    parts: List = []
+    for literal, name, spec, conversion in Formatter().parse(source or ''):
+        if literal:
+            parts.append(literal)
+        if name is None:
+            continue
+        if not name.isidentifier():
+            raise TemplateError(f'Unsupported placeholder {{{name}}}')
+        if allowed is not None and name not in allowed:
+            raise TemplateError(f'Undeclared variable {{{name}}}')
+        parts.append((name, spec, conversion))
+
+    if all(isinstance(part, str) for part in parts):
+        constant = ''.join(parts)
+        return lambda context: constant
+
+    def render(context):
+        out = []
+        for part in parts:
+            if isinstance(part, str):
+                out.append(part)
+                continue
+            name, spec, conversion = part
+            if name not in context:
+                # Not formatted, so a spec like {count:03d} can't fail on the empty default
+                continue
+            value = context[name]
+            if conversion == 'r':
+                value = repr(value)
+            elif conversion == 'a':
+                value = ascii(value)
+            out.append(format(value, spec) if spec else str(value))
+        return ''.join(out)
+
+    return render
+
+
+@dataclass(frozen=True)
+class CompiledTemplate:
+    template_type: str
+    version: object
+    notification_type: str
+    priority: str
+    action_text: str
+    delivery_methods: Tuple[str, ...]
+    delay_minutes: int
+    variables: Tuple[str, ...]
+    render_title: Callable = field(repr=False)
+    render_message: Callable = field(repr=False)
+    render_action_url: Callable = field(repr=False)
+
+    def render(self, context: Dict) -> Dict:
+        return {
+            'title': self.render_title(context),
+            'message': self.render_message(context),
+            'action_url': self.render_action_url(context),
+        }
+
+
+def compile_template(values: Dict) -> CompiledTemplate:
+    """Compile a template row (as a values() dict). Undeclared variables raise TemplateError."""
+    variables = tuple(values.get('available_variables') or ())
+    allowed = set(variables) if variables else None
+    try:
+        return CompiledTemplate(
+            template_type=values['template_type'],
+            version=values.get('updated_at'),
+            notification_type=values['notification_type'],
+            priority=values['priority'],
+            action_text=values.get('action_text', ''),
+            delivery_methods=tuple(values.get('delivery_methods') or ()),
+            delay_minutes=values.get('delay_minutes') or 0,
+            variables=variables,
+            render_title=compile_format(values['title_template'], allowed),
+            render_message=compile_format(values['message_template'], allowed),
+            render_action_url=compile_format(values.get('action_url_template', ''), allowed),
+        )
+    except TemplateError as e:
+        raise TemplateError(f"{values['template_type']}: {e}") from None
+
+
+class TemplateRegistry:
+    """
+    Process-wide cache of compiled templates keyed by ``(template_type, updated_at)``.
+
+    The template row itself lives in the shared cache and is dropped whenever the
+    template is saved, so a lookup costs one cache read and no query; a changed
+    ``updated_at`` produces a fresh compile.
+    """
+
+    def __init__(self):
+        self._compiled: Dict[Tuple[str, object], CompiledTemplate] = {}
+
+    def get(self, template_type, fallback: Optional[Dict] = None) -> Optional[CompiledTemplate]:
+        """Compiled active template, ``fallback`` compiled if there is no row, None if inactive"""
+        values = self.load(template_type)
+        if values == MISSING:
+            if fallback is None:
+                return None
+            values = dict(fallback, template_type=template_type, updated_at=None, is_active=True)
+        if not values['is_active']:
+            return None
+
+        key = (template_type, values['updated_at'])
+        compiled = self._compiled.get(key)
+        if compiled is None:
+            compiled = compile_template(values)
+            # Only the current version of each template is worth keeping
+            self._compiled = {k: v for k, v in self._compiled.items() if k[0] != template_type}
+            self._compiled[key] = compiled
+            logger.debug(f"Compiled notification template {template_type} ({values['updated_at']})")
+        return compiled
+
+    def load(self, template_type):
+        key = template_cache_key(template_type)
+        values = cache.get(key)
+        if values is None:
+            values = NotificationTemplate.objects.filter(template_type=template_type).values(
+                *TEMPLATE_FIELDS
+            ).first() or MISSING
+            config = getattr(settings, 'NOTIFICATION_CONFIG', {})
+            cache.set(key, values, config.get('TEMPLATE_CACHE_SECONDS', TEMPLATE_CACHE_TIMEOUT))
+        return values
+
+    def clear(self):
+        self._compiled = {}
+
+
+template_registry = TemplateRegistry()
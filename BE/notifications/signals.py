@@ -0,0 +1,44 @@
+# BE/notifications/signals.py
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from doctor.models.schedule import Appointment
+from .models import Notification, NotificationPreference, NotificationTemplate
+from .services.delivery import dispatch_urgent
+from .services.inbox import InboxService, in_inbox
+from .services.preferences import invalidate_preferences
+from .services.realtime import is_urgent
+from .services.reminders import ReminderScheduler
+from .services.templates import invalidate_template
+
+
+@receiver(post_save, sender=Appointment)
+def discard_reminders_for_cancelled_appointment(sender, instance, created, **kwargs):
+    if not created and instance.status == 'CANCELLED':
+        ReminderScheduler().discard_for_appointment(instance.id)
+
+
+@receiver(post_save, sender=NotificationTemplate)
+@receiver(post_delete, sender=NotificationTemplate)
+def invalidate_compiled_template(sender, instance, **kwargs):
+    invalidate_template(instance.template_type)
+
+
+@receiver(post_save, sender=NotificationPreference)
+@receiver(post_delete, sender=NotificationPreference)
+def invalidate_cached_preferences(sender, instance, **kwargs):
+    invalidate_preferences(instance.user_id)
+
+
+@receiver(post_save, sender=Notification)
+def route_new_notification(sender, instance, created, **kwargs):
+    if created:
+        InboxService().entered([instance])
+        if instance.scheduled_for is None and is_urgent(instance):
+            dispatch_urgent([instance])
+
+
+@receiver(post_delete, sender=Notification)
+def uncount_deleted_inbox_notification(sender, instance, **kwargs):
+    if not instance.is_read and in_inbox(instance):
+        InboxService.adjust({instance.recipient_id: -1})
@@ -0,0 +1,405 @@
+from datetime import datetime, time, timedelta
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.test import AsyncClient, TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from doctor.models.schedule import Appointment, Schedule
+from shared.factories import make_user
+from shared.models import Doctor, Patient
+from .backends import BaseChannelBackend, DeliveryResult
+from .models import Notification, NotificationLog, NotificationPreference, NotificationTemplate
+from .services.delivery import NotificationDispatcher
+from .services.inbox import InboxService
+from .services.preferences import PreferenceResolver, defer_for_quiet_hours
+from .services.realtime import get_broker
+from .services.reminders import ReminderScheduler
+from .services.templates import TemplateError, TemplateRegistry, compile_format
+
+
+def make_appointment(doctor, patient, at, status='CONFIRMED'):
+    schedule, _ = Schedule.objects.get_or_create(
+        doctor=doctor, date=at.date(), defaults={'start_time': time(0), 'end_time': time(23, 30)}
+    )
+    return Appointment.objects.create(
+        patient=patient, doctor=doctor, schedule=schedule, date=at.date(), time=at.time(),
+        end_time=(at + timedelta(minutes=30)).time(), status=status, reason='Checkup',
+    )
+
+
+class ReminderSchedulerTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.now = timezone.make_aware(datetime.combine(timezone.localdate() + timedelta(days=1), time(8)))
+        self.doctor = Doctor.objects.create(user=make_user('doc', is_doctor=True, last_name='House'),
+                                            specialization='General')
+        self.patient = Patient.objects.create(user=make_user('pat', is_patient=True))
+
+    def reminders(self, **filters):
+        return Notification.objects.filter(dedupe_key__startswith=ReminderScheduler.DEDUPE_PREFIX, **filters)
+
+    def test_appointments_in_the_lookahead_get_one_reminder_per_channel(self):
+        soon = make_appointment(self.doctor, self.patient, self.now + timedelta(hours=3))
+        later = make_appointment(self.doctor, self.patient, self.now + timedelta(hours=26))
+        make_appointment(self.doctor, self.patient, self.now + timedelta(hours=60))
+        make_appointment(self.doctor, self.patient, self.now + timedelta(hours=4), status='CANCELLED')
+
+        self.assertEqual(ReminderScheduler(batch_size=1).run(now=self.now), 4)
+        self.assertEqual(set(self.reminders().values_list('object_id', 'delivery_method')), {
+            (soon.id, 'IN_APP'), (soon.id, 'EMAIL'), (later.id, 'IN_APP'), (later.id, 'EMAIL'),
+        })
+        # A day ahead, or straight away when the appointment is sooner than that
+        self.assertEqual(self.reminders(object_id=later.id).first().scheduled_for, self.now + timedelta(hours=2))
+        self.assertEqual(self.reminders(object_id=soon.id).first().scheduled_for, self.now)
+        self.assertIn('House', self.reminders().first().title)
+
+    def test_rerunning_does_not_duplicate_reminders(self):
+        make_appointment(self.doctor, self.patient, self.now + timedelta(hours=5))
+        scheduler = ReminderScheduler()
+        self.assertEqual(scheduler.run(now=self.now), 2)
+        self.assertEqual(scheduler.run(now=self.now + timedelta(minutes=1)), 0)
+        self.assertEqual(self.reminders().count(), 2)
+
+    def test_opted_out_patients_get_no_reminder(self):
+        NotificationPreference.objects.create(user=self.patient.user, appointment_reminders=False)
+        make_appointment(self.doctor, self.patient, self.now + timedelta(hours=5))
+        self.assertEqual(ReminderScheduler().run(now=self.now), 0)
+
+    def test_quiet_hours_defer_the_reminder(self):
+        NotificationPreference.objects.create(user=self.patient.user, do_not_disturb_start=time(7),
+                                              do_not_disturb_end=time(9), appointment_delivery_methods=['EMAIL'])
+        make_appointment(self.doctor, self.patient, self.now + timedelta(hours=5))
+        ReminderScheduler().run(now=self.now)
+        self.assertEqual(self.reminders().get().scheduled_for, self.now + timedelta(hours=1))
+
+    def test_cancelling_discards_pending_reminders(self):
+        appointment = make_appointment(self.doctor, self.patient, self.now + timedelta(hours=5))
+        ReminderScheduler().run(now=self.now)
+        appointment.status = 'CANCELLED'
+        appointment.save()
+        self.assertFalse(self.reminders().exists())
+
+
+class ScriptedBackend(BaseChannelBackend):
+    provider = 'scripted'
+
+    def __init__(self, channel, error=None, retryable=True):
+        self.channel = channel
+        self.error = error
+        self.retryable = retryable
+        self.sent = []
+
+    def send(self, notification):
+        if self.error:
+            return self.failure(notification, self.error, retryable=self.retryable)
+        self.sent.append(notification.id)
+        return DeliveryResult(notification_id=notification.id, status='SENT',
+                              recipient_address=self.recipient_address(notification))
+
+
+class NotificationDispatcherTests(TestCase):
+    def setUp(self):
+        self.user = make_user('pat', is_patient=True)
+        self.email = ScriptedBackend('EMAIL')
+        self.dispatcher = NotificationDispatcher(backends={'EMAIL': self.email, 'IN_APP': ScriptedBackend('IN_APP')})
+        self.addCleanup(self.dispatcher.shutdown)
+
+    def notify(self, method='EMAIL', **kwargs):
+        return Notification.objects.create(recipient=self.user, notification_type='SYSTEM', title='Hello',
+                                           message='World', delivery_method=method, **kwargs)
+
+    def test_due_notifications_are_sent_and_logged(self):
+        due = self.notify()
+        self.notify(scheduled_for=timezone.now() + timedelta(hours=1))
+        self.assertEqual(self.dispatcher.dispatch_once(), 1)
+        due.refresh_from_db()
+        self.assertTrue(due.is_delivered)
+        self.assertEqual((due.delivery_attempts, due.next_attempt_at), (1, None))
+        self.assertEqual(self.email.sent, [due.id])
+        self.assertEqual(NotificationLog.objects.get(notification=due).status, 'SENT')
+
+    def test_expired_notifications_are_not_sent(self):
+        self.notify(expires_at=timezone.now() - timedelta(minutes=1))
+        pending = self.notify(expires_at=timezone.now() + timedelta(hours=1))
+        self.assertEqual(self.dispatcher.dispatch_once(), 1)
+        self.assertEqual(self.email.sent, [pending.id])
+        # Scheduled past its expiry, so it is never due
+        now = timezone.now()
+        self.notify(scheduled_for=now + timedelta(hours=1), expires_at=now + timedelta(minutes=30))
+        self.assertEqual(self.dispatcher.claim_batch(now=now + timedelta(hours=2)), [])
+
+    def test_claimed_notifications_are_leased(self):
+        self.notify()
+        self.assertEqual(len(self.dispatcher.claim_batch()), 1)
+        self.assertEqual(self.dispatcher.claim_batch(), [])
+        self.assertEqual(len(self.dispatcher.claim_batch(now=timezone.now() + timedelta(minutes=6))), 1)
+
+    def test_retryable_failures_back_off_exponentially(self):
+        self.email.error = 'Provider unavailable'
+        notification = self.notify()
+        self.dispatcher.dispatch_once()
+        notification.refresh_from_db()
+        self.assertFalse(notification.is_delivered)
+        self.assertAlmostEqual((notification.next_attempt_at - notification.last_delivery_attempt).total_seconds(),
+                               30, delta=1)
+        self.assertEqual(self.dispatcher.dispatch_once(), 0)
+        self.assertEqual(self.dispatcher.retry_delay(3), timedelta(seconds=120))
+        self.assertEqual(self.dispatcher.retry_delay(20), timedelta(hours=1))
+
+    def test_last_attempt_is_dead_lettered(self):
+        self.email.error = 'Provider unavailable'
+        notification = self.notify()
+        Notification.objects.filter(id=notification.id).update(
+            delivery_attempts=self.dispatcher.max_attempts - 1, next_attempt_at=timezone.now()
+        )
+        self.dispatcher.dispatch_once()
+        notification.refresh_from_db()
+        self.assertEqual((notification.is_delivered, notification.next_attempt_at), (False, None))
+        self.assertEqual(self.dispatcher.claim_batch(now=timezone.now() + timedelta(days=1)), [])
+
+    def test_channels_without_a_backend_fail_permanently(self):
+        notification = self.notify(method='SMS')
+        self.dispatcher.dispatch_once()
+        notification.refresh_from_db()
+        self.assertIsNone(notification.next_attempt_at)
+        self.assertIn('No backend configured', NotificationLog.objects.get(notification=notification).error_details)
+
+    def test_scheduled_in_app_notifications_reach_the_inbox_when_delivered(self):
+        InboxService().recount(self.user)
+        notification = self.notify(method='IN_APP', scheduled_for=timezone.now() - timedelta(minutes=1))
+        self.assertEqual(InboxService().unread_count(self.user), 0)
+        self.dispatcher.dispatch_once()
+        self.assertEqual(InboxService().unread_count(self.user), 1)
+        self.assertTrue(InboxService().inbox(self.user).filter(id=notification.id).exists())
+
+
+class TemplateRegistryTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.registry = TemplateRegistry()
+        self.template = NotificationTemplate.objects.create(
+            name='Lab result', template_type='LAB_RESULT_READY', notification_type='LAB_RESULT',
+            title_template='Results for {patient_name}', message_template='{test_name} is ready ({count:03d})',
+            available_variables=['patient_name', 'test_name', 'count'],
+        )
+
+    def test_renders_with_missing_values_left_empty(self):
+        compiled = self.registry.get('LAB_RESULT_READY')
+        self.assertEqual(compiled.render({'patient_name': 'Pat', 'count': 7}),
+                         {'title': 'Results for Pat', 'message': ' is ready (007)', 'action_url': ''})
+
+    def test_placeholders_must_be_declared_plain_names(self):
+        with self.assertRaises(TemplateError):
+            compile_format('{user.password}')
+        with self.assertRaises(TemplateError):
+            compile_format('{secret}', allowed={'name'})
+        self.assertEqual(compile_format('No placeholders')({}), 'No placeholders')
+
+    def test_warm_lookups_need_no_queries_and_reuse_the_compiled_template(self):
+        first = self.registry.get('LAB_RESULT_READY')
+        with self.assertNumQueries(0):
+            self.assertIs(self.registry.get('LAB_RESULT_READY'), first)
+
+    def test_saving_a_template_recompiles_it(self):
+        self.registry.get('LAB_RESULT_READY')
+        self.template.title_template = 'New results for {patient_name}'
+        self.template.save()
+        self.assertEqual(self.registry.get('LAB_RESULT_READY').render({'patient_name': 'Pat'})['title'],
+                         'New results for Pat')
+
+    def test_inactive_and_missing_templates(self):
+        self.template.is_active = False
+        self.template.save()
+        self.assertIsNone(self.registry.get('LAB_RESULT_READY'))
+        self.assertIsNone(self.registry.get('WELCOME_MESSAGE'))
+        fallback = self.registry.get('WELCOME_MESSAGE', fallback=dict(
+            ReminderScheduler.DEFAULT_TEMPLATE, title_template='Welcome {name}'
+        ))
+        self.assertEqual(fallback.render({'name': 'Pat'})['title'], 'Welcome Pat')
+
+
+class NotificationInboxTests(TestCase):
+    def setUp(self):
+        self.user = make_user('pat', is_patient=True)
+        self.other = make_user('other', is_patient=True)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.service = InboxService()
+
+    def notify(self, recipient=None, **kwargs):
+        return Notification.objects.create(recipient=recipient or self.user, notification_type='SYSTEM',
+                                           title='Hello', message='World', **kwargs)
+
+    def unread_count(self):
+        return self.client.get('/api/notifications/unread-count/').data['unread_count']
+
+    def test_inbox_lists_own_visible_notifications_newest_first(self):
+        older, newer = self.notify(), self.notify()
+        self.notify(delivery_method='EMAIL')
+        self.notify(scheduled_for=timezone.now() + timedelta(hours=1))
+        self.notify(recipient=self.other)
+        response = self.client.get('/api/notifications/')
+        self.assertEqual([row['id'] for row in response.data['results']], [newer.id, older.id])
+
+    def test_unread_filter(self):
+        self.notify(is_read=True)
+        unread = self.notify()
+        response = self.client.get('/api/notifications/', {'unread': 'true'})
+        self.assertEqual([row['id'] for row in response.data['results']], [unread.id])
+
+    def test_counter_follows_new_read_and_deleted_notifications(self):
+        self.notify()
+        self.assertEqual(self.unread_count(), 1)
+        second, third = self.notify(), self.notify()
+        with self.assertNumQueries(1):
+            self.assertEqual(self.service.unread_count(self.user), 3)
+
+        response = self.client.post('/api/notifications/mark-read/', {'ids': [second.id]}, format='json')
+        self.assertEqual(response.data, {'marked_read': 1, 'unread_count': 2})
+        third.delete()
+        self.assertEqual(self.unread_count(), 1)
+
+    def test_mark_all_read_only_touches_own_inbox(self):
+        self.notify(), self.notify()
+        foreign = self.notify(recipient=self.other)
+        response = self.client.post('/api/notifications/mark-read/', {'all': True}, format='json')
+        self.assertEqual(response.data, {'marked_read': 2, 'unread_count': 0})
+        foreign.refresh_from_db()
+        self.assertFalse(foreign.is_read)
+
+    def test_mark_read_needs_ids_or_all(self):
+        self.assertEqual(self.client.post('/api/notifications/mark-read/', {}, format='json').status_code, 400)
+
+    def test_archiving_expired_notifications_updates_the_counter(self):
+        self.notify()
+        self.notify(expires_at=timezone.now() - timedelta(minutes=1))
+        self.notify(expires_at=timezone.now() - timedelta(minutes=1), is_read=True)
+        self.assertEqual(self.unread_count(), 2)
+        self.assertEqual(self.service.archive_expired(batch_size=1), 2)
+        self.assertEqual(self.unread_count(), 1)
+        self.assertEqual(self.service.recount(self.user), 1)
+
+
+@override_settings(NOTIFICATION_CONFIG=dict(
+    settings.NOTIFICATION_CONFIG, REALTIME_HEARTBEAT_SECONDS=0.1, REALTIME_POLL_SECONDS=0.05,
+    REALTIME_STREAM_MAX_SECONDS=0.5,
+))
+class NotificationStreamTests(TestCase):
+    def setUp(self):
+        self.user = make_user('pat', is_patient=True)
+        self.async_client.force_login(self.user)
+
+    def notify(self, **kwargs):
+        return Notification.objects.create(recipient=self.user, notification_type='SYSTEM', title='Hello',
+                                           message='World', **kwargs)
+
+    async def open_stream(self, **headers):
+        response = await self.async_client.get('/api/notifications/stream/', headers=headers)
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        stream = response.streaming_content.__aiter__()
+        self.assertTrue((await stream.__anext__()).startswith(b'retry:'))
+        return stream
+
+    @staticmethod
+    async def read(stream):
+        return b''.join([chunk async for chunk in stream])
+
+    async def test_requires_authentication(self):
+        response = await AsyncClient().get('/api/notifications/stream/')
+        self.assertEqual(response.status_code, 401)
+
+    async def test_reconnect_replays_missed_notifications(self):
+        seen, missed = await sync_to_async(self.notify)(), await sync_to_async(self.notify)()
+        body = await self.read(await self.open_stream(**{'Last-Event-ID': str(seen.id)}))
+        self.assertIn(f'id: {missed.id}\n'.encode(), body)
+        self.assertNotIn(f'id: {seen.id}\n'.encode(), body)
+        self.assertEqual(body.count(f'id: {missed.id}\n'.encode()), 1)
+
+    async def test_notifications_committed_elsewhere_are_polled(self):
+        stream = await self.open_stream()
+        notification = await sync_to_async(self.notify)(priority='HIGH')
+        body = await self.read(stream)
+        self.assertEqual(body.count(f'id: {notification.id}\n'.encode()), 1)
+        self.assertIn(b': keepalive', body)
+
+    async def test_without_the_poll_fallback_only_pushed_events_arrive(self):
+        config = dict(settings.NOTIFICATION_CONFIG, REALTIME_POLL_SECONDS=None)
+        with self.settings(NOTIFICATION_CONFIG=config):
+            stream = await self.open_stream()
+            await sync_to_async(self.notify)()
+            get_broker().publish(self.user.id, {'id': 10 ** 6, 'event': 'notification', 'data': '{}'})
+            body = await self.read(stream)
+        self.assertEqual(body.count(b'id: '), 1)
+        self.assertIn(f'id: {10 ** 6}\n'.encode(), body)
+
+    async def test_published_events_are_pushed(self):
+        stream = await self.open_stream()
+        get_broker().publish(self.user.id, {'id': 10 ** 6, 'event': 'urgent', 'data': '{}'})
+        self.assertEqual(await stream.__anext__(), f'id: {10 ** 6}\nevent: urgent\ndata: {{}}\n\n'.encode())
+        await self.read(stream)
+        self.assertEqual(get_broker().subscriber_count(self.user.id), 0)
+
+    async def test_events_published_from_another_thread_are_pushed(self):
+        stream = await self.open_stream()
+        # Publishing happens in on_commit, on whichever thread ran the sync code
+        await sync_to_async(get_broker().publish, thread_sensitive=False)(
+            self.user.id, {'id': 10 ** 6, 'event': 'notification', 'data': '{}'}
+        )
+        self.assertIn(f'id: {10 ** 6}\n'.encode(), await stream.__anext__())
+        await self.read(stream)
+
+
+class PreferenceResolverTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = make_user('pat', is_patient=True)
+        self.resolver = PreferenceResolver()
+        self.noon = timezone.make_aware(datetime(2030, 1, 15, 12))
+
+    def test_users_without_preferences_get_the_defaults(self):
+        plan = self.resolver.resolve([self.user.id], 'APPOINTMENT', send_at=self.noon)[self.user.id]
+        self.assertEqual((plan.channels, plan.send_at, plan.deferred), (('IN_APP', 'EMAIL'), self.noon, False))
+
+    def test_opt_outs_and_channel_limits(self):
+        NotificationPreference.objects.create(user=self.user, billing_notifications=False,
+                                              medical_delivery_methods=['SMS', 'EMAIL'])
+        self.assertEqual(self.resolver.resolve([self.user.id], 'BILLING'), {})
+        plan = self.resolver.resolve([self.user.id], 'LAB_RESULT', channels=['EMAIL', 'IN_APP'])[self.user.id]
+        self.assertEqual(plan.channels, ('EMAIL',))
+
+    def test_emergencies_bypass_opt_outs_and_quiet_hours(self):
+        NotificationPreference.objects.create(user=self.user, system_updates=False,
+                                              do_not_disturb_start=time(11), do_not_disturb_end=time(13))
+        plan = self.resolver.resolve([self.user.id], 'SYSTEM', send_at=self.noon, priority='CRITICAL')[self.user.id]
+        self.assertEqual(plan.send_at, self.noon)
+        plan = self.resolver.resolve([self.user.id], 'EMERGENCY', send_at=self.noon)[self.user.id]
+        self.assertEqual(plan.channels, ('IN_APP', 'EMAIL', 'SMS', 'PUSH'))
+
+    def test_quiet_hours_in_the_recipients_timezone(self):
+        # 22:00-07:00 in New York; noon UTC is 07:00 there, 01:00 UTC is 20:00
+        late = timezone.make_aware(datetime(2030, 1, 15, 4))
+        self.assertEqual(defer_for_quiet_hours(late, time(22), time(7), 'America/New_York'), self.noon)
+        early = timezone.make_aware(datetime(2030, 1, 15, 1))
+        self.assertEqual(defer_for_quiet_hours(early, time(22), time(7), 'America/New_York'), early)
+        # Deferring past the deadline pulls the send forward to just before quiet hours
+        self.assertEqual(
+            defer_for_quiet_hours(late, time(22), time(7), 'America/New_York', deadline=late + timedelta(hours=2)),
+            timezone.make_aware(datetime(2030, 1, 15, 2, 59)),
+        )
+
+    def test_cached_preferences_are_dropped_on_save(self):
+        preference = NotificationPreference.objects.create(user=self.user)
+        self.resolver.load([self.user.id])
+        with self.assertNumQueries(0):
+            self.resolver.load([self.user.id])
+        preference.appointment_reminders = False
+        preference.save()
+        self.assertFalse(self.resolver.load([self.user.id])[self.user.id]['appointment_reminders'])
+
+    def test_cache_lifetime_is_configurable(self):
+        config = dict(settings.NOTIFICATION_CONFIG, PREFERENCE_CACHE_SECONDS=5)
+        with override_settings(NOTIFICATION_CONFIG=config):
+            self.assertEqual(PreferenceResolver().cache_timeout, 5)
@@ -0,0 +1,12 @@
+from django.urls import path
+from . import views
+
+urlpatterns = [
+    # Inbox
+    path('', views.NotificationInboxView.as_view(), name='notification-inbox'),
+    path('unread-count/', views.UnreadCountView.as_view(), name='notification-unread-count'),
+    path('mark-read/', views.MarkReadView.as_view(), name='notification-mark-read'),
+
+    # Real-time push (server-sent events)
+    path('stream/', views.notification_stream, name='notification-stream'),
+]
@@ -0,0 +1,156 @@
+# BE/notifications/views.py
+import math
+import time
+from datetime import timedelta
+
+from asgiref.sync import sync_to_async
+from django.db.models import Q
+from django.http import JsonResponse, StreamingHttpResponse
+from django.utils import timezone
+from rest_framework import generics
+from rest_framework.request import Request
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.views import APIView
+
+from shared.utils.pagination import NotificationInboxPagination
+from .serializers import NotificationSerializer, MarkReadSerializer
+from .services.inbox import InboxService
+from .services.realtime import get_broker, notification_event
+from .services.reminders import get_notification_config
+
+
+class NotificationInboxView(generics.ListAPIView):
+    """The user's in-app notifications, newest first; ?unread=true limits to unread"""
+    serializer_class = NotificationSerializer
+    pagination_class = NotificationInboxPagination
+
+    def get_queryset(self):
+        queryset = InboxService().inbox(self.request.user)
+        if self.request.query_params.get('unread') in ('1', 'true'):
+            queryset = queryset.filter(is_read=False)
+        return queryset
+
+
+class UnreadCountView(APIView):
+    """Badge count from the per-user counter"""
+
+    def get(self, request):
+        return Response({'unread_count': InboxService().unread_count(request.user)})
+
+
+class MarkReadView(APIView):
+    """Mark a list of notifications (or the whole inbox) as read"""
+
+    def post(self, request):
+        serializer = MarkReadSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        service = InboxService()
+        ids = None if serializer.validated_data['all'] else serializer.validated_data['ids']
+        updated = service.mark_read(request.user, ids)
+
+        return Response({'marked_read': updated, 'unread_count': service.unread_count(request.user)})
+
+
+def _authenticate(request):
+    """Resolve the user with the same authenticators as the API views"""
+    authenticators = [auth() for auth in api_settings.DEFAULT_AUTHENTICATION_CLASSES]
+    return Request(request, authenticators=authenticators).user
+
+
+def _missed_events(user, last_event_id, limit):
+    notifications = InboxService().inbox(user).filter(id__gt=last_event_id).order_by('id')[:limit]
+    return [notification_event(notification) for notification in notifications]
+
+
+def _recent_events(user, since, limit):
+    """Inbox notifications created, or delivered if scheduled, at or after ``since``"""
+    notifications = InboxService().inbox(user).filter(
+        Q(created_at__gte=since) | Q(delivered_at__gte=since)
+    ).order_by('id')[:limit]
+    return [notification_event(notification) for notification in notifications]
+
+
+def _format_event(event):
+    return f"id: {event['id']}\nevent: {event['event']}\ndata: {event['data']}\n\n"
+
+
+async def notification_stream(request):
+    """
+    Server-sent event stream of the user's new inbox notifications.
+
+    An async view, served by the ASGI application: an open stream awaits the
+    broker instead of holding a worker thread. Notifications are pushed as
+    soon as they commit; with a shared broker (``RedisBroker``) that includes
+    ones committed by other processes and nodes. With the single-node
+    ``InProcessBroker``, set ``REALTIME_POLL_SECONDS`` to also poll the inbox
+    for notifications committed elsewhere (e.g. by the dispatcher). Clients
+    reconnect with ``Last-Event-ID`` (EventSource does this itself) and receive
+    what they missed from the inbox first. Streams are closed after
+    ``REALTIME_STREAM_MAX_SECONDS`` so abandoned connections are released.
+    """
+    user = await sync_to_async(_authenticate)(request)
+    if not user.is_authenticated:
+        return JsonResponse({"detail": "Authentication credentials were not provided."}, status=401)
+
+    config = get_notification_config()
+    heartbeat = config.get('REALTIME_HEARTBEAT_SECONDS', 15)
+    poll_interval = config.get('REALTIME_POLL_SECONDS')
+    max_duration = config.get('REALTIME_STREAM_MAX_SECONDS', 60 * 5)
+    limit = config.get('REALTIME_REPLAY_LIMIT', 50)
+    try:
+        last_event_id = int(request.headers.get('Last-Event-ID') or request.GET.get('last_event_id') or 0)
+    except ValueError:
+        last_event_id = 0
+
+    async def events():
+        # Subscribe and start the poll window before replaying so nothing in between is lost
+        subscription = await get_broker().subscribe(user.id)
+        since = timezone.now()
+        sent = set()
+
+        def unsent(batch):
+            chunks = []
+            for event in batch:
+                if event['id'] not in sent:
+                    sent.add(event['id'])
+                    chunks.append(_format_event(event))
+            return ''.join(chunks)
+
+        try:
+            yield f"retry: {heartbeat * 1000}\n\n"
+            if last_event_id:
+                missed = unsent(await sync_to_async(_missed_events)(user, last_event_id, limit))
+                if missed:
+                    yield missed
+
+            now = time.monotonic()
+            deadline = now + max_duration
+            next_poll = now + poll_interval if poll_interval else math.inf
+            next_heartbeat = now + heartbeat
+            while now < deadline:
+                event = await subscription.get(timeout=max(min(next_poll, next_heartbeat, deadline) - now, 0))
+                chunks = unsent([event]) if event is not None else ''
+
+                now = time.monotonic()
+                if now >= next_poll:
+                    # Overlap the previous window so rows committed late are still seen
+                    polled_at = timezone.now()
+                    chunks += unsent(await sync_to_async(_recent_events)(user, since, limit))
+                    since = polled_at - timedelta(seconds=poll_interval)
+                    next_poll = now + poll_interval
+
+                if chunks:
+                    next_heartbeat = now + heartbeat
+                    yield chunks
+                elif now >= next_heartbeat:
+                    next_heartbeat = now + heartbeat
+                    yield ": keepalive\n\n"
+        finally:
+            await subscription.close()
+
+    response = StreamingHttpResponse(events(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
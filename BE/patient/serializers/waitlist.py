@@ -0,0 +1,25 @@
+# BE/patient/serializers/waitlist.py
+from rest_framework import serializers
+from doctor.models.waitlist import WaitlistEntry
+
+class WaitlistEntrySerializer(serializers.ModelSerializer):
+    doctor_details = serializers.SerializerMethodField()
+
+    class Meta:
+        model = WaitlistEntry
+        fields = ['id', 'doctor', 'date', 'reason', 'status', 'offered_schedule', 'offered_time',
+                  'offer_expires_at', 'appointment', 'created_at', 'doctor_details']
+        read_only_fields = ['status', 'offered_schedule', 'offered_time', 'offer_expires_at',
+                            'appointment', 'created_at', 'doctor_details']
+
+    def get_doctor_details(self, obj):
+        return {
+            'name': f"{obj.doctor.user.first_name} {obj.doctor.user.last_name}",
+            'specialization': obj.doctor.specialization
+        }
+
+    def validate_date(self, value):
+        from django.utils import timezone
+        if value < timezone.localdate():
+            raise serializers.ValidationError("Cannot join the waitlist for a past date")
+        return value
@@ -0,0 +1,76 @@
+# BE/patient/services/booking.py
+from datetime import datetime, timedelta
+
+from django.db import transaction
+
+from doctor.models.schedule import Appointment, Schedule
+
+
+class SlotTaken(Exception):
+    """The slot already has a confirmed appointment"""
+
+
+class BookingService:
+    """Slot arithmetic and appointment creation shared by booking and waitlist views"""
+
+    @staticmethod
+    def lock_schedule(schedule):
+        """
+        Lock the schedule row for the rest of the transaction.
+
+        Bookings and waitlist offers for a schedule take this lock before
+        checking a slot, so two of them can't both see it as free.
+        """
+        return Schedule.objects.select_for_update().select_related('doctor').get(id=schedule.id)
+
+    @staticmethod
+    def is_booked(schedule, start_time):
+        return Appointment.objects.filter(schedule=schedule, time=start_time, status='CONFIRMED').exists()
+
+    def book(self, patient, schedule, start_time, reason=''):
+        with transaction.atomic():
+            schedule = self.lock_schedule(schedule)
+            if self.is_booked(schedule, start_time):
+                raise SlotTaken(f"{schedule.date} {start_time} is already booked")
+
+            end_time_dt = datetime.combine(datetime.today(), start_time) + timedelta(minutes=schedule.slot_duration)
+
+            appointment = Appointment.objects.create(
+                patient=patient,
+                doctor=schedule.doctor,
+                schedule=schedule,
+                date=schedule.date,
+                time=start_time,
+                end_time=end_time_dt.time(),
+                reason=reason
+            )
+
+            self.refresh_availability(schedule)
+        return appointment
+
+    def has_available_slots(self, schedule):
+        booked_slots = Appointment.objects.filter(
+            schedule=schedule,
+            status='CONFIRMED'
+        ).count()
+
+        return booked_slots < self.total_slots(schedule)
+
+    def refresh_availability(self, schedule):
+        """Mark the schedule bookable exactly when it still has a free slot"""
+        is_available = self.has_available_slots(schedule)
+        if schedule.is_available != is_available:
+            schedule.is_available = is_available
+            schedule.save(update_fields=['is_available'])
+
+    @staticmethod
+    def total_slots(schedule):
+        total_minutes = (datetime.combine(datetime.min, schedule.end_time) -
+                         datetime.combine(datetime.min, schedule.start_time)).seconds / 60
+        return int(total_minutes // schedule.slot_duration)
+
+    @staticmethod
+    def slot_times(schedule):
+        start = datetime.combine(datetime.min, schedule.start_time)
+        duration = timedelta(minutes=schedule.slot_duration)
+        return [(start + duration * index).time() for index in range(BookingService.total_slots(schedule))]
@@ -1,5 +1,5 @@
 from django.urls import path
-from .views import booking, appointments
+from .views import booking, appointments, waitlist
 
 urlpatterns = [
     # Doctor discovery and booking
@@ -10,4 +10,9 @@ urlpatterns = [
     # Patient appointments
     path('appointments/', appointments.PatientAppointmentListView.as_view(), name='patient-appointments'),
     path('appointments/<int:appointment_id>/cancel/', appointments.CancelAppointmentView.as_view(), name='cancel-appointment'),
+
+    # Waitlist
+    path('waitlist/', waitlist.PatientWaitlistView.as_view(), name='patient-waitlist'),
+    path('waitlist/<int:entry_id>/', waitlist.WaitlistEntryDetailView.as_view(), name='waitlist-entry'),
+    path('waitlist/<int:entry_id>/accept/', waitlist.AcceptWaitlistOfferView.as_view(), name='accept-waitlist-offer'),
 ]
\ No newline at end of file
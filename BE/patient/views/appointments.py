@@ -9,6 +9,10 @@ from doctor.models.schedule import Schedule, Appointment
 # Change this line:
 from ..serializers.appointment import ScheduleSerializer, AppointmentSerializer
 from rest_framework import serializers
+from shared.utils.pagination import AppointmentCursorPagination
+from django.db import transaction
+from doctor.services.waitlist import WaitlistService
+from ..services.booking import BookingService
 
 # Get models.py dynamically to avoid import issues
 def get_user_models():
@@ -132,12 +136,13 @@ class BookAppointmentView(APIView):
 # Patient Appointment Management
 class PatientAppointmentListView(generics.ListAPIView):
     serializer_class = AppointmentSerializer
+    pagination_class = AppointmentCursorPagination
 
     def get_queryset(self):
         if self.request.user.is_patient:
             User, Doctor, Patient = get_user_models()
             patient = Patient.objects.get(user=self.request.user)
-            return Appointment.objects.filter(patient=patient)
+            return Appointment.objects.filter(patient=patient).select_related('patient__user', 'doctor__user')
         return Appointment.objects.none()
 
 # Doctor Appointment Management
@@ -168,23 +173,17 @@ class CancelAppointmentView(APIView):
             else:
                 return Response({"detail": "Unauthorized"}, status=status.HTTP_403_FORBIDDEN)
 
+            was_confirmed = appointment.status == 'CONFIRMED'
             appointment.status = 'CANCELLED'
             appointment.save()
 
-            # If this was the only booked slot, make schedule available again
-            self._update_schedule_availability(appointment.schedule)
+            # The freed slot makes the schedule bookable again and is offered to the waitlist
+            schedule = appointment.schedule
+            BookingService().refresh_availability(schedule)
+            if was_confirmed:
+                transaction.on_commit(lambda: WaitlistService().offer_freed_slot(schedule, appointment.time))
 
             return Response(AppointmentSerializer(appointment).data)
 
         except Appointment.DoesNotExist:
-            return Response({"detail": "Appointment not found"}, status=status.HTTP_404_NOT_FOUND)
-
-    def _update_schedule_availability(self, schedule):
-        active_appointments = Appointment.objects.filter(
-            schedule=schedule,
-            status='CONFIRMED'
-        ).count()
-
-        if active_appointments == 0:
-            schedule.is_available = True
-            schedule.save()
\ No newline at end of file
+            return Response({"detail": "Appointment not found"}, status=status.HTTP_404_NOT_FOUND)
\ No newline at end of file
@@ -2,14 +2,17 @@
 from rest_framework import status, generics, permissions, filters
 from rest_framework.response import Response
 from rest_framework.views import APIView
+from django.db import transaction
 from django.db.models import Q
-from datetime import datetime, timedelta
+from datetime import datetime
 from django.apps import apps
 from doctor.models.schedule import Schedule, Appointment
 # Change this line:
 from ..serializers.appointment import ScheduleSerializer, AppointmentSerializer
 from rest_framework import serializers
 from rest_framework.permissions import AllowAny
+from doctor.services.waitlist import WaitlistService
+from ..services.booking import BookingService, SlotTaken
 
 # Get models.py dynamically to avoid import issues
 def get_user_models():
@@ -96,41 +99,27 @@ class BookAppointmentView(APIView):
             return Response({"detail": "Schedule not found or not available"},
                             status=status.HTTP_404_NOT_FOUND)
 
-        # Calculate end time based on slot duration
         start_time = datetime.strptime(slot_time, '%H:%M').time()
-        end_time_dt = datetime.combine(datetime.today(), start_time) + timedelta(minutes=schedule.slot_duration)
-        end_time = end_time_dt.time()
 
-        # Create appointment
-        appointment = Appointment.objects.create(
-            patient=patient,
-            doctor=schedule.doctor,
-            schedule=schedule,
-            date=schedule.date,
-            time=start_time,
-            end_time=end_time,
-            reason=request.data.get('reason', '')
-        )
+        booking = BookingService()
+        waitlist = WaitlistService()
+        with transaction.atomic():
+            schedule = booking.lock_schedule(schedule)
 
-        # If this slot makes the schedule fully booked, mark it unavailable
-        if not self._has_available_slots(schedule):
-            schedule.is_available = False
-            schedule.save()
+            # Freed slots are held for waitlisted patients until their offer expires
+            if waitlist.is_held_for_other(schedule, start_time, patient):
+                return Response({"detail": "This slot is currently held for a waitlisted patient"},
+                                status=status.HTTP_409_CONFLICT)
 
-        return Response(AppointmentSerializer(appointment).data, status=status.HTTP_201_CREATED)
+            # Create appointment; the schedule is marked unavailable once fully booked
+            try:
+                appointment = booking.book(patient, schedule, start_time, request.data.get('reason', ''))
+            except SlotTaken:
+                return Response({"detail": "This slot has already been booked"},
+                                status=status.HTTP_409_CONFLICT)
+            waitlist.mark_booked(schedule, start_time, patient, appointment)
 
-    def _has_available_slots(self, schedule):
-        # Check if there are still available time slots in this schedule
-        booked_slots = Appointment.objects.filter(
-            schedule=schedule,
-            status='CONFIRMED'
-        ).count()
-
-        total_minutes = (datetime.combine(datetime.min, schedule.end_time) -
-                         datetime.combine(datetime.min, schedule.start_time)).seconds / 60
-        total_slots = total_minutes / schedule.slot_duration
-
-        return booked_slots < total_slots
+        return Response(AppointmentSerializer(appointment).data, status=status.HTTP_201_CREATED)
 
 # Patient Appointment Management
 class PatientAppointmentListView(generics.ListAPIView):
@@ -0,0 +1,95 @@
+# BE/patient/views/waitlist.py
+from rest_framework import status, generics
+from rest_framework.response import Response
+from rest_framework.views import APIView
+from django.db import transaction
+from django.utils import timezone
+from doctor.models.waitlist import WaitlistEntry
+from doctor.services.waitlist import WaitlistService
+from shared.models import Patient
+from ..serializers.appointment import AppointmentSerializer
+from ..serializers.waitlist import WaitlistEntrySerializer
+from ..services.booking import BookingService, SlotTaken
+
+
+class PatientWaitlistView(generics.ListCreateAPIView):
+    """List the patient's active waitlist entries or join a doctor-day waitlist"""
+    serializer_class = WaitlistEntrySerializer
+    pagination_class = None
+
+    def get_queryset(self):
+        if self.request.user.is_patient:
+            return WaitlistEntry.objects.filter(
+                patient__user=self.request.user,
+                status__in=WaitlistEntry.ACTIVE_STATUSES
+            ).select_related('doctor__user')
+        return WaitlistEntry.objects.none()
+
+    def create(self, request, *args, **kwargs):
+        if not request.user.is_patient:
+            return Response({"detail": "Only patients can join a waitlist"},
+                            status=status.HTTP_403_FORBIDDEN)
+
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        patient = Patient.objects.get(user=request.user)
+        entry, created = WaitlistService().join(
+            patient,
+            serializer.validated_data['doctor'],
+            serializer.validated_data['date'],
+            serializer.validated_data.get('reason', '')
+        )
+        entry.refresh_from_db()
+
+        return Response(WaitlistEntrySerializer(entry).data,
+                        status=status.HTTP_201_CREATED if created else status.HTTP_200_OK)
+
+
+class WaitlistEntryDetailView(APIView):
+    """Leave the waitlist; a held slot is passed to the next patient"""
+
+    def delete(self, request, entry_id):
+        try:
+            entry = WaitlistEntry.objects.select_related('offered_schedule').get(
+                id=entry_id,
+                patient__user=request.user,
+                status__in=WaitlistEntry.ACTIVE_STATUSES
+            )
+        except WaitlistEntry.DoesNotExist:
+            return Response({"detail": "Waitlist entry not found"}, status=status.HTTP_404_NOT_FOUND)
+
+        WaitlistService().cancel(entry)
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+class AcceptWaitlistOfferView(APIView):
+    """Book the slot currently held for the patient"""
+
+    def post(self, request, entry_id):
+        with transaction.atomic():
+            try:
+                entry = WaitlistEntry.objects.select_for_update().select_related(
+                    'patient', 'offered_schedule__doctor'
+                ).get(id=entry_id, patient__user=request.user)
+            except WaitlistEntry.DoesNotExist:
+                return Response({"detail": "Waitlist entry not found"}, status=status.HTTP_404_NOT_FOUND)
+
+            if entry.status != 'OFFERED' or entry.offered_schedule is None:
+                return Response({"detail": "There is no slot on offer for this entry"},
+                                status=status.HTTP_409_CONFLICT)
+            if entry.offer_expires_at <= timezone.now():
+                return Response({"detail": "This offer has expired"}, status=status.HTTP_410_GONE)
+
+            try:
+                appointment = BookingService().book(
+                    entry.patient, entry.offered_schedule, entry.offered_time, entry.reason
+                )
+            except SlotTaken:
+                return Response({"detail": "This slot has already been booked"},
+                                status=status.HTTP_409_CONFLICT)
+            entry.status = 'BOOKED'
+            entry.appointment = appointment
+            entry.save(update_fields=['status', 'appointment', 'updated_at'])
+
+        return Response(AppointmentSerializer(appointment).data, status=status.HTTP_201_CREATED)
@@ -1,5 +1,9 @@
 from django.contrib import admin
-from .models import Pharmacy, Medication, PharmacyInventory, Prescription
+from .models import (
+    AllergyRule, DrugInteraction, InventoryMovement, Medication, Pharmacy, PharmacyInventory, Prescription,
+    PrescriptionAlert,
+)
+from .services.inventory import InventoryLedger
 
 @admin.register(Pharmacy)
 class PharmacyAdmin(admin.ModelAdmin):
@@ -23,8 +27,55 @@ class PharmacyInventoryAdmin(admin.ModelAdmin):
         return obj.is_low_stock
     is_low_stock.boolean = True
 
+    def get_readonly_fields(self, request, obj=None):
+        # Stock only moves through the ledger once a batch exists
+        return ['quantity_in_stock'] if obj is not None else []
+
+    def save_model(self, request, obj, form, change):
+        if change:
+            return super().save_model(request, obj, form, change)
+        received, obj.quantity_in_stock = obj.quantity_in_stock, 0
+        super().save_model(request, obj, form, change)
+        if received:
+            InventoryLedger().record_receipt(obj, received, request.user, reason='Entered in admin')
+            obj.refresh_from_db(fields=['quantity_in_stock'])
+
 @admin.register(Prescription)
 class PrescriptionAdmin(admin.ModelAdmin):
     list_display = ['prescription_number', 'patient', 'doctor', 'medication', 'status', 'prescribed_date']
     list_filter = ['status', 'frequency', 'prescribed_date']
     search_fields = ['prescription_number', 'patient__user__first_name', 'patient__user__last_name']
+
+@admin.register(AllergyRule)
+class AllergyRuleAdmin(admin.ModelAdmin):
+    list_display = ['allergen', 'generic_name', 'category', 'severity', 'is_active']
+    list_filter = ['severity', 'category', 'is_active']
+    search_fields = ['allergen', 'generic_name']
+
+@admin.register(DrugInteraction)
+class DrugInteractionAdmin(admin.ModelAdmin):
+    list_display = ['drug_a', 'drug_b', 'severity', 'is_active']
+    list_filter = ['severity', 'is_active']
+    search_fields = ['drug_a', 'drug_b']
+
+@admin.register(PrescriptionAlert)
+class PrescriptionAlertAdmin(admin.ModelAdmin):
+    list_display = ['prescription', 'patient', 'kind', 'severity', 'message', 'created_at']
+    list_filter = ['kind', 'severity']
+    search_fields = ['prescription__prescription_number', 'allergen', 'condition']
+    raw_id_fields = ['prescription', 'patient', 'interacting_prescription']
+
+@admin.register(InventoryMovement)
+class InventoryMovementAdmin(admin.ModelAdmin):
+    list_display = ['inventory', 'kind', 'quantity', 'prescription', 'reason', 'performed_by', 'created_at']
+    list_filter = ['kind', 'pharmacy', 'created_at']
+    search_fields = ['inventory__batch_number', 'medication__name', 'prescription__prescription_number']
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
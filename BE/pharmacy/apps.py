@@ -4,3 +4,6 @@ class PharmacyConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'pharmacy'
     verbose_name = 'Pharmacy Management'
+
+    def ready(self):
+        from . import signals  # noqa: F401
@@ -0,0 +1,53 @@
+# BE/pharmacy/management/commands/check_prescription_safety.py
+import logging
+import time
+
+from django.core.management.base import BaseCommand
+
+from ...services.safety import PrescribingSafety, get_safety_config, rule_registry
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = 'Recheck every active prescription against the prescribing rules whenever the rule set changes'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Run a single pass and exit',
+        )
+        parser.add_argument(
+            '--interval',
+            type=int,
+            default=get_safety_config().get('CHECK_INTERVAL_SECONDS', 60),
+            help='Seconds between rule-version checks',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=get_safety_config().get('RECHECK_BATCH_SIZE', 1000),
+            help='Patients rechecked per transaction',
+        )
+
+    def handle(self, *args, **options):
+        # The first pass always runs: rules may have changed while nothing was watching
+        checked_version = None
+
+        while True:
+            try:
+                rules = rule_registry.get()
+                if rules.version != checked_version:
+                    alerts = PrescribingSafety(rules).recheck_all(options['batch_size'])
+                    checked_version = rules.version
+                    self.stdout.write(f"Rechecked active prescriptions against rules {rules.version[:12]}: "
+                                      f"{alerts} alerts")
+            except Exception as e:
+                logger.error(f"Prescription safety check failed: {e}")
+                if options['once']:
+                    raise
+
+            if options['once']:
+                break
+            time.sleep(options['interval'])
@@ -0,0 +1,26 @@
+# BE/pharmacy/management/commands/reconcile_inventory.py
+from django.core.management.base import BaseCommand
+
+from ...services.inventory import InventoryLedger
+
+
+class Command(BaseCommand):
+    help = 'Compare batch stock snapshots with their inventory ledger and report (or fix) drift'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--fix',
+            action='store_true',
+            help='Post an adjustment per drifted batch so the ledger matches its stock count',
+        )
+
+    def handle(self, *args, **options):
+        drifted = InventoryLedger().reconcile(fix=options['fix'])
+        for batch_id, snapshot, ledger in drifted[:50]:
+            self.stdout.write(f'  batch {batch_id}: {snapshot} in stock, ledger sums to {ledger}')
+        if not drifted:
+            self.stdout.write(self.style.SUCCESS('Every batch matches its ledger'))
+        elif options['fix']:
+            self.stdout.write(self.style.SUCCESS(f'Adjusted {len(drifted)} batches to their stock counts'))
+        else:
+            self.stdout.write(self.style.WARNING(f'{len(drifted)} batches drifted; rerun with --fix to adjust'))
@@ -0,0 +1,74 @@
+# Generated by Django 4.2.30 on 2026-10-19 10:20
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shared', '0003_id_sequence'),
+        ('pharmacy', '0002_business_ids'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AllergyRule',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('allergen', models.CharField(help_text="Matched case-insensitively against patients' allergen names", max_length=200)),
+                ('generic_name', models.CharField(blank=True, max_length=200)),
+                ('category', models.CharField(blank=True, choices=[('ANTIBIOTIC', 'Antibiotic'), ('PAINKILLER', 'Pain Killer'), ('ANTIVIRAL', 'Antiviral'), ('ANTIFUNGAL', 'Antifungal'), ('CARDIAC', 'Cardiac Medicine'), ('DIABETES', 'Diabetes Medicine'), ('HYPERTENSION', 'Hypertension Medicine'), ('RESPIRATORY', 'Respiratory Medicine'), ('MENTAL_HEALTH', 'Mental Health Medicine'), ('VITAMIN', 'Vitamin/Supplement'), ('OTHER', 'Other')], max_length=20)),
+                ('severity', models.CharField(choices=[('MINOR', 'Minor'), ('MODERATE', 'Moderate'), ('MAJOR', 'Major'), ('CONTRAINDICATED', 'Contraindicated')], max_length=20)),
+                ('note', models.TextField(blank=True)),
+                ('is_active', models.BooleanField(default=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'db_table': 'prescribing_allergy_rules',
+            },
+        ),
+        migrations.CreateModel(
+            name='PrescriptionAlert',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('ALLERGY', 'Allergy'), ('CONTRAINDICATION', 'Contraindication'), ('INTERACTION', 'Drug Interaction')], max_length=20)),
+                ('severity', models.CharField(choices=[('MINOR', 'Minor'), ('MODERATE', 'Moderate'), ('MAJOR', 'Major'), ('CONTRAINDICATED', 'Contraindicated')], max_length=20)),
+                ('message', models.CharField(max_length=500)),
+                ('allergen', models.CharField(blank=True, max_length=200)),
+                ('condition', models.CharField(blank=True, max_length=200)),
+                ('rules_version', models.CharField(max_length=40)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('interacting_prescription', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='pharmacy.prescription')),
+                ('patient', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='prescription_alerts', to='shared.patient')),
+                ('prescription', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='safety_alerts', to='pharmacy.prescription')),
+            ],
+            options={
+                'db_table': 'prescription_alerts',
+            },
+        ),
+        migrations.CreateModel(
+            name='DrugInteraction',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('drug_a', models.CharField(max_length=200)),
+                ('drug_b', models.CharField(max_length=200)),
+                ('severity', models.CharField(choices=[('MINOR', 'Minor'), ('MODERATE', 'Moderate'), ('MAJOR', 'Major'), ('CONTRAINDICATED', 'Contraindicated')], max_length=20)),
+                ('description', models.TextField()),
+                ('is_active', models.BooleanField(default=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'db_table': 'drug_interactions',
+                'unique_together': {('drug_a', 'drug_b')},
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='allergyrule',
+            constraint=models.CheckConstraint(check=models.Q(models.Q(('generic_name', ''), _negated=True), models.Q(('category', ''), _negated=True), _connector='OR'), name='allergy_rule_has_target'),
+        ),
+        migrations.AddIndex(
+            model_name='prescriptionalert',
+            index=models.Index(fields=['patient', 'severity'], name='prescription_alert_patient_idx'),
+        ),
+    ]
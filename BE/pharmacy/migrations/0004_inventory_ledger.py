@@ -0,0 +1,82 @@
+# Generated by Django 4.2.30 on 2026-10-19 10:23
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def open_ledger(apps, schema_editor):
+    """Existing stock enters the ledger as one opening adjustment per batch"""
+    PharmacyInventory = apps.get_model('pharmacy', 'PharmacyInventory')
+    InventoryMovement = apps.get_model('pharmacy', 'InventoryMovement')
+    InventoryMovement.objects.bulk_create([
+        InventoryMovement(
+            inventory_id=batch_id, pharmacy_id=pharmacy_id, medication_id=medication_id,
+            kind='ADJUSTMENT', quantity=quantity, reason='Opening balance',
+        )
+        for batch_id, pharmacy_id, medication_id, quantity in PharmacyInventory.objects.filter(
+            quantity_in_stock__gt=0
+        ).values_list('id', 'pharmacy_id', 'medication_id', 'quantity_in_stock').iterator()
+    ], batch_size=2000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('pharmacy', '0003_prescribing_safety'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='InventoryMovement',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('RECEIPT', 'Receipt'), ('DISPENSE', 'Dispense'), ('ADJUSTMENT', 'Adjustment')], max_length=20)),
+                ('quantity', models.IntegerField(help_text='Signed: receipts add stock, dispenses take it away')),
+                ('reason', models.CharField(blank=True, max_length=200)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'db_table': 'pharmacy_inventory_movements',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='pharmacyinventory',
+            index=models.Index(fields=['pharmacy', 'medication', 'expiration_date'], name='pharmacy_inventory_fefo_idx'),
+        ),
+        migrations.AddField(
+            model_name='inventorymovement',
+            name='inventory',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.RESTRICT, related_name='movements', to='pharmacy.pharmacyinventory'),
+        ),
+        migrations.AddField(
+            model_name='inventorymovement',
+            name='medication',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='inventory_movements', to='pharmacy.medication'),
+        ),
+        migrations.AddField(
+            model_name='inventorymovement',
+            name='performed_by',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='inventorymovement',
+            name='pharmacy',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='inventory_movements', to='pharmacy.pharmacy'),
+        ),
+        migrations.AddField(
+            model_name='inventorymovement',
+            name='prescription',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='inventory_movements', to='pharmacy.prescription'),
+        ),
+        migrations.AddIndex(
+            model_name='inventorymovement',
+            index=models.Index(fields=['inventory', 'created_at'], name='inventory_movement_batch_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='inventorymovement',
+            index=models.Index(fields=['pharmacy', 'medication', '-created_at'], name='inventory_movement_item_idx'),
+        ),
+        migrations.RunPython(open_ledger, migrations.RunPython.noop),
+    ]
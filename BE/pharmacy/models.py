@@ -2,6 +2,8 @@
 from django.db import models
 from decimal import Decimal
 
+from shared.utils.ids import next_id
+
 class Pharmacy(models.Model):
     PHARMACY_TYPE_CHOICES = [
         ('HOSPITAL', 'Hospital Pharmacy'),
@@ -107,6 +109,10 @@ class PharmacyInventory(models.Model):
     class Meta:
         db_table = 'pharmacy_inventory'
         unique_together = ['pharmacy', 'medication', 'batch_number']
+        indexes = [
+            # First-expiring batches first when dispensing
+            models.Index(fields=['pharmacy', 'medication', 'expiration_date'], name='pharmacy_inventory_fefo_idx'),
+        ]
 
 class Prescription(models.Model):
     STATUS_CHOICES = [
@@ -128,7 +134,7 @@ class Prescription(models.Model):
         ('MONTHLY', 'Monthly'),
     ]
 
-    prescription_number = models.CharField(max_length=50, unique=True)
+    prescription_number = models.CharField(max_length=50, unique=True, blank=True, help_text="Assigned on save if left blank")
     patient = models.ForeignKey('shared.Patient', on_delete=models.CASCADE, related_name='prescriptions')
     doctor = models.ForeignKey('shared.Doctor', on_delete=models.CASCADE, related_name='prescriptions')
     pharmacy = models.ForeignKey(Pharmacy, on_delete=models.CASCADE, related_name='prescriptions', null=True, blank=True)
@@ -147,6 +153,11 @@ class Prescription(models.Model):
     expiration_date = models.DateField()
     pharmacist_notes = models.TextField(blank=True)
 
+    def save(self, *args, **kwargs):
+        if not self.prescription_number:
+            self.prescription_number = next_id('prescription', 'RX')
+        super().save(*args, **kwargs)
+
     def __str__(self):
         return f"Prescription {self.prescription_number} - {self.medication.name}"
 
@@ -155,4 +166,114 @@ class Prescription(models.Model):
         return self.refills_used < self.refills_allowed and self.status == 'DISPENSED'
 
     class Meta:
-        db_table = 'prescriptions'
\ No newline at end of file
+        db_table = 'prescriptions'
+
+SAFETY_SEVERITY_CHOICES = [
+    ('MINOR', 'Minor'),
+    ('MODERATE', 'Moderate'),
+    ('MAJOR', 'Major'),
+    ('CONTRAINDICATED', 'Contraindicated'),
+]
+
+class AllergyRule(models.Model):
+    """An allergen that rules out, or calls for caution with, a drug or a whole drug category"""
+    allergen = models.CharField(max_length=200, help_text="Matched case-insensitively against patients' allergen names")
+    generic_name = models.CharField(max_length=200, blank=True)
+    category = models.CharField(max_length=20, choices=Medication.CATEGORY_CHOICES, blank=True)
+    severity = models.CharField(max_length=20, choices=SAFETY_SEVERITY_CHOICES)
+    note = models.TextField(blank=True)
+    is_active = models.BooleanField(default=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.allergen} -> {self.generic_name or self.get_category_display()} ({self.severity})"
+
+    class Meta:
+        db_table = 'prescribing_allergy_rules'
+        constraints = [
+            models.CheckConstraint(
+                check=~models.Q(generic_name='') | ~models.Q(category=''),
+                name='allergy_rule_has_target',
+            ),
+        ]
+
+class DrugInteraction(models.Model):
+    """Two drugs, by generic name, that should not be taken together unchecked"""
+    drug_a = models.CharField(max_length=200)
+    drug_b = models.CharField(max_length=200)
+    severity = models.CharField(max_length=20, choices=SAFETY_SEVERITY_CHOICES)
+    description = models.TextField()
+    is_active = models.BooleanField(default=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.drug_a} + {self.drug_b} ({self.severity})"
+
+    class Meta:
+        db_table = 'drug_interactions'
+        unique_together = ['drug_a', 'drug_b']
+
+class PrescriptionAlert(models.Model):
+    """A safety problem found with an active prescription; rewritten whenever the patient is rechecked"""
+    KIND_CHOICES = [
+        ('ALLERGY', 'Allergy'),
+        ('CONTRAINDICATION', 'Contraindication'),
+        ('INTERACTION', 'Drug Interaction'),
+    ]
+
+    prescription = models.ForeignKey(Prescription, on_delete=models.CASCADE, related_name='safety_alerts')
+    patient = models.ForeignKey('shared.Patient', on_delete=models.CASCADE, related_name='prescription_alerts')
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    severity = models.CharField(max_length=20, choices=SAFETY_SEVERITY_CHOICES)
+    message = models.CharField(max_length=500)
+    allergen = models.CharField(max_length=200, blank=True)
+    condition = models.CharField(max_length=200, blank=True)
+    interacting_prescription = models.ForeignKey(
+        Prescription, on_delete=models.CASCADE, null=True, blank=True, related_name='+'
+    )
+    rules_version = models.CharField(max_length=40)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.kind} {self.severity} - {self.prescription.prescription_number}"
+
+    class Meta:
+        db_table = 'prescription_alerts'
+        indexes = [
+            models.Index(fields=['patient', 'severity'], name='prescription_alert_patient_idx'),
+        ]
+
+class InventoryMovement(models.Model):
+    """
+    Ledger of stock changes per batch. A batch's quantity_in_stock is the
+    running total of its movements, maintained in the same transaction.
+    """
+    KIND_CHOICES = [
+        ('RECEIPT', 'Receipt'),
+        ('DISPENSE', 'Dispense'),
+        ('ADJUSTMENT', 'Adjustment'),
+    ]
+
+    inventory = models.ForeignKey(PharmacyInventory, on_delete=models.RESTRICT, related_name='movements')
+    pharmacy = models.ForeignKey(Pharmacy, on_delete=models.CASCADE, related_name='inventory_movements')
+    medication = models.ForeignKey(Medication, on_delete=models.CASCADE, related_name='inventory_movements')
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    quantity = models.IntegerField(help_text="Signed: receipts add stock, dispenses take it away")
+    prescription = models.ForeignKey(
+        Prescription, on_delete=models.SET_NULL, null=True, blank=True, related_name='inventory_movements'
+    )
+    reason = models.CharField(max_length=200, blank=True)
+    performed_by = models.ForeignKey(
+        'shared.User', on_delete=models.SET_NULL, null=True, blank=True, related_name='+'
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.kind} {self.quantity:+d} - {self.inventory.batch_number}"
+
+    class Meta:
+        db_table = 'pharmacy_inventory_movements'
+        indexes = [
+            models.Index(fields=['inventory', 'created_at'], name='inventory_movement_batch_idx'),
+            models.Index(fields=['pharmacy', 'medication', '-created_at'], name='inventory_movement_item_idx'),
+        ]
@@ -0,0 +1,44 @@
+# BE/pharmacy/serializers.py
+from rest_framework import serializers
+
+from .models import InventoryMovement, PrescriptionAlert
+
+
+class PrescriptionAlertSerializer(serializers.ModelSerializer):
+    prescription_number = serializers.CharField(source='prescription.prescription_number', read_only=True)
+    medication = serializers.CharField(source='prescription.medication.name', read_only=True)
+    interacting_prescription_number = serializers.CharField(
+        source='interacting_prescription.prescription_number', read_only=True, default=None
+    )
+
+    class Meta:
+        model = PrescriptionAlert
+        fields = [
+            'id', 'prescription_number', 'medication', 'patient', 'kind', 'severity', 'message', 'allergen',
+            'condition', 'interacting_prescription_number', 'rules_version', 'created_at',
+        ]
+
+
+class InventoryMovementSerializer(serializers.ModelSerializer):
+    batch_number = serializers.CharField(source='inventory.batch_number', read_only=True)
+    expiration_date = serializers.DateField(source='inventory.expiration_date', read_only=True)
+
+    class Meta:
+        model = InventoryMovement
+        fields = [
+            'id', 'inventory', 'batch_number', 'expiration_date', 'pharmacy', 'medication', 'kind', 'quantity',
+            'prescription', 'reason', 'performed_by', 'created_at',
+        ]
+        read_only_fields = fields
+
+
+class StockReceiptSerializer(serializers.Serializer):
+    pharmacy_id = serializers.IntegerField()
+    medication_id = serializers.IntegerField()
+    batch_number = serializers.CharField(max_length=100)
+    expiration_date = serializers.DateField()
+    quantity = serializers.IntegerField(min_value=1)
+    unit_cost = serializers.DecimalField(max_digits=10, decimal_places=2)
+    selling_price = serializers.DecimalField(max_digits=10, decimal_places=2)
+    supplier = serializers.CharField(max_length=200)
+    reason = serializers.CharField(max_length=200, required=False, default='')
@@ -0,0 +1,222 @@
+# BE/pharmacy/services/inventory.py
+import logging
+from typing import List, Tuple
+
+from django.db import IntegrityError, transaction
+from django.db.models import F, Max, Min, Q, Sum
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from audit.services.trail import audit_write
+from records.services.chart import invalidate_charts
+from records.services.timeline import pending_timeline
+from ..models import InventoryMovement, PharmacyInventory, Prescription
+
+logger = logging.getLogger(__name__)
+
+# Pending prescriptions still need a pharmacist's verification
+DISPENSABLE_STATUSES = ['VERIFIED', 'FILLED']
+
+
+class InventoryError(ValueError):
+    """A stock change that cannot be applied"""
+
+
+class InsufficientStock(InventoryError):
+    def __init__(self, requested, available):
+        super().__init__(f'{requested} requested but only {available} available')
+        self.requested = requested
+        self.available = available
+
+
+def movement(inventory: PharmacyInventory, kind, quantity, user=None, prescription_id=None, reason=''):
+    return InventoryMovement(
+        inventory_id=inventory.id,
+        pharmacy_id=inventory.pharmacy_id,
+        medication_id=inventory.medication_id,
+        kind=kind,
+        quantity=quantity,
+        prescription_id=prescription_id,
+        reason=reason,
+        performed_by=user if user is not None and user.is_authenticated else None,
+    )
+
+
+class InventoryLedger:
+    """
+    Stock changes as ledger movements. Each one moves the batch's
+    ``quantity_in_stock`` with a single ``UPDATE ... SET quantity_in_stock =
+    quantity_in_stock + n`` in the same transaction, so concurrent dispenses
+    never read-modify-write and the snapshot always equals the ledger sum.
+    Decrements are conditional on enough stock remaining; nothing is locked
+    beyond the batch rows actually changed.
+    """
+
+    def receive(self, pharmacy_id, medication_id, batch_number, expiration_date, quantity, unit_cost,
+                selling_price, supplier, user=None, reason='') -> InventoryMovement:
+        if quantity <= 0:
+            raise InventoryError('Received quantity must be positive')
+        if expiration_date < timezone.localdate():
+            raise InventoryError(f'Batch {batch_number} has already expired')
+
+        with transaction.atomic():
+            defaults = {
+                'expiration_date': expiration_date, 'unit_cost': unit_cost, 'selling_price': selling_price,
+                'supplier': supplier, 'quantity_in_stock': 0,
+            }
+            try:
+                with transaction.atomic():
+                    inventory, created = PharmacyInventory.objects.get_or_create(
+                        pharmacy_id=pharmacy_id, medication_id=medication_id, batch_number=batch_number,
+                        defaults=defaults,
+                    )
+            except IntegrityError:
+                # Another receipt of the same batch created it first
+                inventory = PharmacyInventory.objects.get(
+                    pharmacy_id=pharmacy_id, medication_id=medication_id, batch_number=batch_number
+                )
+            if inventory.expiration_date != expiration_date:
+                raise InventoryError(f'Batch {batch_number} is on record as expiring {inventory.expiration_date}')
+            return self.record_receipt(inventory, quantity, user, reason)
+
+    def record_receipt(self, inventory: PharmacyInventory, quantity, user=None, reason='') -> InventoryMovement:
+        with transaction.atomic():
+            PharmacyInventory.objects.filter(id=inventory.id).update(
+                quantity_in_stock=F('quantity_in_stock') + quantity, last_restocked=timezone.now(),
+            )
+            receipt = movement(inventory, 'RECEIPT', quantity, user, reason=reason)
+            receipt.save()
+            return receipt
+
+    def adjust(self, inventory_id, quantity, reason, user=None) -> InventoryMovement:
+        """Signed correction, e.g. after a stock count, damage or expiry write-off"""
+        if not quantity:
+            raise InventoryError('Adjustment quantity must not be zero')
+        if not reason:
+            raise InventoryError('Adjustments need a reason')
+        inventory = PharmacyInventory.objects.filter(id=inventory_id).first()
+        if inventory is None:
+            raise InventoryError(f'Unknown inventory batch {inventory_id}')
+
+        with transaction.atomic():
+            batch = PharmacyInventory.objects.filter(id=inventory_id)
+            if quantity < 0:
+                batch = batch.filter(quantity_in_stock__gte=-quantity)
+            if not batch.update(quantity_in_stock=F('quantity_in_stock') + quantity):
+                available = PharmacyInventory.objects.values_list('quantity_in_stock', flat=True).get(id=inventory_id)
+                raise InsufficientStock(-quantity, available)
+            adjustment = movement(inventory, 'ADJUSTMENT', quantity, user, reason=reason)
+            adjustment.save()
+            return adjustment
+
+    def allocate(self, pharmacy_id, medication_id, quantity) -> List[Tuple[PharmacyInventory, int]]:
+        """
+        Take ``quantity`` from unexpired batches, first-expiring first (FEFO).
+        Must run inside the caller's transaction: a shortfall raises and the
+        decrements already made roll back with it.
+        """
+        batches = PharmacyInventory.objects.filter(
+            pharmacy_id=pharmacy_id, medication_id=medication_id,
+            quantity_in_stock__gt=0, expiration_date__gte=timezone.localdate(),
+        ).order_by('expiration_date', 'id')
+
+        taken = []
+        remaining = quantity
+        for batch in batches:
+            available = batch.quantity_in_stock
+            while remaining and available > 0:
+                take = min(remaining, available)
+                if PharmacyInventory.objects.filter(id=batch.id, quantity_in_stock__gte=take).update(
+                    quantity_in_stock=F('quantity_in_stock') - take
+                ):
+                    taken.append((batch, take))
+                    remaining -= take
+                    break
+                # A concurrent dispense got there first; take what it left
+                available = PharmacyInventory.objects.filter(id=batch.id).values_list(
+                    'quantity_in_stock', flat=True
+                ).first() or 0
+            if not remaining:
+                return taken
+        raise InsufficientStock(quantity, quantity - remaining)
+
+    def dispense(self, prescription: Prescription, pharmacy_id=None, quantity=None, user=None
+                 ) -> List[InventoryMovement]:
+        """
+        Dispense a verified prescription, or a refill of a dispensed one, from
+        FEFO-allocated stock. The prescription is claimed with a conditional
+        update first, so it can't be dispensed (or refilled) twice at once.
+        """
+        pharmacy_id = pharmacy_id or prescription.pharmacy_id
+        quantity = quantity or prescription.quantity_prescribed
+        if pharmacy_id is None:
+            raise InventoryError('No pharmacy to dispense from')
+        if quantity <= 0:
+            raise InventoryError('Dispensed quantity must be positive')
+        if prescription.expiration_date < timezone.localdate():
+            raise InventoryError(f'Prescription {prescription.prescription_number} has expired')
+
+        refill = prescription.status == 'DISPENSED'
+        now = timezone.now()
+        with transaction.atomic():
+            claim = Prescription.objects.filter(id=prescription.id)
+            if refill:
+                claimed = claim.filter(status='DISPENSED', refills_used__lt=F('refills_allowed')).update(
+                    refills_used=F('refills_used') + 1, dispensed_date=now,
+                )
+            else:
+                claimed = claim.filter(status__in=DISPENSABLE_STATUSES).update(
+                    status='DISPENSED', dispensed_date=now, pharmacy_id=pharmacy_id,
+                )
+            if not claimed:
+                raise InventoryError(
+                    f'Prescription {prescription.prescription_number} has no refills left' if refill else
+                    f'Prescription {prescription.prescription_number} is {prescription.status.lower()}, not verified'
+                )
+
+            movements = InventoryMovement.objects.bulk_create([
+                movement(batch, 'DISPENSE', -take, user, prescription.id, 'Refill' if refill else '')
+                for batch, take in self.allocate(pharmacy_id, prescription.medication_id, quantity)
+            ])
+
+            # Updates send no signals
+            pending_timeline.add(('PRESCRIPTION', prescription.id))
+            invalidate_charts(prescription.patient_id)
+            audit_write('UPDATE', 'PRESCRIPTION', prescription.patient_id, prescription.prescription_number,
+                        dispensed=quantity, refill=refill,
+                        batches=[inventory_movement.inventory_id for inventory_movement in movements])
+
+        prescription.refresh_from_db(fields=['status', 'dispensed_date', 'pharmacy', 'refills_used'])
+        return movements
+
+    def stock(self, pharmacy_id):
+        """Per-medication stock at a pharmacy, summed from the batch snapshots"""
+        today = timezone.localdate()
+        current = Q(expiration_date__gte=today)
+        return PharmacyInventory.objects.filter(pharmacy_id=pharmacy_id).values(
+            'medication_id', 'medication__name', 'medication__strength',
+        ).annotate(
+            on_hand=Coalesce(Sum('quantity_in_stock', filter=current), 0),
+            expired=Coalesce(Sum('quantity_in_stock', filter=~current), 0),
+            minimum_stock_level=Max('minimum_stock_level'),
+            next_expiry=Min('expiration_date', filter=current & Q(quantity_in_stock__gt=0)),
+        ).order_by('medication__name', 'medication_id')
+
+    def reconcile(self, fix=False, user=None) -> List[Tuple[int, int, int]]:
+        """
+        (batch id, snapshot, ledger sum) for batches whose snapshot drifted
+        from their movements, e.g. through a raw UPDATE. With ``fix`` the
+        ledger is brought to the snapshot with an adjustment per batch.
+        """
+        drifted = list(PharmacyInventory.objects.annotate(
+            ledger=Coalesce(Sum('movements__quantity'), 0)
+        ).exclude(quantity_in_stock=F('ledger')).values_list('id', 'quantity_in_stock', 'ledger'))
+
+        if fix and drifted:
+            batches = PharmacyInventory.objects.in_bulk([batch_id for batch_id, _, _ in drifted])
+            InventoryMovement.objects.bulk_create([
+                movement(batches[batch_id], 'ADJUSTMENT', snapshot - ledger, user, reason='Reconciled to stock count')
+                for batch_id, snapshot, ledger in drifted
+            ], batch_size=2000)
+            logger.warning(f"Reconciled {len(drifted)} inventory batches to their stock counts")
+        return drifted
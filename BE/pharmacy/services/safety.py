@@ -0,0 +1,349 @@
+# BE/pharmacy/services/safety.py
+import hashlib
+import json
+import logging
+import re
+from collections import defaultdict
+from dataclasses import dataclass, field
+from typing import Dict, FrozenSet, Iterable, List, Optional, Tuple
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, Max
+from django.utils import timezone
+
+from records.models import Allergy, MedicalHistory
+from records.services.chart import CURRENT_CONDITION_STATUSES, CURRENT_PRESCRIPTION_STATUSES
+from shared.utils.transactions import OnCommitBatch
+from ..models import AllergyRule, DrugInteraction, Medication, Prescription, PrescriptionAlert
+
+logger = logging.getLogger(__name__)
+
+RULES_VERSION_KEY = 'pharmacy:prescribing-rules:version'
+SEVERITY_RANK = {'MINOR': 0, 'MODERATE': 1, 'MAJOR': 2, 'CONTRAINDICATED': 3}
+# Longest allergen or condition name, in words, found inside contraindication text
+MAX_PHRASE_WORDS = 4
+_WORD = re.compile(r"[^\W_]+(?:['-][^\W_]+)*")
+
+
+def get_safety_config():
+    return getattr(settings, 'PRESCRIBING_SAFETY_CONFIG', {})
+
+
+def words(text) -> List[str]:
+    return _WORD.findall(str(text or '').casefold())
+
+
+def normalize(term) -> str:
+    """'  Penicillin-G ' and 'penicillin-g' are the same lookup key"""
+    return ' '.join(words(term))
+
+
+def phrases(text, max_words=MAX_PHRASE_WORDS) -> FrozenSet[str]:
+    """Every run of up to ``max_words`` words, so a name is found in free text with one set lookup"""
+    tokens = words(text)
+    return frozenset(
+        ' '.join(tokens[start:start + size])
+        for size in range(1, max_words + 1)
+        for start in range(len(tokens) - size + 1)
+    )
+
+
+def category_target(category) -> str:
+    return f'category:{category}'
+
+
+def drug_pair(a: str, b: str) -> Tuple[str, str]:
+    return (a, b) if a <= b else (b, a)
+
+
+def rules_version() -> str:
+    """
+    Fingerprint of the rule set and the medication catalogue, cached until a
+    rule or medication is saved; three aggregate queries on a miss.
+    """
+    version = cache.get(RULES_VERSION_KEY)
+    if version is None:
+        state = [
+            model.objects.aggregate(rows=Count('id'), changed=Max('updated_at'))
+            for model in (AllergyRule, DrugInteraction, Medication)
+        ]
+        version = hashlib.sha1(json.dumps(state, default=str).encode()).hexdigest()
+        cache.set(RULES_VERSION_KEY, version, get_safety_config().get('RULES_CACHE_SECONDS', 60 * 60))
+    return version
+
+
+def invalidate_rules():
+    cache.delete(RULES_VERSION_KEY)
+
+
+@dataclass(frozen=True)
+class Rule:
+    severity: str
+    message: str
+
+
+@dataclass(frozen=True)
+class DrugProfile:
+    generic: str
+    label: str
+    names: FrozenSet[str]  # Generic, trade and brand names an allergy can name directly
+    targets: Tuple[str, ...]  # Keys allergy rules are filed under
+    contraindications: FrozenSet[str]  # Phrases of the contraindication text
+
+
+@dataclass
+class RuleSet:
+    """
+    Prescribing rules compiled into hash tables: allergen -> {drug or
+    category -> rule}, (drug, drug) -> rule, and a profile per medication.
+    Checks are dictionary lookups; nothing is queried per rule.
+    """
+    version: str
+    allergens: Dict[str, Dict[str, Rule]] = field(default_factory=dict)
+    interactions: Dict[Tuple[str, str], Rule] = field(default_factory=dict)
+    medications: Dict[int, DrugProfile] = field(default_factory=dict)
+
+
+def drug_profile(values) -> DrugProfile:
+    generic = normalize(values['generic_name']) or normalize(values['name'])
+    return DrugProfile(
+        generic=generic,
+        label=values['generic_name'] or values['name'],
+        names=frozenset(filter(None, (generic, normalize(values['name']), normalize(values['brand_name'])))),
+        targets=(generic, category_target(values['category'])),
+        contraindications=phrases(values['contraindications']),
+    )
+
+
+PROFILE_FIELDS = ('id', 'name', 'generic_name', 'brand_name', 'category', 'contraindications')
+
+
+def compile_rules(version: str) -> RuleSet:
+    rules = RuleSet(version=version)
+    for allergen, generic_name, category, severity, note in AllergyRule.objects.filter(is_active=True).values_list(
+        'allergen', 'generic_name', 'category', 'severity', 'note'
+    ):
+        target = normalize(generic_name) if generic_name else category_target(category)
+        message = note or f'{allergen} allergy: {generic_name or category.lower()} may cross-react'
+        rules.allergens.setdefault(normalize(allergen), {})[target] = Rule(severity, message)
+
+    for drug_a, drug_b, severity, description in DrugInteraction.objects.filter(is_active=True).values_list(
+        'drug_a', 'drug_b', 'severity', 'description'
+    ):
+        rules.interactions[drug_pair(normalize(drug_a), normalize(drug_b))] = Rule(severity, description)
+
+    for values in Medication.objects.values(*PROFILE_FIELDS).iterator(chunk_size=5000):
+        rules.medications[values['id']] = drug_profile(values)
+    return rules
+
+
+class RuleRegistry:
+    """
+    Process-wide compiled rule set, recompiled when ``rules_version`` moves.
+    A check costs one cache read for the version.
+    """
+
+    def __init__(self):
+        self._rules: Optional[RuleSet] = None
+
+    def get(self) -> RuleSet:
+        version = rules_version()
+        rules = self._rules
+        if rules is None or rules.version != version:
+            rules = compile_rules(version)
+            self._rules = rules
+            logger.info(
+                f"Compiled prescribing rules {version[:12]}: {len(rules.allergens)} allergens, "
+                f"{len(rules.interactions)} interactions, {len(rules.medications)} medications"
+            )
+        return rules
+
+    def clear(self):
+        self._rules = None
+
+
+rule_registry = RuleRegistry()
+
+
+@dataclass(frozen=True)
+class SafetyIssue:
+    kind: str
+    severity: str
+    message: str
+    allergen: str = ''
+    condition: str = ''
+    interacting_prescription_id: Optional[int] = None
+
+    def as_dict(self) -> Dict:
+        return {
+            'kind': self.kind,
+            'severity': self.severity,
+            'message': self.message,
+            'allergen': self.allergen,
+            'condition': self.condition,
+            'interacting_prescription_id': self.interacting_prescription_id,
+        }
+
+
+@dataclass
+class PatientContext:
+    allergies: List[str] = field(default_factory=list)  # Active allergen names
+    conditions: List[str] = field(default_factory=list)  # Current condition names
+    prescriptions: List[Tuple[int, int]] = field(default_factory=list)  # Active (prescription id, medication id)
+
+
+def active_prescriptions():
+    return Prescription.objects.filter(
+        status__in=CURRENT_PRESCRIPTION_STATUSES, expiration_date__gte=timezone.localdate()
+    )
+
+
+class PrescribingSafety:
+    """
+    Checks a prescription against the patient's active allergies, current
+    conditions and other active prescriptions. Patient data comes in three
+    queries (for any number of patients); the check itself is O(allergies +
+    conditions + prescriptions) lookups in the compiled ``RuleSet``.
+    """
+
+    def __init__(self, rules: Optional[RuleSet] = None):
+        self.rules = rules or rule_registry.get()
+
+    def load(self, patient_ids: Iterable[int]) -> Dict[int, PatientContext]:
+        patient_ids = list(patient_ids)
+        contexts: Dict[int, PatientContext] = defaultdict(PatientContext)
+        for patient_id, allergen in Allergy.objects.filter(
+            patient_id__in=patient_ids, is_active=True
+        ).values_list('patient_id', 'allergen_name'):
+            contexts[patient_id].allergies.append(allergen.strip())
+        for patient_id, condition in MedicalHistory.objects.filter(
+            patient_id__in=patient_ids, status__in=CURRENT_CONDITION_STATUSES
+        ).values_list('patient_id', 'condition_name'):
+            contexts[patient_id].conditions.append(condition.strip())
+        for patient_id, prescription_id, medication_id in active_prescriptions().filter(
+            patient_id__in=patient_ids
+        ).order_by('id').values_list('patient_id', 'id', 'medication_id'):
+            contexts[patient_id].prescriptions.append((prescription_id, medication_id))
+        return contexts
+
+    def profile(self, medication_id) -> Optional[DrugProfile]:
+        profile = self.rules.medications.get(medication_id)
+        if profile is None:
+            # Added since the rules compiled and the version hasn't caught up yet
+            values = Medication.objects.filter(id=medication_id).values(*PROFILE_FIELDS).first()
+            if values is not None:
+                profile = self.rules.medications[medication_id] = drug_profile(values)
+        return profile
+
+    def check(self, medication_id, context: PatientContext, others: Optional[Iterable[Tuple[int, int]]] = None
+              ) -> List[SafetyIssue]:
+        """
+        Issues with giving ``medication_id`` to a patient, worst first. ``others``
+        are the (prescription id, medication id) pairs to check interactions
+        with; by default every active prescription in ``context``.
+        """
+        drug = self.profile(medication_id)
+        if drug is None:
+            return []
+        issues = []
+
+        for allergen in context.allergies:
+            term = normalize(allergen)
+            if term in drug.names:
+                issues.append(SafetyIssue(
+                    'ALLERGY', 'CONTRAINDICATED', f'Patient is allergic to {allergen}', allergen=allergen,
+                ))
+                continue
+            by_target = self.rules.allergens.get(term) or {}
+            found = [
+                SafetyIssue('ALLERGY', rule.severity, rule.message, allergen=allergen)
+                for rule in (by_target.get(target) for target in drug.targets) if rule is not None
+            ]
+            if term in drug.contraindications:
+                found.append(SafetyIssue(
+                    'CONTRAINDICATION', 'MAJOR', f'{drug.label} is contraindicated with {allergen} allergy',
+                    allergen=allergen,
+                ))
+            if found:
+                # One issue per allergy: the worst of what it triggers
+                issues.append(max(found, key=lambda issue: SEVERITY_RANK[issue.severity]))
+
+        for condition in context.conditions:
+            if normalize(condition) in drug.contraindications:
+                issues.append(SafetyIssue(
+                    'CONTRAINDICATION', 'MAJOR', f'{drug.label} is contraindicated with {condition}',
+                    condition=condition,
+                ))
+
+        for prescription_id, other_id in (context.prescriptions if others is None else others):
+            other = self.profile(other_id)
+            if other is None or other.generic == drug.generic:
+                continue
+            rule = self.rules.interactions.get(drug_pair(drug.generic, other.generic))
+            if rule is not None:
+                issues.append(SafetyIssue(
+                    'INTERACTION', rule.severity, f'{drug.label} + {other.label}: {rule.message}',
+                    interacting_prescription_id=prescription_id,
+                ))
+
+        issues.sort(key=lambda issue: -SEVERITY_RANK[issue.severity])
+        return issues
+
+    def check_new(self, patient_id, medication_id) -> List[SafetyIssue]:
+        """Issues a prescription would raise before it is written"""
+        return self.check(medication_id, self.load([patient_id])[patient_id])
+
+    def recheck_patients(self, patient_ids: Iterable[int]) -> int:
+        """
+        Rewrite the alerts of every active prescription of these patients.
+        Interactions are reported on the later prescription of each pair.
+        """
+        patient_ids = set(patient_ids)
+        contexts = self.load(patient_ids)
+        alerts = []
+        for patient_id, context in contexts.items():
+            for position, (prescription_id, medication_id) in enumerate(context.prescriptions):
+                for issue in self.check(medication_id, context, context.prescriptions[:position]):
+                    alerts.append(PrescriptionAlert(
+                        prescription_id=prescription_id,
+                        patient_id=patient_id,
+                        kind=issue.kind,
+                        severity=issue.severity,
+                        message=issue.message[:500],
+                        allergen=issue.allergen[:200],
+                        condition=issue.condition[:200],
+                        interacting_prescription_id=issue.interacting_prescription_id,
+                        rules_version=self.rules.version,
+                    ))
+
+        with transaction.atomic():
+            PrescriptionAlert.objects.filter(patient_id__in=patient_ids).delete()
+            PrescriptionAlert.objects.bulk_create(alerts, batch_size=2000)
+        return len(alerts)
+
+    def recheck_all(self, batch_size=None) -> int:
+        """Recheck every patient with an active prescription, a batch of patients at a time"""
+        batch_size = batch_size or get_safety_config().get('RECHECK_BATCH_SIZE', 1000)
+        patients = active_prescriptions().values_list('patient_id', flat=True).distinct().order_by('patient_id')
+        alerts = 0
+        last_id = 0
+        while True:
+            batch = list(patients.filter(patient_id__gt=last_id)[:batch_size])
+            if not batch:
+                break
+            alerts += self.recheck_patients(batch)
+            last_id = batch[-1]
+        # Prescriptions that lapsed since their patient was last checked
+        PrescriptionAlert.objects.exclude(prescription__in=active_prescriptions()).delete()
+        logger.info(f"Rechecked prescriptions against rules {self.rules.version[:12]}: {alerts} alerts")
+        return alerts
+
+
+def _recheck_pending(patient_ids):
+    PrescribingSafety().recheck_patients(patient_ids)
+
+
+# Patients whose allergies, conditions or prescriptions changed in a transaction
+pending_safety = OnCommitBatch(_recheck_pending)
@@ -0,0 +1,28 @@
+# BE/pharmacy/signals.py
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from records.models import Allergy, MedicalHistory
+from .models import AllergyRule, DrugInteraction, Medication, Prescription
+from .services.safety import invalidate_rules, pending_safety
+
+
+@receiver(post_save, sender=AllergyRule)
+@receiver(post_delete, sender=AllergyRule)
+@receiver(post_save, sender=DrugInteraction)
+@receiver(post_delete, sender=DrugInteraction)
+@receiver(post_save, sender=Medication)
+@receiver(post_delete, sender=Medication)
+def invalidate_prescribing_rules(sender, instance, **kwargs):
+    # Existing prescriptions are rechecked by check_prescription_safety once it sees the new version
+    invalidate_rules()
+
+
+@receiver(post_save, sender=Prescription)
+@receiver(post_delete, sender=Prescription)
+@receiver(post_save, sender=Allergy)
+@receiver(post_delete, sender=Allergy)
+@receiver(post_save, sender=MedicalHistory)
+@receiver(post_delete, sender=MedicalHistory)
+def recheck_patient_prescriptions(sender, instance, **kwargs):
+    pending_safety.add(instance.patient_id)
@@ -0,0 +1,220 @@
+from datetime import date, timedelta
+
+from django.core.cache import cache
+from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from records.models import Allergy, MedicalHistory
+from shared.factories import make_doctor, make_patient
+from .models import (
+    AllergyRule, DrugInteraction, InventoryMovement, Medication, Pharmacy, PharmacyInventory, Prescription,
+    PrescriptionAlert,
+)
+from .services.inventory import InsufficientStock, InventoryError, InventoryLedger
+from .services.safety import PrescribingSafety, rule_registry
+
+
+def make_medication(name, category='OTHER', contraindications='', **kwargs):
+    fields = dict(
+        generic_name=name, drug_code=f'NDC-{name}', drug_type='TABLET', strength='10mg', manufacturer='Acme',
+        description=name, side_effects='', storage_conditions='Room temperature', unit_price=1,
+    )
+    return Medication.objects.create(name=name.title(), category=category, contraindications=contraindications,
+                                     **{**fields, **kwargs})
+
+
+def make_prescription(patient, doctor, medication, **kwargs):
+    fields = dict(dosage='Take 1 tablet', frequency='ONCE_DAILY', duration_days=30, quantity_prescribed=30,
+                  instructions='With food', expiration_date=date.today() + timedelta(days=90))
+    return Prescription.objects.create(patient=patient, doctor=doctor, medication=medication, **{**fields, **kwargs})
+
+
+def make_allergy(patient, allergen, reported_by, **kwargs):
+    return Allergy.objects.create(patient=patient, allergen_name=allergen, allergen_type='MEDICATION',
+                                  severity='SEVERE', reaction_description='Hives', reported_by=reported_by, **kwargs)
+
+
+class PrescribingSafetyTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        rule_registry.clear()
+        self.doctor = make_doctor()
+        self.patient = make_patient()
+        self.amoxicillin = make_medication('amoxicillin', 'ANTIBIOTIC')
+        self.ibuprofen = make_medication('ibuprofen', 'PAINKILLER',
+                                         'Avoid in patients with chronic kidney disease or aspirin allergy')
+        self.warfarin = make_medication('warfarin', 'CARDIAC')
+
+    def check(self, medication):
+        return [(issue.kind, issue.severity) for issue in PrescribingSafety().check_new(self.patient.id, medication.id)]
+
+    def test_allergy_to_the_drug_itself_is_contraindicated(self):
+        make_allergy(self.patient, ' AMOXICILLIN ', self.doctor.user)
+        self.assertEqual(self.check(self.amoxicillin), [('ALLERGY', 'CONTRAINDICATED')])
+
+    def test_allergy_rules_match_by_drug_and_category(self):
+        make_allergy(self.patient, 'Penicillin', self.doctor.user)
+        self.assertEqual(self.check(self.amoxicillin), [])
+        AllergyRule.objects.create(allergen='penicillin', category='ANTIBIOTIC', severity='MODERATE')
+        self.assertEqual(self.check(self.amoxicillin), [('ALLERGY', 'MODERATE')])
+        # The worst rule an allergy triggers is the one reported
+        AllergyRule.objects.create(allergen='Penicillin', generic_name='Amoxicillin', severity='MAJOR')
+        self.assertEqual(self.check(self.amoxicillin), [('ALLERGY', 'MAJOR')])
+
+    def test_contraindication_text_names_conditions_and_allergies(self):
+        MedicalHistory.objects.create(patient=self.patient, condition_name='Chronic Kidney Disease', status='CHRONIC')
+        MedicalHistory.objects.create(patient=self.patient, condition_name='Asthma', status='RESOLVED')
+        make_allergy(self.patient, 'Aspirin', self.doctor.user)
+        issues = PrescribingSafety().check_new(self.patient.id, self.ibuprofen.id)
+        self.assertEqual({(issue.kind, issue.condition, issue.allergen) for issue in issues}, {
+            ('CONTRAINDICATION', 'Chronic Kidney Disease', ''), ('CONTRAINDICATION', '', 'Aspirin'),
+        })
+
+    def test_interactions_with_active_prescriptions(self):
+        aspirin = make_medication('aspirin', 'PAINKILLER')
+        DrugInteraction.objects.create(drug_a='Warfarin', drug_b='aspirin', severity='MAJOR',
+                                       description='Bleeding risk')
+        current = make_prescription(self.patient, self.doctor, self.warfarin)
+        make_prescription(self.patient, self.doctor, self.warfarin, status='CANCELLED')
+        issues = PrescribingSafety().check_new(self.patient.id, aspirin.id)
+        self.assertEqual([(issue.kind, issue.severity, issue.interacting_prescription_id) for issue in issues],
+                         [('INTERACTION', 'MAJOR', current.id)])
+
+    def test_rules_are_compiled_once_per_version(self):
+        rules = rule_registry.get()
+        with self.assertNumQueries(0):
+            self.assertIs(PrescribingSafety().rules, rules)
+        DrugInteraction.objects.create(drug_a='a', drug_b='b', severity='MINOR', description='x')
+        self.assertIsNot(rule_registry.get(), rules)
+
+    def test_changes_to_the_patient_rewrite_the_stored_alerts(self):
+        aspirin = make_medication('aspirin', 'PAINKILLER')
+        DrugInteraction.objects.create(drug_a='warfarin', drug_b='aspirin', severity='MAJOR', description='Bleeding')
+        with self.captureOnCommitCallbacks(execute=True):
+            first = make_prescription(self.patient, self.doctor, self.warfarin)
+            second = make_prescription(self.patient, self.doctor, aspirin)
+        alert = PrescriptionAlert.objects.get(patient=self.patient)
+        # Reported once, on the later prescription of the pair
+        self.assertEqual((alert.prescription_id, alert.interacting_prescription_id), (second.id, first.id))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            allergy = make_allergy(self.patient, 'Warfarin', self.doctor.user)
+        self.assertEqual(set(PrescriptionAlert.objects.values_list('kind', 'severity')),
+                         {('INTERACTION', 'MAJOR'), ('ALLERGY', 'CONTRAINDICATED')})
+        with self.captureOnCommitCallbacks(execute=True):
+            allergy.delete()
+            second.status = 'CANCELLED'
+            second.save()
+        self.assertFalse(PrescriptionAlert.objects.exists())
+
+    def test_safety_check_endpoint(self):
+        make_allergy(self.patient, 'amoxicillin', self.doctor.user)
+        client = APIClient()
+        client.force_authenticate(self.doctor.user)
+        response = client.post('/api/pharmacy/safety-check/', {
+            'patient_id': self.patient.id, 'medication_id': self.amoxicillin.id,
+        }, format='json')
+        self.assertEqual((response.status_code, response.data['severity']), (200, 'CONTRAINDICATED'))
+        self.assertEqual(client.post('/api/pharmacy/safety-check/', {'patient_id': 'x'}).status_code, 400)
+        self.assertEqual(client.post('/api/pharmacy/safety-check/', {
+            'patient_id': self.patient.id, 'medication_id': 0,
+        }).status_code, 404)
+        patient = APIClient()
+        patient.force_authenticate(self.patient.user)
+        self.assertEqual(patient.post('/api/pharmacy/safety-check/', {}).status_code, 403)
+
+
+class InventoryLedgerTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.doctor = make_doctor()
+        self.patient = make_patient()
+        self.medication = make_medication('metformin', 'DIABETES')
+        self.pharmacy = Pharmacy.objects.create(
+            name='Main', pharmacy_type='HOSPITAL', license_number='PH-1', address='1 Main St',
+            phone_number='555-0100', email='main@example.com', operating_hours='9-5',
+        )
+        self.today = timezone.localdate()
+        self.ledger = InventoryLedger()
+        self.later = self.receive('LATER', 60, 20)
+        self.sooner = self.receive('SOONER', 10, 5)
+        self.expired = PharmacyInventory.objects.create(
+            pharmacy=self.pharmacy, medication=self.medication, batch_number='OLD', quantity_in_stock=50,
+            expiration_date=self.today - timedelta(days=1), unit_cost=1, selling_price=2, supplier='Acme',
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.doctor.user)
+
+    def receive(self, batch_number, days, quantity):
+        receipt = self.ledger.receive(self.pharmacy.id, self.medication.id, batch_number,
+                                      self.today + timedelta(days=days), quantity, 1, 2, 'Acme')
+        return receipt.inventory
+
+    def stock(self, *batches):
+        return [PharmacyInventory.objects.get(id=batch.id).quantity_in_stock for batch in batches]
+
+    def prescription(self, **kwargs):
+        fields = dict(status='VERIFIED', pharmacy=self.pharmacy, quantity_prescribed=10)
+        return make_prescription(self.patient, self.doctor, self.medication, **{**fields, **kwargs})
+
+    def dispense(self, prescription, **body):
+        return self.client.post(f'/api/pharmacy/prescriptions/{prescription.prescription_number}/dispense/', body,
+                                format='json')
+
+    def test_dispense_takes_the_first_expiring_unexpired_batches(self):
+        prescription = self.prescription()
+        response = self.dispense(prescription)
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['status'], 'DISPENSED')
+        self.assertEqual([(row['inventory'], row['quantity']) for row in response.data['movements']],
+                         [(self.sooner.id, -5), (self.later.id, -5)])
+        self.assertEqual(self.stock(self.sooner, self.later, self.expired), [0, 15, 50])
+
+    def test_shortfall_rolls_back_every_decrement(self):
+        prescription = self.prescription(quantity_prescribed=30)
+        response = self.dispense(prescription)
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual((response.data['requested'], response.data['available']), (30, 25))
+        self.assertEqual(self.stock(self.sooner, self.later), [5, 20])
+        self.assertEqual(Prescription.objects.get(id=prescription.id).status, 'VERIFIED')
+        self.assertFalse(InventoryMovement.objects.filter(kind='DISPENSE').exists())
+
+    def test_only_verified_prescriptions_and_remaining_refills_are_dispensed(self):
+        self.assertEqual(self.dispense(self.prescription(status='PENDING')).status_code, 400)
+        prescription = self.prescription(quantity_prescribed=5, refills_allowed=1)
+        self.ledger.dispense(prescription)
+        self.ledger.dispense(prescription)
+        self.assertEqual(prescription.refills_used, 1)
+        with self.assertRaises(InventoryError):
+            self.ledger.dispense(prescription)
+        self.assertEqual(self.stock(self.sooner, self.later), [0, 15])
+
+    def test_receipts_add_to_a_batch_but_not_with_another_expiry(self):
+        self.receive('LATER', 60, 5)
+        self.assertEqual(self.stock(self.later), [25])
+        with self.assertRaises(InventoryError):
+            self.receive('LATER', 61, 5)
+        with self.assertRaises(InventoryError):
+            self.receive('STALE', -1, 5)
+
+    def test_adjustments_cannot_take_stock_below_zero(self):
+        with self.assertRaises(InsufficientStock):
+            self.ledger.adjust(self.sooner.id, -6, 'Broken bottles')
+        with self.assertRaises(InventoryError):
+            self.ledger.adjust(self.sooner.id, -1, '')
+        self.ledger.adjust(self.sooner.id, -5, 'Broken bottles')
+        self.assertEqual(self.stock(self.sooner), [0])
+
+    def test_reconcile_finds_and_fixes_drift(self):
+        PharmacyInventory.objects.filter(id=self.later.id).update(quantity_in_stock=18)
+        drifted = self.ledger.reconcile()
+        self.assertEqual(sorted(drifted), [(self.later.id, 18, 20), (self.expired.id, 50, 0)])
+        self.ledger.reconcile(fix=True)
+        self.assertEqual(self.ledger.reconcile(), [])
+
+    def test_stock_counts_only_unexpired_batches_on_hand(self):
+        response = self.client.get(f'/api/pharmacy/pharmacies/{self.pharmacy.id}/stock/')
+        row = response.data[0]
+        self.assertEqual((row['on_hand'], row['expired'], row['next_expiry']),
+                         (25, 50, self.today + timedelta(days=10)))
@@ -0,0 +1,15 @@
+from django.urls import path
+from . import views
+
+urlpatterns = [
+    path('safety-check/', views.SafetyCheckView.as_view(), name='prescription-safety-check'),
+    path('patients/<int:patient_id>/alerts/', views.PatientPrescriptionAlertsView.as_view(),
+         name='prescription-alerts'),
+
+    # Inventory ledger
+    path('prescriptions/<str:prescription_number>/dispense/', views.DispensePrescriptionView.as_view(),
+         name='prescription-dispense'),
+    path('inventory/receipts/', views.StockReceiptView.as_view(), name='stock-receipt'),
+    path('inventory/<int:inventory_id>/adjustments/', views.StockAdjustmentView.as_view(), name='stock-adjustment'),
+    path('pharmacies/<int:pharmacy_id>/stock/', views.PharmacyStockView.as_view(), name='pharmacy-stock'),
+]
@@ -0,0 +1,166 @@
+# BE/pharmacy/views.py
+from rest_framework import status
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from audit.services.trail import audit_read
+from shared.models import Patient
+from shared.utils.permissions import IsClinician, is_clinician
+from .models import Medication, Pharmacy, Prescription, PrescriptionAlert
+from .serializers import InventoryMovementSerializer, PrescriptionAlertSerializer, StockReceiptSerializer
+from .services.inventory import InsufficientStock, InventoryError, InventoryLedger
+from .services.safety import SEVERITY_RANK, PrescribingSafety
+
+
+class SafetyCheckView(APIView):
+    """
+    Check a medication against a patient's allergies, conditions and active
+    prescriptions before prescribing it.
+    Body: {"patient_id", "medication_id"}
+    """
+    permission_classes = [IsClinician]
+
+    def post(self, request):
+        try:
+            patient_id = int(request.data.get('patient_id'))
+            medication_id = int(request.data.get('medication_id'))
+        except (TypeError, ValueError):
+            return Response({"detail": "patient_id and medication_id are required integers"},
+                            status=status.HTTP_400_BAD_REQUEST)
+        if not Patient.objects.filter(id=patient_id).exists():
+            return Response({"detail": "Patient not found"}, status=status.HTTP_404_NOT_FOUND)
+        if not Medication.objects.filter(id=medication_id).exists():
+            return Response({"detail": "Medication not found"}, status=status.HTTP_404_NOT_FOUND)
+
+        safety = PrescribingSafety()
+        issues = safety.check_new(patient_id, medication_id)
+        audit_read(request, 'PRESCRIPTION', patient_id, view='safety_check', medication_id=medication_id)
+        return Response({
+            'patient_id': patient_id,
+            'medication_id': medication_id,
+            'severity': issues[0].severity if issues else None,
+            'issues': [issue.as_dict() for issue in issues],
+            'rules_version': safety.rules.version,
+        })
+
+
+class PatientPrescriptionAlertsView(APIView):
+    """Safety alerts on a patient's active prescriptions, worst first"""
+
+    def get(self, request, patient_id):
+        user = request.user
+        own_chart = getattr(getattr(user, 'patient_profile', None), 'id', None) == patient_id
+        if not (own_chart or is_clinician(user)):
+            return Response({"detail": "You do not have access to this patient's prescriptions"},
+                            status=status.HTTP_403_FORBIDDEN)
+
+        alerts = sorted(
+            PrescriptionAlert.objects.filter(patient_id=patient_id).select_related(
+                'prescription__medication', 'interacting_prescription'
+            ),
+            key=lambda alert: (-SEVERITY_RANK[alert.severity], alert.prescription_id, alert.id),
+        )
+        audit_read(request, 'PRESCRIPTION', patient_id, view='safety_alerts',
+                   prescriptions=sorted({alert.prescription.prescription_number for alert in alerts}))
+        return Response(PrescriptionAlertSerializer(alerts, many=True).data)
+
+
+def inventory_error(error: InventoryError) -> Response:
+    if isinstance(error, InsufficientStock):
+        return Response({"detail": str(error), "requested": error.requested, "available": error.available},
+                        status=status.HTTP_409_CONFLICT)
+    return Response({"detail": str(error)}, status=status.HTTP_400_BAD_REQUEST)
+
+
+class DispensePrescriptionView(APIView):
+    """
+    Dispense a verified prescription, or a refill of a dispensed one, from the
+    first-expiring batches in stock.
+    Body (optional): {"pharmacy_id", "quantity"}; default the prescription's
+    pharmacy and prescribed quantity.
+    """
+    permission_classes = [IsClinician]
+
+    def post(self, request, prescription_number):
+        prescription = Prescription.objects.filter(prescription_number=prescription_number).first()
+        if prescription is None:
+            return Response({"detail": "Prescription not found"}, status=status.HTTP_404_NOT_FOUND)
+        try:
+            pharmacy_id = int(request.data['pharmacy_id']) if request.data.get('pharmacy_id') else None
+            quantity = int(request.data['quantity']) if request.data.get('quantity') else None
+        except (TypeError, ValueError):
+            return Response({"detail": "pharmacy_id and quantity must be integers"},
+                            status=status.HTTP_400_BAD_REQUEST)
+        if pharmacy_id is not None and not Pharmacy.objects.filter(id=pharmacy_id, is_active=True).exists():
+            return Response({"detail": "Pharmacy not found"}, status=status.HTTP_404_NOT_FOUND)
+
+        try:
+            movements = InventoryLedger().dispense(prescription, pharmacy_id, quantity, request.user)
+        except InventoryError as e:
+            return inventory_error(e)
+        return Response({
+            'prescription_number': prescription.prescription_number,
+            'status': prescription.status,
+            'refills_used': prescription.refills_used,
+            'movements': InventoryMovementSerializer(movements, many=True).data,
+        }, status=status.HTTP_201_CREATED)
+
+
+class StockReceiptView(APIView):
+    """Receive a batch of stock, adding to the batch if it is already on record"""
+    permission_classes = [IsClinician]
+
+    def post(self, request):
+        serializer = StockReceiptSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+        if not Pharmacy.objects.filter(id=data['pharmacy_id']).exists():
+            return Response({"detail": "Pharmacy not found"}, status=status.HTTP_404_NOT_FOUND)
+        if not Medication.objects.filter(id=data['medication_id']).exists():
+            return Response({"detail": "Medication not found"}, status=status.HTTP_404_NOT_FOUND)
+
+        try:
+            receipt = InventoryLedger().receive(user=request.user, **data)
+        except InventoryError as e:
+            return inventory_error(e)
+        return Response(InventoryMovementSerializer(receipt).data, status=status.HTTP_201_CREATED)
+
+
+class StockAdjustmentView(APIView):
+    """
+    Correct a batch's stock, e.g. after a count or a write-off.
+    Body: {"quantity" (signed), "reason"}
+    """
+    permission_classes = [IsClinician]
+
+    def post(self, request, inventory_id):
+        try:
+            quantity = int(request.data.get('quantity'))
+        except (TypeError, ValueError):
+            return Response({"detail": "quantity must be a signed integer"}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            adjustment = InventoryLedger().adjust(inventory_id, quantity, str(request.data.get('reason', '')).strip(),
+                                                  request.user)
+        except InventoryError as e:
+            return inventory_error(e)
+        return Response(InventoryMovementSerializer(adjustment).data, status=status.HTTP_201_CREATED)
+
+
+class PharmacyStockView(APIView):
+    """Stock per medication at a pharmacy: unexpired on hand, expired, and the next expiry"""
+    permission_classes = [IsClinician]
+
+    def get(self, request, pharmacy_id):
+        if not Pharmacy.objects.filter(id=pharmacy_id).exists():
+            return Response({"detail": "Pharmacy not found"}, status=status.HTTP_404_NOT_FOUND)
+        return Response([
+            {
+                'medication_id': row['medication_id'],
+                'medication': f"{row['medication__name']} {row['medication__strength']}".strip(),
+                'on_hand': row['on_hand'],
+                'expired': row['expired'],
+                'next_expiry': row['next_expiry'],
+                'is_low_stock': row['on_hand'] <= row['minimum_stock_level'],
+            }
+            for row in InventoryLedger().stock(pharmacy_id)
+        ])
@@ -1,5 +1,6 @@
 from django.contrib import admin
-from .models import HealthRecord, VitalSigns, MedicalHistory, Allergy
+from .models import HealthRecord, VitalSigns, MedicalHistory, Allergy, RecordAccessGrant
+from .services.access import visible_records
 
 @admin.register(HealthRecord)
 class HealthRecordAdmin(admin.ModelAdmin):
@@ -7,6 +8,9 @@ class HealthRecordAdmin(admin.ModelAdmin):
     list_filter = ['record_type', 'privacy_level', 'service_date', 'is_verified']
     search_fields = ['record_id', 'patient__user__first_name', 'title']
 
+    def get_queryset(self, request):
+        return visible_records(request.user, super().get_queryset(request))
+
 @admin.register(VitalSigns)
 class VitalSignsAdmin(admin.ModelAdmin):
     list_display = ['patient', 'systolic_bp', 'diastolic_bp', 'heart_rate', 'temperature', 'measured_at']
@@ -24,3 +28,10 @@ class AllergyAdmin(admin.ModelAdmin):
     list_display = ['patient', 'allergen_name', 'allergen_type', 'severity', 'is_active']
     list_filter = ['allergen_type', 'severity', 'is_active']
     search_fields = ['patient__user__first_name', 'allergen_name']
+
+
+@admin.register(RecordAccessGrant)
+class RecordAccessGrantAdmin(admin.ModelAdmin):
+    list_display = ['user', 'patient', 'privacy_level', 'reason', 'created_at']
+    list_filter = ['reason', 'privacy_level']
+    search_fields = ['user__username', 'patient__user__first_name', 'patient__user__last_name']
@@ -3,4 +3,7 @@ from django.apps import AppConfig
 class RecordsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'records'
-    verbose_name = 'Health Records Management'
\ No newline at end of file
+    verbose_name = 'Health Records Management'
+
+    def ready(self):
+        from . import signals  # noqa: F401
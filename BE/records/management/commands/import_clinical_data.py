@@ -0,0 +1,67 @@
+# BE/records/management/commands/import_clinical_data.py
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+
+from records.services.clinical_import import SCHEMAS, ClinicalImporter, get_import_config, start_job
+
+
+class Command(BaseCommand):
+    help = ('Bulk import patients, health records, vitals, medical history and allergies from CSV or FHIR '
+            '(JSON bundle or NDJSON); reruns with the same job name resume from the last checkpoint')
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='CSV, FHIR bundle (.json) or FHIR NDJSON (.ndjson) file')
+        parser.add_argument(
+            '--kind',
+            choices=sorted(SCHEMAS),
+            help='What a CSV file holds (required for CSV)',
+        )
+        parser.add_argument(
+            '--job',
+            help='Checkpoint name (default: the file name and kind)',
+        )
+        parser.add_argument(
+            '--default-doctor',
+            help='Username of the doctor recorded on rows that name none',
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=get_import_config().get('CHUNK_SIZE', 5000),
+            help='Source rows validated and written per transaction',
+        )
+        parser.add_argument(
+            '--restart',
+            action='store_true',
+            help='Start the job over instead of resuming it',
+        )
+
+    def handle(self, *args, **options):
+        path = options['path']
+        if not os.path.exists(path):
+            raise CommandError(f'{path} does not exist')
+        source_format = 'CSV' if path.lower().endswith('.csv') else 'FHIR'
+        kind = options['kind'] or ''
+        if source_format == 'CSV' and not kind:
+            raise CommandError('--kind is required for CSV files')
+
+        name = options['job'] or '-'.join(filter(None, [os.path.basename(path), kind]))
+        job = start_job(name, os.path.abspath(path), source_format, kind, restart=options['restart'])
+        if job.status == 'COMPLETED':
+            self.stdout.write(f'Import {name} already completed ({job.imported} imported); pass --restart to rerun')
+            return
+        if job.position:
+            self.stdout.write(f'Resuming import {name} after row {job.position}')
+
+        try:
+            importer = ClinicalImporter(job, chunk_size=options['chunk_size'], default_doctor=options['default_doctor'])
+        except ValueError as e:
+            raise CommandError(str(e))
+        job = importer.run()
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Import {name}: {job.position} rows read, {job.imported} imported, {job.rejected} rejected'
+        ))
+        for number, reason in job.errors[:20]:
+            self.stdout.write(f'  row {number}: {reason}')
@@ -0,0 +1,45 @@
+# BE/records/management/commands/prune_vitals.py
+import logging
+import time
+
+from django.core.management.base import BaseCommand
+
+from ...services.vitals import VitalsStore, get_vitals_config
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = 'Drop raw vital readings and minute rollups past their retention period'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Run a single pass and exit',
+        )
+        parser.add_argument(
+            '--interval',
+            type=int,
+            default=get_vitals_config().get('PRUNE_INTERVAL_SECONDS', 60 * 60),
+            help='Seconds between passes',
+        )
+
+    def handle(self, *args, **options):
+        store = VitalsStore()
+
+        while True:
+            try:
+                pruned = store.prune()
+                if any(pruned.values()) or options['verbosity'] > 1:
+                    self.stdout.write(
+                        f"Pruned {pruned['readings']} readings and {pruned['minute_rollups']} minute rollups"
+                    )
+            except Exception as e:
+                logger.error(f"Vitals pruning failed: {e}")
+                if options['once']:
+                    raise
+
+            if options['once']:
+                break
+            time.sleep(options['interval'])
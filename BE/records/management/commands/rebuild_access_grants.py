@@ -0,0 +1,20 @@
+# BE/records/management/commands/rebuild_access_grants.py
+from django.core.management.base import BaseCommand
+
+from records.services.access import AccessGrantService
+
+
+class Command(BaseCommand):
+    help = 'Recompute health record access grants from patients, appointments and records'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=2000,
+            help='Grants written per insert',
+        )
+
+    def handle(self, *args, **options):
+        count = AccessGrantService().rebuild(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {count} access grants'))
@@ -0,0 +1,25 @@
+# BE/records/management/commands/rebuild_record_search.py
+from django.core.management.base import BaseCommand
+
+from records.services.search import RecordSearchService, get_backend, PostgresSearchBackend
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the health record search index (records saved from now on are indexed as they change)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Records reindexed per transaction',
+        )
+
+    def handle(self, *args, **options):
+        backend = get_backend()
+        if isinstance(backend, PostgresSearchBackend):
+            self.stdout.write('PostgreSQL maintains the search_vector column itself; nothing to rebuild')
+            return
+
+        indexed = RecordSearchService(backend).rebuild(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Indexed {indexed} health records'))
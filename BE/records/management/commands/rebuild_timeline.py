@@ -0,0 +1,20 @@
+# BE/records/management/commands/rebuild_timeline.py
+from django.core.management.base import BaseCommand
+
+from records.services.timeline import TimelineService
+
+
+class Command(BaseCommand):
+    help = 'Rebuild patient timelines from their sources (changes from now on are applied as they happen)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=2000,
+            help='Source rows read and written per transaction',
+        )
+
+    def handle(self, *args, **options):
+        written = TimelineService().rebuild(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Wrote {written} timeline events'))
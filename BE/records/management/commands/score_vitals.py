@@ -0,0 +1,46 @@
+# BE/records/management/commands/score_vitals.py
+import logging
+import time
+
+from django.core.management.base import BaseCommand
+
+from ...services.early_warning import EarlyWarningEngine, get_early_warning_config
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = 'Rescore NEWS2 and vital-sign anomalies for every monitored patient'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Run a single pass and exit',
+        )
+        parser.add_argument(
+            '--interval',
+            type=int,
+            default=get_early_warning_config().get('SCORE_INTERVAL_SECONDS', 60),
+            help='Seconds between passes',
+        )
+
+    def handle(self, *args, **options):
+        engine = EarlyWarningEngine()
+
+        while True:
+            try:
+                # Readings aging out of the stale window change scores without any new ingest
+                result = engine.score()
+                if result.changed or options['verbosity'] > 1:
+                    self.stdout.write(
+                        f"Scored {result.scored} patients: {result.changed} changed, {result.alerts} alerts"
+                    )
+            except Exception as e:
+                logger.error(f"Early-warning scoring failed: {e}")
+                if options['once']:
+                    raise
+
+            if options['once']:
+                break
+            time.sleep(options['interval'])
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.30 on 2026-10-19 09:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('records', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='healthrecord',
+            name='record_id',
+            field=models.CharField(blank=True, help_text='Assigned on save if left blank', max_length=50, unique=True),
+        ),
+    ]
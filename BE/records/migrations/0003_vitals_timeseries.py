@@ -0,0 +1,58 @@
+# Generated by Django 4.2.30 on 2026-10-19 09:33
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shared', '0003_id_sequence'),
+        ('records', '0002_business_ids'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VitalRollup',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('vital', models.CharField(choices=[('HEART_RATE', 'Heart Rate'), ('SYSTOLIC_BP', 'Systolic Blood Pressure'), ('DIASTOLIC_BP', 'Diastolic Blood Pressure'), ('RESPIRATORY_RATE', 'Respiratory Rate'), ('TEMPERATURE', 'Temperature'), ('OXYGEN_SATURATION', 'Oxygen Saturation'), ('BLOOD_GLUCOSE', 'Blood Glucose'), ('PAIN_SCALE', 'Pain Scale')], max_length=20)),
+                ('resolution', models.CharField(choices=[('MINUTE', '1 minute'), ('HOUR', '1 hour'), ('DAY', '1 day')], max_length=10)),
+                ('bucket_start', models.DateTimeField()),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('total', models.FloatField(default=0)),
+                ('minimum', models.FloatField(null=True)),
+                ('maximum', models.FloatField(null=True)),
+                ('patient', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='vital_rollups', to='shared.patient')),
+            ],
+            options={
+                'db_table': 'vital_rollups',
+            },
+        ),
+        migrations.CreateModel(
+            name='VitalReading',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('vital', models.CharField(choices=[('HEART_RATE', 'Heart Rate'), ('SYSTOLIC_BP', 'Systolic Blood Pressure'), ('DIASTOLIC_BP', 'Diastolic Blood Pressure'), ('RESPIRATORY_RATE', 'Respiratory Rate'), ('TEMPERATURE', 'Temperature'), ('OXYGEN_SATURATION', 'Oxygen Saturation'), ('BLOOD_GLUCOSE', 'Blood Glucose'), ('PAIN_SCALE', 'Pain Scale')], max_length=20)),
+                ('value', models.FloatField()),
+                ('measured_at', models.DateTimeField()),
+                ('source', models.CharField(blank=True, help_text="Device id, or 'chart' for charted vitals", max_length=100)),
+                ('patient', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='vital_readings', to='shared.patient')),
+            ],
+            options={
+                'db_table': 'vital_readings',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='vitalrollup',
+            constraint=models.UniqueConstraint(fields=('patient', 'vital', 'resolution', 'bucket_start'), name='vital_rollup_unique'),
+        ),
+        migrations.AddIndex(
+            model_name='vitalreading',
+            index=models.Index(fields=['patient', 'vital', 'measured_at'], name='vital_reading_series_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='vitalreading',
+            index=models.Index(fields=['measured_at'], name='vital_reading_time_idx'),
+        ),
+    ]
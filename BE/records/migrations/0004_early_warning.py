@@ -0,0 +1,47 @@
+# Generated by Django 4.2.30 on 2026-10-19 09:38
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shared', '0003_id_sequence'),
+        ('records', '0003_vitals_timeseries'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='vitalrollup',
+            name='total_squares',
+            field=models.FloatField(default=0),
+        ),
+        migrations.CreateModel(
+            name='VitalSnapshot',
+            fields=[
+                ('patient', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='vital_snapshot', serialize=False, to='shared.patient')),
+                ('respiratory_rate', models.FloatField(blank=True, null=True)),
+                ('respiratory_rate_at', models.DateTimeField(blank=True, null=True)),
+                ('oxygen_saturation', models.FloatField(blank=True, null=True)),
+                ('oxygen_saturation_at', models.DateTimeField(blank=True, null=True)),
+                ('systolic_bp', models.FloatField(blank=True, null=True)),
+                ('systolic_bp_at', models.DateTimeField(blank=True, null=True)),
+                ('heart_rate', models.FloatField(blank=True, null=True)),
+                ('heart_rate_at', models.DateTimeField(blank=True, null=True)),
+                ('temperature', models.FloatField(blank=True, help_text='°F', null=True)),
+                ('temperature_at', models.DateTimeField(blank=True, null=True)),
+                ('last_reading_at', models.DateTimeField(blank=True, null=True)),
+                ('news2_score', models.PositiveSmallIntegerField(blank=True, null=True)),
+                ('risk', models.CharField(blank=True, choices=[('LOW', 'Low'), ('LOW_MEDIUM', 'Low-medium'), ('MEDIUM', 'Medium'), ('HIGH', 'High')], max_length=10)),
+                ('anomalies', models.JSONField(blank=True, default=list)),
+                ('scored_at', models.DateTimeField(blank=True, null=True)),
+                ('alerted_risk', models.CharField(blank=True, choices=[('LOW', 'Low'), ('LOW_MEDIUM', 'Low-medium'), ('MEDIUM', 'Medium'), ('HIGH', 'High')], max_length=10)),
+                ('alerted_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'db_table': 'vital_snapshots',
+                'indexes': [models.Index(fields=['last_reading_at'], name='vital_snapshot_recent_idx')],
+            },
+        ),
+    ]
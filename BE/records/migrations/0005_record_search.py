@@ -0,0 +1,56 @@
+# Generated by Django 4.2.30 on 2026-10-19 09:52
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+# Weights A-D match records.services.search.FIELD_WEIGHTS
+SEARCH_VECTOR = """
+    setweight(to_tsvector('english'::regconfig, coalesce(title, '')), 'A') ||
+    setweight(to_tsvector('english'::regconfig, coalesce(diagnosis, '') || ' ' || coalesce(chief_complaint, '')), 'B') ||
+    setweight(to_tsvector('english'::regconfig, coalesce(description, '') || ' ' || coalesce(treatment_plan, '') || ' '
+                          || coalesce(follow_up_instructions, '')), 'C') ||
+    setweight(to_tsvector('english'::regconfig, coalesce(clinical_notes, '')), 'D')
+"""
+
+
+def add_search_vector(apps, schema_editor):
+    """PostgreSQL keeps a generated tsvector column current on every write; other databases use the term table"""
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(
+        f"ALTER TABLE health_records ADD COLUMN search_vector tsvector GENERATED ALWAYS AS ({SEARCH_VECTOR}) STORED"
+    )
+    schema_editor.execute("CREATE INDEX health_record_search_idx ON health_records USING GIN (search_vector)")
+
+
+def drop_search_vector(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute("ALTER TABLE health_records DROP COLUMN search_vector")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('records', '0004_early_warning'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RecordSearchTerm',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('term', models.CharField(max_length=64)),
+                ('weight', models.FloatField(help_text='Field-weighted term frequency')),
+                ('record', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='search_terms', to='records.healthrecord')),
+            ],
+            options={
+                'db_table': 'record_search_terms',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='recordsearchterm',
+            constraint=models.UniqueConstraint(fields=('term', 'record'), name='record_search_term_unique'),
+        ),
+        migrations.RunPython(add_search_vector, drop_search_vector),
+    ]
@@ -0,0 +1,74 @@
+# Generated by Django 4.2.30 on 2026-10-19 09:55
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+# records.services.access.GRANT_LEVELS at the time of this migration
+GRANT_LEVELS = {
+    'SELF': ['PUBLIC', 'RESTRICTED', 'CONFIDENTIAL'],
+    'TREATING': ['PUBLIC', 'RESTRICTED'],
+}
+
+
+def backfill_grants(apps, schema_editor):
+    Patient = apps.get_model('shared', 'Patient')
+    Appointment = apps.get_model('doctor', 'Appointment')
+    HealthRecord = apps.get_model('records', 'HealthRecord')
+    RecordAccessGrant = apps.get_model('records', 'RecordAccessGrant')
+
+    pairs = {('SELF', user_id, patient_id) for patient_id, user_id in Patient.objects.values_list('id', 'user_id')}
+    for queryset in (Appointment.objects.exclude(status='CANCELLED'), HealthRecord.objects.all()):
+        pairs.update(
+            ('TREATING', user_id, patient_id)
+            for user_id, patient_id in queryset.values_list('doctor__user_id', 'patient_id').distinct()
+        )
+    RecordAccessGrant.objects.bulk_create([
+        RecordAccessGrant(user_id=user_id, patient_id=patient_id, privacy_level=level, reason=reason)
+        for reason, user_id, patient_id in pairs
+        for level in GRANT_LEVELS[reason]
+    ], batch_size=2000, ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shared', '0003_id_sequence'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('records', '0005_record_search'),
+        ('doctor', '0004_waitlist'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RecordAccessGrant',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('privacy_level', models.CharField(choices=[('PUBLIC', 'Public'), ('RESTRICTED', 'Restricted'), ('CONFIDENTIAL', 'Confidential'), ('SECRET', 'Secret')], max_length=20)),
+                ('reason', models.CharField(choices=[('SELF', 'Own chart'), ('TREATING', 'Treating doctor')], max_length=20)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'db_table': 'record_access_grants',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='healthrecord',
+            index=models.Index(fields=['patient', '-service_date'], name='health_record_patient_date_idx'),
+        ),
+        migrations.AddField(
+            model_name='recordaccessgrant',
+            name='patient',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='record_access_grants', to='shared.patient'),
+        ),
+        migrations.AddField(
+            model_name='recordaccessgrant',
+            name='user',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='record_access_grants', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddConstraint(
+            model_name='recordaccessgrant',
+            constraint=models.UniqueConstraint(fields=('user', 'patient', 'privacy_level', 'reason'), name='record_access_grant_unique'),
+        ),
+        migrations.RunPython(backfill_grants, migrations.RunPython.noop),
+    ]
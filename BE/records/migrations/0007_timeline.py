@@ -0,0 +1,39 @@
+# Generated by Django 4.2.30 on 2026-10-19 10:04
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shared', '0003_id_sequence'),
+        ('records', '0006_access_grants'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TimelineEvent',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('event_type', models.CharField(choices=[('CONDITION', 'Condition'), ('HEALTH_RECORD', 'Health record'), ('ALLERGY', 'Allergy'), ('PRESCRIPTION', 'Prescription'), ('LAB_ORDER', 'Lab order'), ('APPOINTMENT', 'Appointment')], max_length=20)),
+                ('source_id', models.BigIntegerField(help_text='Primary key of the row this event summarizes')),
+                ('occurred_at', models.DateTimeField()),
+                ('title', models.CharField(max_length=200)),
+                ('category', models.CharField(blank=True, help_text='Record type, ICD code, allergen type, ...', max_length=50)),
+                ('status', models.CharField(blank=True, max_length=50)),
+                ('reference', models.CharField(blank=True, help_text='Business id of the source, if it has one', max_length=50)),
+                ('privacy_level', models.CharField(blank=True, help_text='Health records only', max_length=20)),
+                ('doctor', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='shared.doctor')),
+                ('patient', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='timeline_events', to='shared.patient')),
+            ],
+            options={
+                'db_table': 'timeline_events',
+                'indexes': [models.Index(fields=['patient', '-occurred_at', '-id'], name='timeline_patient_time_idx'), models.Index(fields=['patient', 'event_type', '-occurred_at', '-id'], name='timeline_patient_type_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='timelineevent',
+            constraint=models.UniqueConstraint(fields=('event_type', 'source_id'), name='timeline_event_source_unique'),
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 4.2.30 on 2026-10-19 10:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('records', '0007_timeline'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ClinicalImportJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, unique=True)),
+                ('source', models.CharField(max_length=500)),
+                ('format', models.CharField(choices=[('CSV', 'CSV'), ('FHIR', 'FHIR bundle or NDJSON')], max_length=10)),
+                ('kind', models.CharField(blank=True, help_text='What a CSV file holds; FHIR resources say themselves', max_length=20)),
+                ('position', models.PositiveBigIntegerField(default=0, help_text='Source rows committed')),
+                ('imported', models.PositiveBigIntegerField(default=0)),
+                ('rejected', models.PositiveBigIntegerField(default=0)),
+                ('errors', models.JSONField(blank=True, default=list, help_text='First rejected rows: [row, reason]')),
+                ('status', models.CharField(choices=[('RUNNING', 'Running'), ('COMPLETED', 'Completed'), ('FAILED', 'Failed')], default='RUNNING', max_length=10)),
+                ('started_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'db_table': 'clinical_import_jobs',
+            },
+        ),
+    ]
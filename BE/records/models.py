@@ -2,6 +2,8 @@
 from django.db import models
 from django.core.validators import MinValueValidator, MaxValueValidator
 
+from shared.utils.ids import next_id
+
 class HealthRecord(models.Model):
     RECORD_TYPE_CHOICES = [
         ('CONSULTATION', 'Consultation'),
@@ -25,7 +27,7 @@ class HealthRecord(models.Model):
         ('SECRET', 'Secret'),
     ]
 
-    record_id = models.CharField(max_length=50, unique=True)
+    record_id = models.CharField(max_length=50, unique=True, blank=True, help_text="Assigned on save if left blank")
     patient = models.ForeignKey('shared.Patient', on_delete=models.CASCADE, related_name='health_records')
     doctor = models.ForeignKey('shared.Doctor', on_delete=models.CASCADE, related_name='created_records')
     record_type = models.CharField(max_length=20, choices=RECORD_TYPE_CHOICES)
@@ -55,12 +57,20 @@ class HealthRecord(models.Model):
     verified_by = models.ForeignKey('shared.User', on_delete=models.SET_NULL, null=True, blank=True, related_name='verified_records')
     verified_at = models.DateTimeField(null=True, blank=True)
 
+    def save(self, *args, **kwargs):
+        if not self.record_id:
+            self.record_id = next_id('health_record', 'HR')
+        super().save(*args, **kwargs)
+
     def __str__(self):
         return f"{self.record_type} - {self.patient.user.get_full_name()} - {self.service_date}"
 
     class Meta:
         db_table = 'health_records'
         ordering = ['-service_date', '-created_at']
+        indexes = [
+            models.Index(fields=['patient', '-service_date'], name='health_record_patient_date_idx'),
+        ]
 
 class VitalSigns(models.Model):
     health_record = models.OneToOneField(HealthRecord, on_delete=models.CASCADE, related_name='vital_signs')
@@ -142,6 +152,244 @@ class VitalSigns(models.Model):
         db_table = 'vital_signs'
         ordering = ['-measured_at']
 
+class VitalReading(models.Model):
+    """
+    One measurement of one vital sign, append-only. Device feeds and charted
+    VitalSigns both land here; trends read the VitalRollup buckets instead.
+    """
+    VITAL_CHOICES = [
+        ('HEART_RATE', 'Heart Rate'),
+        ('SYSTOLIC_BP', 'Systolic Blood Pressure'),
+        ('DIASTOLIC_BP', 'Diastolic Blood Pressure'),
+        ('RESPIRATORY_RATE', 'Respiratory Rate'),
+        ('TEMPERATURE', 'Temperature'),
+        ('OXYGEN_SATURATION', 'Oxygen Saturation'),
+        ('BLOOD_GLUCOSE', 'Blood Glucose'),
+        ('PAIN_SCALE', 'Pain Scale'),
+    ]
+
+    id = models.BigAutoField(primary_key=True)
+    patient = models.ForeignKey('shared.Patient', on_delete=models.CASCADE, related_name='vital_readings')
+    vital = models.CharField(max_length=20, choices=VITAL_CHOICES)
+    value = models.FloatField()
+    measured_at = models.DateTimeField()
+    source = models.CharField(max_length=100, blank=True, help_text="Device id, or 'chart' for charted vitals")
+
+    def __str__(self):
+        return f"{self.vital} {self.value} for patient {self.patient_id} at {self.measured_at}"
+
+    class Meta:
+        db_table = 'vital_readings'
+        indexes = [
+            # Readings of one patient's vital sit together in time order
+            models.Index(fields=['patient', 'vital', 'measured_at'], name='vital_reading_series_idx'),
+            models.Index(fields=['measured_at'], name='vital_reading_time_idx'),
+        ]
+
+class VitalRollup(models.Model):
+    """
+    Count, sum, min and max of one patient's vital per minute, hour or day
+    bucket; the sum of squares gives the variance for baselines.
+    """
+    RESOLUTION_CHOICES = [
+        ('MINUTE', '1 minute'),
+        ('HOUR', '1 hour'),
+        ('DAY', '1 day'),
+    ]
+
+    id = models.BigAutoField(primary_key=True)
+    patient = models.ForeignKey('shared.Patient', on_delete=models.CASCADE, related_name='vital_rollups')
+    vital = models.CharField(max_length=20, choices=VitalReading.VITAL_CHOICES)
+    resolution = models.CharField(max_length=10, choices=RESOLUTION_CHOICES)
+    bucket_start = models.DateTimeField()
+    count = models.PositiveIntegerField(default=0)
+    total = models.FloatField(default=0)
+    total_squares = models.FloatField(default=0)
+    minimum = models.FloatField(null=True)
+    maximum = models.FloatField(null=True)
+
+    @property
+    def average(self):
+        return self.total / self.count if self.count else None
+
+    def __str__(self):
+        return f"{self.vital} {self.resolution} {self.bucket_start} for patient {self.patient_id}"
+
+    class Meta:
+        db_table = 'vital_rollups'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['patient', 'vital', 'resolution', 'bucket_start'], name='vital_rollup_unique'
+            ),
+        ]
+
+class VitalSnapshot(models.Model):
+    """
+    Latest value of each early-warning vital per patient and the NEWS2 score
+    they give, kept current on ingest so a whole ward is scored from one row
+    per patient.
+    """
+    RISK_CHOICES = [
+        ('LOW', 'Low'),
+        ('LOW_MEDIUM', 'Low-medium'),
+        ('MEDIUM', 'Medium'),
+        ('HIGH', 'High'),
+    ]
+
+    patient = models.OneToOneField('shared.Patient', on_delete=models.CASCADE, primary_key=True,
+                                   related_name='vital_snapshot')
+    respiratory_rate = models.FloatField(null=True, blank=True)
+    respiratory_rate_at = models.DateTimeField(null=True, blank=True)
+    oxygen_saturation = models.FloatField(null=True, blank=True)
+    oxygen_saturation_at = models.DateTimeField(null=True, blank=True)
+    systolic_bp = models.FloatField(null=True, blank=True)
+    systolic_bp_at = models.DateTimeField(null=True, blank=True)
+    heart_rate = models.FloatField(null=True, blank=True)
+    heart_rate_at = models.DateTimeField(null=True, blank=True)
+    temperature = models.FloatField(null=True, blank=True, help_text="°F")
+    temperature_at = models.DateTimeField(null=True, blank=True)
+    last_reading_at = models.DateTimeField(null=True, blank=True)
+
+    # Scoring
+    news2_score = models.PositiveSmallIntegerField(null=True, blank=True)
+    risk = models.CharField(max_length=10, choices=RISK_CHOICES, blank=True)
+    anomalies = models.JSONField(default=list, blank=True)
+    scored_at = models.DateTimeField(null=True, blank=True)
+    alerted_risk = models.CharField(max_length=10, choices=RISK_CHOICES, blank=True)
+    alerted_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"Patient {self.patient_id}: NEWS2 {self.news2_score} ({self.risk or 'unscored'})"
+
+    class Meta:
+        db_table = 'vital_snapshots'
+        indexes = [
+            models.Index(fields=['last_reading_at'], name='vital_snapshot_recent_idx'),
+        ]
+
+class RecordAccessGrant(models.Model):
+    """
+    Denormalized read access: one row per user, patient and privacy level the
+    user may read on that patient's chart, so record visibility is an indexed
+    EXISTS instead of per-record checks. Maintained from patients, appointments
+    and health records; see records.services.access.
+    """
+    REASON_CHOICES = [
+        ('SELF', 'Own chart'),
+        ('TREATING', 'Treating doctor'),
+    ]
+
+    user = models.ForeignKey('shared.User', on_delete=models.CASCADE, related_name='record_access_grants')
+    patient = models.ForeignKey('shared.Patient', on_delete=models.CASCADE, related_name='record_access_grants')
+    privacy_level = models.CharField(max_length=20, choices=HealthRecord.PRIVACY_LEVEL_CHOICES)
+    reason = models.CharField(max_length=20, choices=REASON_CHOICES)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"User {self.user_id} reads {self.privacy_level} records of patient {self.patient_id} ({self.reason})"
+
+    class Meta:
+        db_table = 'record_access_grants'
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'patient', 'privacy_level', 'reason'],
+                                    name='record_access_grant_unique'),
+        ]
+
+class RecordSearchTerm(models.Model):
+    """
+    Inverted index of HealthRecord text for databases without native full-text
+    search; on PostgreSQL a generated tsvector column is used instead.
+    """
+    term = models.CharField(max_length=64)
+    record = models.ForeignKey(HealthRecord, on_delete=models.CASCADE, related_name='search_terms')
+    weight = models.FloatField(help_text="Field-weighted term frequency")
+
+    def __str__(self):
+        return f"{self.term} -> {self.record_id}"
+
+    class Meta:
+        db_table = 'record_search_terms'
+        constraints = [
+            models.UniqueConstraint(fields=['term', 'record'], name='record_search_term_unique'),
+        ]
+
+class TimelineEvent(models.Model):
+    """
+    Materialized patient timeline: one row per condition, health record,
+    allergy, prescription, lab order and appointment, dated and summarized, so
+    a history of any length pages by (occurred_at, id) from one index instead
+    of merging six tables per request. Kept current by signals; see
+    records.services.timeline.
+    """
+    EVENT_TYPE_CHOICES = [
+        ('CONDITION', 'Condition'),
+        ('HEALTH_RECORD', 'Health record'),
+        ('ALLERGY', 'Allergy'),
+        ('PRESCRIPTION', 'Prescription'),
+        ('LAB_ORDER', 'Lab order'),
+        ('APPOINTMENT', 'Appointment'),
+    ]
+
+    id = models.BigAutoField(primary_key=True)
+    patient = models.ForeignKey('shared.Patient', on_delete=models.CASCADE, related_name='timeline_events')
+    event_type = models.CharField(max_length=20, choices=EVENT_TYPE_CHOICES)
+    source_id = models.BigIntegerField(help_text="Primary key of the row this event summarizes")
+    occurred_at = models.DateTimeField()
+    title = models.CharField(max_length=200)
+    category = models.CharField(max_length=50, blank=True, help_text="Record type, ICD code, allergen type, ...")
+    status = models.CharField(max_length=50, blank=True)
+    reference = models.CharField(max_length=50, blank=True, help_text="Business id of the source, if it has one")
+    privacy_level = models.CharField(max_length=20, blank=True, help_text="Health records only")
+    doctor = models.ForeignKey('shared.Doctor', on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+
+    def __str__(self):
+        return f"{self.event_type} {self.title} for patient {self.patient_id} at {self.occurred_at}"
+
+    class Meta:
+        db_table = 'timeline_events'
+        constraints = [
+            models.UniqueConstraint(fields=['event_type', 'source_id'], name='timeline_event_source_unique'),
+        ]
+        indexes = [
+            models.Index(fields=['patient', '-occurred_at', '-id'], name='timeline_patient_time_idx'),
+            models.Index(fields=['patient', 'event_type', '-occurred_at', '-id'], name='timeline_patient_type_idx'),
+        ]
+
+class ClinicalImportJob(models.Model):
+    """
+    Progress of one bulk import (records.services.clinical_import). ``position``
+    advances in the same transaction as each written chunk, so a rerun under
+    the same name resumes after the last committed chunk.
+    """
+    FORMAT_CHOICES = [
+        ('CSV', 'CSV'),
+        ('FHIR', 'FHIR bundle or NDJSON'),
+    ]
+    STATUS_CHOICES = [
+        ('RUNNING', 'Running'),
+        ('COMPLETED', 'Completed'),
+        ('FAILED', 'Failed'),
+    ]
+
+    name = models.CharField(max_length=100, unique=True)
+    source = models.CharField(max_length=500)
+    format = models.CharField(max_length=10, choices=FORMAT_CHOICES)
+    kind = models.CharField(max_length=20, blank=True, help_text="What a CSV file holds; FHIR resources say themselves")
+    position = models.PositiveBigIntegerField(default=0, help_text="Source rows committed")
+    imported = models.PositiveBigIntegerField(default=0)
+    rejected = models.PositiveBigIntegerField(default=0)
+    errors = models.JSONField(default=list, blank=True, help_text="First rejected rows: [row, reason]")
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='RUNNING')
+    started_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"Import {self.name}: {self.position} rows ({self.status})"
+
+    class Meta:
+        db_table = 'clinical_import_jobs'
+
 class MedicalHistory(models.Model):
     CONDITION_STATUS_CHOICES = [
         ('ACTIVE', 'Active'),
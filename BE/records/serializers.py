@@ -0,0 +1,25 @@
+# BE/records/serializers.py
+from rest_framework import serializers
+from .models import HealthRecord, TimelineEvent
+
+
+class HealthRecordSummarySerializer(serializers.ModelSerializer):
+    class Meta:
+        model = HealthRecord
+        fields = ['id', 'record_id', 'patient', 'doctor', 'record_type', 'title', 'service_date',
+                  'privacy_level', 'is_verified', 'created_at']
+        read_only_fields = fields
+
+
+class TimelineEventSerializer(serializers.ModelSerializer):
+    doctor_name = serializers.SerializerMethodField()
+
+    class Meta:
+        model = TimelineEvent
+        fields = ['id', 'event_type', 'occurred_at', 'title', 'category', 'status', 'reference', 'privacy_level',
+                  'doctor', 'doctor_name']
+        read_only_fields = fields
+
+    def get_doctor_name(self, event):
+        user = event.doctor.user if event.doctor_id else None
+        return user.get_full_name() or user.username if user else ''
@@ -0,0 +1,146 @@
+# BE/records/services/access.py
+import logging
+from functools import reduce
+from operator import or_
+from typing import Iterable, Set, Tuple
+
+from django.db import transaction
+from django.db.models import Exists, OuterRef, Q, QuerySet
+
+from doctor.models.schedule import Appointment
+from shared.models import Doctor, Patient
+from shared.utils.transactions import OnCommitBatch
+from ..models import HealthRecord, RecordAccessGrant
+
+logger = logging.getLogger(__name__)
+
+# Privacy levels each grant reason opens on a patient's chart; SECRET records
+# are only read by their author, explicitly authorized users and superusers
+GRANT_LEVELS = {
+    'SELF': ['PUBLIC', 'RESTRICTED', 'CONFIDENTIAL'],
+    'TREATING': ['PUBLIC', 'RESTRICTED'],
+}
+# Privacy levels readable on any chart by role
+STAFF_LEVELS = ['PUBLIC', 'RESTRICTED', 'CONFIDENTIAL']
+NURSE_LEVELS = ['PUBLIC']
+
+
+def role_levels(user):
+    if user.is_staff:
+        return STAFF_LEVELS
+    if hasattr(user, 'nurse_profile'):
+        return NURSE_LEVELS
+    return []
+
+
+def record_access_filter(user) -> Q:
+    """
+    Everything that lets ``user`` read a health record, as one filter: a grant
+    for the record's patient at its privacy level (own chart, treating doctor),
+    explicit authorization, authorship, and role-wide levels. Both EXISTS
+    probes are correlated on indexed columns, so listings never over-fetch.
+    """
+    grants = RecordAccessGrant.objects.filter(
+        user_id=user.id, patient_id=OuterRef('patient_id'), privacy_level=OuterRef('privacy_level')
+    )
+    authorized = HealthRecord.authorized_users.through.objects.filter(user_id=user.id, healthrecord_id=OuterRef('pk'))
+    allowed = Q(Exists(grants)) | Q(Exists(authorized)) | Q(created_by_id=user.id)
+
+    doctor = getattr(user, 'doctor_profile', None) if user.is_doctor else None
+    if doctor is not None:
+        allowed |= Q(doctor_id=doctor.id)
+    levels = role_levels(user)
+    if levels:
+        allowed |= Q(privacy_level__in=levels)
+    return allowed
+
+
+def visible_records(user, queryset=None) -> QuerySet:
+    """``queryset`` (default all health records) narrowed to what ``user`` may read"""
+    queryset = HealthRecord.objects.all() if queryset is None else queryset
+    if not (user and user.is_authenticated):
+        return queryset.none()
+    if user.is_superuser:
+        return queryset
+    return queryset.filter(record_access_filter(user))
+
+
+def can_read(user, record: HealthRecord) -> bool:
+    return visible_records(user, HealthRecord.objects.filter(pk=record.pk)).exists()
+
+
+def in_care_of(user, field='patient_id') -> Q:
+    """Patients ``user`` treats, per their TREATING grants"""
+    return Q(Exists(RecordAccessGrant.objects.filter(user_id=user.id, reason='TREATING', patient_id=OuterRef(field))))
+
+
+class AccessGrantService:
+    """
+    Keeps RecordAccessGrant in step with its sources: every patient reads their
+    own chart, and a doctor treats a patient while they share a non-cancelled
+    appointment or a health record. Changes are queued per (doctor, patient)
+    pair and settled after commit; ``rebuild`` recomputes everything.
+    """
+
+    def grant_self(self, patient_rows: Iterable[Tuple[int, int]]):
+        """Own-chart grants for (patient id, user id) rows"""
+        RecordAccessGrant.objects.bulk_create([
+            RecordAccessGrant(user_id=user_id, patient_id=patient_id, privacy_level=level, reason='SELF')
+            for patient_id, user_id in patient_rows
+            for level in GRANT_LEVELS['SELF']
+        ], batch_size=2000, ignore_conflicts=True)
+
+    def refresh_treating(self, pairs: Set[Tuple[int, int]]):
+        """Grant or revoke TREATING access for (doctor id, patient id) pairs from what links them now"""
+        pairs = {(doctor_id, patient_id) for doctor_id, patient_id in pairs if doctor_id and patient_id}
+        if not pairs:
+            return
+        doctor_ids = {doctor_id for doctor_id, _ in pairs}
+        patient_ids = {patient_id for _, patient_id in pairs}
+        linked = set(Appointment.objects.filter(
+            doctor_id__in=doctor_ids, patient_id__in=patient_ids
+        ).exclude(status='CANCELLED').values_list('doctor_id', 'patient_id').distinct())
+        linked |= set(HealthRecord.objects.filter(
+            doctor_id__in=doctor_ids, patient_id__in=patient_ids
+        ).values_list('doctor_id', 'patient_id').distinct())
+        users = dict(Doctor.objects.filter(id__in=doctor_ids).values_list('id', 'user_id'))
+
+        granted = [(users[doctor_id], patient_id) for doctor_id, patient_id in pairs & linked if doctor_id in users]
+        revoked = [(users[doctor_id], patient_id) for doctor_id, patient_id in pairs - linked if doctor_id in users]
+        with transaction.atomic():
+            if revoked:
+                RecordAccessGrant.objects.filter(reason='TREATING').filter(reduce(or_, [
+                    Q(user_id=user_id, patient_id=patient_id) for user_id, patient_id in revoked
+                ])).delete()
+            RecordAccessGrant.objects.bulk_create([
+                RecordAccessGrant(user_id=user_id, patient_id=patient_id, privacy_level=level, reason='TREATING')
+                for user_id, patient_id in granted
+                for level in GRANT_LEVELS['TREATING']
+            ], batch_size=2000, ignore_conflicts=True)
+
+    def rebuild(self, batch_size=2000) -> int:
+        """Recompute every grant from patients, appointments and records"""
+        treating = set(Appointment.objects.exclude(status='CANCELLED').values_list(
+            'doctor__user_id', 'patient_id'
+        ).distinct())
+        treating |= set(HealthRecord.objects.values_list('doctor__user_id', 'patient_id').distinct())
+
+        with transaction.atomic():
+            RecordAccessGrant.objects.all().delete()
+            self.grant_self(Patient.objects.values_list('id', 'user_id').iterator(chunk_size=batch_size))
+            RecordAccessGrant.objects.bulk_create([
+                RecordAccessGrant(user_id=user_id, patient_id=patient_id, privacy_level=level, reason='TREATING')
+                for user_id, patient_id in treating
+                for level in GRANT_LEVELS['TREATING']
+            ], batch_size=batch_size, ignore_conflicts=True)
+            count = RecordAccessGrant.objects.count()
+        logger.info(f"Rebuilt {count} record access grants ({len(treating)} treating relationships)")
+        return count
+
+
+def _refresh_pending(pairs):
+    AccessGrantService().refresh_treating(pairs)
+
+
+# (doctor id, patient id) pairs whose relationship changed in a transaction
+pending_grants = OnCommitBatch(_refresh_pending)
@@ -0,0 +1,221 @@
+# BE/records/services/chart.py
+import logging
+from typing import Dict, Optional
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Prefetch
+from django.utils import timezone
+
+from finance.models import Invoice
+from laboratory.models import LabResult
+from pharmacy.models import Prescription
+from shared.models import Patient
+from shared.utils.transactions import OnCommitBatch
+from ..models import Allergy, HealthRecord, MedicalHistory, VitalSigns
+
+logger = logging.getLogger(__name__)
+
+CURRENT_CONDITION_STATUSES = ['ACTIVE', 'CHRONIC']
+CURRENT_PRESCRIPTION_STATUSES = ['PENDING', 'VERIFIED', 'FILLED', 'DISPENSED']
+
+
+def get_chart_config():
+    return getattr(settings, 'CHART_CONFIG', {})
+
+
+def chart_cache_key(patient_id):
+    return f'records:chart:{patient_id}'
+
+
+def full_name(user) -> str:
+    return user.get_full_name() or user.username if user else ''
+
+
+class ChartSummaryService:
+    """
+    One-screen patient chart: recent health records, latest vital signs,
+    current conditions, allergies and prescriptions, recent lab results and
+    open invoices.
+
+    Assembled with a fixed eight queries whatever the chart size: the patient
+    with every section prefetched (related users joined in, so nothing loads
+    lazily), plus lab results, which reach the patient through their order.
+    The result is plain data, cached per patient until a write to any of those
+    models invalidates it.
+    """
+
+    def __init__(self):
+        config = get_chart_config()
+        self.recent_records = config.get('RECENT_RECORDS', 10)
+        self.recent_lab_results = config.get('RECENT_LAB_RESULTS', 20)
+        self.timeout = config.get('CACHE_SECONDS', 60 * 10)
+
+    def summary(self, patient_id) -> Optional[Dict]:
+        key = chart_cache_key(patient_id)
+        chart = cache.get(key)
+        if chart is None:
+            chart = self.build(patient_id)
+            if chart is not None:
+                cache.set(key, chart, self.timeout)
+        return chart
+
+    def prefetches(self):
+        today = timezone.localdate()
+        return [
+            Prefetch(
+                'health_records',
+                queryset=HealthRecord.objects.select_related('doctor__user').order_by(
+                    '-service_date', '-created_at'
+                )[:self.recent_records],
+                to_attr='recent_records',
+            ),
+            Prefetch(
+                'vital_signs',
+                queryset=VitalSigns.objects.order_by('-measured_at')[:1],
+                to_attr='latest_vital_signs',
+            ),
+            Prefetch(
+                'medical_history',
+                queryset=MedicalHistory.objects.filter(status__in=CURRENT_CONDITION_STATUSES),
+                to_attr='current_conditions',
+            ),
+            Prefetch(
+                'allergies',
+                queryset=Allergy.objects.filter(is_active=True),
+                to_attr='active_allergies',
+            ),
+            Prefetch(
+                'prescriptions',
+                queryset=Prescription.objects.filter(
+                    status__in=CURRENT_PRESCRIPTION_STATUSES, expiration_date__gte=today
+                ).select_related('medication', 'doctor__user').order_by('-prescribed_date'),
+                to_attr='current_prescriptions',
+            ),
+            Prefetch(
+                'invoices',
+                queryset=Invoice.objects.outstanding().order_by('due_date'),
+                to_attr='open_invoices',
+            ),
+        ]
+
+    def build(self, patient_id) -> Optional[Dict]:
+        patient = Patient.objects.select_related('user').prefetch_related(*self.prefetches()).filter(
+            id=patient_id
+        ).first()
+        if patient is None:
+            return None
+
+        lab_results = LabResult.objects.filter(order__patient_id=patient_id).select_related(
+            'test', 'order'
+        ).order_by('-result_date')[:self.recent_lab_results]
+        vitals = patient.latest_vital_signs[0] if patient.latest_vital_signs else None
+
+        return {
+            'patient': {
+                'id': patient.id,
+                'name': full_name(patient.user),
+                'date_of_birth': patient.date_of_birth,
+            },
+            'health_records': [
+                {
+                    'record_id': record.record_id,
+                    'record_type': record.record_type,
+                    'title': record.title,
+                    'service_date': record.service_date,
+                    'doctor': full_name(record.doctor.user),
+                    'privacy_level': record.privacy_level,
+                    'is_verified': record.is_verified,
+                }
+                for record in patient.recent_records
+            ],
+            'vital_signs': vitals and {
+                'measured_at': vitals.measured_at,
+                'systolic_bp': vitals.systolic_bp,
+                'diastolic_bp': vitals.diastolic_bp,
+                'heart_rate': vitals.heart_rate,
+                'respiratory_rate': vitals.respiratory_rate,
+                'temperature': vitals.temperature,
+                'oxygen_saturation': vitals.oxygen_saturation,
+                'height_cm': vitals.height_cm,
+                'weight_kg': vitals.weight_kg,
+                'bmi': vitals.bmi,
+                'blood_glucose': vitals.blood_glucose,
+                'pain_scale': vitals.pain_scale,
+            },
+            'conditions': [
+                {
+                    'condition_name': condition.condition_name,
+                    'icd_code': condition.icd_code,
+                    'status': condition.status,
+                    'severity': condition.severity,
+                    'diagnosed_date': condition.diagnosed_date,
+                }
+                for condition in patient.current_conditions
+            ],
+            'allergies': [
+                {
+                    'allergen_name': allergy.allergen_name,
+                    'allergen_type': allergy.allergen_type,
+                    'severity': allergy.severity,
+                    'reaction_description': allergy.reaction_description,
+                }
+                for allergy in patient.active_allergies
+            ],
+            'prescriptions': [
+                {
+                    'prescription_number': prescription.prescription_number,
+                    'medication': prescription.medication.name,
+                    'strength': prescription.medication.strength,
+                    'dosage': prescription.dosage,
+                    'frequency': prescription.frequency,
+                    'status': prescription.status,
+                    'prescribed_date': prescription.prescribed_date,
+                    'expiration_date': prescription.expiration_date,
+                    'refills_remaining': max(prescription.refills_allowed - prescription.refills_used, 0),
+                    'doctor': full_name(prescription.doctor.user),
+                }
+                for prescription in patient.current_prescriptions
+            ],
+            'lab_results': [
+                {
+                    'order_number': result.order.order_number,
+                    'test': result.test.name,
+                    'code': result.test.code,
+                    'value': result.value,
+                    'unit': result.unit,
+                    'status': result.status,
+                    'result_date': result.result_date,
+                }
+                for result in lab_results
+            ],
+            'open_invoices': [
+                {
+                    'invoice_number': invoice.invoice_number,
+                    'service_date': invoice.service_date,
+                    'due_date': invoice.due_date,
+                    'total_amount': invoice.total_amount,
+                    'balance_due': invoice.balance_due,
+                    'status': invoice.status,
+                }
+                for invoice in patient.open_invoices
+            ],
+        }
+
+
+def invalidate_charts(*patient_ids):
+    pending_chart_invalidations.add(*(('PATIENT', patient_id) for patient_id in patient_ids))
+
+
+def _invalidate_pending(keys):
+    """Keys are ('PATIENT', patient_id) or ('INVOICE', invoice_id), the latter resolved in one query"""
+    patient_ids = {key for kind, key in keys if kind == 'PATIENT'}
+    invoice_ids = {key for kind, key in keys if kind == 'INVOICE'}
+    if invoice_ids:
+        patient_ids.update(Invoice.objects.filter(id__in=invoice_ids).values_list('patient_id', flat=True))
+    cache.delete_many([chart_cache_key(patient_id) for patient_id in patient_ids if patient_id is not None])
+
+
+# Charts changed in a transaction are dropped after it commits, so a concurrent
+# read can't cache the pre-commit state over the invalidation
+pending_chart_invalidations = OnCommitBatch(_invalidate_pending)
@@ -0,0 +1,487 @@
+# BE/records/services/clinical_import.py
+import csv
+import logging
+from collections import defaultdict
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from itertools import islice
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from audit.services.trail import audit_writes
+from pharmacy.services.safety import pending_safety
+from shared.models import Doctor, Patient, User
+from shared.utils.ids import id_generator
+from ..models import Allergy, ClinicalImportJob, HealthRecord, MedicalHistory
+from .access import AccessGrantService, pending_grants
+from .chart import invalidate_charts
+from .fhir import read_resources, resource_rows
+from .search import RecordSearchService
+from .timeline import TimelineService
+from .vitals import VITAL_LIMITS, VITAL_NAMES, Reading, VitalsStore
+
+logger = logging.getLogger(__name__)
+
+# Patients first, so everything else in a chunk can reference them
+KINDS = ['patients', 'health_records', 'vitals', 'medical_history', 'allergies']
+TRUE_VALUES = {'true', 't', 'yes', 'y', '1'}
+FALSE_VALUES = {'false', 'f', 'no', 'n', '0'}
+
+
+def get_import_config():
+    return getattr(settings, 'IMPORT_CONFIG', {})
+
+
+def choices(field_choices) -> Tuple[str, ...]:
+    return tuple(choice for choice, _ in field_choices)
+
+
+@dataclass(frozen=True)
+class Column:
+    name: str
+    type: str = 'text'  # text, choice, date, datetime, float, bool or ref (a username)
+    required: bool = False
+    max_length: Optional[int] = None
+    choices: Tuple[str, ...] = ()
+    default: object = ''
+
+
+SCHEMAS = {
+    'patients': [
+        Column('username', required=True, max_length=150),
+        Column('first_name', max_length=150),
+        Column('last_name', max_length=150),
+        Column('email', max_length=254),
+        Column('phone_number', max_length=15),
+        Column('date_of_birth', 'date', default=None),
+    ],
+    'health_records': [
+        Column('patient', 'ref', required=True),
+        Column('doctor', 'ref'),
+        Column('record_type', 'choice', required=True, choices=choices(HealthRecord.RECORD_TYPE_CHOICES)),
+        Column('title', required=True, max_length=200),
+        Column('description'),
+        Column('service_date', 'date', required=True),
+        Column('chief_complaint'),
+        Column('diagnosis'),
+        Column('treatment_plan'),
+        Column('follow_up_instructions'),
+        Column('clinical_notes'),
+        Column('privacy_level', 'choice', choices=choices(HealthRecord.PRIVACY_LEVEL_CHOICES), default='RESTRICTED'),
+    ],
+    'vitals': [
+        Column('patient', 'ref', required=True),
+        Column('vital', 'choice', required=True, choices=tuple(sorted(VITAL_NAMES))),
+        Column('value', 'float', required=True),
+        Column('measured_at', 'datetime', required=True),
+        Column('source', max_length=100, default='import'),
+    ],
+    'medical_history': [
+        Column('patient', 'ref', required=True),
+        Column('condition_name', required=True, max_length=200),
+        Column('icd_code', max_length=20),
+        Column('status', 'choice', required=True, choices=choices(MedicalHistory.CONDITION_STATUS_CHOICES)),
+        Column('diagnosed_date', 'date', default=None),
+        Column('resolved_date', 'date', default=None),
+        Column('severity', max_length=50),
+        Column('notes'),
+        Column('family_relation', max_length=100),
+        Column('doctor', 'ref'),
+    ],
+    'allergies': [
+        Column('patient', 'ref', required=True),
+        Column('allergen_name', required=True, max_length=200),
+        Column('allergen_type', 'choice', required=True, choices=choices(Allergy.ALLERGEN_TYPE_CHOICES)),
+        Column('severity', 'choice', required=True, choices=choices(Allergy.SEVERITY_CHOICES)),
+        Column('reaction_description', required=True),
+        Column('symptoms'),
+        Column('treatment_notes'),
+        Column('first_occurrence_date', 'date', default=None),
+        Column('last_occurrence_date', 'date', default=None),
+        Column('is_active', 'bool', default=True),
+        Column('notes'),
+        Column('reported_by', 'ref'),
+    ],
+}
+
+
+def _float(value) -> float:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return np.nan
+
+
+def _datetime(value) -> Optional[datetime]:
+    if isinstance(value, datetime):
+        moment = value
+    else:
+        try:
+            moment = parse_datetime(str(value).strip())
+        except ValueError:
+            return None
+    if moment is not None and timezone.is_naive(moment):
+        moment = timezone.make_aware(moment)
+    return moment
+
+
+def _date(value):
+    try:
+        return parse_date(str(value).strip()[:10])
+    except ValueError:
+        return None
+
+
+def _bool(value):
+    if isinstance(value, bool):
+        return value
+    text = str(value).strip().lower()
+    return True if text in TRUE_VALUES else False if text in FALSE_VALUES else None
+
+
+def _text(value) -> str:
+    return str(value).strip()
+
+
+def missing(values: np.ndarray) -> np.ndarray:
+    return np.fromiter((value is None for value in values.tolist()), dtype=bool, count=len(values))
+
+
+PARSERS: Dict[str, Callable] = {'date': _date, 'datetime': _datetime, 'bool': _bool}
+
+
+class Chunk:
+    """
+    One kind's rows from a chunk, validated a column at a time: every column
+    is parsed into an array and checked with whole-array masks, and a row
+    keeps the first reason it was rejected for.
+    """
+
+    def __init__(self, kind: str, numbers: List[int], rows: List[Dict]):
+        self.kind = kind
+        self.numbers = np.array(numbers, dtype=np.int64)
+        self.errors = np.full(len(rows), '', dtype=object)
+        self.columns: Dict[str, np.ndarray] = {}
+        for column in SCHEMAS[kind]:
+            self.columns[column.name] = self.parse(column, [row.get(column.name) for row in rows])
+
+    def parse(self, column: Column, raw: List) -> np.ndarray:
+        blank = np.array([value is None or (isinstance(value, str) and not value.strip()) for value in raw], dtype=bool)
+        if column.required:
+            self.reject(blank, f'{column.name} is required')
+
+        if column.type == 'float':
+            values = np.array([_float(value) for value in raw], dtype=float)
+            self.reject(~blank & ~np.isfinite(values), f'{column.name} must be a number')
+            return values
+
+        if column.type in PARSERS:
+            parser = PARSERS[column.type]
+            values = np.array([None if empty else parser(value) for value, empty in zip(raw, blank)], dtype=object)
+            self.reject(~blank & missing(values), f'{column.name} is not a valid {column.type}')
+        else:
+            values = np.array(['' if empty else _text(value) for value, empty in zip(raw, blank)], dtype=object)
+            if column.type == 'choice':
+                values = np.array([value.upper().replace(' ', '_') for value in values], dtype=object)
+                self.reject(~blank & ~np.isin(values, column.choices),
+                            f'{column.name} must be one of {", ".join(column.choices)}')
+            if column.max_length:
+                lengths = np.fromiter((len(value) for value in values), dtype=np.int64, count=len(values))
+                self.reject(lengths > column.max_length, f'{column.name} is longer than {column.max_length}')
+        values[blank] = column.default
+        return values
+
+    def reject(self, mask: np.ndarray, reason: str):
+        self.errors[mask & (self.errors == '')] = reason
+
+    @property
+    def valid(self) -> np.ndarray:
+        return self.errors == ''
+
+    def rejected(self) -> List[Tuple[int, str]]:
+        invalid = ~self.valid
+        return list(zip(self.numbers[invalid].tolist(), self.errors[invalid].tolist()))
+
+    def records(self) -> List[Dict]:
+        """Valid rows, as field dicts"""
+        valid = self.valid
+        columns = {name: values[valid].tolist() for name, values in self.columns.items()}
+        return [dict(zip(columns, values)) for values in zip(*columns.values())]
+
+
+class ReferenceMaps:
+    """
+    Username to id maps for patients, doctors and users. Each chunk's unseen
+    usernames are loaded in one query per map, misses included, so a million
+    rows referencing the same patients cost a handful of lookups.
+    """
+
+    def __init__(self):
+        self.patients: Dict[str, Optional[int]] = {}
+        self.doctors: Dict[str, Optional[int]] = {}
+        self.doctor_users: Dict[int, int] = {}
+        self.users: Dict[str, Optional[int]] = {}
+
+    @staticmethod
+    def resolve(mapping, usernames: np.ndarray, load) -> np.ndarray:
+        missing = {username for username in usernames.tolist() if username and username not in mapping}
+        if missing:
+            mapping.update(dict.fromkeys(missing))
+            mapping.update(load(missing))
+        return np.array([mapping.get(username) if username else None for username in usernames.tolist()], dtype=object)
+
+    def patient_ids(self, usernames):
+        return self.resolve(self.patients, usernames, lambda keys: Patient.objects.filter(
+            user__username__in=keys
+        ).values_list('user__username', 'id'))
+
+    def doctor_ids(self, usernames):
+        def load(keys):
+            for username, doctor_id, user_id in Doctor.objects.filter(user__username__in=keys).values_list(
+                'user__username', 'id', 'user_id'
+            ):
+                self.doctor_users[doctor_id] = user_id
+                yield username, doctor_id
+        return self.resolve(self.doctors, usernames, load)
+
+    def user_ids(self, usernames):
+        return self.resolve(self.users, usernames, lambda keys: User.objects.filter(
+            username__in=keys
+        ).values_list('username', 'id'))
+
+
+class ClinicalImporter:
+    """
+    Streams patients, health records, vitals, medical history and allergies
+    from CSV or FHIR into the database.
+
+    Source rows are read ``chunk_size`` at a time. Each chunk is validated
+    column-wise, references are resolved through ReferenceMaps, and every kind
+    is written with bulk_create in one transaction that also advances the
+    job's checkpoint, so a crash or rerun resumes after the last committed
+    chunk. The work signals would do per row (access grants, search index,
+    timeline, audit, chart cache, vitals rollups) is done per chunk instead.
+    """
+
+    def __init__(self, job: ClinicalImportJob, chunk_size=None, default_doctor: Optional[str] = None):
+        config = get_import_config()
+        self.job = job
+        self.chunk_size = chunk_size or config.get('CHUNK_SIZE', 5000)
+        self.max_errors = config.get('MAX_LOGGED_ERRORS', 1000)
+        self.refs = ReferenceMaps()
+        self.default_doctor = None
+        if default_doctor:
+            self.default_doctor = self.refs.doctor_ids(np.array([default_doctor], dtype=object))[0]
+            if self.default_doctor is None:
+                raise ValueError(f'No doctor with username {default_doctor}')
+        self.writers = {
+            'patients': self.write_patients,
+            'health_records': self.write_health_records,
+            'vitals': self.write_vitals,
+            'medical_history': self.write_medical_history,
+            'allergies': self.write_allergies,
+        }
+
+    # Reading
+
+    def items(self) -> Iterator:
+        if self.job.format == 'CSV':
+            with open(self.job.source, newline='', encoding='utf-8-sig') as source:
+                yield from csv.DictReader(source)
+        else:
+            yield from read_resources(self.job.source)
+
+    def rows(self, item) -> List[Tuple[str, Dict]]:
+        return [(self.job.kind, item)] if self.job.format == 'CSV' else resource_rows(item)
+
+    # Running
+
+    def run(self) -> ClinicalImportJob:
+        items = islice(self.items(), self.job.position, None)
+        try:
+            while True:
+                chunk = list(islice(items, self.chunk_size))
+                if not chunk:
+                    break
+                self.import_chunk(chunk)
+        except Exception:
+            self.job.status = 'FAILED'
+            self.job.save(update_fields=['status', 'updated_at'])
+            raise
+        self.job.status = 'COMPLETED'
+        self.job.finished_at = timezone.now()
+        self.job.save(update_fields=['status', 'finished_at', 'updated_at'])
+        return self.job
+
+    def import_chunk(self, items: List):
+        grouped = defaultdict(lambda: ([], []))
+        rejected = []
+        for number, item in enumerate(items, start=self.job.position + 1):
+            rows = self.rows(item)
+            if not rows:
+                rejected.append((number, f"Unsupported resource {item.get('resourceType', '')}"))
+            for kind, row in rows:
+                grouped[kind][0].append(number)
+                grouped[kind][1].append(row)
+
+        imported = 0
+        with transaction.atomic():
+            for kind in KINDS:
+                if kind in grouped:
+                    chunk = Chunk(kind, *grouped[kind])
+                    imported += self.writers[kind](chunk)
+                    rejected.extend(chunk.rejected())
+
+            job = self.job
+            job.position += len(items)
+            job.imported += imported
+            job.rejected += len(rejected)
+            room = max(self.max_errors - len(job.errors), 0)
+            job.errors.extend([number, reason] for number, reason in sorted(rejected)[:room])
+            job.save(update_fields=['position', 'imported', 'rejected', 'errors', 'updated_at'])
+        logger.info(f"Import {job.name}: {job.position} rows read, {job.imported} imported, {job.rejected} rejected")
+
+    # Writers: each takes a validated chunk, may reject more rows, and returns how many it wrote
+
+    def resolve_patients(self, chunk: Chunk) -> np.ndarray:
+        patient_ids = self.refs.patient_ids(chunk.columns['patient'])
+        chunk.reject(missing(patient_ids), 'Unknown patient')
+        chunk.columns['patient'] = patient_ids
+        return patient_ids
+
+    def resolve_doctors(self, chunk: Chunk, column='doctor', required=True) -> np.ndarray:
+        named = chunk.columns[column] != ''
+        doctors = self.refs.doctor_ids(chunk.columns[column])
+        chunk.reject(named & missing(doctors), f'Unknown doctor in {column}')
+        if self.default_doctor is not None:
+            doctors[~named] = self.default_doctor
+        if required:
+            chunk.reject(missing(doctors), f'{column} is required (or pass a default doctor)')
+        chunk.columns[column] = doctors
+        return doctors
+
+    def audit(self, resource_type, rows):
+        audit_writes(None, 'CREATE', resource_type, rows, source=f'import:{self.job.name}')
+
+    def write_patients(self, chunk: Chunk) -> int:
+        usernames = chunk.columns['username']
+        # First occurrence in the chunk wins; names already taken are rejected
+        _, first = np.unique(usernames.astype(str), return_index=True)
+        repeated = np.ones(len(usernames), dtype=bool)
+        repeated[first] = False
+        chunk.reject(repeated, 'username repeated in chunk')
+        taken = set(User.objects.filter(username__in=usernames.tolist()).values_list('username', flat=True))
+        chunk.reject(np.isin(usernames, list(taken)), 'username already exists')
+
+        rows = chunk.records()
+        users = User.objects.bulk_create([
+            User(
+                username=row['username'], first_name=row['first_name'], last_name=row['last_name'],
+                email=row['email'], phone_number=row['phone_number'] or None, is_patient=True,
+                password=make_password(None),
+            )
+            for row in rows
+        ], batch_size=2000)
+        patients = Patient.objects.bulk_create([
+            Patient(user_id=user.id, date_of_birth=row['date_of_birth']) for user, row in zip(users, rows)
+        ], batch_size=2000)
+        self.refs.patients.update((user.username, patient.id) for user, patient in zip(users, patients))
+        self.refs.users.update((user.username, user.id) for user in users)
+        AccessGrantService().grant_self([(patient.id, patient.user_id) for patient in patients])
+        return len(patients)
+
+    def write_health_records(self, chunk: Chunk) -> int:
+        self.resolve_patients(chunk)
+        self.resolve_doctors(chunk)
+        rows = chunk.records()
+        records = []
+        for record_id, row in zip(id_generator('health_record', 'HR').take(len(rows)), rows):
+            patient_id = row.pop('patient')
+            doctor_id = row.pop('doctor')
+            user_id = self.refs.doctor_users[doctor_id]
+            records.append(HealthRecord(
+                record_id=record_id, patient_id=patient_id, doctor_id=doctor_id,
+                created_by_id=user_id, last_modified_by_id=user_id, **row,
+            ))
+        HealthRecord.objects.bulk_create(records, batch_size=2000)
+
+        RecordSearchService().index(records)
+        TimelineService.write('HEALTH_RECORD', records)
+        pending_grants.add(*{(record.doctor_id, record.patient_id) for record in records})
+        invalidate_charts(*{record.patient_id for record in records})
+        self.audit('HEALTH_RECORD', ((record.patient_id, record.record_id) for record in records))
+        return len(records)
+
+    def write_vitals(self, chunk: Chunk) -> int:
+        self.resolve_patients(chunk)
+        vitals, values = chunk.columns['vital'], chunk.columns['value']
+        low = np.array([VITAL_LIMITS.get(vital, (np.nan, np.nan))[0] for vital in vitals.tolist()], dtype=float)
+        high = np.array([VITAL_LIMITS.get(vital, (np.nan, np.nan))[1] for vital in vitals.tolist()], dtype=float)
+        chunk.reject((values < low) | (values > high), 'value outside the physically possible range')
+        latest = timezone.now() + timedelta(seconds=VitalsStore().max_skew.total_seconds())
+        chunk.reject(np.array([bool(moment and moment > latest) for moment in chunk.columns['measured_at']]),
+                     'measured_at is in the future')
+
+        readings = [
+            Reading(row['patient'], row['vital'], row['value'], row['measured_at'], row['source'])
+            for row in chunk.records()
+        ]
+        VitalsStore().ingest(readings)
+        self.audit('VITALS', ((reading.patient_id, reading.vital) for reading in readings))
+        return len(readings)
+
+    def write_medical_history(self, chunk: Chunk) -> int:
+        self.resolve_patients(chunk)
+        self.resolve_doctors(chunk, required=False)
+        conditions = MedicalHistory.objects.bulk_create([
+            MedicalHistory(patient_id=row.pop('patient'), doctor_id=row.pop('doctor'), **row)
+            for row in chunk.records()
+        ], batch_size=2000)
+        TimelineService.write('CONDITION', conditions)
+        patient_ids = {condition.patient_id for condition in conditions}
+        invalidate_charts(*patient_ids)
+        pending_safety.add(*patient_ids)
+        return len(conditions)
+
+    def write_allergies(self, chunk: Chunk) -> int:
+        self.resolve_patients(chunk)
+        named = chunk.columns['reported_by'] != ''
+        users = self.refs.user_ids(chunk.columns['reported_by'])
+        chunk.reject(named & missing(users), 'Unknown user in reported_by')
+        if self.default_doctor is not None:
+            users[~named] = self.refs.doctor_users[self.default_doctor]
+        chunk.reject(missing(users), 'reported_by is required (or pass a default doctor)')
+        chunk.columns['reported_by'] = users
+
+        allergies = Allergy.objects.bulk_create([
+            Allergy(patient_id=row.pop('patient'), reported_by_id=row.pop('reported_by'), **row)
+            for row in chunk.records()
+        ], batch_size=2000)
+        TimelineService.write('ALLERGY', allergies)
+        patient_ids = {allergy.patient_id for allergy in allergies}
+        invalidate_charts(*patient_ids)
+        pending_safety.add(*patient_ids)
+        self.audit('ALLERGY', ((allergy.patient_id, allergy.pk) for allergy in allergies))
+        return len(allergies)
+
+
+def start_job(name: str, source: str, source_format: str, kind: str = '', restart=False) -> ClinicalImportJob:
+    """The named job, resumed where it stopped unless ``restart``; a finished job is not rerun"""
+    job, created = ClinicalImportJob.objects.get_or_create(
+        name=name, defaults={'source': source, 'format': source_format, 'kind': kind}
+    )
+    if restart and not created:
+        job.position = job.imported = job.rejected = 0
+        job.errors = []
+        job.finished_at = None
+    if restart or job.status == 'FAILED':
+        job.status = 'RUNNING'
+    job.source, job.format, job.kind = source, source_format, kind
+    job.save()
+    return job
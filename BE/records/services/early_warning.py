@@ -0,0 +1,358 @@
+# BE/records/services/early_warning.py
+import logging
+from collections import defaultdict
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Set
+
+import numpy as np
+from django.conf import settings
+from django.contrib.contenttypes.models import ContentType
+from django.db import transaction
+from django.db.models import Case, F, Sum, When
+from django.utils import timezone
+
+from doctor.models.schedule import Appointment
+from notifications.models import Notification
+from shared.models import Patient
+from shared.utils.transactions import OnCommitBatch
+from ..models import HealthRecord, VitalRollup, VitalSnapshot
+from .vitals import Reading, VITAL_SIGNS_FIELDS, bucket_start, RESOLUTIONS
+
+logger = logging.getLogger(__name__)
+
+# Columns of the score matrix, in NEWS2 chart order
+NEWS2_VITALS = ['RESPIRATORY_RATE', 'OXYGEN_SATURATION', 'SYSTOLIC_BP', 'HEART_RATE', 'TEMPERATURE']
+SNAPSHOT_FIELDS = {vital: VITAL_SIGNS_FIELDS[vital] for vital in NEWS2_VITALS}
+
+# (upper band edges, points per band) from the NEWS2 chart; SpO2 on scale 1 and
+# temperature in °C. Supplemental oxygen and consciousness aren't recorded, so
+# they score as room air and alert.
+NEWS2_BANDS = {
+    'RESPIRATORY_RATE': ([8, 11, 20, 24], [3, 1, 0, 2, 3]),
+    'OXYGEN_SATURATION': ([91, 93, 95], [3, 2, 1, 0]),
+    'SYSTOLIC_BP': ([90, 100, 110, 219], [3, 2, 1, 0, 3]),
+    'HEART_RATE': ([40, 50, 90, 110, 130], [3, 1, 0, 1, 2, 3]),
+    'TEMPERATURE': ([35.0, 36.0, 38.0, 39.0], [3, 1, 0, 1, 2]),
+}
+_BANDS = [(np.array(edges, dtype=float), np.array(points, dtype=np.int8)) for edges, points in
+          (NEWS2_BANDS[vital] for vital in NEWS2_VITALS)]
+
+# Values outside these are flagged whatever the score says
+ALERT_THRESHOLDS = {
+    'RESPIRATORY_RATE': (8, 25),
+    'OXYGEN_SATURATION': (90, 100),
+    'SYSTOLIC_BP': (90, 220),
+    'HEART_RATE': (40, 130),
+    'TEMPERATURE': (95.0, 103.1),  # °F
+}
+_LOW = np.array([ALERT_THRESHOLDS[vital][0] for vital in NEWS2_VITALS], dtype=float)
+_HIGH = np.array([ALERT_THRESHOLDS[vital][1] for vital in NEWS2_VITALS], dtype=float)
+
+# Loaded and written by scoring; values come through VitalSnapshot annotations
+SCORE_FIELDS = ['patient', 'news2_score', 'risk', 'anomalies', 'scored_at', 'alerted_risk', 'alerted_at']
+
+RISK_RANK = {'': 0, 'LOW': 0, 'LOW_MEDIUM': 1, 'MEDIUM': 2, 'HIGH': 3}
+ALERT_PRIORITY = {'LOW_MEDIUM': 'URGENT', 'MEDIUM': 'URGENT', 'HIGH': 'CRITICAL'}
+
+
+def get_early_warning_config():
+    return getattr(settings, 'EARLY_WARNING_CONFIG', {})
+
+
+def fahrenheit_to_celsius(values: np.ndarray) -> np.ndarray:
+    return np.round((values - 32.0) * 5.0 / 9.0, 1)
+
+
+def news2(values: np.ndarray):
+    """
+    NEWS2 for a (patients x NEWS2_VITALS) matrix of latest values, NaN where
+    missing. Returns (points per vital, total score, risk) arrays; missing
+    values score 0.
+    """
+    missing = np.isnan(values)
+    filled = np.where(missing, 0.0, values)
+    points = np.zeros(values.shape, dtype=np.int8)
+    for column, (edges, table) in enumerate(_BANDS):
+        column_values = filled[:, column]
+        if NEWS2_VITALS[column] == 'TEMPERATURE':
+            column_values = fahrenheit_to_celsius(column_values)
+        points[:, column] = table[np.digitize(column_values, edges, right=True)]
+    points[missing] = 0
+
+    total = points.sum(axis=1, dtype=np.int16)
+    risk = np.select(
+        [total >= 7, total >= 5, (points == 3).any(axis=1)],
+        ['HIGH', 'MEDIUM', 'LOW_MEDIUM'],
+        default='LOW',
+    )
+    return points, total, risk
+
+
+def anomalies(values: np.ndarray, mean: np.ndarray, std: np.ndarray, z_limit: float) -> np.ndarray:
+    """Boolean matrix: outside the alert thresholds, or ``z_limit`` deviations off the patient's own baseline"""
+    with np.errstate(invalid='ignore', divide='ignore'):
+        outside = (values < _LOW) | (values > _HIGH)
+        z = np.abs(values - mean) / std
+        deviates = np.where(std > 0, z >= z_limit, False)
+    return (outside | deviates) & ~np.isnan(values)
+
+
+@dataclass
+class ScoringResult:
+    scored: int = 0
+    changed: int = 0
+    alerts: int = 0
+
+
+class EarlyWarningEngine:
+    """
+    NEWS2 early-warning scores and vital-sign anomalies, computed with NumPy
+    over every monitored patient at once.
+
+    Ingest keeps each patient's VitalSnapshot current and queues the patients
+    it touched for scoring after commit; ``score()`` with no ids rescores every
+    patient with a recent reading. Scores are one matrix pass; the database work
+    is one read of the snapshots, one baseline aggregate over hourly rollups
+    and writes for the rows whose score changed. Rising risk, and new anomalies,
+    notify the patient's care team with URGENT or CRITICAL notifications.
+    """
+
+    def __init__(self):
+        config = get_early_warning_config()
+        self.stale_after = timedelta(minutes=config.get('STALE_MINUTES', 240))
+        self.baseline_hours = config.get('BASELINE_HOURS', 24)
+        self.min_baseline_count = config.get('MIN_BASELINE_READINGS', 30)
+        self.z_limit = config.get('Z_LIMIT', 3.0)
+        self.repeat_after = timedelta(minutes=config.get('REPEAT_MINUTES', 60))
+        self.care_team_days = config.get('CARE_TEAM_DAYS', 30)
+
+    # Snapshots
+
+    def observe(self, readings: Iterable[Reading]) -> Set[int]:
+        """Fold new readings into snapshots and queue their patients for scoring"""
+        latest = {}
+        for reading in readings:
+            if reading.vital not in SNAPSHOT_FIELDS:
+                continue
+            key = (reading.patient_id, reading.vital)
+            if key not in latest or latest[key].measured_at < reading.measured_at:
+                latest[key] = reading
+        if not latest:
+            return set()
+
+        patient_ids = {patient_id for patient_id, _ in latest}
+        snapshots = {
+            snapshot.patient_id: snapshot
+            for snapshot in VitalSnapshot.objects.select_for_update().filter(patient_id__in=patient_ids)
+        }
+        for (patient_id, vital), reading in latest.items():
+            snapshot = snapshots.setdefault(patient_id, VitalSnapshot(patient_id=patient_id))
+            field = SNAPSHOT_FIELDS[vital]
+            measured_at = getattr(snapshot, f'{field}_at')
+            if measured_at is None or measured_at <= reading.measured_at:
+                setattr(snapshot, field, reading.value)
+                setattr(snapshot, f'{field}_at', reading.measured_at)
+            if snapshot.last_reading_at is None or snapshot.last_reading_at < reading.measured_at:
+                snapshot.last_reading_at = reading.measured_at
+
+        value_fields = [name for field in SNAPSHOT_FIELDS.values() for name in (field, f'{field}_at')]
+        VitalSnapshot.objects.bulk_create(
+            list(snapshots.values()), update_conflicts=True, unique_fields=['patient'],
+            update_fields=value_fields + ['last_reading_at'],
+        )
+        pending_scores.add(*patient_ids)
+        return patient_ids
+
+    # Scoring
+
+    def monitored(self, now: datetime):
+        return VitalSnapshot.objects.filter(last_reading_at__gte=now - self.stale_after)
+
+    def load(self, queryset, now: datetime) -> List[VitalSnapshot]:
+        """
+        Snapshots with their scoring state, and each vital as ``current_<field>``:
+        None once older than the stale window. Timestamps are compared in SQL, so
+        a ward loads without converting thousands of datetimes.
+        """
+        cutoff = now - self.stale_after
+        current = {
+            f'current_{field}': Case(When(**{f'{field}_at__gte': cutoff}, then=F(field))) for field in SNAPSHOT_FIELDS.values()
+        }
+        return list(queryset.only(*SCORE_FIELDS).annotate(**current).order_by('patient_id'))
+
+    @staticmethod
+    def matrix(snapshots: List[VitalSnapshot]) -> np.ndarray:
+        """Current values as a float matrix, NaN where missing"""
+        names = [f'current_{field}' for field in SNAPSHOT_FIELDS.values()]
+        return np.array([[getattr(snapshot, name) for name in names] for snapshot in snapshots], dtype=float)
+
+    def baselines(self, patient_ids: List[int], now: datetime):
+        """Mean and standard deviation per patient and vital from the hourly rollups before this hour"""
+        index = {patient_id: row for row, patient_id in enumerate(patient_ids)}
+        columns = {vital: column for column, vital in enumerate(NEWS2_VITALS)}
+        shape = (len(patient_ids), len(NEWS2_VITALS))
+        count, total, squares = np.zeros(shape), np.zeros(shape), np.zeros(shape)
+
+        this_hour = bucket_start(now, RESOLUTIONS['HOUR'])
+        rows = VitalRollup.objects.filter(
+            patient_id__in=patient_ids, vital__in=NEWS2_VITALS, resolution='HOUR',
+            bucket_start__gte=this_hour - timedelta(hours=self.baseline_hours), bucket_start__lt=this_hour,
+        ).order_by().values('patient_id', 'vital').annotate(
+            n=Sum('count'), total=Sum('total'), squares=Sum('total_squares')
+        ).values_list('patient_id', 'vital', 'n', 'total', 'squares')
+        for patient_id, vital, n, vital_total, vital_squares in rows:
+            position = (index[patient_id], columns[vital])
+            count[position], total[position], squares[position] = n, vital_total, vital_squares
+
+        with np.errstate(invalid='ignore', divide='ignore'):
+            mean = total / count
+            std = np.sqrt(np.maximum(squares / count - mean ** 2, 0.0))
+        too_few = count < self.min_baseline_count
+        mean[too_few] = np.nan
+        std[too_few] = np.nan
+        return mean, std
+
+    def score(self, patient_ids: Optional[Iterable[int]] = None, now: Optional[datetime] = None) -> ScoringResult:
+        now = now or timezone.now()
+        snapshots = self.monitored(now) if patient_ids is None else VitalSnapshot.objects.filter(
+            patient_id__in=list(patient_ids)
+        )
+        snapshots = self.load(snapshots, now)
+        if not snapshots:
+            return ScoringResult()
+
+        values = self.matrix(snapshots)
+        points, totals, risks = news2(values)
+        mean, std = self.baselines([snapshot.patient_id for snapshot in snapshots], now)
+        flagged = anomalies(values, mean, std, self.z_limit)
+
+        changed, alerts = [], []
+        for row, snapshot in enumerate(snapshots):
+            scored = not np.isnan(values[row]).all()
+            score = int(totals[row]) if scored else None
+            risk = str(risks[row]) if scored else ''
+            found = [NEWS2_VITALS[column] for column in np.flatnonzero(flagged[row])]
+
+            alert = self.needs_alert(snapshot, risk, found, now)
+            if (score, risk, found) != (snapshot.news2_score, snapshot.risk, snapshot.anomalies) or alert:
+                new_anomalies = [vital for vital in found if vital not in (snapshot.anomalies or [])]
+                snapshot.news2_score, snapshot.risk, snapshot.anomalies = score, risk, found
+                snapshot.scored_at = now
+                if alert:
+                    alerts.append((snapshot, points[row], new_anomalies))
+                elif RISK_RANK[risk] == 0 and not found:
+                    snapshot.alerted_risk = ''
+                changed.append(snapshot)
+
+        with transaction.atomic():
+            # Sending marks the snapshots it reached, so an unassigned patient alerts again next time
+            sent = self.send_alerts(alerts, now) if alerts else 0
+            VitalSnapshot.objects.bulk_update(changed, SCORE_FIELDS[1:], batch_size=500)
+
+        return ScoringResult(scored=len(snapshots), changed=len(changed), alerts=sent)
+
+    def needs_alert(self, snapshot: VitalSnapshot, risk: str, found: List[str], now: datetime) -> bool:
+        rank = RISK_RANK[risk]
+        if rank == 0:
+            # Anomalies alone alert once per new vital
+            return bool(set(found) - set(snapshot.anomalies or []))
+        if rank > RISK_RANK[snapshot.alerted_risk]:
+            return True
+        if set(found) - set(snapshot.anomalies or []):
+            return True
+        return snapshot.alerted_at is None or now - snapshot.alerted_at >= self.repeat_after
+
+    # Alerts
+
+    def care_team(self, patient_ids: Iterable[int], now: datetime) -> Dict[int, Set[int]]:
+        """User ids of the doctors who saw or are seeing each patient recently"""
+        patient_ids = list(patient_ids)
+        today = timezone.localdate(now)
+        since = today - timedelta(days=self.care_team_days)
+        team = defaultdict(set)
+        records = HealthRecord.objects.filter(
+            patient_id__in=patient_ids, service_date__gte=since
+        ).values_list('patient_id', 'doctor__user_id').distinct()
+        appointments = Appointment.objects.filter(
+            patient_id__in=patient_ids, date__gte=since, date__lte=today + timedelta(days=1)
+        ).exclude(status='CANCELLED').values_list('patient_id', 'doctor__user_id').distinct()
+        for patient_id, user_id in list(records) + list(appointments):
+            team[patient_id].add(user_id)
+        return team
+
+    def send_alerts(self, alerts, now: datetime) -> int:
+        patient_ids = [snapshot.patient_id for snapshot, _, _ in alerts]
+        team = self.care_team(patient_ids, now)
+        names = {
+            patient_id: f'{first} {last}'.strip() or f'Patient {patient_id}'
+            for patient_id, first, last in Patient.objects.filter(id__in=patient_ids).values_list(
+                'id', 'user__first_name', 'user__last_name'
+            )
+        }
+        snapshot_type = ContentType.objects.get_for_model(VitalSnapshot)
+
+        sent, unassigned = 0, []
+        for snapshot, points, new_anomalies in alerts:
+            recipients = team.get(snapshot.patient_id)
+            if not recipients:
+                unassigned.append(snapshot.patient_id)
+                continue
+
+            snapshot.alerted_risk, snapshot.alerted_at = snapshot.risk, now
+            priority = ALERT_PRIORITY.get(snapshot.risk, 'URGENT')
+            title, message = self.describe(snapshot, names[snapshot.patient_id], points, new_anomalies)
+            minute = int(now.timestamp()) // 60
+            for user_id in recipients:
+                # Notification signals take care of the inbox, push and urgent delivery
+                Notification.objects.get_or_create(
+                    dedupe_key=f'early-warning:{snapshot.patient_id}:{user_id}:{snapshot.risk}:{minute}',
+                    defaults=dict(
+                        recipient_id=user_id,
+                        notification_type='ALERT',
+                        priority=priority,
+                        title=title,
+                        message=message,
+                        content_type=snapshot_type,
+                        object_id=snapshot.patient_id,
+                        metadata={
+                            'patient_id': snapshot.patient_id,
+                            'news2_score': snapshot.news2_score,
+                            'risk': snapshot.risk,
+                            'anomalies': snapshot.anomalies,
+                        },
+                    ),
+                )
+                sent += 1
+        if unassigned:
+            logger.warning(f"No care team to alert for {len(unassigned)} patients: {unassigned[:20]}")
+        logger.info(f"Sent {sent} early-warning alerts for {len(alerts) - len(unassigned)} patients")
+        return sent
+
+    @staticmethod
+    def describe(snapshot: VitalSnapshot, name: str, points, new_anomalies):
+        if RISK_RANK[snapshot.risk]:
+            title = f"Early warning: {name} NEWS2 {snapshot.news2_score} ({snapshot.get_risk_display().lower()} risk)"
+        else:
+            title = f"Vital-sign anomaly: {name}"
+
+        parts = []
+        for column, (vital, field) in enumerate(SNAPSHOT_FIELDS.items()):
+            value = getattr(snapshot, f'current_{field}')
+            if value is None:
+                continue
+            flags = []
+            if points[column]:
+                flags.append(f'+{points[column]}')
+            if vital in snapshot.anomalies:
+                flags.append('new anomaly' if vital in new_anomalies else 'anomaly')
+            parts.append(f"{field.replace('_', ' ')} {value:g}" + (f" ({', '.join(flags)})" if flags else ''))
+        return title[:200], '; '.join(parts)
+
+
+def _score_pending(patient_ids):
+    EarlyWarningEngine().score(sorted(patient_ids))
+
+
+# Patients with new readings in a transaction, scored together after commit
+pending_scores = OnCommitBatch(_score_pending)
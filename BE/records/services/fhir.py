@@ -0,0 +1,163 @@
+# BE/records/services/fhir.py
+import base64
+import binascii
+import json
+from typing import Dict, Iterator, List, Optional, Tuple
+
+# LOINC codes of the vitals VitalReading stores
+LOINC_VITALS = {
+    '8867-4': 'HEART_RATE',
+    '8480-6': 'SYSTOLIC_BP',
+    '8462-4': 'DIASTOLIC_BP',
+    '9279-1': 'RESPIRATORY_RATE',
+    '8310-5': 'TEMPERATURE',
+    '59408-5': 'OXYGEN_SATURATION',
+    '2708-6': 'OXYGEN_SATURATION',
+    '2339-0': 'BLOOD_GLUCOSE',
+    '72514-3': 'PAIN_SCALE',
+}
+CONDITION_STATUSES = {
+    'active': 'ACTIVE', 'recurrence': 'ACTIVE', 'relapse': 'ACTIVE',
+    'inactive': 'RESOLVED', 'remission': 'RESOLVED', 'resolved': 'RESOLVED',
+}
+ALLERGEN_TYPES = {'food': 'FOOD', 'medication': 'MEDICATION', 'environment': 'ENVIRONMENTAL', 'biologic': 'OTHER'}
+ICD_10_SYSTEMS = ('http://hl7.org/fhir/sid/icd-10', 'http://hl7.org/fhir/sid/icd-10-cm')
+
+
+def read_resources(path) -> Iterator[Dict]:
+    """
+    FHIR resources from an NDJSON file (FHIR Bulk Data export; streamed line
+    by line) or a JSON Bundle (parsed whole, so prefer NDJSON for large sets).
+    """
+    with open(path, encoding='utf-8') as source:
+        if str(path).endswith('.ndjson'):
+            for line in source:
+                if line.strip():
+                    yield json.loads(line)
+            return
+        bundle = json.load(source)
+    if bundle.get('resourceType') != 'Bundle':
+        yield bundle
+        return
+    for entry in bundle.get('entry', []):
+        if 'resource' in entry:
+            yield entry['resource']
+
+
+def reference_id(reference: Optional[Dict], resource_type: str) -> str:
+    """'Patient/123' -> '123'; imported patients and practitioners are keyed by FHIR id"""
+    value = (reference or {}).get('reference', '')
+    prefix = f'{resource_type}/'
+    return value[len(prefix):] if value.startswith(prefix) else ''
+
+
+def concept_text(concept: Optional[Dict]) -> str:
+    concept = concept or {}
+    codings = concept.get('coding') or [{}]
+    return concept.get('text') or codings[0].get('display') or codings[0].get('code', '')
+
+
+def concept_code(concept: Optional[Dict], systems=None) -> str:
+    for coding in (concept or {}).get('coding', []):
+        if systems is None or coding.get('system') in systems:
+            return coding.get('code', '')
+    return ''
+
+
+def first_code(concept: Optional[Dict]) -> str:
+    return concept_code(concept).lower()
+
+
+def patient_rows(resource) -> List[Tuple[str, Dict]]:
+    name = (resource.get('name') or [{}])[0]
+    telecom = {item.get('system'): item.get('value', '') for item in resource.get('telecom', [])}
+    return [('patients', {
+        'username': resource.get('id', ''),
+        'first_name': ' '.join(name.get('given', [])),
+        'last_name': name.get('family', ''),
+        'email': telecom.get('email', ''),
+        'phone_number': telecom.get('phone', ''),
+        'date_of_birth': resource.get('birthDate', ''),
+    })]
+
+
+def observation_rows(resource) -> List[Tuple[str, Dict]]:
+    """One vitals row per measured vital; a blood pressure panel carries two as components"""
+    patient = reference_id(resource.get('subject'), 'Patient')
+    measured_at = resource.get('effectiveDateTime') or (resource.get('effectivePeriod') or {}).get('start', '')
+    rows = []
+    for part in [resource, *resource.get('component', [])]:
+        vital = LOINC_VITALS.get(concept_code(part.get('code'), ('http://loinc.org',)))
+        quantity = part.get('valueQuantity')
+        if vital is None or quantity is None:
+            continue
+        value = quantity.get('value')
+        if vital == 'TEMPERATURE' and quantity.get('code', quantity.get('unit')) in ('Cel', '°C', 'C') \
+                and isinstance(value, (int, float)):
+            value = value * 9 / 5 + 32
+        rows.append(('vitals', {
+            'patient': patient, 'vital': vital, 'value': value, 'measured_at': measured_at, 'source': 'fhir',
+        }))
+    return rows
+
+
+def condition_rows(resource) -> List[Tuple[str, Dict]]:
+    return [('medical_history', {
+        'patient': reference_id(resource.get('subject'), 'Patient'),
+        'condition_name': concept_text(resource.get('code')),
+        'icd_code': concept_code(resource.get('code'), ICD_10_SYSTEMS),
+        'status': CONDITION_STATUSES.get(first_code(resource.get('clinicalStatus')), 'ACTIVE'),
+        'diagnosed_date': (resource.get('onsetDateTime') or resource.get('recordedDate') or '')[:10],
+        'resolved_date': (resource.get('abatementDateTime') or '')[:10],
+        'severity': concept_text(resource.get('severity')),
+        'doctor': reference_id(resource.get('recorder') or resource.get('asserter'), 'Practitioner'),
+    })]
+
+
+def allergy_rows(resource) -> List[Tuple[str, Dict]]:
+    reaction = (resource.get('reaction') or [{}])[0]
+    manifestations = ', '.join(concept_text(item) for item in reaction.get('manifestation', []))
+    severity = 'LIFE_THREATENING' if resource.get('criticality') == 'high' else reaction.get('severity', 'mild')
+    return [('allergies', {
+        'patient': reference_id(resource.get('patient'), 'Patient'),
+        'allergen_name': concept_text(resource.get('code')),
+        'allergen_type': ALLERGEN_TYPES.get((resource.get('category') or ['other'])[0], 'OTHER'),
+        'severity': severity,
+        'reaction_description': reaction.get('description') or manifestations or 'Not recorded',
+        'symptoms': manifestations,
+        'first_occurrence_date': (resource.get('onsetDateTime') or '')[:10],
+        'is_active': first_code(resource.get('clinicalStatus')) in ('', 'active'),
+        'reported_by': reference_id(resource.get('recorder'), 'Practitioner'),
+    })]
+
+
+def document_rows(resource) -> List[Tuple[str, Dict]]:
+    """A DocumentReference's plain-text attachment becomes a consultation record"""
+    attachment = ((resource.get('content') or [{}])[0]).get('attachment', {})
+    try:
+        text = base64.b64decode(attachment.get('data', '')).decode('utf-8')
+    except (binascii.Error, UnicodeDecodeError):
+        text = ''
+    return [('health_records', {
+        'patient': reference_id(resource.get('subject'), 'Patient'),
+        'doctor': reference_id((resource.get('author') or [None])[0], 'Practitioner'),
+        'record_type': 'CONSULTATION',
+        'title': resource.get('description') or attachment.get('title') or concept_text(resource.get('type')),
+        'description': text,
+        'service_date': (resource.get('date') or '')[:10],
+    })]
+
+
+MAPPERS = {
+    'Patient': patient_rows,
+    'Observation': observation_rows,
+    'Condition': condition_rows,
+    'AllergyIntolerance': allergy_rows,
+    'DocumentReference': document_rows,
+}
+
+
+def resource_rows(resource: Dict) -> List[Tuple[str, Dict]]:
+    """(kind, row) pairs in the CSV column layout; resources of other types give none"""
+    mapper = MAPPERS.get(resource.get('resourceType'))
+    return mapper(resource) if mapper else []
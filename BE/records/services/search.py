@@ -0,0 +1,273 @@
+# BE/records/services/search.py
+import logging
+import math
+import re
+from collections import Counter, defaultdict
+from functools import reduce
+from operator import or_
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import BooleanField, Case, Count, F, FloatField, IntegerField, Q, Sum, Value, When
+from django.db.models.expressions import RawSQL
+from django.utils.html import escape
+
+from ..models import HealthRecord, RecordSearchTerm
+from .access import in_care_of, visible_records
+
+logger = logging.getLogger(__name__)
+
+# Relative weight per indexed field: PostgreSQL's default A-D weights, in the
+# same grouping as the search_vector column (records migration 0005)
+FIELD_WEIGHTS = {
+    'title': 1.0,
+    'diagnosis': 0.4,
+    'chief_complaint': 0.4,
+    'description': 0.2,
+    'treatment_plan': 0.2,
+    'follow_up_instructions': 0.2,
+    'clinical_notes': 0.1,
+}
+INDEXED_FIELDS = set(FIELD_WEIGHTS)
+
+TOKEN_RE = re.compile(r'[^\W_]+')
+STOP_WORDS = {
+    'a', 'an', 'and', 'are', 'as', 'at', 'be', 'by', 'for', 'from', 'has', 'have', 'in', 'is', 'it', 'its',
+    'of', 'on', 'or', 'that', 'the', 'this', 'to', 'was', 'were', 'will', 'with',
+}
+MAX_TERM_LENGTH = 64
+
+# Marks placed by either backend, turned into <mark> tags after escaping
+START_SEL, STOP_SEL = '\x02', '\x03'
+TSQUERY = "websearch_to_tsquery('english', %s)"
+
+
+def get_search_config():
+    return getattr(settings, 'RECORD_SEARCH_CONFIG', {})
+
+
+def normalize(word: str) -> str:
+    """Lowercase and fold simple plurals, so 'Fractures' finds 'fracture'"""
+    word = word.lower()[:MAX_TERM_LENGTH]
+    if len(word) > 3 and word.endswith('s') and not word.endswith(('ss', 'us', 'is')):
+        word = word[:-1]
+    return word
+
+
+def tokenize(text: str) -> List[str]:
+    return [normalize(word) for word in TOKEN_RE.findall(text or '') if word.lower() not in STOP_WORDS]
+
+
+def marked(snippet: str) -> str:
+    return escape(snippet).replace(START_SEL, '<mark>').replace(STOP_SEL, '</mark>')
+
+
+class InvertedIndexBackend:
+    """
+    Term table for databases without full-text search. Each record's terms
+    carry a field-weighted frequency; a query ANDs its terms (the last one as a
+    prefix, for search-as-you-type), scores matches by weight times inverse
+    document frequency, and ranks them in one grouped query.
+    """
+
+    def index(self, records: Iterable[HealthRecord]):
+        records = list(records)
+        rows = []
+        for record in records:
+            weights = defaultdict(float)
+            for field, field_weight in FIELD_WEIGHTS.items():
+                for term, frequency in Counter(tokenize(getattr(record, field))).items():
+                    weights[term] += field_weight * (1 + math.log(frequency))
+            rows.extend(RecordSearchTerm(term=term, record_id=record.id, weight=weight) for term, weight in weights.items())
+
+        with transaction.atomic():
+            RecordSearchTerm.objects.filter(record_id__in=[record.id for record in records]).delete()
+            RecordSearchTerm.objects.bulk_create(rows, batch_size=2000)
+
+    @staticmethod
+    def conditions(terms: List[str]) -> List[Q]:
+        *exact, last = terms
+        return [Q(term=term) for term in exact] + [Q(term__gte=last, term__lt=last + '\uffff')]
+
+    def rank(self, records, query: str, limit: int, offset: int) -> Tuple[int, List[Tuple[int, float]]]:
+        terms = self.query_terms(query)
+        if not terms:
+            return 0, []
+        conditions = self.conditions(terms)
+        which = Case(*[When(condition, then=Value(index)) for index, condition in enumerate(conditions)],
+                     output_field=IntegerField())
+        matching = RecordSearchTerm.objects.filter(reduce(or_, conditions))
+
+        frequencies = dict(
+            matching.annotate(query_term=which).order_by().values('query_term').annotate(
+                n=Count('record', distinct=True)
+            ).values_list('query_term', 'n')
+        )
+        if len(frequencies) < len(terms):
+            # Some term is in no record at all
+            return 0, []
+        indexed = HealthRecord.objects.count()
+        idf = [math.log(1 + indexed / frequencies[index]) for index in range(len(terms))]
+
+        scored = matching.filter(record__in=records.values('id')).order_by().values('record_id').annotate(
+            score=Sum(Case(
+                *[When(condition, then=F('weight') * Value(idf[index])) for index, condition in enumerate(conditions)],
+                output_field=FloatField(),
+            )),
+            matched=Count(which, distinct=True),
+        ).filter(matched=len(terms))
+        total = scored.count()
+        page = scored.order_by('-score', '-record_id').values_list('record_id', 'score')[offset:offset + limit]
+        return total, list(page)
+
+    def highlights(self, record_ids: List[int], query: str) -> Dict[int, Dict[str, str]]:
+        terms = self.query_terms(query)
+        *exact, prefix = terms or ['']
+        exact = set(exact) | ({prefix} if prefix else set())
+        words = get_search_config().get('SNIPPET_WORDS', 30)
+
+        def is_match(word):
+            term = normalize(word)
+            return term in exact or bool(prefix) and term.startswith(prefix)
+
+        found = {}
+        records = HealthRecord.objects.filter(id__in=record_ids).only('id', *FIELD_WEIGHTS)
+        for record in records:
+            snippets = {}
+            for field in FIELD_WEIGHTS:
+                text = getattr(record, field) or ''
+                spans = [(match.start(), match.end()) for match in TOKEN_RE.finditer(text) if is_match(match.group())]
+                if spans:
+                    snippets[field] = self.snippet(text, spans, words)
+            found[record.id] = snippets
+        return found
+
+    @staticmethod
+    def snippet(text: str, spans: List[Tuple[int, int]], words: int) -> str:
+        """About ``words`` words around the first match, matches wrapped in marks"""
+        positions = [match.start() for match in TOKEN_RE.finditer(text)]
+        first = next(index for index, start in enumerate(positions) if start == spans[0][0])
+        low = positions[max(first - words // 3, 0)]
+        high = positions[first + words] if first + words < len(positions) else len(text)
+
+        parts, cursor = [], low
+        for start, end in spans:
+            if start < low or end > high:
+                continue
+            parts += [text[cursor:start], START_SEL, text[start:end], STOP_SEL]
+            cursor = end
+        parts.append(text[cursor:high])
+        snippet = ''.join(parts).strip()
+        return ('… ' if low else '') + snippet + (' …' if high < len(text) else '')
+
+    @staticmethod
+    def query_terms(query: str) -> List[str]:
+        limit = get_search_config().get('MAX_QUERY_TERMS', 8)
+        return list(dict.fromkeys(tokenize(query)))[:limit]
+
+
+class PostgresSearchBackend:
+    """
+    Native full-text search on the generated, GIN-indexed search_vector
+    column; PostgreSQL keeps it current on every write, so indexing is a no-op.
+    """
+
+    def index(self, records: Iterable[HealthRecord]):
+        pass
+
+    def rank(self, records, query: str, limit: int, offset: int) -> Tuple[int, List[Tuple[int, float]]]:
+        matching = records.alias(matched=RawSQL(
+            f'"health_records"."search_vector" @@ {TSQUERY}', [query], output_field=BooleanField()
+        )).filter(matched=True)
+        total = matching.count()
+        page = matching.annotate(score=RawSQL(
+            # 32 normalizes ranks into 0-1
+            f'ts_rank_cd("health_records"."search_vector", {TSQUERY}, 32)', [query], output_field=FloatField()
+        )).order_by('-score', '-id').values_list('id', 'score')[offset:offset + limit]
+        return total, list(page)
+
+    def highlights(self, record_ids: List[int], query: str) -> Dict[int, Dict[str, str]]:
+        words = get_search_config().get('SNIPPET_WORDS', 30)
+        options = f'StartSel={START_SEL}, StopSel={STOP_SEL}, MaxWords={words}, MinWords={words // 3}, MaxFragments=2'
+        headlines = {
+            field: RawSQL(
+                f'''ts_headline('english', coalesce("health_records"."{field}", ''), {TSQUERY}, %s)''',
+                [query, options],
+            )
+            for field in FIELD_WEIGHTS
+        }
+        rows = HealthRecord.objects.filter(id__in=record_ids).annotate(**{
+            f'headline_{field}': expression for field, expression in headlines.items()
+        }).values('id', *(f'headline_{field}' for field in FIELD_WEIGHTS))
+        return {
+            row['id']: {
+                field: row[f'headline_{field}'] for field in FIELD_WEIGHTS if START_SEL in row[f'headline_{field}']
+            }
+            for row in rows
+        }
+
+
+def get_backend():
+    return PostgresSearchBackend() if connection.vendor == 'postgresql' else InvertedIndexBackend()
+
+
+class RecordSearchService:
+    """
+    Ranked, highlighted full-text search over health records, filtered to what
+    the searching user may read: one patient's chart, or a doctor's whole panel.
+    The ranking query returns just a page of ids; metadata and highlights are
+    then fetched for that page only.
+    """
+
+    def __init__(self, backend=None):
+        self.backend = backend or get_backend()
+
+    def search(self, user, query: str, patient_id: Optional[int] = None, limit=20, offset=0) -> Dict:
+        records = visible_records(user)
+        if patient_id is not None:
+            records = records.filter(patient_id=patient_id)
+        elif user.is_doctor and not user.is_staff:
+            records = records.filter(in_care_of(user))
+
+        total, ranked = self.backend.rank(records, query, limit, offset)
+        record_ids = [record_id for record_id, _ in ranked]
+        highlights = self.backend.highlights(record_ids, query) if record_ids else {}
+        found = HealthRecord.objects.filter(id__in=record_ids).select_related('patient__user', 'doctor__user').only(
+            'id', 'record_id', 'record_type', 'title', 'service_date', 'privacy_level',
+            'patient__id', 'patient__user__first_name', 'patient__user__last_name', 'patient__user__username',
+            'doctor__id', 'doctor__user__first_name', 'doctor__user__last_name', 'doctor__user__username',
+        ).in_bulk()
+
+        results = []
+        for record_id, score in ranked:
+            record = found[record_id]
+            results.append({
+                'record_id': record.record_id,
+                'patient_id': record.patient_id,
+                'patient_name': record.patient.user.get_full_name() or record.patient.user.username,
+                'doctor': record.doctor.user.get_full_name() or record.doctor.user.username,
+                'record_type': record.record_type,
+                'title': record.title,
+                'service_date': record.service_date,
+                'privacy_level': record.privacy_level,
+                'rank': round(score, 4),
+                'highlights': {field: marked(snippet) for field, snippet in highlights.get(record_id, {}).items()},
+            })
+        return {'total': total, 'results': results}
+
+    def index(self, records: Iterable[HealthRecord]):
+        self.backend.index(records)
+
+    def rebuild(self, batch_size=1000) -> int:
+        """Reindex every record by id, one batch at a time"""
+        last_id = 0
+        indexed = 0
+        while True:
+            batch = list(HealthRecord.objects.filter(id__gt=last_id).order_by('id').only('id', *FIELD_WEIGHTS)[:batch_size])
+            if not batch:
+                logger.info(f"Reindexed {indexed} health records for search")
+                return indexed
+            self.index(batch)
+            indexed += len(batch)
+            last_id = batch[-1].id
@@ -0,0 +1,159 @@
+# BE/records/services/timeline.py
+import logging
+from collections import defaultdict
+from dataclasses import dataclass
+from datetime import datetime, time
+from typing import Callable, Dict, Iterable, Set, Tuple
+
+from django.db import transaction
+from django.utils import timezone
+
+from doctor.models.schedule import Appointment
+from laboratory.models import LabOrder
+from pharmacy.models import Prescription
+from shared.utils.transactions import OnCommitBatch
+from ..models import Allergy, HealthRecord, MedicalHistory, TimelineEvent
+
+logger = logging.getLogger(__name__)
+
+
+def as_datetime(value) -> datetime:
+    """Dates count from midnight; naive values are local time"""
+    if not isinstance(value, datetime):
+        value = datetime.combine(value, time.min)
+    return timezone.make_aware(value) if timezone.is_naive(value) else value
+
+
+@dataclass(frozen=True)
+class TimelineSource:
+    model: type
+    related: Tuple[str, ...]
+    describe: Callable[[object], Dict]
+
+
+# How each source row becomes a timeline event; every describe() returns the
+# same keys, which are the columns an upsert rewrites
+SOURCES = {
+    'CONDITION': TimelineSource(MedicalHistory, (), lambda condition: {
+        'occurred_at': as_datetime(condition.diagnosed_date or condition.created_at),
+        'title': condition.condition_name,
+        'category': condition.icd_code,
+        'status': condition.status,
+        'reference': '',
+        'privacy_level': '',
+        'doctor_id': condition.doctor_id,
+    }),
+    'HEALTH_RECORD': TimelineSource(HealthRecord, (), lambda record: {
+        'occurred_at': as_datetime(record.service_date),
+        'title': record.title,
+        'category': record.record_type,
+        'status': 'VERIFIED' if record.is_verified else '',
+        'reference': record.record_id,
+        'privacy_level': record.privacy_level,
+        'doctor_id': record.doctor_id,
+    }),
+    'ALLERGY': TimelineSource(Allergy, (), lambda allergy: {
+        'occurred_at': as_datetime(allergy.first_occurrence_date or allergy.created_at),
+        'title': allergy.allergen_name,
+        'category': allergy.allergen_type,
+        'status': allergy.severity if allergy.is_active else 'INACTIVE',
+        'reference': '',
+        'privacy_level': '',
+        'doctor_id': None,
+    }),
+    'PRESCRIPTION': TimelineSource(Prescription, ('medication',), lambda prescription: {
+        'occurred_at': prescription.prescribed_date,
+        'title': f'{prescription.medication.name} {prescription.medication.strength}'.strip()[:200],
+        'category': prescription.frequency,
+        'status': prescription.status,
+        'reference': prescription.prescription_number,
+        'privacy_level': '',
+        'doctor_id': prescription.doctor_id,
+    }),
+    'LAB_ORDER': TimelineSource(LabOrder, ('laboratory',), lambda order: {
+        'occurred_at': order.created_at,
+        'title': f'Lab order {order.order_number} ({order.laboratory.name})'[:200],
+        'category': order.priority,
+        'status': order.status,
+        'reference': order.order_number,
+        'privacy_level': '',
+        'doctor_id': order.doctor_id,
+    }),
+    'APPOINTMENT': TimelineSource(Appointment, (), lambda appointment: {
+        'occurred_at': as_datetime(datetime.combine(appointment.date, appointment.time)),
+        'title': appointment.reason[:200],
+        'category': '',
+        'status': appointment.status,
+        'reference': '',
+        'privacy_level': '',
+        'doctor_id': appointment.doctor_id,
+    }),
+}
+EVENT_TYPES = {source.model: event_type for event_type, source in SOURCES.items()}
+UPSERT_FIELDS = ['patient', 'occurred_at', 'title', 'category', 'status', 'reference', 'privacy_level', 'doctor']
+
+
+class TimelineService:
+    """
+    Maintains TimelineEvent from its six sources. Changed rows are queued as
+    (event type, source id) keys and settled after commit: one query per
+    source type loads whatever still exists, one upsert rewrites those events
+    and one delete drops events whose source is gone.
+    """
+
+    def refresh(self, keys: Iterable[Tuple[str, int]]) -> int:
+        by_type: Dict[str, Set[int]] = defaultdict(set)
+        for event_type, source_id in keys:
+            by_type[event_type].add(source_id)
+
+        written = 0
+        with transaction.atomic():
+            for event_type, source_ids in by_type.items():
+                source = SOURCES[event_type]
+                rows = list(source.model.objects.select_related(*source.related).filter(id__in=source_ids))
+                written += self.write(event_type, rows)
+                TimelineEvent.objects.filter(event_type=event_type, source_id__in=source_ids).exclude(
+                    source_id__in=[row.id for row in rows]
+                ).delete()
+        return written
+
+    @staticmethod
+    def write(event_type, rows, batch_size=2000) -> int:
+        source = SOURCES[event_type]
+        events = [
+            TimelineEvent(patient_id=row.patient_id, event_type=event_type, source_id=row.id, **source.describe(row))
+            for row in rows
+        ]
+        TimelineEvent.objects.bulk_create(
+            events, batch_size=batch_size,
+            update_conflicts=True, unique_fields=['event_type', 'source_id'], update_fields=UPSERT_FIELDS,
+        )
+        return len(events)
+
+    def rebuild(self, batch_size=2000) -> int:
+        """Rewrite every event from its source, one batch of sources at a time, and drop orphans"""
+        written = 0
+        for event_type, source in SOURCES.items():
+            last_id = 0
+            while True:
+                batch = list(source.model.objects.select_related(*source.related).filter(
+                    id__gt=last_id
+                ).order_by('id')[:batch_size])
+                if not batch:
+                    break
+                with transaction.atomic():
+                    written += self.write(event_type, batch, batch_size)
+                last_id = batch[-1].id
+            TimelineEvent.objects.filter(event_type=event_type).exclude(
+                source_id__in=source.model.objects.values('id')
+            ).delete()
+        logger.info(f"Rebuilt {written} timeline events")
+        return written
+
+
+def _refresh_pending(keys):
+    TimelineService().refresh(keys)
+
+
+# (event type, source id) keys changed in a transaction
+pending_timeline = OnCommitBatch(_refresh_pending)
@@ -0,0 +1,304 @@
+# BE/records/services/vitals.py
+import logging
+import math
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone as dt_timezone
+from itertools import islice
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from shared.models import Patient
+from ..models import VitalReading, VitalRollup
+
+logger = logging.getLogger(__name__)
+
+VITAL_NAMES = {choice for choice, _ in VitalReading.VITAL_CHOICES}
+
+# Physically possible values; anything outside is a sensor artefact. Wider than
+# the VitalSigns form validators so critically abnormal readings still get in.
+VITAL_LIMITS = {
+    'HEART_RATE': (0, 350),
+    'SYSTOLIC_BP': (0, 350),
+    'DIASTOLIC_BP': (0, 250),
+    'RESPIRATORY_RATE': (0, 100),
+    'TEMPERATURE': (77, 113),  # °F
+    'OXYGEN_SATURATION': (0, 100),
+    'BLOOD_GLUCOSE': (0, 2000),
+    'PAIN_SCALE': (0, 10),
+}
+
+# VitalSigns field per vital, for charted measurements
+VITAL_SIGNS_FIELDS = {
+    'HEART_RATE': 'heart_rate',
+    'SYSTOLIC_BP': 'systolic_bp',
+    'DIASTOLIC_BP': 'diastolic_bp',
+    'RESPIRATORY_RATE': 'respiratory_rate',
+    'TEMPERATURE': 'temperature',
+    'OXYGEN_SATURATION': 'oxygen_saturation',
+    'BLOOD_GLUCOSE': 'blood_glucose',
+    'PAIN_SCALE': 'pain_scale',
+}
+
+# Bucket width per rollup resolution, finest first; buckets are aligned to UTC
+RESOLUTIONS = {
+    'MINUTE': timedelta(minutes=1),
+    'HOUR': timedelta(hours=1),
+    'DAY': timedelta(days=1),
+}
+RAW = 'RAW'
+
+
+def get_vitals_config():
+    return getattr(settings, 'VITALS_CONFIG', {})
+
+
+def bucket_start(moment: datetime, step: timedelta) -> datetime:
+    seconds = int(step.total_seconds())
+    return datetime.fromtimestamp(int(moment.timestamp()) // seconds * seconds, tz=dt_timezone.utc)
+
+
+@dataclass(frozen=True)
+class Reading:
+    patient_id: int
+    vital: str
+    value: float
+    measured_at: datetime
+    source: str = ''
+
+
+def readings_from_vital_signs(vital_signs) -> List[Reading]:
+    """The measurements on a charted VitalSigns row as readings"""
+    return [
+        Reading(vital_signs.patient_id, vital, float(value), vital_signs.measured_at, 'chart')
+        for vital, field in VITAL_SIGNS_FIELDS.items()
+        if (value := getattr(vital_signs, field)) is not None
+    ]
+
+
+class VitalsStore:
+    """
+    Time-series storage for vital signs.
+
+    Readings are appended in bulk; each ingest batch also folds its readings
+    into per-minute, per-hour and per-day rollups (count, sum, sum of squares,
+    min, max), so a trend over months reads a few hundred rollup rows rather
+    than every reading.
+    Rollups merge, so late and out-of-order readings land in the right bucket.
+    Raw readings and minute rollups are pruned after their retention period.
+    """
+
+    def __init__(self, batch_size=None):
+        config = get_vitals_config()
+        self.batch_size = batch_size or config.get('INGEST_BATCH_SIZE', 5000)
+        self.max_skew = timedelta(seconds=config.get('MAX_CLOCK_SKEW_SECONDS', 300))
+
+    # Ingest
+
+    def parse(self, rows: Iterable[Dict]) -> Tuple[List[Reading], List[Tuple[int, str]]]:
+        """Validate API rows into readings; returns (readings, [(row index, reason)])"""
+        readings, rejected = [], []
+        latest = timezone.now() + self.max_skew
+        for index, row in enumerate(rows):
+            try:
+                patient_id = int(row['patient_id'])
+                vital = str(row['vital']).upper()
+                value = float(row['value'])
+                measured_at = row['measured_at']
+                if isinstance(measured_at, str):
+                    measured_at = parse_datetime(measured_at)
+            except (KeyError, TypeError, ValueError) as e:
+                rejected.append((index, f'Malformed reading: {e}'))
+                continue
+
+            if vital not in VITAL_NAMES:
+                rejected.append((index, f'Unknown vital {vital}'))
+                continue
+            low, high = VITAL_LIMITS[vital]
+            if not math.isfinite(value) or not low <= value <= high:
+                rejected.append((index, f'{vital} value {value} outside {low}-{high}'))
+                continue
+            if not isinstance(measured_at, datetime):
+                rejected.append((index, 'measured_at must be an ISO 8601 timestamp'))
+                continue
+            if timezone.is_naive(measured_at):
+                measured_at = timezone.make_aware(measured_at)
+            if measured_at > latest:
+                rejected.append((index, 'measured_at is in the future'))
+                continue
+
+            readings.append((index, Reading(patient_id, vital, value, measured_at, str(row.get('source') or '')[:100])))
+
+        known = set(Patient.objects.filter(
+            id__in={reading.patient_id for _, reading in readings}
+        ).values_list('id', flat=True))
+        accepted = []
+        for index, reading in readings:
+            if reading.patient_id in known:
+                accepted.append(reading)
+            else:
+                rejected.append((index, f'Unknown patient {reading.patient_id}'))
+        return accepted, rejected
+
+    def ingest(self, readings: Iterable[Reading]) -> int:
+        readings = iter(readings)
+        ingested = 0
+        while True:
+            chunk = list(islice(readings, self.batch_size))
+            if not chunk:
+                return ingested
+            self.ingest_chunk(chunk)
+            ingested += len(chunk)
+
+    def ingest_chunk(self, readings: List[Reading]):
+        with transaction.atomic():
+            VitalReading.objects.bulk_create([
+                VitalReading(
+                    patient_id=reading.patient_id,
+                    vital=reading.vital,
+                    value=reading.value,
+                    measured_at=reading.measured_at,
+                    source=reading.source,
+                )
+                for reading in readings
+            ], batch_size=2000)
+            self.merge_rollups(self.summarize(readings))
+            # Keep snapshots current and score the touched patients after commit
+            from .early_warning import EarlyWarningEngine
+            EarlyWarningEngine().observe(readings)
+
+    # Rollups
+
+    @staticmethod
+    def summarize(readings: Iterable[Reading]) -> Dict[Tuple, List]:
+        """[count, total, total of squares, min, max] per (patient, vital, resolution, bucket start)"""
+        def fold(summary, key, count, total, total_squares, minimum, maximum):
+            stats = summary.get(key)
+            if stats is None:
+                summary[key] = [count, total, total_squares, minimum, maximum]
+            else:
+                stats[0] += count
+                stats[1] += total
+                stats[2] += total_squares
+                stats[3] = min(stats[3], minimum)
+                stats[4] = max(stats[4], maximum)
+
+        finest, *coarser = RESOLUTIONS.items()
+        summary = {}
+        for reading in readings:
+            key = (reading.patient_id, reading.vital, finest[0], bucket_start(reading.measured_at, finest[1]))
+            fold(summary, key, 1, reading.value, reading.value * reading.value, reading.value, reading.value)
+
+        # Coarser buckets are built from the finest ones rather than every reading
+        for (patient_id, vital, _, start), stats in list(summary.items()):
+            for resolution, step in coarser:
+                fold(summary, (patient_id, vital, resolution, bucket_start(start, step)), *stats)
+        return summary
+
+    @staticmethod
+    def merge_rollups(summary: Dict[Tuple, List]):
+        """Add a batch summary to the stored rollups: create, lock, then write merged rows in one upsert"""
+        if not summary:
+            return
+
+        unique_fields = ['patient', 'vital', 'resolution', 'bucket_start']
+        VitalRollup.objects.bulk_create([
+            VitalRollup(patient_id=patient_id, vital=vital, resolution=resolution, bucket_start=start)
+            for patient_id, vital, resolution, start in summary
+        ], batch_size=2000, ignore_conflicts=True)
+
+        starts = [key[3] for key in summary]
+        stored = VitalRollup.objects.select_for_update().filter(
+            patient_id__in={key[0] for key in summary},
+            vital__in={key[1] for key in summary},
+            bucket_start__range=(min(starts), max(starts)),
+        ).values_list('patient_id', 'vital', 'resolution', 'bucket_start', 'count', 'total', 'total_squares',
+                      'minimum', 'maximum')
+
+        merged = []
+        for patient_id, vital, resolution, start, count, total, total_squares, minimum, maximum in stored:
+            stats = summary.get((patient_id, vital, resolution, start))
+            if stats is None:
+                continue
+            merged.append(VitalRollup(
+                patient_id=patient_id,
+                vital=vital,
+                resolution=resolution,
+                bucket_start=start,
+                count=count + stats[0],
+                total=total + stats[1],
+                total_squares=total_squares + stats[2],
+                minimum=stats[3] if minimum is None else min(minimum, stats[3]),
+                maximum=stats[4] if maximum is None else max(maximum, stats[4]),
+            ))
+
+        VitalRollup.objects.bulk_create(
+            merged, batch_size=2000, update_conflicts=True, unique_fields=unique_fields,
+            update_fields=['count', 'total', 'total_squares', 'minimum', 'maximum'],
+        )
+
+    # Reading
+
+    @staticmethod
+    def pick_resolution(span: timedelta, max_points: int) -> str:
+        """Finest resolution that fits ``span`` in ``max_points``; raw readings only for short windows"""
+        if span <= timedelta(seconds=max_points):
+            return RAW
+        for resolution, step in RESOLUTIONS.items():
+            if span / step <= max_points:
+                return resolution
+        return 'DAY'
+
+    def series(self, patient_id, vital, start: datetime, end: datetime, resolution: Optional[str] = None,
+               max_points=500) -> Tuple[str, List[Dict]]:
+        """(resolution, points) for a trend chart; each point has time, count, minimum, maximum, average"""
+        resolution = resolution or self.pick_resolution(end - start, max_points)
+
+        if resolution == RAW:
+            readings = VitalReading.objects.filter(
+                patient_id=patient_id, vital=vital, measured_at__gte=start, measured_at__lt=end
+            ).order_by('measured_at').values_list('measured_at', 'value')
+            return resolution, [
+                {'time': measured_at, 'count': 1, 'minimum': value, 'maximum': value, 'average': value}
+                for measured_at, value in readings
+            ]
+
+        rollups = VitalRollup.objects.filter(
+            patient_id=patient_id, vital=vital, resolution=resolution,
+            bucket_start__gte=bucket_start(start, RESOLUTIONS[resolution]), bucket_start__lt=end,
+        ).order_by('bucket_start').values_list('bucket_start', 'count', 'total', 'minimum', 'maximum')
+        return resolution, [
+            {'time': start_at, 'count': count, 'minimum': minimum, 'maximum': maximum, 'average': total / count}
+            for start_at, count, total, minimum, maximum in rollups if count
+        ]
+
+    # Retention
+
+    def prune(self, now: Optional[datetime] = None, batch_size=10000) -> Dict[str, int]:
+        """Drop raw readings and minute rollups past retention; hour and day rollups are kept"""
+        config = get_vitals_config()
+        now = now or timezone.now()
+        pruned = {
+            'readings': self._delete_before(
+                VitalReading.objects.all(), 'measured_at',
+                now - timedelta(days=config.get('RAW_RETENTION_DAYS', 30)), batch_size,
+            ),
+            'minute_rollups': self._delete_before(
+                VitalRollup.objects.filter(resolution='MINUTE'), 'bucket_start',
+                now - timedelta(days=config.get('MINUTE_ROLLUP_RETENTION_DAYS', 90)), batch_size,
+            ),
+        }
+        logger.info(f"Pruned vitals: {pruned}")
+        return pruned
+
+    @staticmethod
+    def _delete_before(queryset, field, cutoff, batch_size) -> int:
+        deleted = 0
+        while True:
+            ids = list(queryset.filter(**{f'{field}__lt': cutoff}).values_list('id', flat=True)[:batch_size])
+            if not ids:
+                return deleted
+            deleted += queryset.model.objects.filter(id__in=ids).delete()[0]
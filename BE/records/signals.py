@@ -0,0 +1,91 @@
+# BE/records/signals.py
+from django.db.models.signals import post_delete, post_init, post_save
+from django.dispatch import receiver
+
+from doctor.models.schedule import Appointment
+from finance.models import Invoice
+from laboratory.models import LabOrder, LabResult
+from pharmacy.models import Prescription
+from shared.models import Patient
+from .models import Allergy, HealthRecord, MedicalHistory, VitalSigns
+from .services.access import AccessGrantService, pending_grants
+from .services.chart import invalidate_charts
+from .services.search import INDEXED_FIELDS, RecordSearchService
+from .services.timeline import EVENT_TYPES, pending_timeline
+from .services.vitals import VitalsStore, readings_from_vital_signs
+
+
+@receiver(post_save, sender=VitalSigns)
+def store_charted_vitals(sender, instance, created, **kwargs):
+    # Charted vitals join the device feeds so trends and scoring see both
+    if created:
+        VitalsStore().ingest(readings_from_vital_signs(instance))
+
+
+@receiver(post_save, sender=HealthRecord)
+def index_record_text(sender, instance, update_fields=None, **kwargs):
+    if update_fields is None or INDEXED_FIELDS & set(update_fields):
+        RecordSearchService().index([instance])
+
+
+@receiver(post_save, sender=HealthRecord)
+@receiver(post_delete, sender=HealthRecord)
+@receiver(post_save, sender=VitalSigns)
+@receiver(post_delete, sender=VitalSigns)
+@receiver(post_save, sender=MedicalHistory)
+@receiver(post_delete, sender=MedicalHistory)
+@receiver(post_save, sender=Allergy)
+@receiver(post_delete, sender=Allergy)
+@receiver(post_save, sender=Prescription)
+@receiver(post_delete, sender=Prescription)
+@receiver(post_save, sender=Invoice)
+@receiver(post_delete, sender=Invoice)
+def invalidate_patient_chart(sender, instance, **kwargs):
+    invalidate_charts(instance.patient_id)
+
+
+@receiver(post_save, sender=LabResult)
+@receiver(post_delete, sender=LabResult)
+def invalidate_lab_patient_chart(sender, instance, **kwargs):
+    invalidate_charts(instance.order.patient_id)
+
+
+@receiver(post_save, sender=Patient)
+def grant_own_chart(sender, instance, created, **kwargs):
+    if created:
+        AccessGrantService().grant_self([(instance.id, instance.user_id)])
+
+
+@receiver(post_init, sender=Appointment)
+@receiver(post_init, sender=HealthRecord)
+def remember_care_pair(sender, instance, **kwargs):
+    # Read from __dict__ so deferred fields are never loaded here
+    values = instance.__dict__
+    instance._care_pair = (values.get('doctor_id'), values.get('patient_id'))
+
+
+@receiver(post_save, sender=Appointment)
+@receiver(post_delete, sender=Appointment)
+@receiver(post_save, sender=HealthRecord)
+@receiver(post_delete, sender=HealthRecord)
+def refresh_treating_access(sender, instance, **kwargs):
+    # Both the pair the row linked when loaded and the one it links now
+    pair = (instance.doctor_id, instance.patient_id)
+    pending_grants.add(pair, getattr(instance, '_care_pair', pair))
+    instance._care_pair = pair
+
+
+@receiver(post_save, sender=MedicalHistory)
+@receiver(post_delete, sender=MedicalHistory)
+@receiver(post_save, sender=HealthRecord)
+@receiver(post_delete, sender=HealthRecord)
+@receiver(post_save, sender=Allergy)
+@receiver(post_delete, sender=Allergy)
+@receiver(post_save, sender=Prescription)
+@receiver(post_delete, sender=Prescription)
+@receiver(post_save, sender=LabOrder)
+@receiver(post_delete, sender=LabOrder)
+@receiver(post_save, sender=Appointment)
+@receiver(post_delete, sender=Appointment)
+def refresh_timeline(sender, instance, **kwargs):
+    pending_timeline.add((EVENT_TYPES[sender], instance.pk))
@@ -0,0 +1,487 @@
+import json
+import os
+import tempfile
+from datetime import date, datetime, time, timedelta, timezone as dt_timezone
+from io import StringIO
+from unittest import mock
+
+import numpy as np
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from doctor.models.schedule import Appointment, Schedule
+from notifications.models import Notification
+from shared.factories import make_doctor, make_patient
+from shared.models import Patient, User
+from .models import (
+    Allergy, ClinicalImportJob, HealthRecord, RecordAccessGrant, RecordSearchTerm, TimelineEvent, VitalReading,
+    VitalRollup, VitalSnapshot,
+)
+from .services.access import AccessGrantService, can_read, visible_records
+from .services.chart import ChartSummaryService
+from .services.clinical_import import ClinicalImporter, start_job
+from .services.early_warning import EarlyWarningEngine, news2
+from .services.timeline import TimelineService
+from .services.vitals import Reading, VitalsStore
+
+
+def make_record(patient, doctor, **kwargs):
+    fields = dict(record_type='CONSULTATION', title='Follow-up', description='Routine follow-up',
+                  service_date=date.today(), created_by=doctor.user, last_modified_by=doctor.user)
+    return HealthRecord.objects.create(patient=patient, doctor=doctor, **{**fields, **kwargs})
+
+
+class VitalSeriesTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.doctor = make_doctor()
+        self.patient = make_patient()
+        self.client = APIClient()
+        self.client.force_authenticate(self.doctor.user)
+        self.start = datetime(2024, 3, 1, 8, tzinfo=dt_timezone.utc)
+
+    def ingest(self, *readings):
+        return self.client.post('/api/records/vitals/ingest/', {'readings': [
+            {'patient_id': self.patient.id, 'vital': vital, 'value': value,
+             'measured_at': (self.start + timedelta(minutes=minutes)).isoformat()}
+            for vital, value, minutes in readings
+        ]}, format='json')
+
+    def series(self, client=None, **params):
+        return (client or self.client).get(f'/api/records/patients/{self.patient.id}/vitals/heart_rate/', params)
+
+    def test_ingest_rejects_bad_rows_and_folds_rollups(self):
+        response = self.ingest(('HEART_RATE', 80, 0), ('HEART_RATE', 100, 30), ('HEART_RATE', 999, 40),
+                               ('WEIGHT', 70, 50))
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['ingested'], 2)
+        self.assertEqual([row['index'] for row in response.data['rejected']], [2, 3])
+        hour = VitalRollup.objects.get(patient=self.patient, resolution='HOUR')
+        self.assertEqual((hour.count, hour.total, hour.minimum, hour.maximum), (2, 180, 80, 100))
+        self.assertEqual(VitalRollup.objects.filter(resolution='MINUTE').count(), 2)
+
+    def test_late_readings_merge_into_existing_buckets(self):
+        self.ingest(('HEART_RATE', 80, 0))
+        self.ingest(('HEART_RATE', 60, 10))
+        day = VitalRollup.objects.get(patient=self.patient, resolution='DAY')
+        self.assertEqual((day.count, day.minimum, day.maximum), (2, 60, 80))
+
+    def test_series_resolution_follows_the_window(self):
+        self.ingest(('HEART_RATE', 80, 0), ('HEART_RATE', 100, 30), ('HEART_RATE', 90, 90))
+        end = self.start + timedelta(hours=3)
+        response = self.series(start=self.start.isoformat(), end=end.isoformat(), max_points=10)
+        self.assertEqual(response.data['resolution'], 'hour')
+        self.assertEqual([(point['count'], point['average']) for point in response.data['points']],
+                         [(2, 90), (1, 90)])
+        raw = self.series(start=self.start.isoformat(), end=end.isoformat(), resolution='raw')
+        self.assertEqual(len(raw.data['points']), 3)
+
+    def test_invalid_window_is_rejected(self):
+        self.assertEqual(self.series(start='2024-03-02T00:00', end='2024-03-01T00:00').status_code, 400)
+        self.assertEqual(self.series(start='yesterday').status_code, 400)
+        self.assertEqual(self.series(max_points='0').status_code, 400)
+        self.assertEqual(self.series(resolution='week').status_code, 400)
+
+    def test_impossible_timestamps_are_rejected(self):
+        self.assertEqual(self.series(start='2024-13-45T00:00').status_code, 400)
+        self.assertEqual(self.series(end='2024-02-30T00:00').status_code, 400)
+
+    def test_only_clinicians_and_the_patient_read_vitals(self):
+        self.ingest(('HEART_RATE', 80, 0))
+        own = APIClient()
+        own.force_authenticate(self.patient.user)
+        self.assertEqual(self.series(own).status_code, 200)
+        other = APIClient()
+        other.force_authenticate(make_patient('other').user)
+        self.assertEqual(self.series(other).status_code, 403)
+        ingest = other.post('/api/records/vitals/ingest/', {'readings': []}, format='json')
+        self.assertEqual(ingest.status_code, 403)
+        self.assertEqual(VitalReading.objects.count(), 1)
+
+
+class EarlyWarningTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.patient = make_patient()
+
+    def score(self, *vitals):
+        # respiratory rate, SpO2, systolic BP, heart rate, temperature (°F); None when missing
+        points, total, risk = news2(np.array([[np.nan if v is None else v for v in vitals]], dtype=float))
+        return list(points[0]), int(total[0]), str(risk[0])
+
+    def test_news2_bands(self):
+        self.assertEqual(self.score(16, 97, 120, 70, 98.6), ([0, 0, 0, 0, 0], 0, 'LOW'))
+        # Band edges belong to the band below them
+        self.assertEqual(self.score(8, 91, 90, 40, 95.0)[0], [3, 3, 3, 3, 3])
+        self.assertEqual(self.score(9, 92, 91, 41, 95.2)[0], [1, 2, 2, 1, 1])
+        self.assertEqual(self.score(21, 96, 220, 131, 102.3)[0], [2, 0, 3, 3, 2])
+
+    def test_news2_risk_levels(self):
+        self.assertEqual(self.score(25, 97, 120, 70, 98.6)[1:], (3, 'LOW_MEDIUM'))
+        self.assertEqual(self.score(16, 94, 105, 115, 101.3)[1:], (5, 'MEDIUM'))
+        self.assertEqual(self.score(25, 91, 120, 135, 98.6)[1:], (9, 'HIGH'))
+        self.assertEqual(self.score(None, None, None, 135, None)[1:], (3, 'LOW_MEDIUM'))
+
+    def ingest_deteriorating(self):
+        measured_at = timezone.now() - timedelta(minutes=5)
+        with self.captureOnCommitCallbacks(execute=True):
+            VitalsStore().ingest([
+                Reading(self.patient.id, vital, value, measured_at)
+                for vital, value in [('RESPIRATORY_RATE', 25), ('OXYGEN_SATURATION', 91), ('HEART_RATE', 135)]
+            ])
+        return VitalSnapshot.objects.get(patient=self.patient)
+
+    def test_rising_risk_alerts_the_care_team_once(self):
+        doctor = make_doctor()
+        make_record(self.patient, doctor)
+        snapshot = self.ingest_deteriorating()
+        self.assertEqual((snapshot.news2_score, snapshot.risk, snapshot.alerted_risk), (9, 'HIGH', 'HIGH'))
+        alert = Notification.objects.get(recipient=doctor.user, notification_type='ALERT')
+        self.assertEqual(alert.priority, 'CRITICAL')
+        self.assertEqual(EarlyWarningEngine().score([self.patient.id]).alerts, 0)
+
+    def test_escalation_without_a_care_team_is_not_marked_alerted(self):
+        snapshot = self.ingest_deteriorating()
+        self.assertEqual((snapshot.risk, snapshot.alerted_risk, snapshot.alerted_at), ('HIGH', '', None))
+        self.assertFalse(Notification.objects.filter(notification_type='ALERT').exists())
+
+        # Once someone is looking after the patient the pending escalation goes out
+        doctor = make_doctor()
+        make_record(self.patient, doctor)
+        self.assertEqual(EarlyWarningEngine().score([self.patient.id]).alerts, 1)
+        self.assertEqual(VitalSnapshot.objects.get(patient=self.patient).alerted_risk, 'HIGH')
+
+
+class ChartSummaryTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.doctor = make_doctor()
+        self.patient = make_patient()
+        with self.captureOnCommitCallbacks(execute=True):
+            make_record(self.patient, self.doctor, title='Asthma review', privacy_level='RESTRICTED')
+            make_record(self.patient, self.doctor, title='Psych consult', privacy_level='SECRET')
+            Allergy.objects.create(patient=self.patient, allergen_name='Penicillin', allergen_type='MEDICATION',
+                                   severity='SEVERE', reaction_description='Hives', reported_by=self.doctor.user)
+        self.client = APIClient()
+        self.client.force_authenticate(self.doctor.user)
+
+    def chart(self, client=None, patient_id=None):
+        return (client or self.client).get(f'/api/records/patients/{patient_id or self.patient.id}/chart/')
+
+    def test_chart_gathers_the_sections(self):
+        chart = self.chart().data
+        self.assertEqual(chart['patient']['id'], self.patient.id)
+        self.assertEqual({record['title'] for record in chart['health_records']}, {'Asthma review', 'Psych consult'})
+        self.assertEqual([allergy['allergen_name'] for allergy in chart['allergies']], ['Penicillin'])
+        self.assertIsNone(chart['vital_signs'])
+
+    def test_chart_is_built_in_fixed_queries_and_cached(self):
+        with self.assertNumQueries(8):
+            ChartSummaryService().summary(self.patient.id)
+        with self.assertNumQueries(0):
+            ChartSummaryService().summary(self.patient.id)
+
+    def test_writes_invalidate_the_cached_chart_after_commit(self):
+        ChartSummaryService().summary(self.patient.id)
+        with self.captureOnCommitCallbacks(execute=True):
+            make_record(self.patient, self.doctor, title='Spirometry')
+        titles = {record['title'] for record in ChartSummaryService().summary(self.patient.id)['health_records']}
+        self.assertIn('Spirometry', titles)
+
+    def test_records_are_narrowed_to_the_reader(self):
+        own = APIClient()
+        own.force_authenticate(self.patient.user)
+        self.assertEqual([record['title'] for record in self.chart(own).data['health_records']], ['Asthma review'])
+        other = APIClient()
+        other.force_authenticate(make_patient('other').user)
+        self.assertEqual(self.chart(other).status_code, 403)
+        self.assertEqual(self.chart(patient_id=self.patient.id + 100).status_code, 404)
+
+
+class RecordSearchTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.doctor = make_doctor()
+        self.patient = make_patient()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.title_match = make_record(self.patient, self.doctor, title='Wrist fracture',
+                                           description='Fell on outstretched hand')
+            self.body_match = make_record(self.patient, self.doctor, title='Follow-up',
+                                          description='Healing well after the fractures were set')
+            make_record(self.patient, self.doctor, title='Flu', description='Seasonal influenza')
+        self.client = APIClient()
+        self.client.force_authenticate(self.doctor.user)
+
+    def search(self, q, client=None, **params):
+        return (client or self.client).get('/api/records/search/', {'q': q, **params})
+
+    def test_title_matches_rank_first_and_plurals_fold(self):
+        response = self.search('fracture')
+        self.assertEqual(response.data['total'], 2)
+        self.assertEqual([result['record_id'] for result in response.data['results']],
+                         [self.title_match.record_id, self.body_match.record_id])
+        self.assertEqual(response.data['results'][0]['highlights']['title'], 'Wrist <mark>fracture</mark>')
+
+    def test_terms_are_anded_and_the_last_is_a_prefix(self):
+        self.assertEqual(self.search('wrist frac').data['total'], 1)
+        self.assertEqual(self.search('wrist influenza').data['total'], 0)
+
+    def test_highlights_are_escaped(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            make_record(self.patient, self.doctor, title='Rash <b>spreading</b>')
+        highlight = self.search('rash').data['results'][0]['highlights']['title']
+        self.assertEqual(highlight, '<mark>Rash</mark> &lt;b&gt;spreading&lt;/b&gt;')
+
+    def test_results_are_limited_to_readable_records(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            make_record(self.patient, self.doctor, title='Fracture clinic note', privacy_level='CONFIDENTIAL')
+        own = APIClient()
+        own.force_authenticate(self.patient.user)
+        self.assertEqual(self.search('fracture', own).data['total'], 3)
+        # Another doctor's panel is empty, and an explicit chart only shows what they may read
+        stranger = make_doctor('stranger')
+        other = APIClient()
+        other.force_authenticate(stranger.user)
+        self.assertEqual(self.search('fracture', other).data['total'], 0)
+        self.assertEqual(self.search('fracture', other, patient_id=self.patient.id).data['total'], 0)
+
+    def test_paging_and_bad_parameters(self):
+        page = self.search('fracture', limit=1, offset=1).data
+        self.assertEqual((page['total'], len(page['results'])), (2, 1))
+        self.assertEqual(self.search('').status_code, 400)
+        self.assertEqual(self.search('fracture', limit=0).status_code, 400)
+        self.assertEqual(self.search('fracture', offset='x').status_code, 400)
+
+
+class RecordAccessTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.author = make_doctor()
+        self.patient = make_patient()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.records = {
+                level: make_record(self.patient, self.author, title=level.title(), privacy_level=level)
+                for level in ('PUBLIC', 'RESTRICTED', 'CONFIDENTIAL', 'SECRET')
+            }
+
+    def visible(self, user):
+        return set(visible_records(user).values_list('privacy_level', flat=True))
+
+    def book(self, doctor):
+        schedule = Schedule.objects.create(doctor=doctor, date=date.today() + timedelta(days=1),
+                                           start_time=time(9), end_time=time(17))
+        with self.captureOnCommitCallbacks(execute=True):
+            return Appointment.objects.create(
+                patient=self.patient, doctor=doctor, schedule=schedule, date=schedule.date, time=time(9),
+                end_time=time(9, 30), status='CONFIRMED', reason='Checkup',
+            )
+
+    def test_patient_reads_their_chart_except_secret_records(self):
+        self.assertEqual(self.visible(self.patient.user), {'PUBLIC', 'RESTRICTED', 'CONFIDENTIAL'})
+        self.assertEqual(self.visible(make_patient('other').user), set())
+
+    def test_author_reads_everything_they_wrote(self):
+        self.assertEqual(self.visible(self.author.user), {'PUBLIC', 'RESTRICTED', 'CONFIDENTIAL', 'SECRET'})
+
+    def test_treating_doctor_reads_while_an_appointment_links_them(self):
+        colleague = make_doctor('colleague')
+        self.assertEqual(self.visible(colleague.user), set())
+        appointment = self.book(colleague)
+        self.assertEqual(self.visible(colleague.user), {'PUBLIC', 'RESTRICTED'})
+        with self.captureOnCommitCallbacks(execute=True):
+            appointment.status = 'CANCELLED'
+            appointment.save()
+        self.assertEqual(self.visible(colleague.user), set())
+
+    def test_explicit_authorization_opens_a_secret_record(self):
+        colleague = make_doctor('colleague')
+        secret = self.records['SECRET']
+        self.assertFalse(can_read(colleague.user, secret))
+        secret.authorized_users.add(colleague.user)
+        self.assertTrue(can_read(colleague.user, secret))
+
+    def test_staff_read_every_chart_below_secret(self):
+        staff = User.objects.create_user('staff', 'staff@example.com', 'pw', is_staff=True)
+        self.assertEqual(self.visible(staff), {'PUBLIC', 'RESTRICTED', 'CONFIDENTIAL'})
+
+    def test_rebuild_recreates_the_incremental_grants(self):
+        self.book(make_doctor('colleague'))
+        grants = set(RecordAccessGrant.objects.values_list('user_id', 'patient_id', 'privacy_level', 'reason'))
+        AccessGrantService().rebuild()
+        rebuilt = set(RecordAccessGrant.objects.values_list('user_id', 'patient_id', 'privacy_level', 'reason'))
+        self.assertEqual(rebuilt, grants)
+
+    def test_record_list_is_filtered(self):
+        client = APIClient()
+        client.force_authenticate(self.patient.user)
+        response = client.get('/api/records/', {'patient_id': self.patient.id})
+        self.assertEqual({record['privacy_level'] for record in response.data['results']},
+                         {'PUBLIC', 'RESTRICTED', 'CONFIDENTIAL'})
+
+
+class PatientTimelineTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.doctor = make_doctor()
+        self.patient = make_patient()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.record = make_record(self.patient, self.doctor, title='Knee review', service_date=date(2024, 3, 1))
+            make_record(self.patient, self.doctor, title='Psych consult', service_date=date(2024, 4, 1),
+                        privacy_level='SECRET')
+            self.allergy = Allergy.objects.create(
+                patient=self.patient, allergen_name='Peanuts', allergen_type='FOOD', severity='SEVERE',
+                reaction_description='Swelling', first_occurrence_date=date(2024, 2, 1), reported_by=self.doctor.user,
+            )
+        self.client = APIClient()
+        self.client.force_authenticate(self.patient.user)
+
+    def timeline(self, client=None, **params):
+        return (client or self.client).get(f'/api/records/patients/{self.patient.id}/timeline/', params)
+
+    def titles(self, response):
+        return [event['title'] for event in response.data['results']]
+
+    def test_events_come_newest_first_within_the_readers_access(self):
+        self.assertEqual(self.titles(self.timeline()), ['Knee review', 'Peanuts'])
+        doctor = APIClient()
+        doctor.force_authenticate(self.doctor.user)
+        self.assertEqual(self.titles(self.timeline(doctor)), ['Psych consult', 'Knee review', 'Peanuts'])
+
+    def test_type_and_before_filters(self):
+        self.assertEqual(self.titles(self.timeline(type='allergy')), ['Peanuts'])
+        self.assertEqual(self.titles(self.timeline(before='2024-03-01')), ['Peanuts'])
+        self.assertEqual(self.titles(self.timeline(before='2024-03-01T00:00:01')), ['Knee review', 'Peanuts'])
+
+    def test_invalid_filters_are_rejected(self):
+        self.assertEqual(self.timeline(type='surgery').status_code, 400)
+        self.assertEqual(self.timeline(before='soon').status_code, 400)
+        self.assertEqual(self.timeline(before='2024-13-45').status_code, 400)
+        self.assertEqual(self.timeline(before='2024-13-45T00:00').status_code, 400)
+
+    def test_other_patients_are_forbidden(self):
+        other = APIClient()
+        other.force_authenticate(make_patient('other').user)
+        self.assertEqual(self.timeline(other).status_code, 403)
+
+    def test_source_changes_are_reflected_after_commit(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.record.title = 'Knee surgery review'
+            self.record.save()
+            self.allergy.delete()
+        self.assertEqual(self.titles(self.timeline()), ['Knee surgery review'])
+
+    def test_rebuild_matches_the_incremental_events(self):
+        fields = ('event_type', 'source_id', 'occurred_at', 'title', 'status', 'privacy_level')
+        events = set(TimelineEvent.objects.values_list(*fields))
+        TimelineEvent.objects.all().delete()
+        TimelineService().rebuild()
+        self.assertEqual(set(TimelineEvent.objects.values_list(*fields)), events)
+
+
+class ClinicalImportTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.doctor = make_doctor()
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+
+    def source(self, name, text):
+        path = os.path.join(self.directory, name)
+        with open(path, 'w', encoding='utf-8') as source:
+            source.write(text)
+        return path
+
+    def run_import(self, path, kind='', chunk_size=2, name='test', **kwargs):
+        job = start_job(name, path, 'CSV' if path.endswith('.csv') else 'FHIR', kind)
+        with self.captureOnCommitCallbacks(execute=True):
+            return ClinicalImporter(job, chunk_size=chunk_size, **kwargs).run()
+
+    def test_patients_are_validated_column_by_column(self):
+        path = self.source('patients.csv', 'username,first_name,date_of_birth\n'
+                                           'ann,Ann,1980-05-01\n'
+                                           ',Nobody,1980-05-01\n'
+                                           'bob,Bob,1980-13-45\n'
+                                           'ann,Again,\n'
+                                           'doc,Taken,\n')
+        job = self.run_import(path, 'patients', chunk_size=10)
+        self.assertEqual((job.status, job.position, job.imported, job.rejected), ('COMPLETED', 5, 1, 4))
+        self.assertEqual(job.errors, [
+            [2, 'username is required'], [3, 'date_of_birth is not a valid date'],
+            [4, 'username repeated in chunk'], [5, 'username already exists'],
+        ])
+        ann = Patient.objects.get(user__username='ann')
+        self.assertEqual(ann.date_of_birth, date(1980, 5, 1))
+        self.assertTrue(RecordAccessGrant.objects.filter(user=ann.user, reason='SELF').exists())
+
+    def test_records_get_the_work_their_signals_would_do(self):
+        patient = make_patient('ann')
+        path = self.source('records.csv', 'patient,record_type,title,service_date\n'
+                                          'ann,consultation,Migraine review,2024-03-01\n'
+                                          'zed,consultation,Unknown patient,2024-03-01\n')
+        job = self.run_import(path, 'health_records', default_doctor='doc')
+        self.assertEqual((job.imported, job.errors), (1, [[2, 'Unknown patient']]))
+        record = HealthRecord.objects.get(patient=patient)
+        self.assertEqual((record.doctor, record.created_by), (self.doctor, self.doctor.user))
+        self.assertTrue(RecordSearchTerm.objects.filter(record=record, term='migraine').exists())
+        self.assertTrue(TimelineEvent.objects.filter(event_type='HEALTH_RECORD', source_id=record.id).exists())
+        self.assertTrue(RecordAccessGrant.objects.filter(user=self.doctor.user, patient=patient,
+                                                         reason='TREATING').exists())
+
+    def test_records_need_a_doctor(self):
+        make_patient('ann')
+        path = self.source('records.csv', 'patient,record_type,title,service_date\n'
+                                          'ann,consultation,Review,2024-03-01\n')
+        job = self.run_import(path, 'health_records')
+        self.assertEqual(job.errors, [[1, 'doctor is required (or pass a default doctor)']])
+        with self.assertRaises(ValueError):
+            ClinicalImporter(job, default_doctor='nobody')
+
+    def test_fhir_bundle_imports_patients_before_their_vitals(self):
+        path = self.source('bundle.json', json.dumps({'resourceType': 'Bundle', 'entry': [
+            {'resource': {
+                'resourceType': 'Observation', 'subject': {'reference': 'Patient/p1'},
+                'effectiveDateTime': '2024-03-01T08:00:00Z',
+                'code': {'coding': [{'system': 'http://loinc.org', 'code': '8310-5'}]},
+                'valueQuantity': {'value': 37.0, 'code': 'Cel'},
+            }},
+            {'resource': {'resourceType': 'Patient', 'id': 'p1', 'name': [{'given': ['Ann'], 'family': 'Lee'}]}},
+            {'resource': {'resourceType': 'Encounter', 'id': 'e1'}},
+        ]}))
+        job = self.run_import(path, chunk_size=10)
+        self.assertEqual((job.imported, job.errors), (2, [[3, 'Unsupported resource Encounter']]))
+        reading = VitalReading.objects.get(patient__user__username='p1')
+        self.assertEqual((reading.vital, round(reading.value, 1), reading.source), ('TEMPERATURE', 98.6, 'fhir'))
+
+    def test_failed_import_resumes_after_the_last_committed_chunk(self):
+        path = self.source('patients.csv', 'username\n' + ''.join(f'user{number}\n' for number in range(5)))
+        original = ClinicalImporter.import_chunk
+        calls = []
+
+        def fail_second_chunk(importer, items):
+            calls.append(len(items))
+            if len(calls) == 2:
+                raise RuntimeError('connection lost')
+            return original(importer, items)
+
+        with mock.patch.object(ClinicalImporter, 'import_chunk', fail_second_chunk), self.assertRaises(RuntimeError):
+            self.run_import(path, 'patients')
+        job = ClinicalImportJob.objects.get(name='test')
+        self.assertEqual((job.status, job.position, job.imported), ('FAILED', 2, 2))
+
+        job = self.run_import(path, 'patients')
+        self.assertEqual((job.status, job.position, job.imported, job.rejected), ('COMPLETED', 5, 5, 0))
+        self.assertEqual(Patient.objects.filter(user__username__startswith='user').count(), 5)
+
+    def test_command_reports_and_does_not_rerun_a_finished_job(self):
+        path = self.source('patients.csv', 'username\nann\n')
+        out = StringIO()
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command('import_clinical_data', path, kind='patients', stdout=out)
+        self.assertIn('1 rows read, 1 imported, 0 rejected', out.getvalue())
+        out = StringIO()
+        call_command('import_clinical_data', path, kind='patients', stdout=out)
+        self.assertIn('already completed', out.getvalue())
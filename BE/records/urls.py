@@ -0,0 +1,18 @@
+from django.urls import path
+from . import views
+
+urlpatterns = [
+    path('', views.HealthRecordListView.as_view(), name='health-record-list'),
+
+    # Patient chart
+    path('patients/<int:patient_id>/chart/', views.ChartSummaryView.as_view(), name='chart-summary'),
+    path('patients/<int:patient_id>/timeline/', views.PatientTimelineView.as_view(), name='patient-timeline'),
+
+    # Full-text search
+    path('search/', views.RecordSearchView.as_view(), name='record-search'),
+
+    # Vital-sign time series
+    path('vitals/ingest/', views.VitalIngestView.as_view(), name='vital-ingest'),
+    path('patients/<int:patient_id>/vitals/<str:vital>/', views.VitalSeriesView.as_view(), name='vital-series'),
+    path('early-warning/', views.EarlyWarningBoardView.as_view(), name='early-warning-board'),
+]
@@ -0,0 +1,254 @@
+# BE/records/views.py
+from datetime import timedelta
+
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from rest_framework import generics, status
+from rest_framework.exceptions import PermissionDenied, ValidationError
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from audit.services.trail import audit_read, audit_reads, audit_writes
+from shared.utils.pagination import HealthRecordCursorPagination, TimelineCursorPagination
+from shared.utils.permissions import IsClinician, is_clinician
+from .models import TimelineEvent
+from .serializers import HealthRecordSummarySerializer, TimelineEventSerializer
+from .services.access import visible_records
+from .services.chart import ChartSummaryService
+from .services.search import RecordSearchService, get_search_config
+from .services.early_warning import SNAPSHOT_FIELDS, EarlyWarningEngine
+from .services.timeline import as_datetime
+from .services.vitals import RAW, RESOLUTIONS, VITAL_NAMES, VitalsStore, get_vitals_config
+
+
+class VitalIngestView(APIView):
+    """
+    Bulk ingest for bedside and remote-monitoring feeds.
+    Body: {"readings": [{"patient_id", "vital", "value", "measured_at", "source"}, ...]}
+    """
+    permission_classes = [IsClinician]
+
+    def post(self, request):
+        rows = request.data.get('readings')
+        max_readings = get_vitals_config().get('INGEST_MAX_READINGS', 10000)
+        if not isinstance(rows, list) or not rows:
+            return Response({"detail": "readings must be a non-empty list"}, status=status.HTTP_400_BAD_REQUEST)
+        if len(rows) > max_readings:
+            return Response({"detail": f"At most {max_readings} readings per request"},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        store = VitalsStore()
+        readings, rejected = store.parse(rows)
+        ingested = store.ingest(readings)
+        audit_writes(request, 'CREATE', 'VITALS', ((reading.patient_id, reading.vital) for reading in readings),
+                     source='ingest')
+        return Response({
+            'ingested': ingested,
+            'rejected': [{'index': index, 'reason': reason} for index, reason in rejected],
+        }, status=status.HTTP_201_CREATED if ingested else status.HTTP_400_BAD_REQUEST)
+
+
+class VitalSeriesView(APIView):
+    """
+    Trend of one vital for a patient, from rollups sized to the window.
+    Query params: start, end (ISO 8601, default the last 7 days), resolution
+    (raw/minute/hour/day, default picked from the window), max_points.
+    """
+
+    def get(self, request, patient_id, vital):
+        user = request.user
+        own_chart = getattr(getattr(user, 'patient_profile', None), 'id', None) == patient_id
+        if not (own_chart or is_clinician(user)):
+            return Response({"detail": "You do not have access to this patient's vitals"},
+                            status=status.HTTP_403_FORBIDDEN)
+
+        vital = vital.upper()
+        if vital not in VITAL_NAMES:
+            return Response({"detail": f"Unknown vital {vital}"}, status=status.HTTP_400_BAD_REQUEST)
+
+        params = request.query_params
+        try:
+            end = parse_datetime(params['end']) if params.get('end') else timezone.now()
+            start = parse_datetime(params['start']) if params.get('start') else end and end - timedelta(days=7)
+        except ValueError:
+            # Well-formed but impossible, e.g. 2024-13-45T00:00
+            start = end = None
+        resolution = params.get('resolution', '').upper() or None
+        try:
+            max_points = min(int(params.get('max_points', 500)), 5000)
+        except ValueError:
+            max_points = 0
+        if start is None or end is None or start >= end or max_points <= 0:
+            return Response({"detail": "Use ISO 8601 start < end and a positive max_points"},
+                            status=status.HTTP_400_BAD_REQUEST)
+        if resolution is not None and resolution != RAW and resolution not in RESOLUTIONS:
+            return Response({"detail": "resolution must be raw, minute, hour or day"},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        start = timezone.make_aware(start) if timezone.is_naive(start) else start
+        end = timezone.make_aware(end) if timezone.is_naive(end) else end
+        resolution, points = VitalsStore().series(patient_id, vital, start, end, resolution, max_points)
+        audit_read(request, 'VITALS', patient_id, vital, start=start, end=end)
+        return Response({
+            'patient_id': patient_id,
+            'vital': vital,
+            'resolution': resolution.lower(),
+            'start': start,
+            'end': end,
+            'points': points,
+        })
+
+
+class EarlyWarningBoardView(APIView):
+    """
+    Monitored patients by early-warning score, highest first.
+    Query params: risk (low/low_medium/medium/high, repeatable) to filter.
+    """
+    permission_classes = [IsClinician]
+
+    def get(self, request):
+        engine = EarlyWarningEngine()
+        snapshots = engine.monitored(timezone.now()).filter(news2_score__isnull=False)
+        risks = [risk.upper() for risk in request.query_params.getlist('risk')]
+        if risks:
+            snapshots = snapshots.filter(risk__in=risks)
+        snapshots = list(snapshots.select_related('patient__user').order_by('-news2_score', '-last_reading_at')[:500])
+        audit_reads(request, 'VITALS', ((snapshot.patient_id, 'snapshot') for snapshot in snapshots),
+                    view='early_warning')
+
+        return Response([
+            {
+                'patient_id': snapshot.patient_id,
+                'patient_name': snapshot.patient.user.get_full_name(),
+                'news2_score': snapshot.news2_score,
+                'risk': snapshot.risk,
+                'anomalies': snapshot.anomalies,
+                'vitals': {field: getattr(snapshot, field) for field in SNAPSHOT_FIELDS.values()},
+                'last_reading_at': snapshot.last_reading_at,
+                'scored_at': snapshot.scored_at,
+            }
+            for snapshot in snapshots
+        ])
+
+
+class ChartSummaryView(APIView):
+    """Patient chart summary: records, latest vitals, conditions, allergies, medications, labs and open invoices"""
+
+    def get(self, request, patient_id):
+        user = request.user
+        own_chart = getattr(getattr(user, 'patient_profile', None), 'id', None) == patient_id
+        if not (own_chart or is_clinician(user)):
+            return Response({"detail": "You do not have access to this patient's chart"},
+                            status=status.HTTP_403_FORBIDDEN)
+
+        chart = ChartSummaryService().summary(patient_id)
+        if chart is None:
+            return Response({"detail": "Patient not found"}, status=status.HTTP_404_NOT_FOUND)
+
+        # The cached chart is shared; records are narrowed to this reader
+        readable = set(visible_records(user).filter(
+            record_id__in=[record['record_id'] for record in chart['health_records']]
+        ).values_list('record_id', flat=True))
+        chart = {**chart, 'health_records': [
+            record for record in chart['health_records'] if record['record_id'] in readable
+        ]}
+        audit_read(request, 'CHART', patient_id, records=sorted(readable))
+        return Response(chart)
+
+
+class RecordSearchView(APIView):
+    """
+    Full-text search over the health records the user may read.
+    Query params: q, patient_id (default: the doctor's panel, or the patient's
+    own chart), limit, offset.
+    """
+
+    def get(self, request):
+        params = request.query_params
+        query = params.get('q', '').strip()
+        max_limit = get_search_config().get('MAX_PAGE_SIZE', 100)
+        try:
+            patient_id = int(params['patient_id']) if params.get('patient_id') else None
+            limit = min(int(params.get('limit', 20)), max_limit)
+            offset = int(params.get('offset', 0))
+        except ValueError:
+            limit = offset = -1
+        if not query or limit <= 0 or offset < 0:
+            return Response({"detail": "q is required; limit and offset must be non-negative integers"},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        found = RecordSearchService().search(request.user, query, patient_id=patient_id, limit=limit, offset=offset)
+        audit_reads(request, 'HEALTH_RECORD', (
+            (result['patient_id'], result['record_id']) for result in found['results']
+        ), query=query)
+        return Response({'query': query, 'limit': limit, 'offset': offset, **found})
+
+
+class HealthRecordListView(generics.ListAPIView):
+    """
+    Health records the user may read, newest first.
+    Query params: patient_id, record_type.
+    """
+    serializer_class = HealthRecordSummarySerializer
+    pagination_class = HealthRecordCursorPagination
+
+    def get_queryset(self):
+        params = self.request.query_params
+        queryset = visible_records(self.request.user)
+        if params.get('patient_id', '').isdigit():
+            queryset = queryset.filter(patient_id=int(params['patient_id']))
+        if params.get('record_type'):
+            queryset = queryset.filter(record_type=params['record_type'].upper())
+        return queryset
+
+    def paginate_queryset(self, queryset):
+        page = super().paginate_queryset(queryset)
+        audit_reads(self.request, 'HEALTH_RECORD', ((record.patient_id, record.record_id) for record in page or []))
+        return page
+
+
+class PatientTimelineView(generics.ListAPIView):
+    """
+    A patient's history across conditions, health records, allergies,
+    prescriptions, lab orders and appointments, newest first.
+    Query params: type (repeatable), before (ISO 8601 date or timestamp) to
+    start from a point in time.
+    """
+    serializer_class = TimelineEventSerializer
+    pagination_class = TimelineCursorPagination
+
+    def get_queryset(self):
+        user = self.request.user
+        patient_id = self.kwargs['patient_id']
+        own_chart = getattr(getattr(user, 'patient_profile', None), 'id', None) == patient_id
+        if not (own_chart or is_clinician(user)):
+            raise PermissionDenied("You do not have access to this patient's timeline")
+
+        params = self.request.query_params
+        events = TimelineEvent.objects.filter(patient_id=patient_id).select_related('doctor__user')
+        types = [event_type.upper() for event_type in params.getlist('type')]
+        unknown = set(types) - {choice for choice, _ in TimelineEvent.EVENT_TYPE_CHOICES}
+        if unknown:
+            raise ValidationError({"type": f"Unknown event types: {', '.join(sorted(unknown))}"})
+        if types:
+            events = events.filter(event_type__in=types)
+        if params.get('before'):
+            try:
+                before = parse_datetime(params['before']) or parse_date(params['before'])
+            except ValueError:
+                before = None
+            if before is None:
+                raise ValidationError({"before": "Use an ISO 8601 date or timestamp"})
+            events = events.filter(occurred_at__lt=as_datetime(before))
+
+        # Health record events keep their record's privacy
+        return events.filter(~Q(event_type='HEALTH_RECORD') | Q(
+            source_id__in=visible_records(user).filter(patient_id=patient_id).values('id')
+        ))
+
+    def paginate_queryset(self, queryset):
+        page = super().paginate_queryset(queryset)
+        audit_read(self.request, 'TIMELINE', self.kwargs['patient_id'],
+                   events=[f'{event.event_type}:{event.source_id}' for event in page or []])
+        return page
@@ -0,0 +1,17 @@
+# BE/shared/factories.py
+"""Model factories shared by the apps' tests"""
+from shared.models import Doctor, Patient, User
+
+
+def make_user(username, **kwargs):
+    return User.objects.create_user(username, f'{username}@example.com', 'pw', **kwargs)
+
+
+def make_doctor(username='doc'):
+    user = make_user(username, is_doctor=True, last_name='Doc')
+    return Doctor.objects.create(user=user, specialization='General')
+
+
+def make_patient(username='pat'):
+    user = make_user(username, is_patient=True, first_name='Pat')
+    return Patient.objects.create(user=user)
@@ -4,7 +4,6 @@ from django.contrib.auth import get_user_model
 from django.utils import timezone
 from datetime import date, timedelta
 from decimal import Decimal
-import uuid
 
 # Import all models.py
 from shared.models import User, Doctor, Patient, Nurse
@@ -429,7 +428,6 @@ class Command(BaseCommand):
 
             # Create health record
             health_record = HealthRecord.objects.create(
-                record_id=f'HR{uuid.uuid4().hex[:8].upper()}',
                 patient=patient,
                 doctor=doctor,
                 record_type='CONSULTATION',
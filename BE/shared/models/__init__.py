@@ -1,4 +1,5 @@
 from .base import User, Doctor, Patient
 from .nurse import Nurse
+from .sequence import IdSequence
 
-__all__ = ['User', 'Doctor', 'Patient', 'Nurse']
\ No newline at end of file
+__all__ = ['User', 'Doctor', 'Patient', 'Nurse', 'IdSequence']
@@ -0,0 +1,14 @@
+# BE/shared/models/sequence.py
+from django.db import models
+
+class IdSequence(models.Model):
+    """Named counter behind business ids; processes reserve blocks of it (see shared.utils.ids)"""
+    name = models.CharField(max_length=50, primary_key=True)
+    next_value = models.BigIntegerField(default=1)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.name}: {self.next_value}"
+
+    class Meta:
+        db_table = 'id_sequences'
@@ -0,0 +1,51 @@
+from contextlib import suppress
+from unittest import mock
+
+from django.db import transaction
+from django.test import TestCase, TransactionTestCase
+
+from .models import IdSequence
+from .utils.ids import IdGenerator
+
+
+class IdGeneratorTests(TestCase):
+    def test_ids_are_prefixed_and_zero_padded(self):
+        generator = IdGenerator('ids-format', 'T', width=6)
+        self.assertEqual(generator.take(3), ['T-000001', 'T-000002', 'T-000003'])
+        self.assertEqual(generator.next(), 'T-000004')
+
+    def test_rolled_back_reservation_is_not_handed_out_again(self):
+        generator = IdGenerator('ids-rollback', 'T', block_size=10)
+        with suppress(RuntimeError), transaction.atomic():
+            generator.take(2)
+            raise RuntimeError('rolled back')
+
+        kept = generator.take(3)
+        # Another process drawing from the same sequence after the rollback
+        other = IdGenerator('ids-rollback', 'T', block_size=10).take(3)
+        self.assertFalse(set(kept) & set(other))
+        self.assertEqual(IdSequence.objects.get(name='ids-rollback').next_value, 7)
+
+
+class IdGeneratorBlockTests(TransactionTestCase):
+    def test_committed_blocks_are_served_from_memory(self):
+        generator = IdGenerator('ids-block', 'T', block_size=5)
+        self.assertEqual(generator.next(), 'T-0000000001')
+        with self.assertNumQueries(0):
+            self.assertEqual(generator.take(4)[-1], 'T-0000000005')
+        # A request larger than a block reserves what it needs in one go
+        self.assertEqual(len(generator.take(12)), 12)
+        self.assertEqual(IdSequence.objects.get(name='ids-block').next_value, 18)
+
+    def test_stale_blocks_are_dropped_so_ids_follow_time(self):
+        early = IdGenerator('ids-age', 'T', block_size=10, max_age=1)
+        late = IdGenerator('ids-age', 'T', block_size=10, max_age=1)
+        with mock.patch('shared.utils.ids.time.monotonic', return_value=100.0):
+            first = early.next()
+            second = late.next()
+        self.assertLess(first, second)
+        with mock.patch('shared.utils.ids.time.monotonic', return_value=100.5):
+            # Within the age bound a block is still served from memory
+            self.assertEqual(early.next(), 'T-0000000002')
+        with mock.patch('shared.utils.ids.time.monotonic', return_value=102.0):
+            self.assertGreater(early.next(), second)
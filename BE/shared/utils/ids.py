@@ -0,0 +1,136 @@
+# BE/shared/utils/ids.py
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Tuple
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import F
+
+logger = logging.getLogger(__name__)
+
+
+def get_id_config():
+    return getattr(settings, 'ID_CONFIG', {})
+
+
+def _reserve(name, size) -> Tuple[int, int]:
+    from shared.models import IdSequence
+
+    with transaction.atomic():
+        sequence = IdSequence.objects.filter(name=name)
+        if not sequence.update(next_value=F('next_value') + size):
+            IdSequence.objects.bulk_create([IdSequence(name=name)], ignore_conflicts=True)
+            sequence.update(next_value=F('next_value') + size)
+        # The UPDATE holds the row lock, so this reads our own increment
+        end = sequence.values_list('next_value', flat=True).get()
+    return end - size, end
+
+
+def _reserve_on_own_connection(name, size):
+    try:
+        return _reserve(name, size)
+    finally:
+        connection.close()
+
+
+_reserver = None
+_reserver_lock = threading.Lock()
+
+
+def reserves_in_caller_transaction() -> bool:
+    """True when a reservation would be rolled back along with the caller's transaction"""
+    return connection.in_atomic_block and connection.vendor == 'sqlite'
+
+
+def reserve_block(name, size) -> Tuple[int, int]:
+    """
+    Take ``size`` numbers from the named sequence: returns [start, end).
+
+    Inside a transaction the reservation runs on a separate connection and
+    commits on its own, so rolling the caller back can't return the block
+    for another process to reuse. SQLite allows one writer at a time, so there
+    it joins the caller's transaction instead (see reserves_in_caller_transaction).
+    """
+    global _reserver
+    if not connection.in_atomic_block or reserves_in_caller_transaction():
+        return _reserve(name, size)
+
+    if _reserver is None:
+        with _reserver_lock:
+            if _reserver is None:
+                _reserver = ThreadPoolExecutor(max_workers=1, thread_name_prefix='id-reserve')
+    return _reserver.submit(_reserve_on_own_connection, name, size).result()
+
+
+class IdGenerator:
+    """
+    Issues ``PREFIX-0000012345`` style ids from a named database sequence.
+
+    Each process reserves a block of numbers at a time and hands them out from
+    memory, so an id costs no query until the block runs out. Ids only grow
+    within a process. Across processes they are time-ordered to within
+    ``BLOCK_MAX_AGE_SECONDS``: a block older than that is dropped and a fresh
+    one reserved, so an id issued more than that after another always sorts
+    after it, while ids issued closer together by different processes may
+    interleave. Numbers are zero-padded to a fixed width, so new rows land at
+    the right edge of the unique index. Numbers left in a dropped block, or in
+    one a process held when it exited, are skipped, so ids have gaps.
+
+    Where a reservation would join the caller's transaction (SQLite), only the
+    numbers needed are reserved and nothing is cached: a rollback returns them
+    to the sequence, and a cached block would then be handed out a second time.
+    """
+
+    def __init__(self, name, prefix, block_size=None, width=None, max_age=None):
+        config = get_id_config()
+        self.name = name
+        self.prefix = prefix
+        self.block_size = block_size or config.get('BLOCK_SIZE', 100)
+        self.width = width or config.get('WIDTH', 10)
+        self.max_age = max_age if max_age is not None else config.get('BLOCK_MAX_AGE_SECONDS', 1)
+        self._next = 0
+        self._end = 0
+        self._reserved_at = 0.0
+        self._lock = threading.Lock()
+
+    def format(self, number) -> str:
+        return f'{self.prefix}-{number:0{self.width}d}'
+
+    def next(self) -> str:
+        return self.take(1)[0]
+
+    def take(self, count) -> List[str]:
+        """``count`` ids in one go, e.g. for bulk_create; reserves a larger block if needed"""
+        numbers = []
+        with self._lock:
+            while len(numbers) < count:
+                if self._next >= self._end or time.monotonic() - self._reserved_at > self.max_age:
+                    needed = count - len(numbers)
+                    if reserves_in_caller_transaction():
+                        numbers.extend(range(*reserve_block(self.name, needed)))
+                        break
+                    self._next, self._end = reserve_block(self.name, max(self.block_size, needed))
+                    self._reserved_at = time.monotonic()
+                stop = min(self._end, self._next + count - len(numbers))
+                numbers.extend(range(self._next, stop))
+                self._next = stop
+        return [self.format(number) for number in numbers]
+
+
+_generators: Dict[str, IdGenerator] = {}
+_generators_lock = threading.Lock()
+
+
+def id_generator(name, prefix) -> IdGenerator:
+    generator = _generators.get(name)
+    if generator is None:
+        with _generators_lock:
+            generator = _generators.setdefault(name, IdGenerator(name, prefix))
+    return generator
+
+
+def next_id(name, prefix) -> str:
+    return id_generator(name, prefix).next()
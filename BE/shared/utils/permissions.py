@@ -0,0 +1,15 @@
+# BE/shared/utils/permissions.py
+from rest_framework import permissions
+
+
+def is_clinician(user) -> bool:
+    return bool(user and user.is_authenticated and (
+        user.is_staff or user.is_doctor or hasattr(user, 'nurse_profile')
+    ))
+
+
+class IsClinician(permissions.BasePermission):
+    """Doctors, nurses and staff"""
+
+    def has_permission(self, request, view):
+        return is_clinician(request.user)
@@ -0,0 +1,29 @@
+# BE/shared/utils/transactions.py
+import threading
+
+from django.db import transaction
+
+
+class OnCommitBatch:
+    """
+    Collects keys during a transaction and hands them to ``flush`` in one call
+    after it commits, so N row changes cost one follow-up instead of N.
+    Outside a transaction the flush happens immediately.
+    """
+
+    def __init__(self, flush):
+        self.flush = flush
+        self._local = threading.local()
+
+    def add(self, *keys):
+        if getattr(self._local, 'keys', None) is None:
+            self._local.keys = set()
+        self._local.keys.update(keys)
+        # Callbacks after the first find nothing left to do
+        transaction.on_commit(self._run)
+
+    def _run(self):
+        keys = getattr(self._local, 'keys', None)
+        self._local.keys = None
+        if keys:
+            self.flush(keys)